@@ -10,6 +10,8 @@ import multiprocessing as mp
 # -----------
 import src.misc.config as config
 from src.misc.init_modules import load_simulation_environment
+from src.misc.scenario_runner import run_scenarios_on_worker_pool
+from src.FleetSimulationBase import FleetSimulationBase
 from src.misc.globals import *
 
 
@@ -26,8 +28,19 @@ def run_single_simulation(scenario_parameters):
         SF.run()
 
 
+def resume_simulation(checkpoint_file):
+    """This function continues a simulation from a checkpoint file, which is written every checkpoint_interval
+    simulation seconds (see FleetSimulationBase.save_checkpoint). Output written after the checkpoint is replaced.
+
+    :param checkpoint_file: path to checkpoint file (in the checkpoints directory of the scenario output)
+    :type checkpoint_file: str
+    """
+    SF = FleetSimulationBase.load_checkpoint(checkpoint_file)
+    SF.run()
+
+
 def run_scenarios(constant_config_file, scenario_file, n_parallel_sim=1, n_cpu_per_sim=1, evaluate=1, log_level="info",
-                  keep_old=False, continue_next_after_error=False):
+                  keep_old=False, continue_next_after_error=False, persistent_workers=False):
     """
     This function combines constant study parameters and scenario parameters.
     Then it sets up a pool of workers and starts a simulation for each scenario.
@@ -53,6 +66,10 @@ def run_scenarios(constant_config_file, scenario_file, n_parallel_sim=1, n_cpu_p
     :type keep_old: bool
     :param continue_next_after_error: continue with next simulation if one the simulations threw an error (only SP)
     :type continue_next_after_error: bool
+    :param persistent_workers: use n_parallel_sim persistent workers pulling the scenarios (largest first) from a
+            shared queue and reusing loaded networks and zone systems; a summary with wall time and peak memory of
+            each scenario is written to the results directory of the study (see src/misc/scenario_runner.py)
+    :type persistent_workers: bool
     """
     assert type(n_parallel_sim) == int, "n_parallel_sim must be of type int"
     # read constant and scenario config files
@@ -85,7 +102,10 @@ def run_scenarios(constant_config_file, scenario_file, n_parallel_sim=1, n_cpu_p
 
     # perform simulation(s)
     print(f"Simulation of {len(scenario_cfgs)} scenarios on {n_parallel_sim} processes with {n_cpu_per_sim} cpus per simulation ...")
-    if n_parallel_sim == 1:
+    if persistent_workers:
+        run_scenarios_on_worker_pool(scenario_cfgs, n_parallel_sim,
+                                     continue_next_after_error=continue_next_after_error)
+    elif n_parallel_sim == 1:
         for scenario_cfg in scenario_cfgs:
             if continue_next_after_error:
                 try:
@@ -192,7 +212,9 @@ def check_assertions(list_eval_df, all_scenario_assertion_dict):
 if __name__ == "__main__":
     mp.freeze_support()
 
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 2 and sys.argv[1] == "--resume":
+        resume_simulation(sys.argv[2])
+    elif len(sys.argv) > 1:
         run_scenarios(*sys.argv)
     else:
         import time
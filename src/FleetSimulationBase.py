@@ -6,6 +6,11 @@ import logging
 import random
 import time
 import datetime
+import math
+import itertools
+import pickle
+import marshal
+import types
 # import traceback
 from abc import abstractmethod
 from tqdm import tqdm
@@ -21,9 +26,12 @@ import numpy as np
 
 # src imports
 # -----------
-from src.misc.init_modules import load_fleet_control_module, load_routing_engine
+from src.misc.init_modules import load_fleet_control_module, load_routing_engine, load_zone_system
 from src.demand.demand import Demand, SlaveDemand
 from src.simulation.Vehicles import SimulationVehicle
+from src.simulation.FleetState import FleetState
+from src.misc.output_writer import get_output_file_path, get_output_buffer_size, create_output_writer, \
+    submit_output_task, start_output_service, stop_output_service, flush_output_service, get_output_format
 if tp.TYPE_CHECKING:
     from src.fleetctrl.FleetControlBase import FleetControlBase
     from src.routing.NetworkBase import NetworkBase
@@ -37,8 +45,11 @@ from src.misc.globals import *
 DEFAULT_LOG_LEVEL = logging.INFO
 LOG = logging.getLogger(__name__)
 BUFFER_SIZE = 10
+EVENT_TIME_TOLERANCE = 0.001  # [s] floating point deviations of event times must not delay the processing of an event
 PROGRESS_LOOP = "demand"
 PROGRESS_LOOP_VEHICLE_STATUS = [VRL_STATES.IDLE,VRL_STATES.CHARGING,VRL_STATES.REPOSITION]
+CHECKPOINT_DIR = "checkpoints"  # sub-directory of the scenario output directory
+CHECKPOINT_ROUTING_ENGINE_ID = "routing_engine"
 # check for computation on LRZ cluster
 if os.environ.get('SLURM_PROCID'):
     PROGRESS_LOOP = "off"
@@ -51,8 +62,8 @@ INPUT_PARAMETERS_FleetSimulationBase = {
         G_DEMAND_NAME, G_RQ_FILE, G_AR_MAX_DEC_T
     ],
     "input_parameters_optional": [
-        G_SIM_TIME_STEP, G_NR_CH_OPERATORS, G_SIM_REALTIME_PLOT_FLAG, "log_level", G_SIM_ROUTE_OUT_FLAG, G_SIM_REPLAY_FLAG, G_INIT_STATE_SCENARIO,
-        G_FC_TYPE, G_ZONE_SYSTEM_NAME, G_FC_TR, G_FC_FNAME, G_INFRA_NAME
+        G_SIM_TIME_STEP, G_NR_CH_OPERATORS, G_SIM_REALTIME_PLOT_FLAG, G_SIM_SKIP_IDLE_STEPS, G_SIM_CHECKPOINT_INTERVAL, "log_level", G_SIM_ROUTE_OUT_FLAG, G_SIM_REPLAY_FLAG, G_INIT_STATE_SCENARIO,
+        G_FC_TYPE, G_ZONE_SYSTEM_NAME, G_FC_TR, G_FC_FNAME, G_INFRA_NAME, G_RQ_STREAM_LOOKAHEAD
     ],
     "mandatory_modules": [
         G_SIM_ENV, G_NETWORK_TYPE, G_RQ_TYP1, G_OP_MODULE
@@ -119,6 +130,53 @@ def build_operator_attribute_dicts(parameters, n_op, prefix="op_"):
 # main
 # ----
 
+def _rebuild_local_function(code_bytes, module_name, name, defaults, kwdefaults, closure_values):
+    if closure_values is None:
+        closure = None
+    else:
+        closure = tuple(types.CellType(value) for value in closure_values)
+    func = types.FunctionType(marshal.loads(code_bytes), importlib.import_module(module_name).__dict__, name,
+                              defaults, closure)
+    func.__kwdefaults__ = kwdefaults
+    return func
+
+
+class _CheckpointPickler(pickle.Pickler):
+    """The routing engine is not pickled with the simulation state, but replaced by a reference. At restore, the
+    network is loaded again and its dynamic state is set separately (see NetworkBase.get_checkpoint_state()).
+    Local functions (e.g. the objective functions of the fleet controls) are pickled with their code and closure
+    values; checkpoints can therefore only be restored with the same python version."""
+    def __init__(self, file, routing_engine):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.routing_engine = routing_engine
+
+    def persistent_id(self, obj):
+        if obj is self.routing_engine:
+            return CHECKPOINT_ROUTING_ENGINE_ID
+        return None
+
+    def reducer_override(self, obj):
+        if type(obj) is types.FunctionType and ("<locals>" in obj.__qualname__ or obj.__name__ == "<lambda>"):
+            if obj.__closure__ is None:
+                closure_values = None
+            else:
+                closure_values = tuple(cell.cell_contents for cell in obj.__closure__)
+            return _rebuild_local_function, (marshal.dumps(obj.__code__), obj.__module__, obj.__name__,
+                                             obj.__defaults__, obj.__kwdefaults__, closure_values)
+        return NotImplemented
+
+
+class _CheckpointUnpickler(pickle.Unpickler):
+    def __init__(self, file, routing_engine):
+        super().__init__(file)
+        self.routing_engine = routing_engine
+
+    def persistent_load(self, pid):
+        if pid == CHECKPOINT_ROUTING_ENGINE_ID:
+            return self.routing_engine
+        raise pickle.UnpicklingError(f"unknown persistent id {pid} in checkpoint")
+
+
 class FleetSimulationBase:
     def __init__(self, scenario_parameters: dict):
         self.t_init_start = time.perf_counter()
@@ -140,6 +198,7 @@ class FleetSimulationBase:
             return
         else:
             self._started = False
+        self._output_closed = False
 
         # general parameters
         self.start_time = self.scenario_parameters[G_SIM_START_TIME]
@@ -152,6 +211,18 @@ class FleetSimulationBase:
         self._shared_dict: dict = {}
         self._plot_class_instance: tp.Optional[PyPlot] = None
         self.realtime_plot_flag = self.scenario_parameters.get(G_SIM_REALTIME_PLOT_FLAG, 0)
+        # time steps without events are skipped (not compatible with realtime plots)
+        self.skip_idle_steps = bool(self.scenario_parameters.get(G_SIM_SKIP_IDLE_STEPS, False))
+        if self.skip_idle_steps and self.realtime_plot_flag in {1, 2}:
+            LOG.warning(f"{G_SIM_SKIP_IDLE_STEPS} is not available with realtime plots -> all time steps are simulated")
+            self.skip_idle_steps = False
+        self._last_step_time = None
+        # periodic checkpoints of the simulation state (see save_checkpoint)
+        self.checkpoint_interval = self.scenario_parameters.get(G_SIM_CHECKPOINT_INTERVAL, 0)
+        if self.checkpoint_interval is None or self.checkpoint_interval != self.checkpoint_interval:
+            self.checkpoint_interval = 0
+        self._next_checkpoint_time = self.start_time + self.checkpoint_interval
+        self._resume_after_time = None  # time of the last simulated step of a restored checkpoint
 
         # build list of operator dictionaries  # TODO: this could be eliminated with a new YAML-based config system
         self.list_op_dicts: tp.Dict[str,str] = build_operator_attribute_dicts(scenario_parameters, self.n_op,
@@ -169,42 +240,10 @@ class FleetSimulationBase:
         # write scenario config file in output directory
         self.save_scenario_inputs()
 
-        # remove old log handlers (otherwise sequential simulations only log to first simulation)
-        for handler in logging.root.handlers[:]:
-            logging.root.removeHandler(handler)
-        # start new log file
-        logging.VERBOSE = 5
-        logging.addLevelName(logging.VERBOSE, "VERBOSE")
-        logging.Logger.verbose = lambda inst, msg, *args, **kwargs: inst.log(logging.VERBOSE, msg, *args, **kwargs)
-        logging.LoggerAdapter.verbose = lambda inst, msg, *args, **kwargs: inst.log(logging.VERBOSE, msg, *args, **kwargs)
-        logging.verbose = lambda msg, *args, **kwargs: logging.log(logging.VERBOSE, msg, *args, **kwargs)
-        if self.scenario_parameters.get("log_level", "info"):
-            level_str = self.scenario_parameters["log_level"]
-            if level_str == "verbose":
-                log_level = logging.VERBOSE
-            elif level_str == "debug":
-                log_level = logging.DEBUG
-            elif level_str == "info":
-                log_level = logging.INFO
-            elif level_str == "warning":
-                log_level = logging.WARNING
-            else:
-                log_level = DEFAULT_LOG_LEVEL
-        else:
-            log_level = DEFAULT_LOG_LEVEL
-            pd.set_option("mode.chained_assignment", None)
-        self.log_file = os.path.join(self.dir_names[G_DIR_OUTPUT], f"00_simulation.log")
-        if log_level < logging.INFO:
-            streams = [logging.FileHandler(self.log_file), logging.StreamHandler()]
-        else:
-            print("Only minimum output to console -> see log-file")
-            streams = [logging.FileHandler(self.log_file)]
-        # TODO # log of subsequent simulations is saved in first simulation log
-        logging.basicConfig(handlers=streams,
-                            level=log_level, format='%(process)d-%(name)s-%(levelname)s-%(message)s')
+        self._init_logging()
 
         # set up output files
-        self.user_stat_f = os.path.join(self.dir_names[G_DIR_OUTPUT], f"1_user-stats.csv")
+        self.user_stat_f = get_output_file_path(self.dir_names[G_DIR_OUTPUT], "1_user-stats", self.scenario_parameters)
         self.network_stat_f = os.path.join(self.dir_names[G_DIR_OUTPUT], f"3_network-stats.csv")
         self.pt_stat_f = os.path.join(self.dir_names[G_DIR_OUTPUT], "4_pt_stats.csv")
 
@@ -215,20 +254,13 @@ class FleetSimulationBase:
         # TODO # after ISTTT: bring init of modules in extra function (-> parallel processing)
         self.zones = None
         if self.dir_names.get(G_DIR_ZONES, None) is not None:
-            if self.scenario_parameters.get(G_FC_TYPE) and self.scenario_parameters[G_FC_TYPE] == "perfect":
-                from src.infra.PerfectForecastZoning import PerfectForecastZoneSystem
-                self.zones = PerfectForecastZoneSystem(self.dir_names[G_DIR_ZONES], self.scenario_parameters, self.dir_names)
-            else:
-                from src.infra.Zoning import ZoneSystem
-                self.zones = ZoneSystem(self.dir_names[G_DIR_ZONES], self.scenario_parameters, self.dir_names)
+            self.zones = load_zone_system(self.dir_names[G_DIR_ZONES], self.scenario_parameters, self.dir_names)
 
         # routing engine
         LOG.info("Initialization of network and routing engine...")
         network_type = self.scenario_parameters[G_NETWORK_TYPE]
-        network_dynamics_file = self.scenario_parameters.get(G_NW_DYNAMIC_F, None)
         # TODO # check consistency of scenario inputs / another way to refactor add_init_data ?
-        self.routing_engine: NetworkBase = load_routing_engine(network_type, self.dir_names[G_DIR_NETWORK],
-                                                               network_dynamics_file_name=network_dynamics_file)
+        self.routing_engine: NetworkBase = self._load_routing_engine(self.scenario_parameters, self.dir_names)
         if network_type == "NetworkDynamicNFDClusters":
             self.routing_engine.add_init_data(self.start_time, self.time_step,
                                               self.scenario_parameters[G_NW_DENSITY_T_BIN_SIZE],
@@ -260,12 +292,28 @@ class FleetSimulationBase:
 
         # attributes for fleet controller and vehicles
         self.sim_vehicles: tp.Dict[tp.Tuple[int, int], SimulationVehicle] = {}
+        self.fleet_state = FleetState()  # columnar copy of vehicle states (status)
         self.sorted_sim_vehicle_keys: tp.List[tp.Tuple[int, int]] = sorted(self.sim_vehicles.keys())
-        self.vehicle_update_order: tp.Dict[tp.Tuple[int, int], int] = {vid : 1 for vid in self.sim_vehicles.keys()} #value defines the order in whichvehicles are updated (i.e. charging first)
+        self.vehicle_update_index: tp.Dict[tp.Tuple[int, int], int] = {} # position of vehicle in update order of self.sim_vehicles
+        self.vehicles_updated_first: tp.Set[tp.Tuple[int, int]] = set() # vehicles that are updated before all others (i.e. charging)
         self.operators: tp.List[FleetControlBase] = []
         self.op_output = {}
+        self.op_output_writers = {}
+        self.op_output_buffer_size = get_output_buffer_size(self.scenario_parameters, BUFFER_SIZE)
         self._load_fleetctr_vehicles()
 
+        # online evaluation (KPIs are computed from the records while they are written)
+        self.online_evaluation = None
+        if self.scenario_parameters.get(G_EVAL_ONLINE, False):
+            from src.evaluation.online import OnlineEvaluation
+            list_op_vid_vtype = [(op_id, vid, veh_obj.veh_type)
+                                 for (op_id, vid), veh_obj in self.sim_vehicles.items()]
+            self.online_evaluation = OnlineEvaluation(self.scenario_parameters, self.list_op_dicts, self.dir_names,
+                                                      list_op_vid_vtype)
+            self.demand.add_record_listener(self.online_evaluation.add_user_records)
+        elif self.scenario_parameters.get(G_EVAL_ONLINE_ONLY, False):
+            LOG.warning(f"{G_EVAL_ONLINE_ONLY} requires {G_EVAL_ONLINE} -> standard evaluation of the output files is used")
+
         # call additional simulation environment specific init
         LOG.info("Simulation environment specific initializations...")
         self.init_blocking = True
@@ -276,6 +324,12 @@ class FleetSimulationBase:
         LOG.info("Creating or loading initial vehicle states...")
         np.random.seed(self.scenario_parameters[G_RANDOM_SEED])
         self.load_initial_state()
+        if self.checkpoint_interval > 0:
+            unsupported_reason = self._get_unsupported_checkpoint_reason()
+            if unsupported_reason is not None:
+                LOG.warning(f"checkpoints are not available ({unsupported_reason}) -> {G_SIM_CHECKPOINT_INTERVAL} is"
+                            f" ignored")
+                self.checkpoint_interval = 0
         LOG.info(f"Initialization of scenario {self.scenario_name} successful.")
 
         # self.routing_engine.checkNetwork()
@@ -352,6 +406,9 @@ class FleetSimulationBase:
             operator_attributes = self.list_op_dicts[op_id]
             operator_module_name = operator_attributes[G_OP_MODULE]
             self.op_output[op_id] = []  # shared list among vehicles
+            op_output_f = get_output_file_path(self.dir_names[G_DIR_OUTPUT], f"2-{op_id}_op-stats",
+                                               self.scenario_parameters)
+            self.op_output_writers[op_id] = create_output_writer(op_output_f, self.scenario_parameters)
             if not operator_module_name == "LinebasedFleetControl":
                 fleet_composition_dict = operator_attributes[G_OP_FLEET]
                 list_vehicles = []
@@ -365,6 +422,7 @@ class FleetSimulationBase:
                                                         replay_flag)
                         list_vehicles.append(tmp_veh_obj)
                         self.sim_vehicles[(op_id, vid)] = tmp_veh_obj
+                        self.fleet_state.register_vehicle(tmp_veh_obj)
                         vid += 1
                 OpClass: FleetControlBase = load_fleet_control_module(operator_module_name)
                 self.operators.append(OpClass(op_id, operator_attributes, list_vehicles, self.routing_engine, self.zones,
@@ -382,12 +440,57 @@ class FleetSimulationBase:
                     list_vehicles.append(tmp_veh_obj)
                     veh_type_list.append([op_id, vid, veh_type])
                     self.sim_vehicles[(op_id, vid)] = tmp_veh_obj
+                    self.fleet_state.register_vehicle(tmp_veh_obj)
                 OpClass.continue_init(list_vehicles, self.start_time)
                 self.operators.append(OpClass)
         veh_type_f = os.path.join(self.dir_names[G_DIR_OUTPUT], "2_vehicle_types.csv")
         veh_type_df = pd.DataFrame(veh_type_list, columns=[G_V_OP_ID, G_V_VID, G_V_TYPE])
         veh_type_df.to_csv(veh_type_f, index=False)
-        self.vehicle_update_order: tp.Dict[tp.Tuple[int, int], int] = {vid : 1 for vid in self.sim_vehicles.keys()}
+        self.vehicle_update_index = {opid_vid_tuple : i for i, opid_vid_tuple in enumerate(self.sim_vehicles.keys())}
+        self.vehicles_updated_first = set()
+
+    def _init_logging(self):
+        """This method sets up the log file of the scenario (log messages are appended to an existing file)."""
+        # remove old log handlers (otherwise sequential simulations only log to first simulation)
+        for handler in logging.root.handlers[:]:
+            logging.root.removeHandler(handler)
+        # start new log file
+        logging.VERBOSE = 5
+        logging.addLevelName(logging.VERBOSE, "VERBOSE")
+        logging.Logger.verbose = lambda inst, msg, *args, **kwargs: inst.log(logging.VERBOSE, msg, *args, **kwargs)
+        logging.LoggerAdapter.verbose = lambda inst, msg, *args, **kwargs: inst.log(logging.VERBOSE, msg, *args, **kwargs)
+        logging.verbose = lambda msg, *args, **kwargs: logging.log(logging.VERBOSE, msg, *args, **kwargs)
+        if self.scenario_parameters.get("log_level", "info"):
+            level_str = self.scenario_parameters["log_level"]
+            if level_str == "verbose":
+                log_level = logging.VERBOSE
+            elif level_str == "debug":
+                log_level = logging.DEBUG
+            elif level_str == "info":
+                log_level = logging.INFO
+            elif level_str == "warning":
+                log_level = logging.WARNING
+            else:
+                log_level = DEFAULT_LOG_LEVEL
+        else:
+            log_level = DEFAULT_LOG_LEVEL
+            pd.set_option("mode.chained_assignment", None)
+        self.log_file = os.path.join(self.dir_names[G_DIR_OUTPUT], f"00_simulation.log")
+        if log_level < logging.INFO:
+            streams = [logging.FileHandler(self.log_file), logging.StreamHandler()]
+        else:
+            print("Only minimum output to console -> see log-file")
+            streams = [logging.FileHandler(self.log_file)]
+        # TODO # log of subsequent simulations is saved in first simulation log
+        logging.basicConfig(handlers=streams,
+                            level=log_level, format='%(process)d-%(name)s-%(levelname)s-%(message)s')
+
+    @staticmethod
+    def _load_routing_engine(scenario_parameters, dir_names):
+        return load_routing_engine(scenario_parameters[G_NETWORK_TYPE], dir_names[G_DIR_NETWORK],
+                                   network_dynamics_file_name=scenario_parameters.get(G_NW_DYNAMIC_F, None),
+                                   table_mode=scenario_parameters.get(G_NW_TABLE_MODE),
+                                   route_cache_size=scenario_parameters.get(G_NW_ROUTE_CACHE_SIZE))
 
     @staticmethod
     def get_directory_dict(scenario_parameters):
@@ -408,11 +511,27 @@ class FleetSimulationBase:
     def evaluate(self):
         """Runs standard and simulation environment specific evaluations over simulation results."""
         output_dir = self.dir_names[G_DIR_OUTPUT]
-        # standard evaluation
-        from src.evaluation.standard import standard_evaluation
-        standard_evaluation(output_dir)
+        if self.online_evaluation is not None and self.scenario_parameters.get(G_EVAL_ONLINE_ONLY, False):
+            # standard_eval.csv from the online KPIs without reading the output files again
+            self.online_evaluation.write_results(output_dir, write_standard_eval=True)
+        else:
+            # standard evaluation
+            from src.evaluation.standard import standard_evaluation
+            standard_evaluation(output_dir)
+            if self.online_evaluation is not None:
+                self.online_evaluation.write_results(output_dir)
         self.add_evaluate()
 
+    def get_online_kpis(self):
+        """This method returns the current KPIs of the online evaluation (only records that were already written to
+        the output buffers are considered).
+
+        :return: DataFrame with KPIs per operator like standard_eval.csv or None if the online evaluation is inactive
+        """
+        if self.online_evaluation is None:
+            return None
+        return self.online_evaluation.get_kpis()
+
     # def initialize_operators_and_vehicles(self): TODO I think this is depricated!
     #     """ this function loads and initialzie all operator classes and its vehicle objects
     #     and sets corresponding outputs"""
@@ -522,6 +641,132 @@ class FleetSimulationBase:
         fs_df = pd.DataFrame(list_vehicle_states)
         fs_df.to_csv(final_state_f)
 
+    def save_checkpoint(self, sim_time):
+        """This method saves the complete simulation state after the simulation step of sim_time (vehicles, fleet
+        control, demand, charging infrastructure, random number generators, output buffers) in the checkpoints
+        directory of the scenario output. The network is not part of the checkpoint, only its dynamic state. The sizes
+        of the output files are stored to remove output that is written after the checkpoint when it is restored.
+
+        :param sim_time: current simulation time (the step of sim_time has to be finished)
+        :return: checkpoint file path
+        """
+        if get_output_format(self.scenario_parameters) != "csv":
+            raise IOError(f"checkpoints are only available for csv output files!")
+        LOG.info(f"Saving checkpoint at simulation time {sim_time} ...")
+        t0 = time.perf_counter()
+        # all output records until now have to be written to allow a consistent restore of the output files
+        flush_output_service()
+        output_dir = self.dir_names[G_DIR_OUTPUT]
+        output_file_sizes = {}
+        for f in os.listdir(output_dir):
+            output_f = os.path.join(output_dir, f)
+            if os.path.isfile(output_f) and output_f != self.log_file:
+                output_file_sizes[f] = os.path.getsize(output_f)
+        # the history of the charging stations is stored in class attributes
+        from src.infra.ChargingInfrastructure import ChargingStation
+        header = {"scenario_parameters": self.scenario_parameters, "sim_time": sim_time,
+                  "sim_env_class": self.__class__,
+                  "routing_engine_state": self.routing_engine.get_checkpoint_state(),
+                  "random_state": random.getstate(), "np_random_state": np.random.get_state(),
+                  "charging_station_history": (ChargingStation.station_history,
+                                               ChargingStation.station_history_file_path),
+                  "output_file_sizes": output_file_sizes}
+        # realtime plots are started again after a restore
+        sim_state = self.__dict__.copy()
+        sim_state["_manager"] = None
+        sim_state["_shared_dict"] = {}
+        sim_state["_plot_class_instance"] = None
+        checkpoint_dir = os.path.join(output_dir, CHECKPOINT_DIR)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        checkpoint_f = os.path.join(checkpoint_dir, f"checkpoint_{sim_time}.pkl")
+        # the checkpoint is only replaced when it was written completely
+        tmp_checkpoint_f = checkpoint_f + ".tmp"
+        try:
+            with open(tmp_checkpoint_f, "wb") as fh:
+                pickle.dump(header, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                _CheckpointPickler(fh, self.routing_engine).dump(sim_state)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            os.remove(tmp_checkpoint_f)
+            raise IOError(f"simulation state cannot be saved in a checkpoint (modules with processes or open files,"
+                          f" e.g. parallelization, are not supported): {e!r}") from e
+        os.replace(tmp_checkpoint_f, checkpoint_f)
+        LOG.info(f"... checkpoint {checkpoint_f} saved in {round(time.perf_counter() - t0, 3)}s")
+        return checkpoint_f
+
+    @staticmethod
+    def load_checkpoint(checkpoint_f):
+        """This method restores a simulation from a checkpoint (see save_checkpoint). The network is loaded again
+        from the input files and output that was written after the checkpoint is removed from the output files.
+        Calling run() of the returned simulation continues with the time step after the checkpoint.
+
+        :param checkpoint_f: checkpoint file path
+        :return: simulation environment instance
+        """
+        with open(checkpoint_f, "rb") as fh:
+            header = pickle.load(fh)
+            scenario_parameters = header["scenario_parameters"]
+            dir_names = FleetSimulationBase.get_directory_dict(scenario_parameters)
+            print("-" * 80 + f"\nResume simulation of scenario {scenario_parameters[G_SCENARIO_NAME]}"
+                             f" after simulation time {header['sim_time']}")
+            routing_engine = FleetSimulationBase._load_routing_engine(scenario_parameters, dir_names)
+            routing_engine.set_checkpoint_state(header["routing_engine_state"])
+            sim_state = _CheckpointUnpickler(fh, routing_engine).load()
+        sim_env_class = header["sim_env_class"]
+        sim = sim_env_class.__new__(sim_env_class)
+        sim.__dict__.update(sim_state)
+        sim.t_init_start = time.perf_counter()
+        sim._started = False
+        sim._output_closed = False
+        sim._resume_after_time = header["sim_time"]
+        # reset output files to their state at the checkpoint
+        output_dir = sim.dir_names[G_DIR_OUTPUT]
+        output_file_sizes = header["output_file_sizes"]
+        for f in os.listdir(output_dir):
+            output_f = os.path.join(output_dir, f)
+            if not os.path.isfile(output_f) or output_f == sim.log_file:
+                continue
+            if f not in output_file_sizes:
+                os.remove(output_f)
+            elif os.path.getsize(output_f) != output_file_sizes[f]:
+                with open(output_f, "r+b") as fh:
+                    fh.truncate(output_file_sizes[f])
+        sim._init_logging()
+        LOG.info(f"Simulation resumed from checkpoint {checkpoint_f} after simulation time {header['sim_time']}.")
+        random.setstate(header["random_state"])
+        np.random.set_state(header["np_random_state"])
+        from src.infra.ChargingInfrastructure import ChargingStation
+        ChargingStation.station_history, ChargingStation.station_history_file_path = \
+            header["charging_station_history"]
+        return sim
+
+    def _get_unsupported_checkpoint_reason(self):
+        """ checks at initialization whether the simulation setup supports checkpoints
+
+        :return: reason why checkpoints are not supported or None
+        """
+        output_format = get_output_format(self.scenario_parameters)
+        if output_format != "csv":
+            return f"output format {output_format} instead of csv"
+        n_cpu = self.scenario_parameters.get(G_SLAVE_CPU, 1)
+        if n_cpu is not None and n_cpu == n_cpu and int(n_cpu) > 1:
+            return f"parallelization with {G_SLAVE_CPU} = {n_cpu}"
+        try:
+            self.routing_engine.get_checkpoint_state()
+        except NotImplementedError:
+            return f"routing engine {self.routing_engine.__class__.__name__} does not provide its state"
+        return None
+
+    def _save_checkpoint_if_due(self, sim_time):
+        if self.checkpoint_interval > 0 and sim_time >= self._next_checkpoint_time:
+            n_intervals = (sim_time - self.start_time) // self.checkpoint_interval + 1
+            self._next_checkpoint_time = self.start_time + n_intervals * self.checkpoint_interval
+            try:
+                self.save_checkpoint(sim_time)
+            except IOError as e:
+                # a failed checkpoint must not abort the simulation
+                LOG.warning(f"checkpoint at simulation time {sim_time} failed -> no further checkpoints: {e}")
+                self.checkpoint_interval = 0
+
     def record_remaining_assignments(self):
         """
         This method simulates the remaining assignments at the end of the simulation in order to get them recorded
@@ -562,21 +807,31 @@ class FleetSimulationBase:
         self.demand.save_user_stats(force)
         for op_id in range(self.n_op):
             current_buffer_size = len(self.op_output[op_id]) 
-            if (current_buffer_size and force) or current_buffer_size > BUFFER_SIZE:
-                op_output_f = os.path.join(self.dir_names[G_DIR_OUTPUT], f"2-{op_id}_op-stats.csv")
-                if os.path.isfile(op_output_f):
-                    write_mode = "a"
-                    write_header = False
-                else:
-                    write_mode = "w"
-                    write_header = True
+            if (current_buffer_size and force) or current_buffer_size > self.op_output_buffer_size:
                 tmp_df = pd.DataFrame(self.op_output[op_id])
-                tmp_df.to_csv(op_output_f, index=False, mode=write_mode, header=write_header)
+                if self.online_evaluation is not None:
+                    self.online_evaluation.add_vehicle_records(op_id, tmp_df)
+                submit_output_task(self.op_output_writers[op_id].write, tmp_df)
                 self.op_output[op_id].clear()
                 # LOG.info(f"\t ... just wrote {current_buffer_size} entries from buffer to stats of operator {op_id}.")
                 LOG.debug(f"\t ... just wrote {current_buffer_size} entries from buffer to stats of operator {op_id}.")
             self.operators[op_id].record_dynamic_fleetcontrol_output(force=force)
 
+    def close_output_files(self):
+        """This method finalizes the user, operator and dynamic fleet control output files and waits until the output
+        service has written all queued output. It has to be called after the last records were written (the binary
+        output formats are only readable afterwards)."""
+        if self._output_closed:
+            return
+        self._output_closed = True
+        try:
+            self.demand.close_user_stats_output()
+            for op_id in range(self.n_op):
+                submit_output_task(self.op_output_writers[op_id].close)
+                self.operators[op_id].close_dynamic_fleetcontrol_output()
+        finally:
+            stop_output_service()
+
     def update_sim_state_fleets(self, last_time, next_time, force_update_plan=False):
         """
         This method updates the simulation vehicles, records, ends and starts tasks and returns some data that
@@ -586,15 +841,25 @@ class FleetSimulationBase:
         :param force_update_plan: flag that can force vehicle plan to be updated
         """
         LOG.debug(f"updating MoD state from {last_time} to {next_time}")
-        #for opid_vid_tuple, veh_obj in self.sim_vehicles.items():
-        for opid_vid_tuple, veh_obj in sorted(self.sim_vehicles.items(), key=lambda x:self.vehicle_update_order[x[0]]):
+        self._move_driving_vehicles(last_time, next_time)
+        # charging vehicles of the last step are updated first (in the order of self.sim_vehicles), then all others
+        list_update_first = sorted(self.vehicles_updated_first, key=lambda x:self.vehicle_update_index[x])
+        set_update_first = set(list_update_first)
+        update_order = itertools.chain(list_update_first,
+                                       (x for x in self.sim_vehicles.keys() if x not in set_update_first))
+        for opid_vid_tuple in update_order:
+            veh_obj = self.sim_vehicles[opid_vid_tuple]
             op_id, vid = opid_vid_tuple
-            boarding_requests, alighting_requests, passed_VRL, dict_start_alighting =\
-                veh_obj.update_veh_state(last_time, next_time)
+            if veh_obj.status == VRL_STATES.IDLE and not veh_obj.start_next_leg_first:
+                # idle vehicles without new assignment do not change their state
+                boarding_requests, alighting_requests, passed_VRL, dict_start_alighting = {}, {}, [], {}
+            else:
+                boarding_requests, alighting_requests, passed_VRL, dict_start_alighting =\
+                    veh_obj.update_veh_state(last_time, next_time)
             if veh_obj.status == VRL_STATES.CHARGING:
-                self.vehicle_update_order[opid_vid_tuple] = 0
+                self.vehicles_updated_first.add(opid_vid_tuple)
             else:
-                self.vehicle_update_order[opid_vid_tuple] = 1
+                self.vehicles_updated_first.discard(opid_vid_tuple)
             for rid, boarding_time_and_pos in boarding_requests.items():
                 boarding_time, boarding_pos = boarding_time_and_pos
                 LOG.debug(f"rid {rid} boarding at {boarding_time} at pos {boarding_pos}")
@@ -616,6 +881,26 @@ class FleetSimulationBase:
                 self.operators[op_id].receive_status_update(vid, next_time, passed_VRL, force_update_plan)
         # TODO # after ISTTT: live visualization: send vehicle states (self.live_visualization_flag==True)
 
+    def _move_driving_vehicles(self, last_time, next_time):
+        """
+        This method moves all vehicles that start the time step on a driving leg together with one call of the
+        routing engine. The results are stored in the vehicles and used in their next call of update_veh_state.
+        :param last_time: simulation time before the state update
+        :param next_time: simulation time of the state update
+        """
+        batch_input = {}    # replay_flag -> list of (veh_obj, route, pos)
+        for veh_obj in self.fleet_state.get_vehicles(status_list=G_DRIVING_STATUS):
+            move_input = veh_obj.get_batch_move_input()
+            if move_input is not None:
+                batch_input.setdefault(veh_obj.replay_flag, []).append((veh_obj, move_input[0], move_input[1]))
+        for replay_flag, list_veh_route_pos in batch_input.items():
+            move_results = self.routing_engine.move_fleet_along_routes(
+                [route for _, route, _ in list_veh_route_pos], [pos for _, _, pos in list_veh_route_pos],
+                next_time - last_time, sim_vid_ids=[(veh_obj.op_id, veh_obj.vid) for veh_obj, _, _ in list_veh_route_pos],
+                new_sim_time=last_time, record_node_times=replay_flag)
+            for (veh_obj, _, _), move_result in zip(list_veh_route_pos, move_results):
+                veh_obj.set_precomputed_move(last_time, next_time - last_time, move_result)
+
     def update_vehicle_routes(self, sim_time):
         """ this method can be used to recalculate routes of currently driving vehicles in case
         network travel times changed and shortest paths need to be re-set
@@ -704,40 +989,58 @@ class FleetSimulationBase:
         t_run_start = time.perf_counter()
         if not self._started:
             self._started = True
-            if PROGRESS_LOOP == "off":
-                for sim_time in range(self.start_time, self.end_time, self.time_step):
-                    self.step(sim_time)
-                    self._update_realtime_plots_dict(sim_time)
-            elif PROGRESS_LOOP == "demand":
-                # loop over time with progress bar scaling according to future demand
-                all_requests = sum([len(x) for x in self.demand.future_requests.values()])
-                with tqdm(total=100, position=tqdm_position) as pbar:
-                    pbar.set_description(self.scenario_parameters.get(G_SCENARIO_NAME))
-                    for sim_time in range(self.start_time, self.end_time, self.time_step):
-                        remaining_requests = sum([len(x) for x in self.demand.future_requests.values()])
+            output_service = start_output_service(self.scenario_parameters)
+            try:
+                if PROGRESS_LOOP == "off":
+                    for sim_time in self._iterate_sim_times():
                         self.step(sim_time)
-                        cur_perc = int(100 * (1 - remaining_requests/all_requests))
-                        pbar.update(cur_perc - pbar.n)
-                        vehicle_counts = self.count_fleet_status()
-                        info_dict = {"simulation_time": sim_time,
-                                     "driving": sum([vehicle_counts[x] for x in G_DRIVING_STATUS])}
-                        info_dict.update({x.display_name: vehicle_counts[x] for x in PROGRESS_LOOP_VEHICLE_STATUS})
-                        pbar.set_postfix(info_dict)
                         self._update_realtime_plots_dict(sim_time)
-            else:
-                # loop over time with progress bar scaling with time
-                for sim_time in tqdm(range(self.start_time, self.end_time, self.time_step), position=tqdm_position,
-                                     desc=self.scenario_parameters.get(G_SCENARIO_NAME)):
-                    self.step(sim_time)
-                    self._update_realtime_plots_dict(sim_time)
-
-            # record stats
-            self.record_stats()
-
-            # save final state, record remaining travelers and vehicle tasks
-            self.save_final_state()
-            self.record_remaining_assignments()
-            self.demand.record_remaining_users()
+                        self._save_checkpoint_if_due(sim_time)
+                elif PROGRESS_LOOP == "demand":
+                    # loop over time with progress bar scaling according to future demand
+                    with tqdm(total=100, position=tqdm_position) as pbar:
+                        pbar.set_description(self.scenario_parameters.get(G_SCENARIO_NAME))
+                        for sim_time in self._iterate_sim_times():
+                            cur_perc = int(100 * self.demand.get_progress(sim_time))
+                            self.step(sim_time)
+                            pbar.update(cur_perc - pbar.n)
+                            vehicle_counts = self.count_fleet_status()
+                            info_dict = {"simulation_time": sim_time,
+                                         "driving": sum([vehicle_counts[x] for x in G_DRIVING_STATUS])}
+                            info_dict.update({x.display_name: vehicle_counts[x]
+                                              for x in PROGRESS_LOOP_VEHICLE_STATUS})
+                            if output_service is not None:
+                                info_dict["output_queue"] = output_service.get_queue_depth()
+                            pbar.set_postfix(info_dict)
+                            self._update_realtime_plots_dict(sim_time)
+                            self._save_checkpoint_if_due(sim_time)
+                else:
+                    # loop over time with progress bar scaling with time
+                    with tqdm(total=len(range(self.start_time, self.end_time, self.time_step)), position=tqdm_position,
+                              desc=self.scenario_parameters.get(G_SCENARIO_NAME)) as pbar:
+                        for sim_time in self._iterate_sim_times():
+                            self.step(sim_time)
+                            self._update_realtime_plots_dict(sim_time)
+                            pbar.update((sim_time - self.start_time) // self.time_step + 1 - pbar.n)
+                            self._save_checkpoint_if_due(sim_time)
+
+                # record stats
+                self.record_stats()
+
+                # save final state, record remaining travelers and vehicle tasks
+                self.save_final_state()
+                self.record_remaining_assignments()
+                self.demand.record_remaining_users()
+            except BaseException:
+                # flush all output also if the simulation was stopped by an exception; errors while closing the
+                # output files are only logged to keep the original exception
+                try:
+                    self.close_output_files()
+                except Exception:
+                    LOG.exception("closing the output files after the simulation was stopped failed")
+                raise
+            self.close_output_files()
+
         t_run_end = time.perf_counter()
         # call evaluation
         self.evaluate()
@@ -754,6 +1057,72 @@ class FleetSimulationBase:
         LOG.info(prt_str)
         self._end_realtime_plot()
 
+    def _iterate_sim_times(self):
+        """ generator of the simulation times for which step() is called: all time steps in [start_time, end_time)
+        or, if G_SIM_SKIP_IDLE_STEPS is set, only the time steps in which an event has to be processed
+        (a simulation restored from a checkpoint continues after the time step of the checkpoint) """
+        if self._resume_after_time is None:
+            sim_time = self.start_time
+        else:
+            sim_time = self._get_next_sim_time(self._resume_after_time)
+            self._resume_after_time = None
+        while sim_time < self.end_time:
+            yield sim_time
+            sim_time = self._get_next_sim_time(sim_time)
+
+    def _get_next_sim_time(self, sim_time):
+        """ returns the simulation time of the step after the (finished) step of sim_time """
+        last_grid_time = self.start_time + ((self.end_time - self.start_time - 1) // self.time_step) * self.time_step
+        self._last_step_time = sim_time
+        next_time = sim_time + self.time_step
+        if self.skip_idle_steps and next_time < last_grid_time:
+            next_event = self._get_next_event_time(sim_time, next_time)
+            if next_event > next_time:
+                # an event is processed in the first time step at or after its occurrence
+                # (the last time step is always simulated to bring all vehicles to their final state)
+                if next_event < last_grid_time:
+                    n_steps = math.ceil((next_event - EVENT_TIME_TOLERANCE - self.start_time) / self.time_step)
+                    next_time = max(next_time, self.start_time + n_steps * self.time_step)
+                else:
+                    next_time = last_grid_time
+                LOG.debug(f"no event until {next_event} -> skip time steps from {sim_time} to {next_time}")
+        return next_time
+
+    def _get_next_event_time(self, sim_time, next_time):
+        """ returns the earliest time after sim_time at which any simulation module has to be updated
+        the search is stopped as soon as an event before next_time is found
+
+        :param sim_time: current simulation time
+        :param next_time: time of the next regular simulation step
+        :return: next event time (inf if no further event is known)
+        """
+        next_event = min(self.demand.get_next_event_time(sim_time), self.routing_engine.get_next_update_time(sim_time))
+        if next_event <= next_time:
+            return next_event
+        for op in self.operators:
+            next_event = min(next_event, op.get_next_event_time(sim_time))
+        for ch_op_dict in self.charging_operator_dict.values():
+            for ch_op in ch_op_dict.values():
+                next_event = min(next_event, ch_op.get_next_event_time(sim_time))
+        if next_event <= next_time:
+            return next_event
+        for veh_obj in self.sim_vehicles.values():
+            next_event = min(next_event, veh_obj.get_next_event_time(sim_time))
+            if next_event <= next_time:
+                break
+        return next_event
+
+    def _get_last_step_time(self, sim_time):
+        """ returns the time of the previously simulated step; only differs from sim_time - time_step if idle time
+        steps are skipped
+
+        :param sim_time: current simulation time
+        :return: time of last simulation step
+        """
+        if self._last_step_time is None or not self.skip_idle_steps:
+            return sim_time - self.time_step
+        return self._last_step_time
+
     def _start_realtime_plot(self):
         """ This method starts a separate process for real time python plots """
         if self.realtime_plot_flag in {1, 2}:
@@ -807,11 +1176,7 @@ class FleetSimulationBase:
 
         :return: dictionary of vehicle state as keys and number of vehicles in those status as values
         """
-        vehicles = self.sim_vehicles.values()
-        count = {state: 0 for state in VRL_STATES}
-        for v in vehicles:
-            count[v.status] += 1
-        return count
+        return self.fleet_state.count_status()
 
     @abstractmethod
     def step(self, sim_time):
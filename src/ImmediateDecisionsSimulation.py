@@ -75,14 +75,14 @@ class ImmediateDecisionsSimulation(FleetSimulationBase):
         :return: None
         """
         # 1)
-        self.update_sim_state_fleets(sim_time - self.time_step, sim_time)
+        self.update_sim_state_fleets(self._get_last_step_time(sim_time), sim_time)
         new_travel_times = self.routing_engine.update_network(sim_time)
         if new_travel_times:
             for op_id in range(self.n_op):
                 self.operators[op_id].inform_network_travel_time_update(sim_time)
         # 2)
         list_undecided_travelers = list(self.demand.get_undecided_travelers(sim_time))
-        last_time = sim_time - self.time_step
+        last_time = self._get_last_step_time(sim_time)
         if last_time < self.start_time:
             last_time = None
         list_new_traveler_rid_obj = self.demand.get_new_travelers(sim_time, since=last_time)
@@ -16,6 +16,7 @@ from abc import ABCMeta, abstractmethod
 
 from src.FleetSimulationBase import build_operator_attribute_dicts
 from src.misc.globals import *
+from src.misc.output_writer import read_output_file, find_output_file
 PORT = 4200
 EPSG_WGS = 4326
 
@@ -25,30 +26,10 @@ PYPLOT_FRAMERATE = 30
 AVAILABLE_LAYERS = ["vehicles"]  # add layers here when they are implemented
 
 CUSTOMER_SMOOTH_TIME = 300  # seconds / bin timing for customer data smoothing
+MOVING_STATUS = ["route", "reposition", "to_charge", "to_depot"]
+TRAJECTORY_INDEX_FILE = "replay_trajectory_index.npz"
 
 
-def interpolate_coordinates(row, nodes_gdf):
-    """This function approximates the coordinates of a vehicle position.
-    For simplicity and computational effort, it is assumed that street sections are small compared to the earth radius
-    and linear interpolation has sufficient accuraccy.
-
-    :param pos: (o_node, d_node, rel_pos) of an edge | d_node, rel_pos can be None (if vehicle is idle in o_node)
-    :param nodes_gdf: GeoDataFrame with node geometry in WGS84 coordinates
-    :return: lon, lat
-    """
-    pos = row["nw_pos"]
-    p0 = nodes_gdf.loc[pos[0], "geometry"]
-    p0_lon = p0.x
-    p0_lat = p0.y
-    if pos[1] == -1:
-        return p0_lon, p0_lat
-    else:
-        p1 = nodes_gdf.loc[pos[1], "geometry"]
-        p1_lon = p1.x
-        p1_lat = p1.y
-        return p0_lon + (p1_lon - p0_lon)*pos[2], p0_lat + (p1_lat - p0_lat)*pos[2]
-        #return (p0_lon + p1_lon) / 2, (p0_lat + p1_lat) / 2
-
 def interpolate_coordinates_with_edges(row, nodes_gdf, edges_gdf):
     """This function approximates the coordinates of a vehicle position.
     For simplicity and computational effort, it is assumed that street sections are small compared to the earth radius
@@ -84,11 +65,6 @@ def interpolate_coordinates_with_edges(row, nodes_gdf, edges_gdf):
         frac_on_part = 1.0 - ( (next_length - pos[2] * full_length) / current_part_len)
         return p0_lon + (p1_lon - p0_lon)*frac_on_part, p1_lat + (p1_lat - p0_lat)*frac_on_part
 
-def point_str_to_pos(p_str):
-    p_info = p_str.split(";")
-    return int(p_info[0]), int(p_info[1]), float(p_info[2])
-
-
 def prep_nw_output(nw_row):
     geo = nw_row["geometry"]
     return {"type":"Point", "coordinates": [geo.x, geo.y]}
@@ -114,85 +90,6 @@ def prep_output(gdf_row):
             }}
 
 
-class State:
-    def __init__(self, vid_str, time, pos, end_time, end_pos, soc, pax,parcels,
-                 passengers,moving, status, trajectory_str = None):
-        self.vid_str = vid_str
-        self.time = time
-        if type(pos) == str:
-            self.pos = point_str_to_pos(pos)
-        else:
-            self.pos = pos
-        self.soc = soc
-        self.pax = pax
-        self.parcels = parcels
-        self.passengers = passengers
-        self.moving = moving
-        self.status = status
-        self.end_time = end_time
-        if type(end_pos) == str:
-            self.end_pos = point_str_to_pos(end_pos)
-        else:
-            self.end_pos = end_pos
-        self.trajectory = []
-        if trajectory_str is not None and not pd.isnull(trajectory_str):
-            for tmp_str in trajectory_str.split(";"):
-                tmp_str2 = tmp_str.split(":")
-                self.trajectory.append((int(tmp_str2[0]), float(tmp_str2[1])))
-
-    def to_dict(self):
-        # TODO # make definition of transferred attributes here
-        return {"vid": self.vid_str, "nw_pos": self.pos, "soc": self.soc, "pax": self.pax,"parcels":self.parcels,"passengers":self.passengers, "moving": self.moving,
-                "status": self.status}
-
-    def return_state(self, replay_time):
-        """This method allows a standardized way to prepare the output.
-
-        :param replay_time: current replay time
-        :return: state-dict or empty dict
-        """
-        if replay_time > self.end_time:
-            self.pos = self.end_pos
-            return None
-        if not self.moving:
-            return self.to_dict()
-        else:
-            while self.time < replay_time:
-                if len(self.trajectory) != 0:
-                    if self.trajectory[0][1] <= replay_time:
-                        self.time = self.trajectory[0][1]
-                        self.pos = (self.trajectory[0][0], -1, -1)
-                        self.trajectory = self.trajectory[1:]
-                        continue
-                    else:
-                        target = self.trajectory[0][0]
-                        target_time = self.trajectory[0][1]
-                        if self.pos[2] < 0:
-                            cur_pos = 0.0
-                        else:
-                            cur_pos = self.pos[2]
-                        delta_pos = (1.0 - cur_pos)/(target_time - self.time)*(replay_time - self.time)
-                        self.pos = (self.pos[0], target, cur_pos + delta_pos)
-                        self.time = replay_time
-                else:
-                    target = self.end_pos[0]
-                    target_time = self.end_time
-                    target_pos = self.end_pos[2]
-                    if target_pos is None:
-                        print("is this possible??")
-                    if self.pos[2] < 0:
-                        cur_pos = 0.0
-                    else:
-                        cur_pos = self.pos[2]
-                    delta_pos = (target_pos - cur_pos)/(target_time - self.time)*(replay_time - self.time)
-                    self.pos = (self.pos[0], target, cur_pos + delta_pos)
-                    self.time = replay_time
-            return self.to_dict()
-                    
-        # if replay_time == self.time:
-        #     return self.to_dict()
-        # else:
-        #     return None
 class UserState:
     def __init__(self,usr_df,start_time,end_time,parcels=False,passengers=False) -> None:
        # self.usr_id = usr_id
@@ -231,98 +128,213 @@ class UserState:
         return return_df      
 
 
-class ReplayVehicle:
-    def __init__(self, op_id, vid, veh_df, start_time, end_time):
-        self.op_id = op_id
-        self.vid = vid
-        self.vid_df = veh_df.reset_index()
-        self.start_time = start_time
-        self.end_time = end_time
-        self.active_row = 0
-        self.init_pax = 0
-        self.init_parcels = 0
-        self.init_passengers = 0
-        self.init_pos = self.vid_df.loc[0, G_VR_LEG_START_POS]
-        try:
-            self.init_soc = self.vid_df.loc[0, G_VR_LEG_START_SOC]
-        except:
-            self.init_soc = 1.0
-        self.last_state = State(str(self), self.start_time, self.init_pos, self.start_time, 
-                                self.init_pos, self.init_soc, self.init_pax, self.init_parcels, 
-                                self.init_passengers, False, "idle")
-
-    def __str__(self):
-        return f"{self.op_id}-{self.vid}"
+def _split_position_strs(pos_series):
+    """ vectorized conversion of position strings "o_node;d_node;rel_pos" to arrays (-1 for d_node on a node) """
+    pos_df = pos_series.astype(str).str.split(";", expand=True)
+    return pos_df[0].astype(int).values, pos_df[1].astype(int).values, pos_df[2].astype(float).values
 
-    def get_veh_state(self, replay_time):
-        """This method returns the current vehicle state.
 
-        :param replay_time: current simulation replay time
-        :return: json with state information of this vehicle
+def _count_ob_rqs(ob_rid_series):
+    """ returns number of parcels and number of passengers on board for each record """
+    nr_parcels = np.zeros(ob_rid_series.shape[0], dtype=np.int64)
+    nr_passengers = np.zeros(ob_rid_series.shape[0], dtype=np.int64)
+    for i, rq_on_board in enumerate(ob_rid_series.values):
+        if pd.isnull(rq_on_board) or rq_on_board == "":
+            continue
+        for rq in str(rq_on_board).split(";"):
+            if rq.startswith("p"):
+                nr_parcels[i] += 1
+            else:
+                nr_passengers[i] += 1
+    return nr_parcels, nr_passengers
+
+
+class TrajectoryIndex:
+    def __init__(self, arrays):
+        """This class contains a time-sorted index of the vehicle records for the replay. For every vehicle, there
+        are
+        - position key frames (time, node, next node, relative position): between two key frames, the vehicle
+            moves linearly; idle and stationary periods are described by two key frames with the same position
+        - state segments (start time, status, soc, occupancy): valid until the start time of the next segment
+        Both are stored in flat arrays sorted by (vehicle, time); the lookup for all vehicles at a replay time is
+        done with a single searchsorted() on the combined key vehicle * time span + time.
+        Use create_from_fleet_stat_dfs() or load_or_create() to build an index.
+
+        :param arrays: dictionary of index arrays (see create_from_fleet_stat_dfs())
         """
-        # TODO # adopt for smooth soc
-        same_state = self.last_state.return_state(replay_time)
-        if same_state is not None:
-            return same_state
-        # first check active row if simulation time is still within its boundaries
-        if replay_time < self.vid_df.loc[self.active_row, G_VR_LEG_START_TIME] or\
-                replay_time > self.vid_df.loc[self.active_row, G_VR_LEG_END_TIME]:
-            self.vid_df["started"] = self.vid_df[G_VR_LEG_START_TIME] <= replay_time
-            self.active_row = self.vid_df["started"].sum() - 1
-        if self.active_row == -1:
-            self.active_row = 0
-            end_time = self.vid_df.loc[self.active_row, G_VR_LEG_START_TIME]
-            self.last_state = State(str(self), replay_time, self.init_pos, end_time, self.init_pos, self.init_soc, self.init_pax, self.init_parcels, self.init_passengers, False, "idle")
+        self.arrays = arrays
+        self.veh_op_id = arrays["veh_op_id"]
+        self.veh_vid = arrays["veh_vid"]
+        self.nr_vehicles = len(self.veh_vid)
+        self.veh_str = np.array([f"{op_id}-{vid}" for op_id, vid in zip(self.veh_op_id.tolist(),
+                                                                         self.veh_vid.tolist())], dtype=object)
+        self.t0 = float(arrays["time_bounds"][0])
+        self.span = float(arrays["time_bounds"][1]) - self.t0 + 1.0
+        self.kf_offsets = arrays["kf_offsets"]
+        self.kf_time = arrays["kf_time"]
+        self.kf_key = self._get_keys(arrays["kf_veh"], self.kf_time)
+        self.seg_key = self._get_keys(arrays["seg_veh"], arrays["seg_time"])
+        self.seg_offsets = arrays["seg_offsets"]
+        self.kf_lon = None
+        self.kf_lat = None
+
+    def _get_keys(self, veh_indices, times):
+        # times have to be non-decreasing per vehicle -> cumulative maximum of combined key
+        return np.maximum.accumulate(veh_indices * self.span + (np.clip(times, self.t0, self.t0 + self.span - 1)
+                                                                - self.t0))
+
+    @classmethod
+    def create_from_fleet_stat_dfs(cls, dict_op_fleet_stat_df):
+        """This method builds the index from the operator stats (records of vehicle legs).
+
+        :param dict_op_fleet_stat_df: op_id -> DataFrame of the operator stats file
+        :return: TrajectoryIndex
+        """
+        fleet_stat_df = pd.concat([op_df.assign(**{G_V_OP_ID: op_id})
+                                   for op_id, op_df in dict_op_fleet_stat_df.items()], ignore_index=True)
+        fleet_stat_df = fleet_stat_df.sort_values([G_V_OP_ID, G_V_VID, G_VR_LEG_START_TIME], kind="stable")
+        fleet_stat_df.reset_index(drop=True, inplace=True)
+        nr_records = fleet_stat_df.shape[0]
+        veh_index = fleet_stat_df.groupby([G_V_OP_ID, G_V_VID], sort=True).ngroup().values.astype(np.int64)
+        first_rows = np.flatnonzero(np.r_[True, veh_index[1:] != veh_index[:-1]])
+        start_times = fleet_stat_df[G_VR_LEG_START_TIME].values.astype(float)
+        end_times = np.maximum(fleet_stat_df[G_VR_LEG_END_TIME].values.astype(float), start_times)
+        start_node, start_next_node, start_frac = _split_position_strs(fleet_stat_df[G_VR_LEG_START_POS])
+        end_node, end_next_node, end_frac = _split_position_strs(fleet_stat_df[G_VR_LEG_END_POS])
+        status = fleet_stat_df[G_VR_STATUS].astype(str).values.astype(str)
+        moving = np.isin(status, MOVING_STATUS)
+        if G_VR_LEG_START_SOC in fleet_stat_df.columns:
+            start_soc = fleet_stat_df[G_VR_LEG_START_SOC].values.astype(float)
+            end_soc = fleet_stat_df[G_VR_LEG_END_SOC].values.astype(float) \
+                if G_VR_LEG_END_SOC in fleet_stat_df.columns else start_soc
         else:
-            pax = self.vid_df.loc[self.active_row, G_VR_NR_PAX]
-            rq_on_board = self.vid_df.loc[self.active_row, G_VR_OB_RID]
-            rq_on_board = str(rq_on_board)
-            rq_on_board = rq_on_board.split(";")
-            parcels = [rq for rq in rq_on_board if rq.startswith("p")]
-            parcels = len(parcels)
-            passengers = [rq for rq in rq_on_board if not rq.startswith("p") and rq != "nan"]
-            passengers = len(passengers)
-            route_start_time = self.vid_df.loc[self.active_row, G_VR_LEG_START_TIME]
-            route_end_time = self.vid_df.loc[self.active_row, G_VR_LEG_END_TIME]
-            # check status
-            if route_end_time > replay_time:
-                status = self.vid_df.loc[self.active_row, G_VR_STATUS]
-                end_pos = self.vid_df.loc[self.active_row, G_VR_LEG_END_POS]
-                # TODO # change status to "idle", "in-service", "charging" instead of "moving"
-                if status in ["route", "reposition", "to_charge", "to_depot"]:
-                    moving = True
-                    trajectory_str = self.vid_df.loc[self.active_row, G_VR_REPLAY_ROUTE]
-                else:
-                    moving = False
-                    trajectory_str = None
-                # TODO # soc!
-                start_soc = self.vid_df.loc[self.active_row, G_VR_LEG_START_SOC]
-                self.last_state = State(str(self), replay_time, self.last_state.pos, route_end_time, end_pos, start_soc, pax, parcels, passengers, moving, status, trajectory_str=trajectory_str)
-            else:
-                status = "idle"
-                moving = False
-                end_time = self.end_time
-                if self.active_row + 1 < self.vid_df.shape[0]:
-                    end_time = self.vid_df.loc[self.active_row + 1, G_VR_LEG_START_TIME]
-                self.last_state = State(str(self), replay_time, self.last_state.pos, end_time, self.last_state.pos, self.last_state.soc, 0, 0, 0, moving, status)
-        #
-        return_state = self.last_state.return_state(replay_time)
-        return return_state
+            start_soc = np.ones(nr_records)
+            end_soc = start_soc
+        nr_pax = fleet_stat_df[G_VR_NR_PAX].fillna(0).values.astype(np.int64)
+        nr_parcels, nr_passengers = _count_ob_rqs(fleet_stat_df[G_VR_OB_RID])
+        # position key frames: leg start, nodes of the trajectory (moving legs), leg end
+        traj_rows, traj_time, traj_node, traj_order = [], [], [], []
+        if G_VR_REPLAY_ROUTE in fleet_stat_df.columns:
+            for row in np.flatnonzero(moving).tolist():
+                trajectory_str = fleet_stat_df.at[row, G_VR_REPLAY_ROUTE]
+                if pd.isnull(trajectory_str) or trajectory_str == "":
+                    continue
+                for order, tmp_str in enumerate(str(trajectory_str).split(";"), start=1):
+                    node_str, time_str = tmp_str.split(":")
+                    traj_rows.append(row)
+                    traj_node.append(int(node_str))
+                    traj_time.append(float(time_str))
+                    traj_order.append(order)
+        rows = np.arange(nr_records)
+        traj_rows = np.array(traj_rows, dtype=np.int64)
+        nr_traj = len(traj_rows)
+        kf_row = np.concatenate([rows, traj_rows, rows])
+        kf_order = np.concatenate([np.zeros(nr_records), np.array(traj_order, dtype=float),
+                                   np.full(nr_records, np.inf)])
+        kf_sort = np.lexsort((kf_order, kf_row))
+        kf_veh = veh_index[kf_row][kf_sort]
+        kf_time = np.concatenate([start_times, np.array(traj_time, dtype=float), end_times])[kf_sort]
+        kf_node = np.concatenate([start_node, np.array(traj_node, dtype=np.int64), end_node])[kf_sort]
+        kf_next_node = np.concatenate([start_next_node, np.full(nr_traj, -1, dtype=np.int64),
+                                       end_next_node])[kf_sort]
+        kf_frac = np.concatenate([start_frac, np.full(nr_traj, -1.0), end_frac])[kf_sort]
+        # state segments: initial idle state, active leg, idle state after leg
+        nr_veh = len(first_rows)
+        seg_row = np.concatenate([first_rows, rows, rows])
+        seg_order = np.concatenate([np.full(nr_veh, -1), np.zeros(nr_records), np.ones(nr_records)])
+        seg_sort = np.lexsort((seg_order, seg_row))
+        zeros = np.zeros(nr_records, dtype=np.int64)
+        arrays = {
+            "veh_op_id": fleet_stat_df[G_V_OP_ID].values[first_rows].astype(np.int64),
+            "veh_vid": fleet_stat_df[G_V_VID].values[first_rows].astype(np.int64),
+            "time_bounds": np.array([min(start_times.min(initial=0), kf_time.min(initial=0)),
+                                     max(end_times.max(initial=0), kf_time.max(initial=0))]),
+            "kf_offsets": np.searchsorted(kf_veh, np.arange(nr_veh + 1)),
+            "kf_veh": kf_veh, "kf_time": kf_time, "kf_node": kf_node, "kf_next_node": kf_next_node,
+            "kf_frac": kf_frac,
+            "seg_offsets": None,
+            "seg_veh": veh_index[seg_row][seg_sort],
+            "seg_time": np.concatenate([start_times[first_rows], start_times, end_times])[seg_sort],
+            "seg_status": np.concatenate([np.full(nr_veh, "idle"), status, np.full(nr_records, "idle")]
+                                         ).astype(str)[seg_sort],
+            "seg_moving": np.concatenate([np.zeros(nr_veh, dtype=bool), moving, np.zeros(nr_records, dtype=bool)]
+                                         )[seg_sort],
+            "seg_soc": np.concatenate([start_soc[first_rows], start_soc, end_soc])[seg_sort],
+            "seg_pax": np.concatenate([zeros[:nr_veh], nr_pax, zeros])[seg_sort],
+            "seg_parcels": np.concatenate([zeros[:nr_veh], nr_parcels, zeros])[seg_sort],
+            "seg_passengers": np.concatenate([zeros[:nr_veh], nr_passengers, zeros])[seg_sort],
+        }
+        arrays["seg_offsets"] = np.searchsorted(arrays["seg_veh"], np.arange(nr_veh + 1))
+        return cls(arrays)
 
-    def get_current_vehicle_trajectory(self, replay_time):
-        """This method returns the current vehicle trajectory as geojson collection containing
-        - polyline with currently assigned route
-        - stops for requests
+    @classmethod
+    def load_or_create(cls, output_dir, n_op):
+        """This method loads the index from the scenario output directory or creates (and saves) it if it does not
+        exist or is older than the operator stats.
+
+        :param output_dir: scenario output directory
+        :param n_op: number of operators
+        :return: TrajectoryIndex
+        """
+        index_f = os.path.join(output_dir, TRAJECTORY_INDEX_FILE)
+        op_stat_fs = [find_output_file(output_dir, f"2-{op_id}_op-stats") for op_id in range(n_op)]
+        if os.path.isfile(index_f) and all(os.path.getmtime(f) <= os.path.getmtime(index_f)
+                                           for f in op_stat_fs if f is not None):
+            with np.load(index_f) as npz:
+                return cls({key: npz[key] for key in npz.files})
+        dict_op_fleet_stat_df = {op_id: read_output_file(output_dir, f"2-{op_id}_op-stats") for op_id in range(n_op)}
+        trajectory_index = cls.create_from_fleet_stat_dfs(dict_op_fleet_stat_df)
+        trajectory_index.save(index_f)
+        return trajectory_index
+
+    def save(self, index_f):
+        np.savez(index_f, **self.arrays)
+
+    def set_node_coordinates(self, nodes_gdf):
+        """This method computes the coordinates of all position key frames.
+
+        :param nodes_gdf: GeoDataFrame with node geometry in WGS84 coordinates (index: node index)
+        """
+        node_lon = np.full(int(nodes_gdf.index.max()) + 1, np.nan)
+        node_lat = np.full(int(nodes_gdf.index.max()) + 1, np.nan)
+        node_lon[nodes_gdf.index.values.astype(int)] = nodes_gdf["geometry"].x.values
+        node_lat[nodes_gdf.index.values.astype(int)] = nodes_gdf["geometry"].y.values
+        kf_node = self.arrays["kf_node"]
+        kf_next_node = self.arrays["kf_next_node"]
+        on_edge = kf_next_node >= 0
+        frac = np.where(on_edge, self.arrays["kf_frac"], 0.0)
+        next_node = np.where(on_edge, kf_next_node, kf_node)
+        self.kf_lon = node_lon[kf_node] + (node_lon[next_node] - node_lon[kf_node]) * frac
+        self.kf_lat = node_lat[kf_node] + (node_lat[next_node] - node_lat[kf_node]) * frac
+
+    def _lookup(self, keys, offsets, replay_time):
+        vehicles = np.arange(self.nr_vehicles)
+        query = vehicles * self.span + (min(max(replay_time, self.t0), self.t0 + self.span - 1) - self.t0)
+        indices = np.searchsorted(keys, query, side="right") - 1
+        return np.maximum(indices, offsets[:-1])
+
+    def get_vehicle_states(self, replay_time):
+        """This method returns the states of all vehicles at the replay time.
 
         :param replay_time: current replay time
-        :return: geojson feature collection
+        :return: DataFrame with columns vid, lon, lat, soc, pax, parcels, passengers, moving, status
         """
-        # TODO # get_current_vehicle_trajectory()
-        # TODO # use request (rq_time, pu/do) information to decide whether
-        #  - to include a stop to a route or
-        #  - to mark it with 'currently_unknown' flag (next stop)
-        #  - to mark whether it is a drop-off/pick-up/pu&do stop
-        pass
+        # state segments
+        seg = self._lookup(self.seg_key, self.seg_offsets, replay_time)
+        # positions: linear interpolation between the current and the next key frame of the vehicle
+        kf = self._lookup(self.kf_key, self.kf_offsets, replay_time)
+        next_kf = np.minimum(kf + 1, self.kf_offsets[1:] - 1)
+        delta_t = self.kf_time[next_kf] - self.kf_time[kf]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = np.where(delta_t > 0, (replay_time - self.kf_time[kf]) / delta_t, 0.0)
+        w = np.clip(w, 0.0, 1.0)
+        lon = self.kf_lon[kf] + (self.kf_lon[next_kf] - self.kf_lon[kf]) * w
+        lat = self.kf_lat[kf] + (self.kf_lat[next_kf] - self.kf_lat[kf]) * w
+        return pd.DataFrame({"vid": self.veh_str, "lon": lon, "lat": lat,
+                             "soc": self.arrays["seg_soc"][seg], "pax": self.arrays["seg_pax"][seg],
+                             "parcels": self.arrays["seg_parcels"][seg],
+                             "passengers": self.arrays["seg_passengers"][seg],
+                             "moving": self.arrays["seg_moving"][seg], "status": self.arrays["seg_status"][seg]})
 
 
 class Singleton(ABCMeta):
@@ -378,8 +390,7 @@ class Replay(VehicleMovementSimulation):
         self.poss_veh_states = []
         #
         self.steps_per_real_sec = 1
-        self.replay_vehicles = {}       # (op_id, vid) -> ReplayVehicle
-        self.operator_vehicles = {}     # op_id -> list_vehicles
+        self.trajectory_index: Optional[TrajectoryIndex] = None
 
     def load_scenario(self, output_dir, start_time_in_seconds = None, end_time_in_seconds = None,parcels=False,passengers=False):
         """This method has to be called to load the scenario data.
@@ -461,20 +472,14 @@ class Replay(VehicleMovementSimulation):
         print("... processing vehicle data")
         self.n_op = scenario_parameters[G_NR_OPERATORS]
         self.list_op_dicts = build_operator_attribute_dicts(scenario_parameters, self.n_op, prefix="op_")
-        for op_id in range(self.n_op):
-            fleet_stat_f = os.path.join(output_dir, f"2-{op_id}_op-stats.csv")
-            fleet_stat_df = pd.read_csv(fleet_stat_f)
-            fleet_stat_df = fleet_stat_df[fleet_stat_df["start_time"] >= self.sim_start_time]
-            possible_status = fleet_stat_df["status"].unique()
-            self.poss_veh_states = list(set(self.poss_veh_states).union(possible_status)) + ["idle"]
-            for vid, veh_stat_f in fleet_stat_df.groupby(G_RQ_VID):
-                self.replay_vehicles[(op_id, vid)] = ReplayVehicle(op_id, vid, veh_stat_f, self.sim_start_time,
-                                                                   self.sim_end_time)
+        self.trajectory_index = TrajectoryIndex.load_or_create(output_dir, self.n_op)
+        self.trajectory_index.set_node_coordinates(self.node_gdf)
+        possible_status = np.unique(self.trajectory_index.arrays["seg_status"]).tolist()
+        self.poss_veh_states = list(set(self.poss_veh_states).union(possible_status).union(["idle"]))
         states_codes = {status.display_name: status.value for status in VRL_STATES}
         self.poss_veh_states = sorted(self.poss_veh_states, key=lambda x: states_codes[x])
         print("... processing user data")
-        usr_stats_f = os.path.join(output_dir, "1_user-stats.csv")
-        usr_stats_df = pd.read_csv(usr_stats_f)
+        usr_stats_df = read_output_file(output_dir, "1_user-stats")
         #usr_stats_df = usr_stats_df[usr_stats_df["earliest_pickup_time"] >= self.sim_start_time]
         self.user_stats = UserState(usr_stats_df, self.sim_start_time, self.sim_end_time,parcels=parcels,passengers=passengers)
         def get_node_from_pos(pos):
@@ -575,10 +580,8 @@ class Replay(VehicleMovementSimulation):
             # TODO # update and send self._current_kpis for current replay time with keyword 'KPI'
             pass
         if self._act_layer == "vehicles":
-            list_pos_df = pd.DataFrame([veh.get_veh_state(self.replay_time) for veh in self.replay_vehicles.values()])
+            list_pos_df = self.trajectory_index.get_vehicle_states(self.replay_time)
             # TODO # compare with self._last_veh_state to filter for vehicles with changes (unless self._layer_changed)
-            list_pos_df[["lon", "lat"]] = list_pos_df.apply(interpolate_coordinates, args=(self.node_gdf, ), axis=1,
-                                                            result_type="expand")
             gdf = gpd.GeoDataFrame(list_pos_df, geometry=gpd.points_from_xy(list_pos_df["lon"], list_pos_df["lat"]),
                                    crs=self.node_gdf.crs)
             output_list = [prep_output(row) for _, row in gdf.iterrows()]
@@ -690,9 +693,8 @@ class ReplayPyPlot(Replay):
             print("Video created: {}".format(os.path.join(self.plots_dir, video_name)))
 
     def _emit_current_information(self):
-        list_pos_df = pd.DataFrame([veh.get_veh_state(self.replay_time) for veh in self.replay_vehicles.values()])
-        list_pos_df["coordinates"] = list_pos_df.apply(interpolate_coordinates, args=(self.node_gdf,), axis=1,
-                                                       result_type="reduce")
+        list_pos_df = self.trajectory_index.get_vehicle_states(self.replay_time)
+        list_pos_df["coordinates"] = list(zip(list_pos_df["lon"].values, list_pos_df["lat"].values))
         list_pos_df.set_index("vid", inplace=True)
         user_stats = self.user_stats.get_user_data(self.replay_time) # return [avg_wait_time,avg_ride_time,avg_detour_time]
 
@@ -70,8 +70,9 @@ class RequestBase(metaclass=ABCMeta):
         self.d_node = int(rq_row[G_RQ_DESTINATION])
         self.d_pos = routing_engine.return_node_position(self.d_node)
         # store miscellaneous custom values from demand file
-        for param, value in rq_row.drop([G_RQ_TIME, G_RQ_ID, G_RQ_ORIGIN, G_RQ_DESTINATION]).iteritems():
-            setattr(self, str(param), value)
+        for param, value in rq_row.items():
+            if param not in (G_RQ_TIME, G_RQ_ID, G_RQ_ORIGIN, G_RQ_DESTINATION):
+                setattr(self, str(param), value)
         # offer: operator_id > offer class entity
         self.offer = {}
         # decision/output
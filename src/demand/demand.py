@@ -2,6 +2,7 @@
 # standard distribution imports
 # -----------------------------
 import logging
+import bisect
 
 # additional module imports (> requirements)
 # ------------------------------------------
@@ -11,8 +12,9 @@ pd.options.mode.chained_assignment = None
 
 # src imports
 # -----------
-from src.misc.distributions import draw_from_distribution_dict
+from src.misc.distributions import draw_from_distribution_dict, draw_from_distribution_dicts
 from src.misc.init_modules import load_request_module
+from src.misc.output_writer import get_output_buffer_size, create_output_writer, submit_output_task
 
 # global variables
 # ----------------
@@ -20,6 +22,7 @@ from src.misc.globals import *
 
 LOG = logging.getLogger(__name__)
 BUFFER_SIZE = 10
+DEMAND_STREAM_CHUNK_SIZE = 10000    # number of rows read at once from streamed demand files
 # -------------------------------------------------------------------------------------------------------------------- #
 
 
@@ -49,18 +52,198 @@ def create_traveler(rq_row, rq_node_type_distr, zone_definition, routing_engine,
     return TravelerClass(rq_row, routing_engine, simulation_time_step, scenario_parameters)
 
 
-# TODO # write more efficient create_traveler; just-in-time creation?
+class DemandFileRow(dict):
+    """Row of a demand file, in which every value keeps the data type of its column (unlike rows of
+    DataFrame.iterrows()). It provides the parts of the pandas Series interface used by the traveler models:
+    item access, get(), items() and name (index of the row)."""
+    __slots__ = ("name",)
+
+    def __init__(self, values, name):
+        super().__init__(values)
+        self.name = name
+
+
+def create_travelers(rq_df, rq_node_type_distr, zone_definition, routing_engine, simulation_time_step,
+                     scenario_parameters, random_state=None):
+    """This function creates the traveler objects for all rows of a demand data frame (in row order). The traveler
+    classes are drawn in bulk with the same random numbers as calls of create_traveler() for each row.
+
+    :param rq_df: demand data frame
+    :param random_state: numpy RandomState to draw traveler classes (None: global numpy random state)
+    :return: list of traveler objects
+    """
+    nr_rows = rq_df.shape[0]
+    columns = list(rq_df.columns)
+    rows = [DemandFileRow(zip(columns, values), name) for name, values in
+            zip(rq_df.index.tolist(), zip(*[rq_df[col].tolist() for col in columns]))]
+    if None in rq_node_type_distr.keys():
+        row_distributions = [rq_node_type_distr[None]] * nr_rows
+    elif not zone_definition:
+        row_distributions = [rq_node_type_distr.get(None)] * nr_rows
+    else:
+        o_nodes = rq_df[G_RQ_ORIGIN].tolist()
+        d_nodes = rq_df[G_RQ_DESTINATION].tolist()
+        node_zones = {node: zone_definition.get_zone_from_node(node) for node in set(o_nodes) | set(d_nodes)}
+        row_distributions = []
+        for o_node, d_node in zip(o_nodes, d_nodes):
+            o_zone_index = node_zones[o_node]
+            d_zone_index = node_zones[d_node]
+            if o_zone_index is None or d_zone_index is None:
+                row_distributions.append(rq_node_type_distr.get(None))
+            else:
+                row_distributions.append(rq_node_type_distr.get((o_zone_index, d_zone_index)))
+    for rq_row, distribution in zip(rows, row_distributions):
+        if not distribution:
+            raise IOError(f"Could not find fitting request-type for traveler {rq_row}")
+    traveler_classes = draw_from_distribution_dicts(row_distributions, random_state=random_state)
+    return [TravelerClass(rq_row, routing_engine, simulation_time_step, scenario_parameters)
+            for TravelerClass, rq_row in zip(traveler_classes, rows)]
+
+
+def prepare_demand_rows(rq_df, start_time, end_time, simulation_time_step, max_decision_time, remove_identical_od):
+    """This function filters the rows of a demand data frame to the simulation time, rounds the request times to the
+    simulation time step and sets the latest decision time if it is not given in the demand file.
+
+    :param rq_df: demand data frame
+    :param max_decision_time: maximum decision time (G_AR_MAX_DEC_T); only required if G_RQ_LDT is not a column
+    :param remove_identical_od: requests with identical origin and destination are removed
+    :return: (filtered data frame, number of requests outside of simulation time, number of requests with o == d)
+    """
+    number_rq_0 = rq_df.shape[0]
+    future_requests = rq_df[(rq_df[G_RQ_TIME] >= start_time) & (rq_df[G_RQ_TIME] < end_time)]
+    number_rq_1 = future_requests.shape[0]
+    if remove_identical_od:
+        future_requests = future_requests[(future_requests[G_RQ_ORIGIN] != future_requests[G_RQ_DESTINATION])]
+    number_rq = future_requests.shape[0]
+    future_requests[G_RQ_TIME] = future_requests[G_RQ_TIME] - np.mod(future_requests[G_RQ_TIME],
+                                                                     simulation_time_step)
+    # define maximum decision time
+    if G_RQ_LDT not in future_requests.columns:
+        if max_decision_time is None:
+            raise KeyError(G_AR_MAX_DEC_T)
+        future_requests[G_RQ_LDT] = future_requests[G_RQ_TIME] + max_decision_time
+    return future_requests, number_rq_0 - number_rq_1, number_rq_1 - number_rq
+
+
+class DemandFileStream:
+    """This class reads a demand file, which is sorted by request time, in chunks and returns its prepared rows
+    up to a given request time. Only the rows of the current chunk are kept in memory."""
+    def __init__(self, abs_req_f, start_time, end_time, simulation_time_step, max_decision_time, remove_identical_od,
+                 rq_node_type_distr, random_state, chunk_size=DEMAND_STREAM_CHUNK_SIZE):
+        self.abs_req_f = abs_req_f
+        self.start_time = start_time
+        self.end_time = end_time
+        self.simulation_time_step = simulation_time_step
+        self.max_decision_time = max_decision_time
+        self.remove_identical_od = remove_identical_od
+        self.rq_node_type_distr = rq_node_type_distr
+        self.random_state = random_state
+        self.loaded_until = -np.inf    # all rows with (rounded) request time <= loaded_until were returned
+        self.chunk_size = chunk_size
+        self._reader = pd.read_csv(abs_req_f, dtype={"start": int, "end": int}, chunksize=chunk_size)
+        self._buffer = None
+        self._last_file_time = None
+        self._exhausted = False
+        self._number_read = 0
+        self._number_removed_time = 0
+        self._number_removed_od = 0
+
+    def __getstate__(self):
+        # the file reader cannot be pickled (simulation checkpoints) -> it is opened again at the current row
+        state = self.__dict__.copy()
+        state["_reader"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if not self._exhausted:
+            self._reader = pd.read_csv(self.abs_req_f, dtype={"start": int, "end": int}, chunksize=self.chunk_size,
+                                       skiprows=range(1, self._number_read + 1))
+
+    def _read_chunk(self):
+        """ reads the next chunk of the demand file and appends its prepared rows to the buffer """
+        try:
+            chunk = next(self._reader)
+        except StopIteration:
+            self._close()
+            return
+        file_times = chunk[G_RQ_TIME]
+        if not file_times.is_monotonic_increasing or (self._last_file_time is not None and
+                                                      file_times.iloc[0] < self._last_file_time):
+            raise IOError(f"demand file {self.abs_req_f} has to be sorted by {G_RQ_TIME} to be streamed!")
+        self._last_file_time = file_times.iloc[-1]
+        rows, number_removed_time, number_removed_od = \
+            prepare_demand_rows(chunk, self.start_time, self.end_time, self.simulation_time_step,
+                                self.max_decision_time, self.remove_identical_od)
+        self._number_read += chunk.shape[0]
+        self._number_removed_time += number_removed_time
+        self._number_removed_od += number_removed_od
+        if self._buffer is None or self._buffer.shape[0] == 0:
+            self._buffer = rows
+        else:
+            self._buffer = pd.concat([self._buffer, rows])
+        if self._last_file_time >= self.end_time:
+            # remaining rows are after the simulation end
+            self._close()
+
+    def _close(self):
+        if not self._exhausted:
+            self._exhausted = True
+            self._reader.close()
+            LOG.info(f"demand stream {self.abs_req_f}: {self._number_removed_time}/{self._number_read} requests removed"
+                     f" ({G_RQ_TIME} not in simulation time; remaining rows of file not read)")
+            if self.remove_identical_od:
+                LOG.info(f"demand stream {self.abs_req_f}: {self._number_removed_od} requests removed"
+                         f" ({G_RQ_ORIGIN} == {G_RQ_DESTINATION})")
+
+    def pop_rows_until(self, until_time):
+        """ returns all prepared rows with a request time until until_time that were not returned before
+
+        :param until_time: latest (rounded) request time
+        :return: data frame
+        """
+        while not self._exhausted and (self._buffer is None or self._buffer.shape[0] == 0
+                                       or self._buffer[G_RQ_TIME].iloc[-1] <= until_time):
+            self._read_chunk()
+        self.loaded_until = until_time
+        if self._buffer is None:
+            return pd.DataFrame()
+        until_mask = self._buffer[G_RQ_TIME] <= until_time
+        rows = self._buffer[until_mask]
+        self._buffer = self._buffer[~until_mask]
+        return rows
+
+    def get_next_request_time(self):
+        """ returns the (rounded) request time of the next row that was not returned yet (inf if there is none) """
+        while not self._exhausted and (self._buffer is None or self._buffer.shape[0] == 0):
+            self._read_chunk()
+        if self._buffer is None or self._buffer.shape[0] == 0:
+            return float("inf")
+        return self._buffer[G_RQ_TIME].iloc[0]
+
+
 class Demand:
     def __init__(self, scenario_parameters, output_f, routing_engine=None, zone_system=None):
         self.scenario_parameters = scenario_parameters
         # prepare output
         self.output_f = output_f
+        self.output_writer = create_output_writer(output_f, scenario_parameters)
+        self.output_buffer_size = get_output_buffer_size(scenario_parameters, BUFFER_SIZE)
         self.user_stat_buffer = []  # list of dictionaries
+        self.user_record_listeners = []  # functions called with every DataFrame of user records that is written
         # request data bases
         self.rq_db = {}  # rid > rq
         self.undecided_rq = {} # rid > rq
         self.waiting_rq = {} # rid > rq
         self.future_requests = {}
+        self._sorted_future_request_times = None    # built lazily in get_next_event_time()
+        # demand files can be streamed: travelers are only created stream_lookahead seconds before their request time
+        self.stream_lookahead = scenario_parameters.get(G_RQ_STREAM_LOOKAHEAD)
+        self._streams = []
+        self._start_time = None
+        self._end_time = None
+        self._nr_created_requests = 0
+        self._nr_released_requests = 0
         # optional
         self.zone_definition = zone_system
         self.routing_engine = routing_engine
@@ -91,34 +274,8 @@ class Demand:
             raise IOError("No valid traveler type found")
         # read input
         abs_req_f = os.path.join(rq_file_dir, rq_file_name)
-        tmp_df = pd.read_csv(abs_req_f, dtype={"start": int, "end": int})
-        number_rq_0 = tmp_df.shape[0]
-        future_requests = tmp_df[(tmp_df[G_RQ_TIME] >= start_time) & (tmp_df[G_RQ_TIME] < end_time)]
-        number_rq_1 = future_requests.shape[0]
-        future_requests = future_requests[(future_requests[G_RQ_ORIGIN] != future_requests[G_RQ_DESTINATION])]
-        number_rq = future_requests.shape[0]
-        future_requests[G_RQ_TIME] = future_requests[G_RQ_TIME] - np.mod(future_requests[G_RQ_TIME],
-                                                                         simulation_time_step)
-        # define maximum decision time
-        if G_RQ_LDT not in future_requests.columns:
-            max_dec_time = self.scenario_parameters[G_AR_MAX_DEC_T]
-            future_requests[G_RQ_LDT] = future_requests[G_RQ_TIME] + max_dec_time
-        for rq_time, rq_time_df in future_requests.groupby(G_RQ_TIME):
-            new_rq_dict = {}
-            # TODO: note, iterrows() does not preserve dtype, so strange things happen if demand file contains mixed types. Possibly rethink how this works.
-            for _, rq_row in rq_time_df.iterrows():
-                rq_obj = create_traveler(rq_row, rq_node_type_distr, self.zone_definition, self.routing_engine,
-                                         simulation_time_step, self.scenario_parameters)
-                new_rq_dict[rq_obj.rid] = rq_obj
-            if rq_time in self.future_requests:
-                self.future_requests[rq_time].update(new_rq_dict)
-            else:
-                self.future_requests[rq_time] = new_rq_dict
-        LOG.info(f"init(): {number_rq_0 - number_rq_1}/{number_rq_0}"
-                 f" requests removed ({G_RQ_TIME} not in simulation time)")
-        LOG.info(f"init(): {number_rq_1 - number_rq}/{number_rq_1}"
-                 f" requests removed ({G_RQ_ORIGIN} == {G_RQ_DESTINATION})")
-        # LOG.debug(f"self.future_requests = {self.future_requests}")
+        self._read_demand_file(abs_req_f, start_time, end_time, np_random_seed, rq_node_type_distr,
+                               simulation_time_step, remove_identical_od=True)
 
     def load_parcel_demand_file(self, start_time, end_time, parcel_rq_file_dir, parcel_rq_file_name, np_random_seed, parcel_rq_type=None,
                          parcel_rq_type_distr={}, parcel_rq_od_zone_distr={}, simulation_time_step=1):
@@ -145,45 +302,111 @@ class Demand:
             raise IOError("No valid traveler type found")
         # read input
         abs_req_f = os.path.join(parcel_rq_file_dir, parcel_rq_file_name)
+        self._read_demand_file(abs_req_f, start_time, end_time, np_random_seed, rq_node_type_distr,
+                               simulation_time_step, remove_identical_od=False)
+
+    def _read_demand_file(self, abs_req_f, start_time, end_time, np_random_seed, rq_node_type_distr,
+                          simulation_time_step, remove_identical_od):
+        """This method creates all travelers of a demand file or, if G_RQ_STREAM_LOOKAHEAD is given, prepares
+        a stream from which travelers are only created shortly before they enter the simulation.
+
+        :param abs_req_f: path to demand file
+        :param rq_node_type_distr: (o_zone, d_zone) or None -> traveler class -> share
+        :param remove_identical_od: requests with identical origin and destination are removed
+        """
+        self._start_time = start_time
+        self._end_time = end_time
+        if self.stream_lookahead is not None:
+            LOG.info(f"init(): travelers of {abs_req_f} are created {self.stream_lookahead}s before their request time")
+            # traveler classes are drawn with a separate random state (draws happen during the simulation)
+            random_state = np.random.RandomState(int(1712 * np_random_seed))
+            self._streams.append(DemandFileStream(abs_req_f, start_time, end_time, simulation_time_step,
+                                                  self.scenario_parameters.get(G_AR_MAX_DEC_T), remove_identical_od,
+                                                  rq_node_type_distr, random_state))
+            self._load_streamed_requests(start_time + self.stream_lookahead)
+            return
         tmp_df = pd.read_csv(abs_req_f, dtype={"start": int, "end": int})
-        number_rq_0 = tmp_df.shape[0]
-        future_requests = tmp_df[(tmp_df[G_RQ_TIME] >= start_time) & (tmp_df[G_RQ_TIME] < end_time)]
-        number_rq = future_requests.shape[0]
-        future_requests[G_RQ_TIME] = future_requests[G_RQ_TIME] - np.mod(future_requests[G_RQ_TIME],
-                                                                         simulation_time_step)
-        # define maximum decision time
-        if G_RQ_LDT not in future_requests.columns:
-            max_dec_time = self.scenario_parameters[G_AR_MAX_DEC_T]
-            future_requests[G_RQ_LDT] = future_requests[G_RQ_TIME] + max_dec_time
-        for rq_time, rq_time_df in future_requests.groupby(G_RQ_TIME):
-            new_rq_dict = {}
-            # TODO: note, iterrows() does not preserve dtype, so strange things happen if demand file contains mixed types. Possibly rethink how this works.
-            for _, rq_row in rq_time_df.iterrows():
-                rq_obj = create_traveler(rq_row, rq_node_type_distr, self.zone_definition, self.routing_engine,
-                                         simulation_time_step, self.scenario_parameters)
-                new_rq_dict[rq_obj.rid] = rq_obj
-            if rq_time in self.future_requests:
-                self.future_requests[rq_time].update(new_rq_dict)
-            else:
-                self.future_requests[rq_time] = new_rq_dict
-        LOG.info(f"init(): {number_rq_0 - number_rq}/{number_rq_0}"
+        future_requests, number_removed_time, number_removed_od = \
+            prepare_demand_rows(tmp_df, start_time, end_time, simulation_time_step,
+                                self.scenario_parameters.get(G_AR_MAX_DEC_T), remove_identical_od)
+        self._add_future_requests(future_requests, rq_node_type_distr, simulation_time_step)
+        LOG.info(f"init(): {number_removed_time}/{tmp_df.shape[0]}"
                  f" requests removed ({G_RQ_TIME} not in simulation time)")
-        # LOG.debug(f"self.future_requests = {self.future_requests}")
+        if remove_identical_od:
+            LOG.info(f"init(): {number_removed_od}/{tmp_df.shape[0] - number_removed_time}"
+                     f" requests removed ({G_RQ_ORIGIN} == {G_RQ_DESTINATION})")
+
+    def _add_future_requests(self, future_requests, rq_node_type_distr, simulation_time_step, random_state=None):
+        """This method creates the traveler objects of a filtered demand data frame and adds them to future_requests.
+
+        :param future_requests: demand data frame (request times already rounded to the simulation time step)
+        :param rq_node_type_distr: (o_zone, d_zone) or None -> traveler class -> share
+        :param simulation_time_step: simulation time step
+        :param random_state: numpy RandomState to draw traveler classes (None: global numpy random state)
+        """
+        # requests are created in order of request time (and file order for equal request times)
+        future_requests = future_requests.sort_values(G_RQ_TIME, kind="stable")
+        list_rq_obj = create_travelers(future_requests, rq_node_type_distr, self.zone_definition, self.routing_engine,
+                                       simulation_time_step, self.scenario_parameters, random_state=random_state)
+        for rq_time, rq_obj in zip(future_requests[G_RQ_TIME].tolist(), list_rq_obj):
+            try:
+                self.future_requests[rq_time][rq_obj.rid] = rq_obj
+            except KeyError:
+                self.future_requests[rq_time] = {rq_obj.rid: rq_obj}
+        self._nr_created_requests += len(list_rq_obj)
+        self._sorted_future_request_times = None
+
+    def _load_streamed_requests(self, until_time):
+        """This method creates the travelers of all demand streams with request times until until_time.
+
+        :param until_time: latest (rounded) request time of created travelers
+        """
+        for stream in self._streams:
+            if stream.loaded_until < until_time:
+                rows = stream.pop_rows_until(until_time)
+                if rows.shape[0] > 0:
+                    self._add_future_requests(rows, stream.rq_node_type_distr, stream.simulation_time_step,
+                                              random_state=stream.random_state)
+
+    def get_progress(self, simulation_time):
+        """This method returns the share of requests that already entered the simulation. For streamed demand, the
+        share of the simulation time window is returned instead.
+
+        :param simulation_time: current simulation time
+        :return: value between 0 and 1
+        """
+        if self._streams:
+            if self._end_time <= self._start_time:
+                return 1.0
+            return min(1.0, max(0.0, (simulation_time - self._start_time) / (self._end_time - self._start_time)))
+        if self._nr_created_requests == 0:
+            return 1.0
+        return self._nr_released_requests / self._nr_created_requests
 
     def save_user_stats(self, force=True):
         current_buffer_size = len(self.user_stat_buffer)
-        if (current_buffer_size and force) or current_buffer_size >= BUFFER_SIZE:
-            if os.path.isfile(self.output_f):
-                write_mode, write_header = "a", False
-            else:
-                write_mode, write_header = "w", True
+        if (current_buffer_size and force) or current_buffer_size >= self.output_buffer_size:
             out_df = pd.DataFrame(self.user_stat_buffer)
             out_df.set_index(G_RQ_ID, inplace=True)
-            out_df.to_csv(self.output_f, mode=write_mode, header=write_header)
+            for listener in self.user_record_listeners:
+                listener(out_df)
+            submit_output_task(self.output_writer.write, out_df, index=True)
             self.user_stat_buffer = []
             # LOG.info(f"\t ... just wrote {current_buffer_size} entries from buffer to customer output file.")
             LOG.debug(f"\t ... just wrote {current_buffer_size} entries from buffer to customer output file.")
 
+    def add_record_listener(self, listener):
+        """This method registers a function that is called with every DataFrame of user records before it is written
+        to the output file (e.g. for an online evaluation).
+
+        :param listener: function with a DataFrame of user records as only argument
+        """
+        self.user_record_listeners.append(listener)
+
+    def close_user_stats_output(self):
+        """This method finalizes the user output file."""
+        submit_output_task(self.output_writer.close)
+
     def record_user(self, rid):
         try:
             self.user_stat_buffer.append(self.rq_db[rid].record_data())
@@ -202,6 +425,8 @@ class Demand:
         :return: list of (rid, rq) tuples
         """
         since = since if since is not None else simulation_time - 1  # default to only retrieving for current sim time
+        if self._streams:
+            self._load_streamed_requests(simulation_time + self.stream_lookahead)
         list_new_traveler_rid_obj = []
         for t in range(since + 1, simulation_time + 1):
             rqs = self.future_requests.pop(t, {})
@@ -210,9 +435,29 @@ class Demand:
                 self.rq_db[rid] = rq
                 self.undecided_rq[rid] = rq
                 list_new_traveler_rid_obj.append((rid, rq))
+        self._nr_released_requests += len(list_new_traveler_rid_obj)
         LOG.debug(f"{len(list_new_traveler_rid_obj)} new travelers join the simulation at time {simulation_time}.")
         return list_new_traveler_rid_obj
 
+    def get_next_event_time(self, simulation_time):
+        """This method returns the next time at which travelers have to be processed. Undecided and waiting travelers
+        can decide or cancel in every time step.
+
+        :param simulation_time: current simulation time
+        :return: simulation_time if travelers are in the system, time of next request otherwise (inf if none left)
+        """
+        if self.undecided_rq or self.waiting_rq:
+            return simulation_time
+        if self._sorted_future_request_times is None:
+            self._sorted_future_request_times = sorted(self.future_requests.keys())
+        index = bisect.bisect_right(self._sorted_future_request_times, simulation_time)
+        if index < len(self._sorted_future_request_times):
+            return self._sorted_future_request_times[index]
+        next_event = float("inf")
+        for stream in self._streams:
+            next_event = min(next_event, stream.get_next_request_time())
+        return next_event
+
     def get_undecided_travelers(self, simulation_time):
         """This method returns the list of currently undecided requests.
 
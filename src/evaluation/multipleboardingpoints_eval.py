@@ -13,7 +13,9 @@ from src.fleetctrl.pooling.objectives import LARGE_INT
 def multiple_boarding_points(mod_user_stats, operator_attributes, scenario_parameters, dir_names, op_var_costs):
     infrastructure_dir = dir_names.get(G_DIR_INFRA)
     if dir_names.get(G_DIR_INFRA, None) is not None and os.path.isfile(os.path.join(infrastructure_dir, "boarding_points.csv")):
-        routing_engine = load_routing_engine(scenario_parameters[G_NETWORK_TYPE], dir_names[G_DIR_NETWORK], network_dynamics_file_name=scenario_parameters.get(G_NW_DYNAMIC_F, None))
+        routing_engine = load_routing_engine(scenario_parameters[G_NETWORK_TYPE], dir_names[G_DIR_NETWORK], network_dynamics_file_name=scenario_parameters.get(G_NW_DYNAMIC_F, None),
+                                             table_mode=scenario_parameters.get(G_NW_TABLE_MODE),
+                                             route_cache_size=scenario_parameters.get(G_NW_ROUTE_CACHE_SIZE))
         max_walking_distance = scenario_parameters[G_BP_MAX_DIS]
         boarding_time = operator_attributes[G_OP_CONST_BT]
 
@@ -0,0 +1,409 @@
+# -------------------------------------------------------------------------------------------------------------------- #
+# standard distribution imports
+# -----------------------------
+import os
+import logging
+from collections import defaultdict
+
+# additional module imports (> requirements)
+# ------------------------------------------
+import numpy as np
+import pandas as pd
+
+# src imports
+# -----------
+from src.misc.globals import *
+from src.evaluation.standard import decode_offer_str, create_vehicle_type_db, BoardingProcessTracker, \
+    get_reservation_kpis, get_user_time_kpis, get_fleet_time_kpis, get_fleet_distance_kpis, get_trip_distance_kpis, \
+    get_vehicle_eval, get_vehicle_cost_kpis
+
+LOG = logging.getLogger(__name__)
+
+TEMPORAL_BIN_SIZE = 15 * 60
+ONLINE_EVAL_F = "online_eval.csv"
+ONLINE_TEMPORAL_EVAL_F = "online_temporal_eval.csv"
+STANDARD_EVAL_F = "standard_eval.csv"
+WAIT_TIME_RESOLUTION = 0.1  # resolution [s] of the waiting time histogram (median and 90% quantile)
+# KPIs (rows of standard_eval.csv) in the order of evaluation/standard.py
+BASE_KPIS = ["operator_id", "number users", "number travelers", "modal split", "modal split rq", "reservation users",
+             "reservation pax", "served reservation users [%]", "served reservation pax [%]", "online users",
+             "online pax", "served online users [%]", "served online pax [%]", r'% created offers', "utility"]
+IM_KPIS = ["pt revenue", "total intermodal MoD subsidy"]
+OUTPUT_KPIS = ["travel time", "travel distance", "waiting time", "waiting time from ept", "waiting time (median)",
+               "waiting time (90% quantile)", "detour time", "rel detour", r"% fleet utilization",
+               "rides per veh rev hours", "rides per veh rev hours rq", "total vkm", "occupancy", "occupancy rq",
+               r"% empty vkm", r"% repositioning vkm", "customer direct distance [km]", "saved distance [%]",
+               "trip distance per fleet distance", "trip distance per fleet distance (no reloc)",
+               "avg driving velocity [km/h]", "avg trip velocity [km/h]", "vehicle revenue hours [Fzg h]",
+               "total toll", "mod revenue", "mod fix costs", "mod var costs", "total CO2 emissions [t]",
+               "total external emission costs", "parking cost", "toll", "customer in vehicle distance",
+               "shared rides [%]"]
+
+
+def _get_float_col(df, col):
+    if col in df.columns:
+        return pd.to_numeric(df[col], errors="coerce").values.astype(float)
+    return np.full(df.shape[0], np.nan)
+
+
+def _get_str_col(df, col):
+    if col in df.columns:
+        return df[col].values
+    return np.full(df.shape[0], "", dtype=object)
+
+
+def _is_empty_str(val):
+    return val is None or val != val or val == ""
+
+
+class _OperatorAccumulator:
+    def __init__(self, op_id):
+        self.op_id = op_id
+        # user records
+        self.user_sums = defaultdict(float)
+        self.user_seen_cols = set()
+        self.wait_time_hist = defaultdict(int)  # wait time [WAIT_TIME_RESOLUTION] -> number of users
+        # vehicle records
+        self.vehicle_sums = defaultdict(float)
+        self.vehicle_km = defaultdict(float)    # vid -> driven km
+        self.boarding_tracker = BoardingProcessTracker()
+
+
+class OnlineEvaluation:
+    def __init__(self, scenario_parameters, list_op_dicts, dir_names, list_op_vid_vtype):
+        """This class computes the KPIs of the standard evaluation incrementally from the user and vehicle records
+        while they are written during the simulation, i.e. they are available as live KPIs during the run. The KPI
+        formulas are shared with evaluation/standard.py. Memory only scales with the number of operators, vehicles,
+        customers on board and temporal bins.
+        Differences to evaluation/standard.py: median and 90% quantile of the waiting time are computed from a
+        histogram with WAIT_TIME_RESOLUTION, the multiple boarding point evaluation and the travel distance of
+        PT/PV users (from the offers) are not available and sums are accumulated chunk by chunk (floating point
+        rounding can differ in the last digits).
+
+        :param scenario_parameters: scenario parameter dictionary
+        :param list_op_dicts: list of operator attribute dictionaries
+        :param dir_names: directory dictionary
+        :param list_op_vid_vtype: list of (op_id, vid, vehicle type) of all simulation vehicles
+        """
+        self.scenario_parameters = scenario_parameters
+        self.list_op_dicts = list_op_dicts
+        self.sim_start_time = scenario_parameters[G_SIM_START_TIME]
+        self.sim_end_time = scenario_parameters[G_SIM_END_TIME]
+        self.eval_start_time = scenario_parameters.get(G_EVAL_INT_START)
+        self.eval_end_time = scenario_parameters.get(G_EVAL_INT_END)
+        veh_type_db = create_vehicle_type_db(dir_names[G_DIR_VEH])
+        self.op_vehicles = defaultdict(list)    # op_id -> list of (vid, vehicle type data)
+        for op_id, vid, vtype in list_op_vid_vtype:
+            self.op_vehicles[op_id].append((vid, veh_type_db[vtype]))
+        # user records
+        self.nr_users = 0
+        self.nr_pax = 0
+        self.reservation_horizons = sorted(set(self._get_reservation_horizon(op_id)
+                                               for op_id in range(-len(list_op_dicts), len(list_op_dicts))))
+        self.reservation_users = defaultdict(int)   # reservation horizon -> users with reservation
+        self.reservation_pax = defaultdict(int)
+        self.op_created_offers = defaultdict(int)
+        self.op_accumulators = {}
+        # temporal bins: (bin index, op_id) -> attribute -> value
+        self.temporal_bins = defaultdict(lambda: defaultdict(float))
+
+    def _get_reservation_horizon(self, op_id):
+        # same indexing as evaluation/standard.py (also used for the negative ids of the mode choice alternatives)
+        try:
+            return self.list_op_dicts[int(op_id)].get(G_RA_OPT_HOR, 0)
+        except IndexError:
+            return 0
+
+    def _get_op_accumulator(self, op_id):
+        op_acc = self.op_accumulators.get(op_id)
+        if op_acc is None:
+            op_acc = _OperatorAccumulator(op_id)
+            self.op_accumulators[op_id] = op_acc
+        return op_acc
+
+    def _filter_eval_interval(self, df, time_col):
+        if self.eval_start_time is not None and time_col in df.columns:
+            df = df[df[time_col] >= int(self.eval_start_time)]
+        if self.eval_end_time is not None and time_col in df.columns:
+            df = df[df[time_col] < int(self.eval_end_time)]
+        return df
+
+    # record input
+    # ------------
+    def add_user_records(self, user_df):
+        """This method adds a chunk of user records (as written to the user stats output file).
+
+        :param user_df: DataFrame of user records (index: request id)
+        """
+        user_df = self._filter_eval_interval(user_df, G_RQ_TIME)
+        if user_df.shape[0] == 0:
+            return
+        nr_pax = _get_float_col(user_df, G_RQ_PAX)
+        rq_times = _get_float_col(user_df, G_RQ_TIME)
+        epts = _get_float_col(user_df, G_RQ_EPT)
+        self.nr_users += user_df.shape[0]
+        self.nr_pax += int(np.nansum(nr_pax))
+        for horizon in self.reservation_horizons:
+            reservation = epts - rq_times > horizon
+            self.reservation_users[horizon] += int(reservation.sum())
+            self.reservation_pax[horizon] += int(nr_pax[reservation].sum())
+        for offer_str in _get_str_col(user_df, G_RQ_OFFERS):
+            for op_id in decode_offer_str(offer_str).keys():
+                self.op_created_offers[op_id] += 1
+        rq_bins = (rq_times // TEMPORAL_BIN_SIZE).astype(int)
+        for bin_index, count in zip(*np.unique(rq_bins, return_counts=True)):
+            self.temporal_bins[(int(bin_index), None)]["number requests"] += int(count)
+        if G_RQ_OP_ID not in user_df.columns:
+            return
+        op_ids = _get_float_col(user_df, G_RQ_OP_ID)
+        for op_id in np.unique(op_ids[~np.isnan(op_ids)]):
+            op_id = int(op_id)
+            op_mask = op_ids == op_id
+            op_users = user_df[op_mask]
+            op_acc = self._get_op_accumulator(op_id)
+            sums = op_acc.user_sums
+            sums["number users"] += op_users.shape[0]
+            sums["number travelers"] += nr_pax[op_mask].sum()
+            reservation = epts[op_mask] - rq_times[op_mask] > self._get_reservation_horizon(op_id)
+            sums["reservation users"] += int(reservation.sum())
+            sums["reservation pax"] += float(nr_pax[op_mask][reservation].sum())
+            for col in [G_RQ_PU, G_RQ_DO, G_RQ_EPT, G_RQ_DRT, G_RQ_DRD, G_RQ_FARE, G_RQ_C_UTIL, G_RQ_TOLL, G_RQ_PARK,
+                        G_RQ_IM_PT_FARE, G_RQ_SUB]:
+                if col in op_users.columns:
+                    op_acc.user_seen_cols.add(col)
+                    sums[col] += np.nansum(_get_float_col(op_users, col))
+            if op_id < 0:
+                continue
+            boarding_time = self.list_op_dicts[op_id].get(G_OP_CONST_BT, 0)
+            pu_times = _get_float_col(op_users, G_RQ_PU)
+            do_times = _get_float_col(op_users, G_RQ_DO)
+            drts = _get_float_col(op_users, G_RQ_DRT)
+            wait_times = pu_times - rq_times[op_mask]
+            valid_wait = ~np.isnan(wait_times)
+            sums["wait time"] += wait_times[valid_wait].sum()
+            sums["wait time count"] += valid_wait.sum()
+            for wait_time, count in zip(*np.unique(np.rint(wait_times[valid_wait] / WAIT_TIME_RESOLUTION),
+                                                   return_counts=True)):
+                op_acc.wait_time_hist[int(wait_time)] += int(count)
+            sums["rel detour"] += np.nansum((do_times - pu_times - boarding_time - drts) / drts)
+            served_bins = (rq_times[op_mask][~np.isnan(pu_times)] // TEMPORAL_BIN_SIZE).astype(int)
+            for bin_index, count in zip(*np.unique(served_bins, return_counts=True)):
+                self.temporal_bins[(int(bin_index), op_id)]["served users"] += int(count)
+
+    def add_vehicle_records(self, op_id, vehicle_df):
+        """This method adds a chunk of vehicle leg records (as written to the operator stats output file). The
+        records of each vehicle have to be added in chronological order.
+
+        :param op_id: operator id
+        :param vehicle_df: DataFrame of vehicle records
+        """
+        vehicle_df = self._filter_eval_interval(vehicle_df, G_VR_LEG_START_TIME)
+        if vehicle_df.shape[0] == 0:
+            return
+        op_acc = self._get_op_accumulator(op_id)
+        sums = op_acc.vehicle_sums
+        vids = vehicle_df[G_V_VID].values
+        status = vehicle_df[G_VR_STATUS].values
+        start_times = _get_float_col(vehicle_df, G_VR_LEG_START_TIME)
+        end_times = _get_float_col(vehicle_df, G_VR_LEG_END_TIME)
+        distances = _get_float_col(vehicle_df, G_VR_LEG_DISTANCE)
+        ob_rids = _get_str_col(vehicle_df, G_VR_OB_RID)
+        nr_pax = _get_float_col(vehicle_df, G_VR_NR_PAX)
+        # times
+        clipped_start_times = np.minimum(start_times, self.sim_end_time)
+        clipped_end_times = np.minimum(end_times, self.sim_end_time)
+        unutilized = np.isin(status, [VRL_STATES.OUT_OF_SERVICE.display_name, VRL_STATES.CHARGING.display_name])
+        revenue = np.isin(status, [x.display_name for x in G_REVENUE_STATUS])
+        driving = np.isin(status, [x.display_name for x in G_DRIVING_STATUS])
+        sums["utilization time"] += (clipped_end_times[~unutilized] - clipped_start_times[~unutilized]).sum()
+        sums["unutilized time"] += (clipped_end_times[unutilized] - clipped_start_times[unutilized]).sum()
+        sums["revenue time"] += (clipped_end_times[revenue] - clipped_start_times[revenue]).sum()
+        sums["driving time"] += np.nansum(end_times[driving] - start_times[driving])
+        # distances
+        empty = np.array([_is_empty_str(x) for x in ob_rids], dtype=bool)
+        nr_ob_rq = np.array([0 if _is_empty_str(x) else str(x).count(";") + 1 for x in ob_rids])
+        sums["distance"] += np.nansum(distances)
+        sums["weighted ob rq"] += np.nansum(nr_ob_rq * distances)
+        sums["weighted ob pax"] += np.nansum(nr_pax * distances)
+        sums["empty distance"] += np.nansum(distances[empty])
+        sums["repositioning distance"] += np.nansum(distances[empty & (status == VRL_STATES.REPOSITION.display_name)])
+        sums["toll"] += np.nansum(_get_float_col(vehicle_df, G_VR_TOLL))
+        for vid, distance in zip(vids.tolist(), np.nan_to_num(distances).tolist()):
+            op_acc.vehicle_km[vid] += distance / 1000.0
+        # in vehicle distance and shared rides
+        for record in zip(vids.tolist(), status, distances, ob_rids, _get_str_col(vehicle_df, G_VR_BOARDING_RID),
+                          _get_str_col(vehicle_df, G_VR_ALIGHTING_RID)):
+            op_acc.boarding_tracker.add_record(*record)
+        # temporal bins (vkm and pkm by start time, revenue time distributed over the bins of the leg)
+        start_bins = (start_times // TEMPORAL_BIN_SIZE).astype(int)
+        for bin_index, vkm, pkm in pd.DataFrame({"bin": start_bins, "vkm": np.nan_to_num(distances) / 1000.0,
+                                                 "pkm": np.nan_to_num(nr_pax * distances) / 1000.0}
+                                                ).groupby("bin").sum().itertuples():
+            self.temporal_bins[(int(bin_index), op_id)]["vkm"] += vkm
+            self.temporal_bins[(int(bin_index), op_id)]["pkm"] += pkm
+        rev_start_times = clipped_start_times[revenue]
+        rev_end_times = clipped_end_times[revenue]
+        first_bins = (rev_start_times // TEMPORAL_BIN_SIZE).astype(int)
+        last_bins = (np.maximum(rev_start_times, rev_end_times - 1) // TEMPORAL_BIN_SIZE).astype(int)
+        for offset in range(int((last_bins - first_bins).max(initial=-1)) + 1):
+            bins = first_bins + offset
+            mask = bins <= last_bins
+            overlap = np.minimum(rev_end_times[mask], (bins[mask] + 1) * TEMPORAL_BIN_SIZE) - \
+                np.maximum(rev_start_times[mask], bins[mask] * TEMPORAL_BIN_SIZE)
+            for bin_index, duration in zip(bins[mask].tolist(), overlap.tolist()):
+                if duration > 0:
+                    self.temporal_bins[(bin_index, op_id)]["revenue hours"] += duration / 3600.0
+
+    # results
+    # -------
+    def get_kpis(self):
+        """This method returns the current KPIs; it can be called at any time of the simulation (live KPIs).
+
+        :return: DataFrame with KPIs (rows) per operator (columns) like standard_eval.csv
+        """
+        result_dict_list = []
+        operator_names = []
+        for op_id in sorted(self.op_accumulators.keys()):
+            op_acc = self.op_accumulators[op_id]
+            if op_acc.user_sums["number users"] == 0:
+                continue
+            kpis = self._get_user_kpis(op_id, op_acc)
+            if op_id >= 0:
+                op_name = f"MoD_{op_id}"
+                kpis.update(self._get_fleet_kpis(op_id, op_acc))
+                list_kpis = BASE_KPIS + OUTPUT_KPIS
+            elif op_id in (G_MC_DEC_PT, G_MC_DEC_PV):
+                op_name = "PT" if op_id == G_MC_DEC_PT else "PV"
+                list_kpis = BASE_KPIS + OUTPUT_KPIS
+            else:
+                op_name = f"IM_MoD_{op_id}"
+                list_kpis = BASE_KPIS + IM_KPIS + OUTPUT_KPIS
+            result_dict_list.append({kpi: kpis.get(kpi, np.nan) for kpi in list_kpis})
+            operator_names.append(op_name)
+        return pd.DataFrame(result_dict_list, index=operator_names).transpose()
+
+    def get_temporal_kpis(self):
+        """This method returns the KPIs aggregated in temporal bins.
+
+        :return: DataFrame with columns bin start time, operator_id and KPIs
+        """
+        rows = []
+        for (bin_index, op_id), values in sorted(self.temporal_bins.items(),
+                                                 key=lambda x: (x[0][0], -10 if x[0][1] is None else x[0][1])):
+            row = {"bin start time": bin_index * TEMPORAL_BIN_SIZE, "operator_id": op_id}
+            row.update(values)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def write_results(self, output_dir, write_standard_eval=False):
+        """This method writes the KPIs (same format as standard_eval.csv) and the temporal KPIs to the output
+        directory.
+
+        :param output_dir: scenario output directory
+        :param write_standard_eval: if True, the KPIs are additionally written to standard_eval.csv (replacing the
+                standard evaluation of the output files)
+        :return: DataFrame of KPIs
+        """
+        result_df = self.get_kpis()
+        result_df.to_csv(os.path.join(output_dir, ONLINE_EVAL_F))
+        if write_standard_eval:
+            result_df.to_csv(os.path.join(output_dir, STANDARD_EVAL_F))
+        self.get_temporal_kpis().to_csv(os.path.join(output_dir, ONLINE_TEMPORAL_EVAL_F), index=False)
+        return result_df
+
+    def _get_user_kpis(self, op_id, op_acc):
+        sums = op_acc.user_sums
+        seen = op_acc.user_seen_cols
+        op_number_users = sums["number users"]
+        op_number_pax = sums["number travelers"]
+        kpis = {"operator_id": op_id,
+                "number users": op_number_users,
+                "number travelers": op_number_pax,
+                "modal split": op_number_pax / self.nr_pax,
+                "modal split rq": op_number_users / self.nr_users,
+                r'% created offers': self.op_created_offers.get(op_id, 0) / self.nr_users * 100.0}
+        if G_RQ_C_UTIL in seen:
+            kpis["utility"] = sums[G_RQ_C_UTIL] / op_number_users
+        horizon = self._get_reservation_horizon(op_id)
+        kpis.update(get_reservation_kpis(op_number_users, op_number_pax, sums["reservation users"],
+                                         sums["reservation pax"], self.nr_users, self.nr_pax,
+                                         self.reservation_users[horizon], self.reservation_pax[horizon]))
+        # user costs
+        if G_RQ_FARE in seen:
+            kpis["mod revenue"] = sums[G_RQ_FARE]
+        if op_id == G_MC_DEC_PV:
+            if G_RQ_TOLL in seen:
+                kpis["toll"] = sums[G_RQ_TOLL] / op_number_users
+            if G_RQ_PARK in seen:
+                kpis["parking cost"] = sums[G_RQ_PARK] / op_number_users
+        elif op_id < 0 and op_id != G_MC_DEC_PT:
+            if G_RQ_IM_PT_FARE in seen:
+                kpis["pt revenue"] = sums[G_RQ_IM_PT_FARE]
+                kpis["total intermodal MoD subsidy"] = sums[G_RQ_SUB]
+        return kpis
+
+    def _get_fleet_kpis(self, op_id, op_acc):
+        sums = op_acc.user_sums
+        v_sums = op_acc.vehicle_sums
+        seen = op_acc.user_seen_cols
+        op_number_users = sums["number users"]
+        op_number_pax = sums["number travelers"]
+
+        def get_user_sum(col):
+            return sums[col] if col in seen else np.nan
+        # user KPIs
+        op_user_sum_travel_time = np.nan
+        if G_RQ_DO in seen and G_RQ_PU in seen:
+            op_user_sum_travel_time = sums[G_RQ_DO] - sums[G_RQ_PU]
+        sum_rel_detour = sums["rel detour"] if G_RQ_DRT in seen else np.nan
+        kpis = get_user_time_kpis(op_number_users, op_user_sum_travel_time, get_user_sum(G_RQ_PU),
+                                  get_user_sum(G_RQ_EPT), get_user_sum(G_RQ_DRT), sum_rel_detour,
+                                  self.list_op_dicts[op_id].get(G_OP_CONST_BT, 0))
+        if sums["wait time count"] > 0:
+            kpis["waiting time"] = sums["wait time"] / sums["wait time count"]
+            kpis["waiting time (median)"] = self._get_hist_quantile(op_acc.wait_time_hist, 0.5)
+            kpis["waiting time (90% quantile)"] = self._get_hist_quantile(op_acc.wait_time_hist, 0.9)
+        op_sum_direct_travel_distance = sums[G_RQ_DRD] / 1000.0 if G_RQ_DRD in seen else np.nan
+        kpis["customer direct distance [km]"] = op_sum_direct_travel_distance
+        # fleet KPIs
+        op_vehicles = self.op_vehicles.get(op_id, [])
+        kpis.update(get_fleet_time_kpis(len(op_vehicles), self.sim_end_time - self.sim_start_time,
+                                        v_sums["utilization time"], v_sums["unutilized time"], v_sums["revenue time"],
+                                        op_number_users, op_number_pax))
+        kpis.update(get_fleet_distance_kpis(v_sums["distance"], v_sums["weighted ob rq"], v_sums["weighted ob pax"],
+                                            v_sums["empty distance"], v_sums["repositioning distance"]))
+        trip_direct_distance = None if np.isnan(op_sum_direct_travel_distance) else op_sum_direct_travel_distance
+        kpis.update(get_trip_distance_kpis(trip_direct_distance, kpis["total vkm"], kpis[r"% repositioning vkm"],
+                                           v_sums["driving time"], op_user_sum_travel_time))
+        kpis["total toll"] = v_sums["toll"]
+        kpis["toll"] = v_sums["toll"]
+        # costs and emissions by vehicle
+        if len(op_vehicles) > 0:
+            vids = [vid for vid, _ in op_vehicles]
+            veh_km = np.array([op_acc.vehicle_km.get(vid, 0.0) for vid in vids])
+            all_vid_df = get_vehicle_eval(vids, veh_km, [vtype_data for _, vtype_data in op_vehicles],
+                                          self.scenario_parameters)
+        else:
+            all_vid_df = pd.DataFrame()
+        kpis.update(get_vehicle_cost_kpis(all_vid_df))
+        boarding_tracker = op_acc.boarding_tracker
+        if boarding_tracker.nr_alighted_boarded > 0:
+            kpis["customer in vehicle distance"] = boarding_tracker.get_avg_in_vehicle_distance()
+        if boarding_tracker.nr_alighted > 0:
+            kpis["shared rides [%]"] = boarding_tracker.get_shared_rides()
+        return kpis
+
+    @staticmethod
+    def _get_hist_quantile(hist, q):
+        """ quantile with linear interpolation (like pandas) from the waiting time histogram """
+        n = sum(hist.values())
+        if n == 0:
+            return np.nan
+        values = sorted(hist.keys())
+        counts = np.cumsum([hist[v] for v in values])
+        pos = (n - 1) * q
+        lower = int(np.floor(pos))
+        upper = int(np.ceil(pos))
+        lower_value = values[int(np.searchsorted(counts, lower + 1))]
+        upper_value = values[int(np.searchsorted(counts, upper + 1))]
+        return (lower_value + (upper_value - lower_value) * (pos - lower)) * WAIT_TIME_RESOLUTION
@@ -8,6 +8,7 @@ MAIN_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 sys.path.append(MAIN_DIR)
 from src.evaluation.multipleboardingpoints_eval import multiple_boarding_points
 from src.misc.globals import *
+from src.misc.output_writer import read_output_file, find_output_file
 
 EURO_PER_TON_OF_CO2 = 145 # from BVWP2030 Modulhandbuch (page 113)
 EMISSION_CPG = 145 * 100 / 1000**2
@@ -59,7 +60,7 @@ def read_op_output_file(output_dir, op_id, evaluation_start_time = None, evaluat
     :param evaluation_end_time: if given, all entries starting after this time are discarded
     :return: output dataframe of specific operator
     """
-    op_df = pd.read_csv(os.path.join(output_dir, f"2-{int(op_id)}_op-stats.csv"))
+    op_df = read_output_file(output_dir, f"2-{int(op_id)}_op-stats")
     if evaluation_start_time is not None:
         op_df = op_df[op_df[G_VR_LEG_START_TIME] >= evaluation_start_time]
     if evaluation_end_time is not None:
@@ -86,7 +87,7 @@ def read_user_output_file(output_dir, evaluation_start_time = None, evaluation_e
     :param evaluation_end_time: if given, all entries starting after this time are discarded
     :return: output dataframe of specific operator
     """
-    user_stats = pd.read_csv(os.path.join(output_dir, "1_user-stats.csv"))
+    user_stats = read_output_file(output_dir, "1_user-stats")
     if evaluation_start_time is not None:
         user_stats = user_stats[user_stats[G_RQ_TIME] >= evaluation_start_time]
     if evaluation_end_time is not None:
@@ -138,63 +139,255 @@ def create_vehicle_type_db(vehicle_data_dir):
         veh_type_db[veh_type_name][G_VTYPE_NAME] = veh_type_data.name
     return veh_type_db
 
+def _is_empty_rid_str(rid_str):
+    return rid_str is None or rid_str != rid_str or rid_str == ""
+
+
+class BoardingProcessTracker:
+    """ this class follows the customers on board of the vehicles through the vehicle records to evaluate the in vehicle
+    distance and the shared rides; the records of each vehicle have to be added in chronological order """
+    def __init__(self):
+        self.ob_distance = {}   # vid -> rid -> in vehicle distance since boarding
+        self.ob_shared = {}     # vid -> rid -> 1 if the ride was shared
+        self.sum_in_vehicle_distance = 0
+        self.nr_alighted_boarded = 0    # alighting customers whose boarding was recorded
+        self.nr_alighted = 0
+        self.nr_shared = 0
+
+    def add_record(self, vid, status, distance, ob_str, boarding_str, alight_str):
+        dis_dict = self.ob_distance.setdefault(vid, {})
+        shared_dict = self.ob_shared.setdefault(vid, {})
+        if status == VRL_STATES.BOARDING.display_name:
+            if not _is_empty_rid_str(boarding_str):
+                for rid in str(boarding_str).split(";"):
+                    dis_dict[rid] = 0
+                    shared_dict[rid] = 0
+            if not _is_empty_rid_str(alight_str):
+                for rid in str(alight_str).split(";"):
+                    try:
+                        self.sum_in_vehicle_distance += dis_dict.pop(rid)
+                        self.nr_alighted_boarded += 1
+                    except KeyError:
+                        pass
+                    self.nr_shared += shared_dict.pop(rid, 0)
+                    self.nr_alighted += 1
+        elif not _is_empty_rid_str(ob_str):
+            ob_list = str(ob_str).split(";")
+            for rid in ob_list:
+                try:
+                    dis_dict[rid] += distance
+                except KeyError:
+                    pass
+            if len(ob_list) > 1:
+                for rid in ob_list:
+                    shared_dict[rid] = 1
+
+    def get_avg_in_vehicle_distance(self):
+        return self.sum_in_vehicle_distance/self.nr_alighted_boarded
+
+    def get_shared_rides(self):
+        return 100.0*self.nr_shared/self.nr_alighted
+
+
+def _track_boarding_processes(op_df):
+    """ this function adds the vehicle records sorted by vehicle id (the order of the records of a vehicle is kept)
+    to a BoardingProcessTracker
+    :param op_df: operator output dataframe
+    :return: BoardingProcessTracker
+    """
+    order = np.argsort(op_df[G_V_VID].values, kind="stable")
+    tracker = BoardingProcessTracker()
+    for record in zip(op_df[G_V_VID].values[order], op_df[G_VR_STATUS].values[order],
+                      op_df[G_VR_LEG_DISTANCE].values[order], op_df[G_VR_OB_RID].values[order],
+                      op_df[G_VR_BOARDING_RID].values[order], op_df[G_VR_ALIGHTING_RID].values[order]):
+        tracker.add_record(*record)
+    return tracker
+
+def _sum_by_vehicle(op_df, col, vids):
+    """ this function sums up a column of the vehicle records for each vehicle
+    :param op_df: operator output dataframe
+    :param col: column to sum up
+    :param vids: array of vehicle ids
+    :return: array with the sum for each vehicle in vids (0 for vehicles without records)
+    """
+    order = np.argsort(op_df[G_V_VID].values, kind="stable")
+    sorted_vids = op_df[G_V_VID].values[order]
+    values = op_df[col].values[order].astype(float)
+    values[np.isnan(values)] = 0.0
+    starts = np.searchsorted(sorted_vids, vids, side="left")
+    ends = np.searchsorted(sorted_vids, vids, side="right")
+    # sum of every slice like pandas to obtain identical floating point results
+    return np.array([values[start:end].sum() for start, end in zip(starts.tolist(), ends.tolist())], dtype=float)
+
 def avg_in_vehicle_distance(op_df):
-    N = 0
-    dis_dict = {}
-    sum_dis = 0
-    for vid, veh_df in op_df.groupby(G_V_VID):
-        for status, distance, ob_str, boarding_str, alight_str in zip(veh_df[G_VR_STATUS].values, veh_df[G_VR_LEG_DISTANCE].values, veh_df[G_VR_OB_RID].values, veh_df[G_VR_BOARDING_RID].values, veh_df[G_VR_ALIGHTING_RID].values):
-            if status == VRL_STATES.BOARDING.display_name:
-                if boarding_str == boarding_str:
-                    for rid in boarding_str.split(";"):
-                        dis_dict[rid] = 0
-                if alight_str == alight_str:
-                    for rid in alight_str.split(";"):
-                        try:
-                            sum_dis += dis_dict[rid]
-                            N += 1
-                            del dis_dict[rid]
-                        except KeyError:
-                            pass
-            else:
-                if ob_str == ob_str:
-                    for rid in ob_str.split(";"):
-                        try:
-                            dis_dict[rid] += distance
-                        except KeyError:
-                            pass
-        dis_dict = {}
-    return sum_dis/N
+    return _track_boarding_processes(op_df).get_avg_in_vehicle_distance()
 
 def shared_rides(op_df):
-    N = 0
-    rid_shared_dict = {}
-    N_shared = 0
-    for vid, veh_df in op_df.groupby(G_V_VID):
-        for status, distance, ob_str, boarding_str, alight_str in zip(veh_df[G_VR_STATUS].values, veh_df[G_VR_LEG_DISTANCE].values, veh_df[G_VR_OB_RID].values, veh_df[G_VR_BOARDING_RID].values, veh_df[G_VR_ALIGHTING_RID].values):
-            if status == VRL_STATES.BOARDING.display_name:
-                if boarding_str == boarding_str:
-                    for rid in boarding_str.split(";"):
-                        rid_shared_dict[rid] = 0
-                if alight_str == alight_str:
-                    for rid in alight_str.split(";"):
-                        try:
-                            N_shared += rid_shared_dict.get(rid, 0)
-                            N += 1
-                            del rid_shared_dict[rid]
-                        except KeyError:
-                            pass
-            else:
-                if ob_str == ob_str:
-                    ob_list = ob_str.split(";")
-                    if len(ob_list) > 1:
-                        for rid in ob_list:
-                            try:
-                                rid_shared_dict[rid] = 1
-                            except KeyError:
-                                pass
-        rid_shared_dict = {}
-    return 100.0*N_shared/N
+    return _track_boarding_processes(op_df).get_shared_rides()
+
+
+# KPI formulas from aggregated values (shared with the online evaluation in evaluation/online.py)
+# ---------------------------------------------------------------------------------------------
+def get_reservation_kpis(op_number_users, op_number_pax, op_number_reservation_users, op_number_reservation_pax,
+                         number_users, number_pax, number_reservation_users, number_reservation_pax):
+    """ this function computes the served reservation and online users of an operator
+    :param op_number_users: number of users of the operator
+    :param op_number_pax: number of travelers of the operator
+    :param op_number_reservation_users: number of users of the operator that booked in advance
+    :param op_number_reservation_pax: number of travelers of the operator that booked in advance
+    :param number_users: number of all users
+    :param number_pax: number of all travelers
+    :param number_reservation_users: number of all users that booked in advance (reservation horizon of the operator)
+    :param number_reservation_pax: number of all travelers that booked in advance
+    :return: dictionary KPI -> value
+    """
+    try:
+        frac_served_reservation_users = op_number_reservation_users/number_reservation_users*100.0
+        frac_served_reservation_pax = op_number_reservation_pax/number_reservation_pax*100.0
+    except ZeroDivisionError:
+        frac_served_reservation_users = 100.0
+        frac_served_reservation_pax = 100.0
+    op_number_online_users = op_number_users - op_number_reservation_users
+    op_number_online_pax = op_number_pax - op_number_reservation_pax
+    try:
+        frac_served_online_users = op_number_online_users/(number_users - number_reservation_users)*100.0
+        frac_served_online_pax = op_number_online_pax/(number_pax - number_reservation_pax)*100.0
+    except ZeroDivisionError:
+        frac_served_online_users = 100.0
+        frac_served_online_pax = 100.0
+    return {"reservation users": op_number_reservation_users,
+            "reservation pax" : op_number_reservation_pax,
+            "served reservation users [%]": frac_served_reservation_users,
+            "served reservation pax [%]": frac_served_reservation_pax,
+            "online users" : op_number_online_users,
+            "online pax" : op_number_online_pax,
+            "served online users [%]": frac_served_online_users,
+            "served online pax [%]": frac_served_online_pax}
+
+def get_user_time_kpis(op_number_users, sum_travel_time, sum_pick_up_time, sum_ept, sum_direct_travel_time,
+                       sum_rel_detour, boarding_time):
+    """ this function computes the average travel, waiting and detour times of the served users of an operator
+    (unavailable sums are given as np.nan)
+    :param op_number_users: number of users of the operator
+    :param sum_travel_time: sum of drop off minus pick up times
+    :param sum_pick_up_time: sum of pick up times
+    :param sum_ept: sum of earliest pick up times
+    :param sum_direct_travel_time: sum of direct travel times
+    :param sum_rel_detour: sum of relative detours (travel time - boarding time - direct travel time) / direct travel time
+    :param boarding_time: constant boarding time of the operator
+    :return: dictionary KPI -> value
+    """
+    return {"travel time": sum_travel_time / op_number_users,
+            "waiting time from ept": (sum_pick_up_time - sum_ept) / op_number_users,
+            "detour time": (sum_travel_time - sum_direct_travel_time)/op_number_users - boarding_time,
+            "rel detour": sum_rel_detour/op_number_users * 100.0}
+
+def get_fleet_time_kpis(n_vehicles, simulation_time, utilization_time, unutilized_time, revenue_time, op_number_users,
+                        op_number_pax):
+    """ this function computes the utilization KPIs of an operator fleet
+    :param n_vehicles: number of vehicles of the operator
+    :param simulation_time: duration of the simulation
+    :param utilization_time: sum of the durations of the vehicle records (not out of service or charging)
+    :param unutilized_time: sum of the durations of out of service and charging vehicle records
+    :param revenue_time: sum of the durations of the revenue vehicle records
+    :param op_number_users: number of users of the operator
+    :param op_number_pax: number of travelers of the operator
+    :return: dictionary KPI -> value
+    """
+    kpis = {r"% fleet utilization": np.nan, "rides per veh rev hours": np.nan, "rides per veh rev hours rq": np.nan,
+            "vehicle revenue hours [Fzg h]": revenue_time/3600.0}
+    try:
+        kpis["rides per veh rev hours"] = op_number_pax/kpis["vehicle revenue hours [Fzg h]"]
+        kpis["rides per veh rev hours rq"] = op_number_users/kpis["vehicle revenue hours [Fzg h]"]
+        kpis[r"% fleet utilization"] = 100 * (utilization_time/(n_vehicles * simulation_time - unutilized_time))
+    except ZeroDivisionError:
+        pass
+    return kpis
+
+def get_fleet_distance_kpis(total_distance, weighted_ob_rq_distance, weighted_ob_pax_distance, empty_distance,
+                            repositioning_distance):
+    """ this function computes the occupancy and empty distance KPIs of an operator fleet
+    :param total_distance: driven distance of the fleet [m]
+    :param weighted_ob_rq_distance: sum of driven distance times number of requests on board
+    :param weighted_ob_pax_distance: sum of driven distance times number of travelers on board
+    :param empty_distance: driven distance without customers on board [m]
+    :param repositioning_distance: driven distance of repositioning trips without customers on board [m]
+    :return: dictionary KPI -> value
+    """
+    total_km = total_distance/1000.0
+    try:
+        return {"total vkm": total_km,
+                "occupancy": weighted_ob_pax_distance / total_distance,
+                "occupancy rq": weighted_ob_rq_distance / total_distance,
+                r"% empty vkm": empty_distance/1000.0/total_km*100.0,
+                r"% repositioning vkm": repositioning_distance/total_km*100.0/1000.0}
+    except ZeroDivisionError:
+        return {"total vkm": total_km, "occupancy": 0, "occupancy rq": 0, r"% empty vkm": 0,
+                r"% repositioning vkm": 0}
+
+def get_trip_distance_kpis(trip_direct_distance, total_km, repositioning_vkm, driving_time, sum_travel_time):
+    """ this function compares the direct distances of the served trips with the fleet distance
+    :param trip_direct_distance: sum of direct distances of the served trips [km] (None if not available)
+    :param total_km: driven distance of the fleet [km]
+    :param repositioning_vkm: share of repositioning distance [%]
+    :param driving_time: sum of the durations of the driving vehicle records
+    :param sum_travel_time: sum of the travel times of the served users
+    :return: dictionary KPI -> value
+    """
+    kpis = {"saved distance [%]": np.nan, "trip distance per fleet distance": np.nan,
+            "trip distance per fleet distance (no reloc)": np.nan, "avg driving velocity [km/h]": np.nan,
+            "avg trip velocity [km/h]": np.nan}
+    try:
+        kpis["avg driving velocity [km/h]"] = total_km/driving_time*3600.0
+        if trip_direct_distance is not None:
+            kpis["avg trip velocity [km/h]"] = trip_direct_distance/sum_travel_time*3.6
+            kpis["saved distance [%]"] = (trip_direct_distance - total_km)/trip_direct_distance * 100.0
+            kpis["trip distance per fleet distance"] = trip_direct_distance / total_km
+            kpis["trip distance per fleet distance (no reloc)"] = \
+                trip_direct_distance / (total_km * (1.0 - repositioning_vkm/100.0))
+    except ZeroDivisionError:
+        pass
+    return kpis
+
+def get_vehicle_eval(vids, veh_km, list_vtype_data, scenario_parameters):
+    """ this function computes energy, emissions and costs of the vehicles of an operator
+    :param vids: array of vehicle ids
+    :param veh_km: array of driven distances [km] of these vehicles
+    :param list_vtype_data: list of vehicle type data of these vehicles (see create_vehicle_type_db)
+    :param scenario_parameters: scenario parameters
+    :return: dataframe with vehicle ids as index
+    """
+    def get_vtype_array(key):
+        return np.array([vtype_data[key] for vtype_data in list_vtype_data])
+    veh_kWh = veh_km * get_vtype_array(G_VTYPE_BATTERY_SIZE) / get_vtype_array(G_VTYPE_RANGE)
+    co2_per_kWh = scenario_parameters.get(G_ENERGY_EMISSIONS, ENERGY_EMISSIONS)
+    if co2_per_kWh is None:
+        co2_per_kWh = ENERGY_EMISSIONS
+    veh_co2 = co2_per_kWh * veh_kWh
+    veh_fix_costs = np.rint(scenario_parameters.get(G_OP_SHARE_FC, 1.0) * get_vtype_array(G_VTYPE_FIX_COST))
+    veh_var_costs = np.rint(get_vtype_array(G_VTYPE_DIST_COST) * veh_km)
+    # TODO # after ISTTT: idle times
+    return pd.DataFrame({"type": get_vtype_array(G_VTYPE_NAME), "total km": veh_km, "total kWh": veh_kWh,
+                         "total CO2 [g]": veh_co2, "fix costs": veh_fix_costs, "total variable costs": veh_var_costs},
+                        index=vids)
+
+def get_vehicle_cost_kpis(all_vid_df):
+    """ this function aggregates the vehicle evaluation of an operator
+    :param all_vid_df: dataframe from get_vehicle_eval
+    :return: dictionary KPI -> value
+    """
+    try:
+        op_co2 = all_vid_df["total CO2 [g]"].sum()
+        op_ext_em_costs = np.rint(EMISSION_CPG * op_co2)
+        op_fix_costs = all_vid_df["fix costs"].sum()
+        op_var_costs = all_vid_df["total variable costs"].sum()
+    except:
+        op_co2 = 0
+        op_ext_em_costs = 0
+        op_fix_costs = 0
+        op_var_costs = 0
+    return {"mod fix costs": op_fix_costs, "mod var costs": op_var_costs, "total CO2 emissions [t]": op_co2 / 10**6,
+            "total external emission costs": op_ext_em_costs}
 
 
 def standard_evaluation(output_dir, evaluation_start_time = None, evaluation_end_time = None, print_comments=False, dir_names_in = {}):
@@ -239,9 +432,7 @@ def standard_evaluation(output_dir, evaluation_start_time = None, evaluation_end
     row_id_to_offer_dict = {}    # user_stats_row_id -> op_id -> offer
     op_id_to_offer_dict = {}    # op_id -> user_stats_row_id -> offer
     active_offer_parameters = {}
-    for key, entries in user_stats.iterrows():
-        row_id_to_offer_dict[key] = entries[G_RQ_PAX]
-        offer_entry = entries[G_RQ_OFFERS]
+    for key, offer_entry in zip(user_stats.index, user_stats[G_RQ_OFFERS].values):
         offer = decode_offer_str(offer_entry)
         row_id_to_offer_dict[key] = offer
         for op_id, op_offer in offer.items():
@@ -274,36 +465,17 @@ def standard_evaluation(output_dir, evaluation_start_time = None, evaluation_end
             
         op_reservation_users = op_users[op_users[G_RQ_EPT] - op_users[G_RQ_TIME] > op_reservation_horizon]
         total_reservation_users = user_stats[user_stats[G_RQ_EPT] - user_stats[G_RQ_TIME] > op_reservation_horizon]
-        op_number_reservation_users = op_reservation_users.shape[0]
-        op_number_reservation_pax = op_reservation_users[G_RQ_PAX].sum()
-        try:
-            op_frac_served_reservation_users = op_number_reservation_users/total_reservation_users.shape[0]*100.0
-            op_frac_served_reservation_pax = op_number_reservation_pax/total_reservation_users[G_RQ_PAX].sum()*100.0
-        except ZeroDivisionError:
-            op_frac_served_reservation_users = 100.0
-            op_frac_served_reservation_pax = 100.0
-        op_number_online_users = op_number_users - op_number_reservation_users
-        op_number_online_pax = op_number_pax - op_number_reservation_pax
-        try:
-            op_frac_served_online_users = op_number_online_users/(number_users - total_reservation_users.shape[0])*100.0
-            op_frac_served_online_pax = op_number_online_pax/(number_total_travelers - total_reservation_users[G_RQ_PAX].sum())*100.0
-        except ZeroDivisionError:
-            op_frac_served_online_users = 100.0
-            op_frac_served_online_pax = 100.0
+        reservation_kpis = get_reservation_kpis(op_number_users, op_number_pax, op_reservation_users.shape[0],
+                                                op_reservation_users[G_RQ_PAX].sum(), number_users,
+                                                number_total_travelers, total_reservation_users.shape[0],
+                                                total_reservation_users[G_RQ_PAX].sum())
 
         result_dict = {"operator_id": op_id, 
                        "number users": op_number_users,
                        "number travelers": op_number_pax,
                        "modal split": op_modal_split,
                        "modal split rq": op_modal_split_rq,
-                       "reservation users": op_number_reservation_users,
-                       "reservation pax" : op_number_reservation_pax,
-                       "served reservation users [%]": op_frac_served_reservation_users,
-                       "served reservation pax [%]": op_frac_served_reservation_pax,
-                       "online users" : op_number_online_users,
-                       "online pax" : op_number_online_pax,
-                       "served online users [%]": op_frac_served_online_users,
-                       "served online pax [%]": op_frac_served_online_pax,
+                       **reservation_kpis,
                        r'% created offers': op_rel_created_offers,
                        "utility" : op_avg_utility}
 
@@ -340,7 +512,7 @@ def standard_evaluation(output_dir, evaluation_start_time = None, evaluation_end
         op_parking_cost = np.nan
         op_fix_costs = np.nan
         op_var_costs = np.nan
-        op_co2 = np.nan
+        op_co2_t = np.nan
         op_ext_em_costs = np.nan
 
         if op_id >= 0:  #AMoD
@@ -364,9 +536,6 @@ def standard_evaluation(output_dir, evaluation_start_time = None, evaluation_end
             # sum travel time
             if G_RQ_DO in op_users.columns and G_RQ_PU in op_users.columns:
                 op_user_sum_travel_time = op_users[G_RQ_DO].sum() - op_users[G_RQ_PU].sum()
-            # avg travel time
-            if not np.isnan(op_user_sum_travel_time):
-                op_avg_travel_time = op_user_sum_travel_time / op_number_users
             # sum fare
             if G_RQ_FARE in op_users.columns:
                 op_revenue = op_users[G_RQ_FARE].sum()
@@ -376,18 +545,20 @@ def standard_evaluation(output_dir, evaluation_start_time = None, evaluation_end
                 op_avg_wait_time = op_users["wait time"].mean()
                 op_med_wait_time = op_users["wait time"].median()
                 op_90perquant_wait_time = op_users["wait time"].quantile(q=0.9)
-            # avg waiting time from earliest pickup time
-            if G_RQ_PU in op_users.columns and G_RQ_EPT in op_users.columns:
-                op_avg_wait_from_ept = (op_users[G_RQ_PU].sum() - op_users[G_RQ_EPT].sum()) / op_number_users
-            # avg abs detour time
+            # avg travel time, waiting time from earliest pickup time, abs and rel detour time
+            def get_col_sum(col):
+                return op_users[col].sum() if col in op_users.columns else np.nan
+            op_sum_rel_detour = np.nan
             if not np.isnan(op_user_sum_travel_time) and G_RQ_DRT in op_users.columns:
-                op_avg_detour_time = (op_user_sum_travel_time - op_users[G_RQ_DRT].sum())/op_number_users - \
-                                     boarding_time
-            # avg rel detour time
-            if not np.isnan(op_user_sum_travel_time) and G_RQ_DRT in op_users.columns:
-                rel_det_series = (op_users[G_RQ_DO] - op_users[G_RQ_PU] - boarding_time -
-                                  op_users[G_RQ_DRT])/op_users[G_RQ_DRT]
-                op_avg_rel_detour = rel_det_series.sum()/op_number_users * 100.0
+                op_sum_rel_detour = ((op_users[G_RQ_DO] - op_users[G_RQ_PU] - boarding_time -
+                                      op_users[G_RQ_DRT])/op_users[G_RQ_DRT]).sum()
+            user_time_kpis = get_user_time_kpis(op_number_users, op_user_sum_travel_time, get_col_sum(G_RQ_PU),
+                                                get_col_sum(G_RQ_EPT), get_col_sum(G_RQ_DRT), op_sum_rel_detour,
+                                                boarding_time)
+            op_avg_travel_time = user_time_kpis["travel time"]
+            op_avg_wait_from_ept = user_time_kpis["waiting time from ept"]
+            op_avg_detour_time = user_time_kpis["detour time"]
+            op_avg_rel_detour = user_time_kpis["rel detour"]
             # direct travel time and distance
             if G_RQ_DRD in op_users.columns:
                 op_sum_direct_travel_distance = op_users[G_RQ_DRD].sum() / 1000.0
@@ -401,110 +572,77 @@ def standard_evaluation(output_dir, evaluation_start_time = None, evaluation_end
 
             sim_end_time = scenario_parameters["end_time"]
             simulation_time = scenario_parameters["end_time"] - scenario_parameters["start_time"]
-            try:
-                # correct utilization: do not consider tasks after simulation end time
-                op_vehicle_df["VRL_end_sim_end_time"] = np.minimum(op_vehicle_df[G_VR_LEG_END_TIME], sim_end_time)
-                op_vehicle_df["VRL_start_sim_end_time"] = np.minimum(op_vehicle_df[G_VR_LEG_START_TIME], sim_end_time)
-                utilized_veh_df = op_vehicle_df[(op_vehicle_df["status"] != VRL_STATES.OUT_OF_SERVICE.display_name) & (op_vehicle_df["status"] != VRL_STATES.CHARGING.display_name)]
-                utilization_time = utilized_veh_df["VRL_end_sim_end_time"].sum() - utilized_veh_df["VRL_start_sim_end_time"].sum()
-                unutilized_veh_df = op_vehicle_df[(op_vehicle_df["status"] == VRL_STATES.OUT_OF_SERVICE.display_name) | (op_vehicle_df["status"] == VRL_STATES.CHARGING.display_name)]
-                unutilized_time = unutilized_veh_df["VRL_end_sim_end_time"].sum() - unutilized_veh_df["VRL_start_sim_end_time"].sum()
-                rev_df = op_vehicle_df[op_vehicle_df["status"].isin([x.display_name for x in G_REVENUE_STATUS])]
-                op_vehicle_revenue_hours = (rev_df["VRL_end_sim_end_time"].sum() - rev_df["VRL_start_sim_end_time"].sum())/3600.0
-                op_ride_per_veh_rev_hours = op_number_pax/op_vehicle_revenue_hours
-                op_ride_per_veh_rev_hours_rq = op_number_users/op_vehicle_revenue_hours
-                op_fleet_utilization = 100 * (utilization_time/(n_vehicles * simulation_time - unutilized_time))
-            except ZeroDivisionError:
-                pass
-            op_total_km = op_vehicle_df[G_VR_LEG_DISTANCE].sum()/1000.0
-
-            def weight_ob_rq(entries):
-                if pd.isnull(entries[G_VR_OB_RID]):
-                    return 0.0
-                else:
-                    number_ob_rq = len(str(entries[G_VR_OB_RID]).split(";"))
-                    return number_ob_rq * entries[G_VR_LEG_DISTANCE]
-
-            def weight_ob_pax(entries):
-                try:
-                    return entries[G_VR_NR_PAX] * entries[G_VR_LEG_DISTANCE]
-                except:
-                    return 0.0
-
-            try:
-                op_vehicle_df["weighted_ob_rq"] = op_vehicle_df.apply(weight_ob_rq, axis = 1)
-                op_vehicle_df["weighted_ob_pax"] = op_vehicle_df.apply(weight_ob_pax, axis=1)
-                op_distance_avg_rq = op_vehicle_df["weighted_ob_rq"].sum() / op_vehicle_df[G_VR_LEG_DISTANCE].sum()
-                op_distance_avg_occupancy = op_vehicle_df["weighted_ob_pax"].sum() / op_vehicle_df[G_VR_LEG_DISTANCE].sum()
-                empty_df = op_vehicle_df[op_vehicle_df[G_VR_OB_RID].isnull()]
-                op_empty_vkm = empty_df[G_VR_LEG_DISTANCE].sum()/1000.0/op_total_km*100.0
-                op_repositioning_vkm = empty_df[empty_df[G_VR_STATUS] == "reposition"][G_VR_LEG_DISTANCE].sum()/op_total_km*100.0/1000.0
-                if G_VR_TOLL in op_vehicle_df.columns:
-                    op_toll = op_vehicle_df[G_VR_TOLL].sum()
-            except ZeroDivisionError:
-                op_vehicle_df["weighted_ob_rq"] = 0
-                op_vehicle_df["weighted_ob_pax"] = 0
-                op_distance_avg_rq = 0
-                op_distance_avg_occupancy = 0
-                op_empty_vkm = 0
-                op_repositioning_vkm = 0
-                op_toll = 0
-
-            # saved distance
+            # correct utilization: do not consider tasks after simulation end time
+            op_vehicle_df["VRL_end_sim_end_time"] = np.minimum(op_vehicle_df[G_VR_LEG_END_TIME], sim_end_time)
+            op_vehicle_df["VRL_start_sim_end_time"] = np.minimum(op_vehicle_df[G_VR_LEG_START_TIME], sim_end_time)
+            utilized_veh_df = op_vehicle_df[(op_vehicle_df["status"] != VRL_STATES.OUT_OF_SERVICE.display_name) & (op_vehicle_df["status"] != VRL_STATES.CHARGING.display_name)]
+            utilization_time = utilized_veh_df["VRL_end_sim_end_time"].sum() - utilized_veh_df["VRL_start_sim_end_time"].sum()
+            unutilized_veh_df = op_vehicle_df[(op_vehicle_df["status"] == VRL_STATES.OUT_OF_SERVICE.display_name) | (op_vehicle_df["status"] == VRL_STATES.CHARGING.display_name)]
+            unutilized_time = unutilized_veh_df["VRL_end_sim_end_time"].sum() - unutilized_veh_df["VRL_start_sim_end_time"].sum()
+            rev_df = op_vehicle_df[op_vehicle_df["status"].isin([x.display_name for x in G_REVENUE_STATUS])]
+            revenue_time = rev_df["VRL_end_sim_end_time"].sum() - rev_df["VRL_start_sim_end_time"].sum()
+            fleet_time_kpis = get_fleet_time_kpis(n_vehicles, simulation_time, utilization_time, unutilized_time,
+                                                  revenue_time, op_number_users, op_number_pax)
+            op_vehicle_revenue_hours = fleet_time_kpis["vehicle revenue hours [Fzg h]"]
+            op_ride_per_veh_rev_hours = fleet_time_kpis["rides per veh rev hours"]
+            op_ride_per_veh_rev_hours_rq = fleet_time_kpis["rides per veh rev hours rq"]
+            op_fleet_utilization = fleet_time_kpis[r"% fleet utilization"]
+
+            ob_rids = op_vehicle_df[G_VR_OB_RID]
+            number_ob_rq = ob_rids.astype(str).str.count(";").values + 1
+            weighted_ob_rq = np.where(ob_rids.isnull().values, 0.0, number_ob_rq * op_vehicle_df[G_VR_LEG_DISTANCE].values)
+            if G_VR_NR_PAX in op_vehicle_df.columns:
+                weighted_ob_pax = (op_vehicle_df[G_VR_NR_PAX] * op_vehicle_df[G_VR_LEG_DISTANCE]).sum()
+            else:
+                weighted_ob_pax = 0.0
+            empty_df = op_vehicle_df[op_vehicle_df[G_VR_OB_RID].isnull()]
+            fleet_distance_kpis = get_fleet_distance_kpis(op_vehicle_df[G_VR_LEG_DISTANCE].sum(),
+                                                          pd.Series(weighted_ob_rq).sum(), weighted_ob_pax,
+                                                          empty_df[G_VR_LEG_DISTANCE].sum(),
+                                                          empty_df[empty_df[G_VR_STATUS] == "reposition"][G_VR_LEG_DISTANCE].sum())
+            op_total_km = fleet_distance_kpis["total vkm"]
+            op_distance_avg_rq = fleet_distance_kpis["occupancy rq"]
+            op_distance_avg_occupancy = fleet_distance_kpis["occupancy"]
+            op_empty_vkm = fleet_distance_kpis[r"% empty vkm"]
+            op_repositioning_vkm = fleet_distance_kpis[r"% repositioning vkm"]
+            if G_VR_TOLL in op_vehicle_df.columns:
+                op_toll = op_vehicle_df[G_VR_TOLL].sum()
+
+            # saved distance and speed
             trip_direct_distance = None
             if not np.isnan(op_total_km) and result_dict.get("bp_sum_direct_distance") is not None: # direct distances between pu and do
-                bp_sum_direct_distance = result_dict["bp_sum_direct_distance"]
-                trip_direct_distance = bp_sum_direct_distance
-                op_saved_distance = (bp_sum_direct_distance - op_total_km)/bp_sum_direct_distance * 100.0
-                op_ride_distance_per_vehicle_distance = bp_sum_direct_distance / op_total_km
-                op_ride_distance_per_vehicle_distance_no_rel = bp_sum_direct_distance / (op_total_km * (1.0 - op_repositioning_vkm/100.0))
+                trip_direct_distance = result_dict["bp_sum_direct_distance"]
             elif not np.isnan(op_total_km) and not np.isnan(op_sum_direct_travel_distance):
                 trip_direct_distance = op_sum_direct_travel_distance
-                op_saved_distance = (op_sum_direct_travel_distance - op_total_km)/op_sum_direct_travel_distance * 100.0
-                op_ride_distance_per_vehicle_distance = op_sum_direct_travel_distance / op_total_km
-                op_ride_distance_per_vehicle_distance_no_rel = op_sum_direct_travel_distance / (op_total_km * (1.0 - op_repositioning_vkm/100.0))
-
-            # speed
             driving = op_vehicle_df[op_vehicle_df["status"].isin([i.display_name for i in G_DRIVING_STATUS])]
             driving_time = driving["end_time"].sum() - driving["start_time"].sum()
-            op_avg_velocity = op_total_km/driving_time*3600.0
-            op_trip_velocity = trip_direct_distance/op_user_sum_travel_time*3.6
+            trip_distance_kpis = get_trip_distance_kpis(trip_direct_distance, op_total_km, op_repositioning_vkm,
+                                                        driving_time, op_user_sum_travel_time)
+            op_saved_distance = trip_distance_kpis["saved distance [%]"]
+            op_ride_distance_per_vehicle_distance = trip_distance_kpis["trip distance per fleet distance"]
+            op_ride_distance_per_vehicle_distance_no_rel = trip_distance_kpis["trip distance per fleet distance (no reloc)"]
+            op_avg_velocity = trip_distance_kpis["avg driving velocity [km/h]"]
+            op_trip_velocity = trip_distance_kpis["avg trip velocity [km/h]"]
 
             # by vehicle stats
             # ----------------
             op_veh_types = veh_type_stats[veh_type_stats[G_V_OP_ID] == op_id]
-            op_veh_types.set_index(G_V_VID, inplace=True)
-            all_vid_dict = {}
-            for vid, vid_vtype_row in op_veh_types.iterrows():
-                vtype_data = veh_type_db[vid_vtype_row[G_V_TYPE]]
-                op_vid_vehicle_df = op_vehicle_df[op_vehicle_df[G_V_VID] == vid]
-                veh_km = op_vid_vehicle_df[G_VR_LEG_DISTANCE].sum() / 1000
-                veh_kWh = veh_km * vtype_data[G_VTYPE_BATTERY_SIZE] / vtype_data[G_VTYPE_RANGE]
-                co2_per_kWh = scenario_parameters.get(G_ENERGY_EMISSIONS, ENERGY_EMISSIONS)
-                if co2_per_kWh is None:
-                    co2_per_kWh = ENERGY_EMISSIONS
-                veh_co2 = co2_per_kWh * veh_kWh
-                veh_fix_costs = np.rint(scenario_parameters.get(G_OP_SHARE_FC, 1.0) * vtype_data[G_VTYPE_FIX_COST])
-                veh_var_costs = np.rint(vtype_data[G_VTYPE_DIST_COST] * veh_km)
-                # TODO # after ISTTT: idle times
-                all_vid_dict[vid] = {"type":vtype_data[G_VTYPE_NAME], "total km":veh_km, "total kWh": veh_kWh,
-                                    "total CO2 [g]": veh_co2, "fix costs": veh_fix_costs,
-                                    "total variable costs": veh_var_costs}
-            all_vid_df = pd.DataFrame.from_dict(all_vid_dict, orient="index")
+            if op_veh_types.shape[0] > 0:
+                vids = op_veh_types[G_V_VID].values
+                list_vtype_data = [veh_type_db[vtype] for vtype in op_veh_types[G_V_TYPE].values]
+                veh_km = _sum_by_vehicle(op_vehicle_df, G_VR_LEG_DISTANCE, vids) / 1000
+                all_vid_df = get_vehicle_eval(vids, veh_km, list_vtype_data, scenario_parameters)
+            else:
+                all_vid_df = pd.DataFrame()
             all_vid_df.to_csv(os.path.join(output_dir, f"standard_mod-{op_id}_veh_eval.csv"))
 
             # aggregated specific by vehicle stats
             # ------------------------------------
-            try:
-                op_co2 = all_vid_df["total CO2 [g]"].sum()
-                op_ext_em_costs = np.rint(EMISSION_CPG * op_co2)
-                op_fix_costs = all_vid_df["fix costs"].sum()
-                op_var_costs = all_vid_df["total variable costs"].sum()
-            except:
-                op_co2 = 0
-                op_ext_em_costs = 0
-                op_fix_costs = 0
-                op_var_costs = 0
+            vehicle_cost_kpis = get_vehicle_cost_kpis(all_vid_df)
+            op_fix_costs = vehicle_cost_kpis["mod fix costs"]
+            op_var_costs = vehicle_cost_kpis["mod var costs"]
+            op_co2_t = vehicle_cost_kpis["total CO2 emissions [t]"]
+            op_ext_em_costs = vehicle_cost_kpis["total external emission costs"]
 
         elif op_id == G_MC_DEC_PT:
             # 2) public transportation: -> evaluation/publictransport.py
@@ -578,12 +716,13 @@ def standard_evaluation(output_dir, evaluation_start_time = None, evaluation_end
         result_dict["mod revenue"] = op_revenue
         result_dict["mod fix costs"] = op_fix_costs
         result_dict["mod var costs"] = op_var_costs
-        result_dict["total CO2 emissions [t]"] = op_co2 / 10**6
+        result_dict["total CO2 emissions [t]"] = op_co2_t
         result_dict["total external emission costs"] = op_ext_em_costs
         result_dict["parking cost"] = op_parking_cost
         result_dict["toll"] = op_toll
-        result_dict["customer in vehicle distance"] = avg_in_vehicle_distance(op_vehicle_df)
-        result_dict["shared rides [%]"] = shared_rides(op_vehicle_df)
+        boarding_tracker = _track_boarding_processes(op_vehicle_df)
+        result_dict["customer in vehicle distance"] = boarding_tracker.get_avg_in_vehicle_distance()
+        result_dict["shared rides [%]"] = boarding_tracker.get_shared_rides()
 
         result_dict_list.append(result_dict)
         operator_names.append(op_name)
@@ -605,7 +744,7 @@ def evaluate_folder(path, evaluation_start_time = None, evaluation_end_time = No
     for f in os.listdir(path):
         sc_path = os.path.join(path, f)
         if os.path.isdir(sc_path):
-            if os.path.isfile(os.path.join(sc_path, "1_user-stats.csv")):
+            if find_output_file(sc_path, "1_user-stats") is not None:
                 standard_evaluation(sc_path, evaluation_start_time=evaluation_start_time, evaluation_end_time=evaluation_end_time, print_comments=print_comments)
 
 
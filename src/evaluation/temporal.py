@@ -10,6 +10,7 @@ sys.path.append(MAIN_DIR)
 from src.evaluation.standard import decode_offer_str, load_scenario_inputs, get_directory_dict,\
                                     read_op_output_file, read_user_output_file
 from src.misc.globals import *
+from src.misc.output_writer import read_output_file
 
 # plt.style.use("seaborn-whitegrid")
 # matplotlib.rcParams['ps.useafm'] = True
@@ -535,88 +536,47 @@ def _load_op_stats_and_infer_idle_states(output_dir, scenario_parameters, op_id,
     :param evaluation_end_time: end time of the evaluation time interval
     :return: operator dataframe with vehicle idle states
     """
-    op_stats = os.path.join(output_dir, "2-{}_op-stats.csv".format(int(op_id)))
-    op_df = pd.read_csv(op_stats)
+    op_df = read_output_file(output_dir, "2-{}_op-stats".format(int(op_id)))
     #insert idle
     start_time = scenario_parameters[G_SIM_START_TIME]
     end_time = max(op_df[G_VR_LEG_END_TIME].values)
-    add_df_list = []
-    to_drop = []    # some jobs dont finish correctly (charging and out_of_service doubled) # TODO #
-    for vid, veh_stats in op_df.groupby(G_V_VID):
-        veh_stats.sort_values(by=G_VR_LEG_END_TIME, inplace = True)
-        last_end_time = start_time
-        c = 0
-        last_entry = None
-        for _, entry in veh_stats.iterrows():
-            if c == 0:
-                if entry[G_VR_LEG_START_TIME] > start_time:
-                    d = {}
-                    for key, val in entry.items():
-                        if key == G_VR_LEG_START_TIME:
-                            d[G_VR_LEG_START_TIME] = start_time
-                        elif key == G_VR_LEG_END_TIME:
-                            d[G_VR_LEG_END_TIME] = entry[G_VR_LEG_START_TIME]
-                        elif key == G_VR_STATUS:
-                            d[G_VR_STATUS] = "idle"
-                        elif key == G_VR_LEG_END_SOC:
-                            d[G_VR_LEG_END_SOC] = entry[G_VR_LEG_START_SOC]
-                        elif key == G_VR_LEG_START_SOC:
-                            d[G_VR_LEG_START_SOC] = entry[G_VR_LEG_START_SOC]
-                        else:
-                            d[key] = val
-                    add_df_list.append(d)
-                last_end_time = entry[G_VR_LEG_END_TIME]
-                c+=1
-                continue
-            c+=1
-            if entry[G_VR_LEG_START_TIME] > last_end_time:
-                d = {}
-                for key, val in entry.items():
-                    if key == G_VR_LEG_START_TIME:
-                        d[G_VR_LEG_START_TIME] = last_end_time
-                    elif key == G_VR_LEG_END_TIME:
-                        d[G_VR_LEG_END_TIME] = entry[G_VR_LEG_START_TIME]
-                    elif key == G_VR_STATUS:
-                        if entry[G_VR_STATUS] == "out_of_service" or entry[G_VR_STATUS] == "charging" or entry[G_VR_STATUS] == "to_depot":
-                            d[G_VR_STATUS] = "idle"
-                        else:
-                            d[G_VR_STATUS] = "idle"
-                    elif key == G_VR_LEG_END_SOC:
-                        d[G_VR_LEG_END_SOC] = entry[G_VR_LEG_START_SOC]
-                    else:
-                        d[key] = val
-                add_df_list.append(d)
-            last_end_time = entry[G_VR_LEG_END_TIME]
-            last_entry = entry
-        if last_end_time < end_time and last_entry is not None:
-            d = {}
-            for key, val in last_entry.items():
-                if key == G_VR_LEG_START_TIME:
-                    d[G_VR_LEG_START_TIME] = last_end_time
-                elif key == G_VR_LEG_END_TIME:
-                    d[G_VR_LEG_END_TIME] = end_time
-                elif key == G_VR_STATUS:
-                    d[G_VR_STATUS] = "idle"
-                elif key == G_VR_LEG_END_SOC:
-                    d[G_VR_LEG_END_SOC] = last_entry[G_VR_LEG_START_SOC]
-                else:
-                    d[key] = val
-            add_df_list.append(d)
-    idle_df = pd.DataFrame(add_df_list)
-    op_df.drop(to_drop, inplace=True)
+    # records of each vehicle sorted by end time; idle states fill the gaps between start time and first record,
+    # between consecutive records and between last record and end time (only for vehicles with several records)
+    veh_df = op_df.sort_values(by=[G_V_VID, G_VR_LEG_END_TIME], kind="mergesort").reset_index(drop=True)
+    vids = veh_df[G_V_VID].values
+    leg_start_times = veh_df[G_VR_LEG_START_TIME].values
+    leg_end_times = veh_df[G_VR_LEG_END_TIME].values
+    first_record = np.ones(len(vids), dtype=bool)
+    first_record[1:] = vids[1:] != vids[:-1]
+    last_record = np.ones(len(vids), dtype=bool)
+    last_record[:-1] = vids[1:] != vids[:-1]
+    last_end_times = np.concatenate([[start_time], leg_end_times[:-1]])
+    last_end_times[first_record] = start_time
+    before_record = leg_start_times > last_end_times
+    after_record = last_record & ~first_record & (leg_end_times < end_time)
+    idle_df_list = []
+    for mask, idle_start_times, idle_end_times, sort_offset in [
+            (before_record, last_end_times, leg_start_times, 0),
+            (after_record, leg_end_times, np.full(len(vids), end_time), 1)]:
+        idle_df = veh_df[mask].copy()
+        idle_df[G_VR_LEG_START_TIME] = idle_start_times[mask]
+        idle_df[G_VR_LEG_END_TIME] = idle_end_times[mask]
+        idle_df[G_VR_STATUS] = "idle"
+        if G_VR_LEG_END_SOC in idle_df.columns:
+            idle_df[G_VR_LEG_END_SOC] = idle_df[G_VR_LEG_START_SOC]
+        idle_df["idle_sort_key"] = 2 * np.flatnonzero(mask) + sort_offset
+        idle_df_list.append(idle_df)
+    idle_df = pd.concat(idle_df_list, axis=0).sort_values(by="idle_sort_key", kind="mergesort")
+    idle_df = idle_df.drop(columns="idle_sort_key")
     op_df = pd.concat([op_df, idle_df], axis = 0, ignore_index = True)
     op_df.sort_values(by=G_VR_LEG_END_TIME, inplace = True)
     # cut times
     if evaluation_start_time is not None:
         op_df = op_df[op_df[G_VR_LEG_END_TIME] > evaluation_start_time]
-        def set_start_time(row):
-            return max(evaluation_start_time, row[G_VR_LEG_START_TIME])
-        op_df[G_VR_LEG_START_TIME] = op_df.apply(set_start_time, axis=1)
+        op_df[G_VR_LEG_START_TIME] = op_df[G_VR_LEG_START_TIME].clip(lower=evaluation_start_time)
     if evaluation_end_time is not None:
         op_df = op_df[op_df[G_VR_LEG_START_TIME] < evaluation_end_time]
-        def set_end_time(row):
-            return min(evaluation_end_time, row[G_VR_LEG_END_TIME])
-        op_df[G_VR_LEG_END_TIME] = op_df.apply(set_end_time, axis=1)
+        op_df[G_VR_LEG_END_TIME] = op_df[G_VR_LEG_END_TIME].clip(upper=evaluation_end_time)
     return op_df
 
 
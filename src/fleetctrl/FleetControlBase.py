@@ -29,6 +29,8 @@ from src.demand.TravelerModels import RequestBase
 from src.misc.init_modules import load_repositioning_strategy, load_charging_strategy, \
     load_dynamic_fleet_sizing_strategy, load_dynamic_pricing_strategy, load_reservation_strategy
 from src.fleetctrl.pooling.GeneralPoolingFunctions import get_assigned_rids_from_vehplan
+from src.misc.output_writer import get_output_file_path, get_output_buffer_size, create_output_writer, \
+    submit_output_task
 if TYPE_CHECKING:
     from src.routing.NetworkBase import NetworkBase
     from src.simulation.Vehicles import SimulationVehicle
@@ -102,7 +104,10 @@ class FleetControlBase(metaclass=ABCMeta):
 
         # dynamic output base
         # -------------------
-        self.dyn_fltctrl_output_f = os.path.join(dir_names[G_DIR_OUTPUT], f"3-{self.op_id}_op-dyn_atts.csv")
+        self.dyn_fltctrl_output_f = get_output_file_path(dir_names[G_DIR_OUTPUT], f"3-{self.op_id}_op-dyn_atts",
+                                                         scenario_parameters)
+        self.dyn_output_writer = create_output_writer(self.dyn_fltctrl_output_f, scenario_parameters)
+        self.dyn_output_buffer_size = get_output_buffer_size(scenario_parameters, BUFFER_SIZE)
         self.dyn_output_dict = {}
         self.dyn_par_keys = []
 
@@ -228,7 +233,7 @@ class FleetControlBase(metaclass=ABCMeta):
         self.repo_time_step = operator_attributes.get(G_OP_REPO_TS)
         if repo_method is not None and self.repo_time_step is not None:
             RepoClass = load_repositioning_strategy(repo_method)
-            self.repo : RepositioningBase = RepoClass(self, operator_attributes, dir_names)
+            self.repo : RepositioningBase = RepoClass(self, operator_attributes, dir_names, solver=self.solver)
             prt_strategy_str += f"\t Repositioning: {self.repo.__class__.__name__}\n"
             self._init_dynamic_fleetcontrol_output_key(G_FCTRL_CT_REPO)
         else:
@@ -515,6 +520,31 @@ class FleetControlBase(metaclass=ABCMeta):
             self._prq_from_reservation_to_immediate(rid, simulation_time)
         self._call_time_trigger_request_batch(simulation_time)
         self._call_time_trigger_additional_tasks(simulation_time)
+        # cumulative counters of the (shared) routing engine cache
+        route_cache_stats = self.routing_engine.get_route_cache_statistics()
+        if route_cache_stats:
+            for key in route_cache_stats.keys():
+                self._init_dynamic_fleetcontrol_output_key(key)
+            self._add_to_dynamic_fleetcontrol_output(simulation_time, route_cache_stats)
+
+    def get_next_event_time(self, simulation_time : int) -> float:
+        """This method returns the next simulation time at which a time-triggered process of the fleet control is due.
+        It is used to skip simulation time steps without events. Charging, dynamic fleet sizing and dynamic pricing
+        strategies are evaluated in every time step.
+
+        WHEN INHERITING THIS FUNCTION: consider additional time-triggered processes (min with super() result)
+
+        :param simulation_time: current simulation time
+        :type simulation_time: float
+        :return: next event time (simulation_time if the fleet control has to be triggered in the next time step)
+        :rtype: float
+        """
+        if self.charging_strategy is not None or self.dyn_fleet_sizing is not None or self.dyn_pricing is not None:
+            return simulation_time
+        next_event = self.reservation_module.get_next_event_time(simulation_time)
+        if self.repo is not None:
+            next_event = min(next_event, (simulation_time // self.repo_time_step + 1) * self.repo_time_step)
+        return next_event
 
     @abstractmethod
     def _call_time_trigger_request_batch(self, simulation_time : int):
@@ -792,13 +822,7 @@ class FleetControlBase(metaclass=ABCMeta):
         file 3-{self.op_id}_op-dyn_atts.csv """
         current_buffer_size = len(self.dyn_output_dict.keys())
         if current_buffer_size > 0:
-            if force or current_buffer_size > BUFFER_SIZE:
-                if os.path.isfile(self.dyn_fltctrl_output_f):
-                    write_mode = "a"
-                    write_header = False
-                else:
-                    write_mode = "w"
-                    write_header = True
+            if force or current_buffer_size > self.dyn_output_buffer_size:
                 tmp_df_list = []
                 for sim_time, entry_dict in self.dyn_output_dict.items():
                     x = {"sim_time":sim_time}
@@ -814,7 +838,7 @@ class FleetControlBase(metaclass=ABCMeta):
                     if key not in sorted_cols:
                         sorted_cols.append(key)
                 record_df = tmp_df[sorted_cols]
-                record_df.to_csv(self.dyn_fltctrl_output_f, index=False, mode=write_mode, header=write_header)
+                submit_output_task(self.dyn_output_writer.write, record_df)
                 self.dyn_output_dict = {}
                 # LOG.info(f"\t ... just wrote {current_buffer_size} entries from buffer to stats of operator {op_id}.")
                 LOG.debug(f"\t ... just wrote {current_buffer_size} entries from buffer to dynamic stats of operator"
@@ -822,6 +846,10 @@ class FleetControlBase(metaclass=ABCMeta):
         # additionally save repositioning output if repositioning module is available
         if self.repo:
             self.repo.record_repo_stats()
+
+    def close_dynamic_fleetcontrol_output(self):
+        """ this method finalizes the file 3-{self.op_id}_op-dyn_atts """
+        submit_output_task(self.dyn_output_writer.close)
             
     def _build_VRLs(self, vehicle_plan : VehiclePlan, veh_obj : SimulationVehicle, sim_time : int) -> List[VehicleRouteLeg]:
         """This method builds VRL for simulation vehicles from a given Plan. Since the vehicle could already have the
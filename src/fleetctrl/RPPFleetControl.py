@@ -421,6 +421,14 @@ class RPPFleetControlFullInsertion(FleetControlBase):
                 LOG.debug(f"activate {base_rid} with epa {epa} for global optimisation at time {sim_time}!")
                 del self.reserved_base_rids[base_rid]
 
+    def get_next_event_time(self, simulation_time):
+        """ parcels are assigned every optimisation_time_step
+        :param simulation_time: current simulation time
+        :return: next event time
+        """
+        next_opt_time = (simulation_time // self.optimisation_time_step + 1) * self.optimisation_time_step
+        return min(super().get_next_event_time(simulation_time), next_opt_time)
+
     def _call_time_trigger_request_batch(self, simulation_time):
         """this is the main functionality for the rpp assignment control
         it checks for all unassigned parcels all new assigned vehicle plans
@@ -655,6 +663,15 @@ class RPPFleetControlSingleStopInsertion(RPPFleetControlFullInsertion):
         self.vid_to_inserted_parcel_id = {} # vid -> p_rid -> 1
         self.deliver_remaining_parcel_time = operator_attributes[G_OP_PA_REDEL]
         
+    def get_next_event_time(self, simulation_time):
+        """ remaining parcels are delivered in every time step after deliver_remaining_parcel_time
+        :param simulation_time: current simulation time
+        :return: next event time
+        """
+        if simulation_time >= self.deliver_remaining_parcel_time:
+            return simulation_time
+        return min(super().get_next_event_time(simulation_time), self.deliver_remaining_parcel_time)
+
     def _call_time_trigger_request_batch(self, simulation_time):
         """This method implements the main functionality of the parcel assignment strategy
         the function is seperated into parcel destination assignment and origin assignment
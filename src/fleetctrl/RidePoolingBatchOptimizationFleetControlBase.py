@@ -328,6 +328,18 @@ class RidePoolingBatchOptimizationFleetControlBase(FleetControlBase):
         else:
             self.RPBO_Module.add_new_request(rid, self.rq_dict[rid])
 
+    def get_next_event_time(self, simulation_time : int) -> float:
+        """This method returns the next simulation time at which a time-triggered process of the fleet control is due.
+        In addition to the base class, the batch optimization is triggered every optimisation_time_step.
+
+        :param simulation_time: current simulation time
+        :type simulation_time: float
+        :return: next event time
+        :rtype: float
+        """
+        next_opt_time = (simulation_time // self.optimisation_time_step + 1) * self.optimisation_time_step
+        return min(super().get_next_event_time(simulation_time), next_opt_time)
+
     def _call_time_trigger_request_batch(self, simulation_time : int):
         """This method can be used to perform time-triggered processes, e.g. the optimization of the current
         assignments of simulation vehicles of the fleet.
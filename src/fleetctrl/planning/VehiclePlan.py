@@ -84,6 +84,13 @@ class PlanStopBase(metaclass=ABCMeta):
         :param pax_infos: (dict) from corresponding vehicle plan rid -> list (boarding_time, deboarding time) (only boarding time needed)
         :return: (float) latest start time"""
         pass
+
+    @abstractmethod
+    def get_fixed_latest_start_time(self) -> float:
+        """ this function returns the latest start time of the Plan Stop resulting from all time constraints that
+        do not depend on planned boarding times (i.e. without maximum trip time constraints)
+        :return: (float) latest start time"""
+        pass
     
     @abstractmethod
     def get_duration_and_earliest_departure(self) -> tuple:
@@ -354,23 +361,30 @@ class PlanStop(PlanStopBase):
         latest drop off time constraints
         :param pax_infos: (dict) from corresponding vehicle plan rid -> list (boarding_time, deboarding time) (only boarding time needed)
         :return: (float) latest start time"""
-        self._latest_start_time = LARGE_INT
-        if self.direct_latest_start_time is not None and self.direct_latest_start_time < self._latest_start_time:
-            self._latest_start_time = self.direct_latest_start_time
-        if len(self.latest_pickup_time_dict.values()) > 0:
-            la = np.ceil(min(self.latest_pickup_time_dict.values()))
-            if la < self._latest_start_time:
-                self._latest_start_time = la
+        self._latest_start_time = self.get_fixed_latest_start_time()
         if len(self.max_trip_time_dict.values()) > 0:
             la = np.ceil(min((pax_infos[rid][0] + self.max_trip_time_dict[rid] for rid in self.boarding_dict.get(-1, []))))
             if la < self._latest_start_time:
                 self._latest_start_time = la
-        if len(self.latest_arrival_time_dict.values()) > 0:
-            la = np.ceil(min(self.latest_arrival_time_dict.values()))
-            if la < self._latest_start_time:
-                self._latest_start_time = la
         #LOG.debug("get latest start time: {}".format(str(self)))
         return self._latest_start_time
+
+    def get_fixed_latest_start_time(self) -> float:
+        """ this function returns the latest start time of the Plan Stop resulting from all time constraints that
+        do not depend on planned boarding times (i.e. without maximum trip time constraints)
+        :return: (float) latest start time"""
+        latest_start_time = LARGE_INT
+        if self.direct_latest_start_time is not None and self.direct_latest_start_time < latest_start_time:
+            latest_start_time = self.direct_latest_start_time
+        if len(self.latest_pickup_time_dict.values()) > 0:
+            la = np.ceil(min(self.latest_pickup_time_dict.values()))
+            if la < latest_start_time:
+                latest_start_time = la
+        if len(self.latest_arrival_time_dict.values()) > 0:
+            la = np.ceil(min(self.latest_arrival_time_dict.values()))
+            if la < latest_start_time:
+                latest_start_time = la
+        return latest_start_time
     
     def get_started_at(self) -> float:
         return self.started_at
@@ -556,6 +570,10 @@ class VehiclePlan:
         self.vid = None
         self.feasible = None
         self.structural_feasible = True  # indicates if plan is in line with vehicle state ignoring time constraints
+        self._insertion_slack = None    # cached result of get_insertion_slack(); reset in update_tt_and_check_plan()
+        self._planned_state = None      # (vehicle state, plan stops) of the last feasible update_tt_and_check_plan()
+        self._current_insertion_slack = None    # (vehicle state, plan stops, result) of get_current_insertion_slack()
+        self._leg_travel_infos = {}     # (start_pos, end_pos) -> (tt, dis) of the legs of the last update_tt_and_check_plan() with reuse_leg_travel_infos
         if not copy:
             self.vid = veh_obj.vid
             self.feasible = self.update_tt_and_check_plan(veh_obj, sim_time, routing_engine, keep_feasible=True)
@@ -574,6 +592,9 @@ class VehiclePlan:
         tmp_VehiclePlan.utility = self.utility
         tmp_VehiclePlan.pax_info = self.pax_info.copy()
         tmp_VehiclePlan.feasible = True
+        if self._planned_state is not None and self._is_planned_state(self._planned_state, self._planned_state[0]):
+            # planned times are copied with the plan stops
+            tmp_VehiclePlan._planned_state = (self._planned_state[0], tuple(tmp_VehiclePlan.list_plan_stops))
         return tmp_VehiclePlan
 
     def is_feasible(self) -> bool:
@@ -628,7 +649,8 @@ class VehiclePlan:
             new_veh_plan.list_plan_stops.insert(position, plan_stop)
         new_veh_plan.update_tt_and_check_plan(veh_obj, sim_time, routing_engine, keep_feasible=True)
 
-    def update_plan(self, veh_obj : SimulationVehicle, sim_time : float, routing_engine : NetworkBase, list_passed_VRLs : List[VehicleRouteLeg]=None, keep_time_infeasible : bool=True) -> bool:
+    def update_plan(self, veh_obj : SimulationVehicle, sim_time : float, routing_engine : NetworkBase, list_passed_VRLs : List[VehicleRouteLeg]=None, keep_time_infeasible : bool=True,
+                    reuse_leg_travel_infos : bool=False) -> bool:
         """This method checks whether the simulation vehicle passed some of the planned stops and removes them from the
         plan after passing. It returns the feasibility of the plan.
 
@@ -637,6 +659,7 @@ class VehiclePlan:
         :param routing_engine: reference to routing engine
         :param list_passed_VRLs: list of passed VRLs
         :param keep_time_infeasible: if True full evaluation of feasiblity even though infeasibility of time constraints have been found
+        :param reuse_leg_travel_infos: see update_tt_and_check_plan()
         :return: is_feasible returns True if all
         """
         # 1) check if list_passed_VRLs invalidates the plan or removes some stops
@@ -723,7 +746,8 @@ class VehiclePlan:
         # LOG.debug(str(self))
         # LOG.debug(f"currently ob: {veh_obj.pax}")
         self.feasible = self.update_tt_and_check_plan(veh_obj, sim_time, routing_engine,
-                                                      keep_feasible=keep_time_infeasible)
+                                                      keep_feasible=keep_time_infeasible,
+                                                      reuse_leg_travel_infos=reuse_leg_travel_infos)
         return self.feasible
 
     def return_intermediary_plan_state(self, veh_obj : SimulationVehicle, sim_time : float, routing_engine : NetworkBase, stop_index : int) -> dict:
@@ -791,7 +815,8 @@ class VehiclePlan:
         return {"stop_index": stop_index, "c_pos": c_pos, "c_soc": c_soc, "c_time": c_time, "c_pax": c_pax,
                 "pax_info": self.pax_info.copy(), "c_nr_pax": nr_pax, "c_nr_parcels" : nr_parcels}
 
-    def update_tt_and_check_plan(self, veh_obj : SimulationVehicle, sim_time : float, routing_engine : NetworkBase, init_plan_state : dict=None, keep_feasible : bool=False):
+    def update_tt_and_check_plan(self, veh_obj : SimulationVehicle, sim_time : float, routing_engine : NetworkBase, init_plan_state : dict=None, keep_feasible : bool=False,
+                                 reuse_leg_travel_infos : bool=False):
         """This method updates the planning properties of all PlanStops of the Plan according to the new vehicle
         position and checks if it is still feasible.
 
@@ -800,13 +825,28 @@ class VehiclePlan:
         :param routing_engine: reference to routing engine
         :param init_plan_state: {} requires "stop_index" "c_index", "c_pos", "c_soc", "c_time", "c_pax" and "pax_info"
         :param keep_feasible: useful flag to keep assigned VehiclePlans for simulations with dynamic travel times
+        :param reuse_leg_travel_infos: if True, travel infos of legs between the same positions are taken from the last
+                update of this plan instead of querying the routing engine (only valid if travel times did not change since);
+                the legs are only recorded for the next update if this flag is set
         :return: is_feasible returns True if all
         """
         # TODO # think about update of duration of VehicleChargeLegs
         # LOG.debug(f"update tt an check plan {veh_obj} pax {veh_obj.pax} | at {sim_time} | pax info {self.pax_info}")
+        self._insertion_slack = None
+        self._planned_state = None
+        self._current_insertion_slack = None
         is_feasible = True
+        if reuse_leg_travel_infos:
+            last_leg_travel_infos = self._leg_travel_infos
+            if init_plan_state is None:
+                self._leg_travel_infos = {}
+        else:
+            last_leg_travel_infos = None
+            self._leg_travel_infos = {}
         if len(self.list_plan_stops) == 0:
             self.pax_info = {}
+            if init_plan_state is None:
+                self._planned_state = (self._get_planned_state_key(veh_obj, sim_time), ())
             return is_feasible
         infeasible_index = -1  # lock all plan stops until last infeasible stop if vehplan is forced to stay feasible
         if init_plan_state is not None:
@@ -849,7 +889,15 @@ class VehiclePlan:
                 if not is_feasible and not keep_feasible:
                     # LOG.debug(f" -> break because infeasible | is feasible {is_feasible} keep_feasible {keep_feasible}")
                     break
-                _, tt, tdist = routing_engine.return_travel_costs_1to1(c_pos, pstop_pos)
+                if last_leg_travel_infos is None:
+                    _, tt, tdist = routing_engine.return_travel_costs_1to1(c_pos, pstop_pos)
+                else:
+                    leg_travel_info = last_leg_travel_infos.get((c_pos, pstop_pos))
+                    if leg_travel_info is None:
+                        _, tt, tdist = routing_engine.return_travel_costs_1to1(c_pos, pstop_pos)
+                    else:
+                        tt, tdist = leg_travel_info
+                    self._leg_travel_infos[(c_pos, pstop_pos)] = (tt, tdist)
                 c_pos = pstop_pos
                 c_time += tt
                 # LOG.debug(f"c_time 2 {c_time}")
@@ -914,10 +962,74 @@ class VehiclePlan:
                     break
                 # LOG.debug("LOCK because infeasible {}".format(i))
                 p_stop.set_infeasible_locked(True)
+        if is_feasible and init_plan_state is None:
+            self._planned_state = (self._get_planned_state_key(veh_obj, sim_time), tuple(self.list_plan_stops))
         # LOG.debug(f"is feasible {is_feasible} | pax info {self.pax_info}")
         # LOG.debug("update plan and check tt {}".format(self))
         return is_feasible
 
+    def _get_planned_state_key(self, veh_obj : SimulationVehicle, sim_time : float) -> tuple:
+        """ returns the vehicle state the planned times of update_tt_and_check_plan() depend on """
+        started_at = self.list_plan_stops[0].get_started_at() if len(self.list_plan_stops) > 0 else None
+        return (sim_time, veh_obj.pos, veh_obj.soc, tuple(rq.get_rid_struct() for rq in veh_obj.pax), started_at)
+
+    def _is_planned_state(self, planned_state : tuple, state_key : tuple) -> bool:
+        """ checks if planned_state (state key, plan stops) fits to state_key and the current plan stops """
+        if planned_state is None or planned_state[0] != state_key or len(planned_state[1]) != len(self.list_plan_stops):
+            return False
+        return all(ps is planned_ps for ps, planned_ps in zip(self.list_plan_stops, planned_state[1]))
+
+    def get_insertion_slack(self) -> Tuple[List[float], List[float], List[float]]:
+        """ this function returns the planned arrival and departure times of all plan stops and their slack, i.e. the
+        maximum delay of the arrival at a plan stop that keeps the time constraints of this and all following plan
+        stops feasible. Maximum trip time, capacity and soc constraints are not considered: a larger delay is
+        infeasible, a smaller delay still has to be checked with update_tt_and_check_plan().
+        The values are only valid if the last call of update_tt_and_check_plan() returned a feasible plan for the
+        current vehicle state. They are cached until the next call of update_tt_and_check_plan().
+        :return: (list of planned arrival times, list of planned departure times, list of slack times)"""
+        if self._insertion_slack is None:
+            nr_stops = len(self.list_plan_stops)
+            arrival_times = [None for _ in range(nr_stops)]
+            departure_times = [None for _ in range(nr_stops)]
+            slack_times = [None for _ in range(nr_stops)]
+            next_slack = float("inf")
+            for i in range(nr_stops - 1, -1, -1):
+                pstop = self.list_plan_stops[i]
+                arrival_time, departure_time = pstop.get_planned_arrival_and_departure_time()
+                start_time = max(arrival_time, pstop.get_earliest_start_time())
+                duration, _ = pstop.get_duration_and_earliest_departure()
+                min_departure_time = start_time + duration if duration is not None else start_time
+                # a delay is absorbed by waiting times before the start and after the minimum departure
+                next_slack = start_time - arrival_time + min(pstop.get_fixed_latest_start_time() - start_time,
+                                                             departure_time - min_departure_time + next_slack)
+                arrival_times[i] = arrival_time
+                departure_times[i] = departure_time
+                slack_times[i] = next_slack
+            self._insertion_slack = (arrival_times, departure_times, slack_times)
+        return self._insertion_slack
+
+    def get_current_insertion_slack(self, veh_obj : SimulationVehicle, sim_time : float, routing_engine : NetworkBase):
+        """ this function returns the pax info and get_insertion_slack() of this plan for the current vehicle state
+        without changing the plan. If the last update_tt_and_check_plan() was not done for the current vehicle state,
+        the planned times are computed on a copy of the plan. The result is cached until the plan or the vehicle state
+        changes.
+        :param veh_obj: simulation vehicle
+        :param sim_time: current simulation time
+        :param routing_engine: routing engine
+        :return: (pax info, (planned arrival times, planned departure times, slack times)) or None if infeasible"""
+        state_key = self._get_planned_state_key(veh_obj, sim_time)
+        if self._is_planned_state(self._planned_state, state_key):
+            return self.pax_info, self.get_insertion_slack()
+        if self._current_insertion_slack is None or \
+                not self._is_planned_state(self._current_insertion_slack[:2], state_key):
+            ref_plan = self.copy()
+            if ref_plan.update_tt_and_check_plan(veh_obj, sim_time, routing_engine):
+                result = (ref_plan.pax_info, ref_plan.get_insertion_slack())
+            else:
+                result = None
+            self._current_insertion_slack = (state_key, tuple(self.list_plan_stops), result)
+        return self._current_insertion_slack[2]
+
     def get_dedicated_rid_list(self) -> list:
         """ returns a list of request-ids whicht are part of this vehicle plan
         :return: list of rid
@@ -1,3 +1,8 @@
+import numpy as np
+
+# tolerance factor for the beeline speed bound (rounding of coordinates and travel times)
+RR_BEELINE_SPEED_TOLERANCE = 1.01
+
 
 def checkRRcomptibility(plan_rq_1, plan_rq_2, routing_engine, constant_boarding_time, dynamic_boarding_time = 0):
     """This method checks the compatibility of the origins and destinations of two requests. Independent of any vehicle availability, many
@@ -91,6 +96,94 @@ def checkRRcomptibilityInOrder(plan_rq_1, plan_rq_2, routing_engine, constant_bo
 
     return False
 
+class RRCandidateFilter:
+    def __init__(self, list_plan_rqs, routing_engine, active=True):
+        """This class excludes request pairs that can not be rr-compatible before checkRRcomptibility is called.
+        Travel times are bounded from below by beeline distance / routing_engine.return_beeline_speed_upper_bound().
+        A pair is a candidate if it passes the bounds of any of the schedules tested by checkRRcomptibilityInOrder:
+        - o1 -> d1 -> o2: d1 == o2 or e_pu_1 + tt(o1, d1) + tt(d1, o2) < l_pu_2
+        - o1 -> o2 -> d1/d2: t = max(e_pu_1 + tt(o1, o2), e_pu_2) < l_pu_2 and t + tt(o2, d2) <= l_do_2 and
+            (d1 == d2 or t + tt(o2, d1) <= l_do_1)
+        (and the same with request 1 and 2 swapped). As only lower bounds are used, no compatible pair is excluded;
+        the exact check is still necessary for all candidates.
+        The filter only pays off if many of the active requests are far apart compared to the distance that can be
+        driven within their time windows (large service areas, short maximum waiting times, long optimization
+        horizons). In small service areas, all pairs pass the bounds and the filter only adds its vectorized checks.
+
+        :param list_plan_rqs: list of PlanRequest-objs that are tested against (candidate indices refer to this list)
+        :param routing_engine: reference to routing engine
+        :param active: if False, all requests are returned as candidates
+        """
+        self.routing_engine = routing_engine
+        self.nr_requests = len(list_plan_rqs)
+        if not active:
+            self.active = False
+            return
+        speed = routing_engine.return_beeline_speed_upper_bound()
+        self.active = speed is not None and 0 < speed < np.inf and self.nr_requests > 0
+        if not self.active:
+            return
+        self.inv_speed = 1.0 / (speed * RR_BEELINE_SPEED_TOLERANCE)
+        self._pos_ids = {}
+        self._pos_coordinates = []
+        o_ids, e_pus, l_pus, d_ids, l_dos = [], [], [], [], []
+        for plan_rq in list_plan_rqs:
+            o_id, e_pu, l_pu, d_id, l_do = self._get_stop_infos(plan_rq)
+            o_ids.append(o_id)
+            e_pus.append(e_pu)
+            l_pus.append(l_pu)
+            d_ids.append(d_id)
+            l_dos.append(l_do)
+        coordinates = np.array(self._pos_coordinates, dtype=float)
+        self.o_ids = np.array(o_ids, dtype=np.int64)
+        self.d_ids = np.array(d_ids, dtype=np.int64)
+        self.o_x, self.o_y = coordinates[self.o_ids, 0], coordinates[self.o_ids, 1]
+        self.d_x, self.d_y = coordinates[self.d_ids, 0], coordinates[self.d_ids, 1]
+        self.e_pu = np.array(e_pus, dtype=float)
+        self.l_pu = np.array(l_pus, dtype=float)
+        self.l_do = np.array(l_dos, dtype=float)
+        self.direct_lb = np.hypot(self.d_x - self.o_x, self.d_y - self.o_y) * self.inv_speed
+
+    def _get_pos_id(self, pos):
+        pos_id = self._pos_ids.get(pos)
+        if pos_id is None:
+            pos_id = len(self._pos_coordinates)
+            self._pos_ids[pos] = pos_id
+            self._pos_coordinates.append(self.routing_engine.return_position_coordinates(pos))
+        return pos_id
+
+    def _get_stop_infos(self, plan_rq):
+        o_pos, e_pu, l_pu = plan_rq.get_o_stop_info()
+        d_pos, l_do, _ = plan_rq.get_d_stop_info()
+        return self._get_pos_id(o_pos), e_pu, l_pu, self._get_pos_id(d_pos), l_do
+
+    def get_candidate_indices(self, plan_rq):
+        """This method returns the indices of all requests that might be rr-compatible with plan_rq.
+
+        :param plan_rq: PlanRequest-obj
+        :return: array of indices (ascending) of list_plan_rqs
+        """
+        if not self.active:
+            return np.arange(self.nr_requests)
+        o_id, e_pu, l_pu, d_id, l_do = self._get_stop_infos(plan_rq)
+        o_x, o_y = self._pos_coordinates[o_id]
+        d_x, d_y = self._pos_coordinates[d_id]
+        direct_lb = np.hypot(d_x - o_x, d_y - o_y) * self.inv_speed
+        lb_o_o = np.hypot(self.o_x - o_x, self.o_y - o_y) * self.inv_speed
+        lb_o_d = np.hypot(self.d_x - o_x, self.d_y - o_y) * self.inv_speed       # o of plan_rq, d of others
+        lb_d_o = np.hypot(self.o_x - d_x, self.o_y - d_y) * self.inv_speed       # d of plan_rq, o of others
+        same_d = self.d_ids == d_id
+        # plan_rq is picked up first
+        candidates = (self.o_ids == d_id) | (e_pu + direct_lb + lb_d_o < self.l_pu)
+        t = np.maximum(e_pu + lb_o_o, self.e_pu)
+        candidates |= (t < self.l_pu) & (t + self.direct_lb <= self.l_do) & (same_d | (t + lb_d_o <= l_do))
+        # other request is picked up first
+        candidates |= (self.d_ids == o_id) | (self.e_pu + self.direct_lb + lb_o_d < l_pu)
+        t = np.maximum(self.e_pu + lb_o_o, e_pu)
+        candidates |= (t < l_pu) & (t + direct_lb <= l_do) & (same_d | (t + lb_o_d <= self.l_do))
+        return np.flatnonzero(candidates)
+
+
 def get_assigned_rids_from_vehplan(vehicle_plan):
     """ this function returns a list of assigned request ids from the corresponding vehicle plan
     :param vehicle_plan: corresponding vehicle plan object
@@ -8,7 +8,7 @@ from typing import Callable, Dict, List, Any, Tuple, TYPE_CHECKING
 
 from src.fleetctrl.planning.VehiclePlan import VehiclePlan
 from src.fleetctrl.pooling.batch.BatchAssignmentAlgorithmBase import BatchAssignmentAlgorithmBase, SimulationVehicleStruct
-from src.fleetctrl.pooling.GeneralPoolingFunctions import checkRRcomptibility
+from src.fleetctrl.pooling.GeneralPoolingFunctions import checkRRcomptibility, RRCandidateFilter
 from src.fleetctrl.pooling.batch.AlonsoMora.V2RB import V2RB
 from src.fleetctrl.pooling.immediate.insertion import simple_remove, single_insertion
 from src.fleetctrl.pooling.immediate.SelectRV import filter_directionality, filter_least_number_tasks
@@ -194,7 +194,7 @@ INPUT_PARAMETERS_AlonsoMoraAssignment = {
     "inherit" : "BatchAssignmentAlgorithmBase",
     "input_parameters_mandatory": [G_RA_SOLVER],
     "input_parameters_optional": [
-        G_RA_TB_TO_PER_VEH, G_RA_MAX_VR, G_RA_OPT_TO, G_RA_HEU, G_RVH_B_DIR, G_RVH_DIR, G_RVH_B_LWL, G_RVH_LWL, G_RVH_AM_RR, G_RVH_AM_TI
+        G_RA_TB_TO_PER_VEH, G_RA_TB_TO_PER_BATCH, G_RA_MAX_VR, G_RA_OPT_TO, G_RA_HEU, G_RA_AM_DELTA, G_RA_AM_RR_FILTER, G_RVH_B_DIR, G_RVH_DIR, G_RVH_B_LWL, G_RVH_LWL, G_RVH_AM_RR, G_RVH_AM_TI
         ],
     "mandatory_modules": [],
     "optional_modules": []
@@ -225,8 +225,11 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
         # "single_plan_per_v2rb"      -> no parameter needed
 
         self.veh_tree_build_timeout : int = operator_attributes.get(G_RA_TB_TO_PER_VEH, None)
+        self.batch_tree_build_timeout : float = operator_attributes.get(G_RA_TB_TO_PER_BATCH, None)
         self.optimisation_timeout : int = operator_attributes.get(G_RA_OPT_TO, None)
         self.max_rv_connections : int = operator_attributes.get(G_RA_MAX_VR, None)
+        self.delta_v2rb_update : bool = operator_attributes.get(G_RA_AM_DELTA, False)
+        self.rr_candidate_filter : bool = operator_attributes.get(G_RA_AM_RR_FILTER, False)
         applied_heuristics = operator_attributes.get(G_RA_HEU, None)
         
         self.applied_heuristics = {}
@@ -280,6 +283,11 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
         self.untracked_boarding_detected = {}
 
         self.current_best_cfv = 0 #stores the global cost function value from last optimisation
+        self.rr_pair_stats : Dict[str, int] = {"rr_tested" : 0, "rr_pruned" : 0}   # request pairs of last _computeRR() (only without parallelization)
+        self.v2rb_stats : Dict[str, int] = {"v2rb_reused" : 0, "v2rb_shifted" : 0, "v2rb_deleted" : 0, "v2rb_built" : 0}  # V2RBs of last _computeV2RBdatabase() (only without parallelization)
+        self.vid_state_signatures : Dict[int, tuple] = {}   # vid -> vehicle state signature of the last V2RB update (only with delta update)
+        self.vid_to_completed_tree_level : Dict[int, int] = {}  # vid -> size of bundles completely built in last _computeV2RBdatabase() (only with batch time budget)
+        self.tree_build_stats : Dict[str, int] = {}     # statistics of last tree building with batch time budget
 
     def register_parallelization_manager(self, alonsomora_parallelization_manager : ParallelizationManager):
         LOG.info("AM register parallelization manager")
@@ -332,7 +340,7 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
         self._computeRV()
         t_rv = time.time()
         ## LOG.debug(f"new RV cons {self.r2v}")
-        if self.veh_tree_build_timeout is not None:
+        if self.veh_tree_build_timeout is not None or self.batch_tree_build_timeout is not None:
             self._set_init_solution_insertion()
        # # LOG.debug(f"check for untracked boardings")
         for vid in self.untracked_boarding_detected.keys():
@@ -360,6 +368,9 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
         t_opt = time.time()
         # LOG.debug(f"after optimisation {self.optimisation_solutions}")
         times = {"sim_time" : self.sim_time, "setup" : t_setup - t_start, "rr" : t_rr - t_setup, "rv" : t_rv - t_rr, "build" : t_build - t_rv, "opt" : t_opt - t_build, "all" : t_opt - t_start}
+        times.update(self.rr_pair_stats)
+        times.update(self.v2rb_stats)
+        times.update(self.tree_build_stats)
         time_str = ",".join(["{};{}".format(a, b) for a, b in times.items()])
         LOG.info("OPT TIMES:{}".format(time_str))
         LOG.info("Opt stats at sim time {} : opt duration {} | res cfv {}".format(self.sim_time, t_opt - t_start, self.current_best_cfv))
@@ -573,6 +584,10 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
             del self.requests_to_compute[rid]
         except:
             pass
+        try:
+            del self.requests_to_compute_in_next_step[rid]
+        except:
+            pass
 
         if self.alonso_mora_parallelization_manager is not None:
             self.alonso_mora_parallelization_manager.delete_request(self.fo_id, rid)
@@ -800,10 +815,20 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
     def _computeRR(self):
         """ this function computes all rr-connections from self.requests_to_compute with all active_requests
         """
+        self.rr_pair_stats = {"rr_tested" : 0, "rr_pruned" : 0}
         if not self.alonso_mora_parallelization_manager:
+            if len(self.requests_to_compute) == 0:
+                return
+            rid2_list = list(self.rid_to_consider_for_global_optimisation.keys())
+            rr_filter = RRCandidateFilter([self.active_requests[rid2] for rid2 in rid2_list], self.routing_engine,
+                                          active=self.rr_candidate_filter)
             for rid1 in self.requests_to_compute.keys():
                 rq1 = self.active_requests[rid1]
-                for rid2 in self.rid_to_consider_for_global_optimisation.keys():
+                candidate_indices = rr_filter.get_candidate_indices(rq1)
+                self.rr_pair_stats["rr_tested"] += len(candidate_indices)
+                self.rr_pair_stats["rr_pruned"] += len(rid2_list) - len(candidate_indices)
+                for index in candidate_indices.tolist():
+                    rid2 = rid2_list[index]
                     if rid1 != rid2:
                         if not self._is_subrid(rid1) or not self._is_subrid(rid2) or self._get_associated_baserid(rid1) != self._get_associated_baserid(rid2):
                             rq2 = self.active_requests[rid2]
@@ -842,16 +867,26 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
             new_rv = {}
             travel_infos = {}
             rids_to_compute_to_rq = {}
+            # get routing results in single processing: all vehicle locations to all new request origins in one batch
+            list_veh_locations = list(veh_locations_to_vid.keys())
+            rid_to_rv_column = {}
+            list_o_pos = []
+            max_search_radius = 0
+            for rid in self.requests_to_compute.keys():
+                o_pos, _, latest_pu = self.active_requests[rid].get_o_stop_info()
+                rid_to_rv_column[rid] = len(list_o_pos)
+                list_o_pos.append(o_pos)
+                max_search_radius = max(max_search_radius, latest_pu - current_time)
+            _, rv_tt_matrix, _ = self.routing_engine.return_travel_costs_MtoN(list_veh_locations, list_o_pos,
+                                                                              max_cost_value=max_search_radius)
         for rid in self.requests_to_compute.keys():
             prq = self.active_requests[rid]
             if not self.alonso_mora_parallelization_manager:
-                # get routing results in single processing
-                o_pos, _, latest_pu = prq.get_o_stop_info()
-                routing_results = self.routing_engine.return_travel_costs_Xto1(veh_locations_to_vid.keys(), o_pos,
-                                                                               max_cost_value=latest_pu - current_time)
-                for veh_loc, tt, _, _ in routing_results:
-                    for vid in veh_locations_to_vid[veh_loc]:
-                        vid_dict[vid] = tt
+                _, _, latest_pu = prq.get_o_stop_info()
+                rv_tts = rv_tt_matrix[:, rid_to_rv_column[rid]]
+                for veh_loc_index in np.nonzero(rv_tts <= latest_pu - current_time)[0]:
+                    for vid in veh_locations_to_vid[list_veh_locations[veh_loc_index]]:
+                        vid_dict[vid] = float(rv_tts[veh_loc_index])
             else:
                 # get prepared routing results in multi processing
                 for vid in new_rv.get(rid, []):
@@ -939,10 +974,20 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
         #if self.fleetcontrol is not None:
             # LOG.debug("alonso computeV2RBDataBase: at {}".format(self.sim_time))
             # # LOG.debug("rv connections: {}".format(self.v2r))
-        if not self.alonso_mora_parallelization_manager:
+        self.v2rb_stats = {"v2rb_reused" : 0, "v2rb_shifted" : 0, "v2rb_deleted" : 0, "v2rb_built" : 0}
+        if not self.alonso_mora_parallelization_manager and self.batch_tree_build_timeout is not None:
+            t_deadline = time.time() + self.batch_tree_build_timeout
+            for vid in self.veh_objs.keys():
+                self._updateVehicleDataBase(vid)
+            nr_v2rbs_before_build = len(self.rtv_obj)
+            self._buildTreesWithBatchDeadline(t_deadline)
+            self.v2rb_stats["v2rb_built"] = len(self.rtv_obj) - nr_v2rbs_before_build
+        elif not self.alonso_mora_parallelization_manager:
             for vid, veh_obj in self.veh_objs.items():
                 self._updateVehicleDataBase(vid)
+                nr_v2rbs_before_build = len(self.rtv_v.get(vid, {}))
                 self._buildTreeForVid(vid)
+                self.v2rb_stats["v2rb_built"] += len(self.rtv_v.get(vid, {})) - nr_v2rbs_before_build
         else:
             new_v2rbs_all = []
             batch_size = max(float(np.floor(len(self.veh_objs)/self.alonso_mora_parallelization_manager.number_cores/5.0)), 1)
@@ -978,9 +1023,11 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
             for v2rb in new_v2rbs_all:
                 self._addRtvKey(v2rb.rtv_key, v2rb)
 
-    def _buildTreeForVid(self, vid : int):
-        """ this method builds new V2RBS for all requests_to_compute for a single vehicle
-        param vid : vehicle_id for vid to be build
+    def _getRidsToBuildForVid(self, vid : int) -> List[Tuple[Any, int]]:
+        """ this method returns the requests whose V2RBs have to be built for a single vehicle in the order they are built
+        (currently assigned requests first, otherwise random order)
+        param vid : vehicle_id
+        return : list of (rid, h) with h = 1 if rid is currently assigned to vid, else 0
         """
         assigned_key = self.current_assignments.get(vid, None)
         if assigned_key is not None:
@@ -1002,6 +1049,13 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
                 rids_to_build_with_hierarchy.append((rid, h))
         np.random.shuffle(rids_to_build_with_hierarchy)
         rids_to_build_with_hierarchy = sorted(rids_to_build_with_hierarchy, key = lambda x:x[1], reverse = True)
+        return rids_to_build_with_hierarchy
+
+    def _buildTreeForVid(self, vid : int):
+        """ this method builds new V2RBS for all requests_to_compute for a single vehicle
+        param vid : vehicle_id for vid to be build
+        """
+        rids_to_build_with_hierarchy = self._getRidsToBuildForVid(vid)
         t_all_vid = time.time()
         #LOG.debug("build tree for vid {} with rids {} | locked {}".format(vid, rids_to_build_with_hierarchy, self.r2v_locked))
         for rid, h in rids_to_build_with_hierarchy:
@@ -1013,7 +1067,77 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
             self._buildOnCurrentTree(vid, rid)
 
         self._checkForNecessaryV2RBsAndComputeMissing(vid)
-        
+
+    def _buildTreesWithBatchDeadline(self, t_deadline : float):
+        """ this method builds new V2RBs for all vehicles until t_deadline is reached (anytime version of _buildTreeForVid)
+        the trees of all vehicles are grown level by level: the V2RBs with k requests are built for all vehicles before
+        any V2RB with k+1 requests is built. If the deadline is reached, building stops with the current database;
+        requests whose trees are not completed are computed again in the next optimisation step.
+        The number of completed levels per vehicle is stored in self.vid_to_completed_tree_level
+        (self.veh_tree_build_timeout is not applied here)
+        param t_deadline : time.time() after which no new V2RBs are built
+        """
+        vid_to_growing_rids = {}    # vid -> list of (rid, do_not_remove_for_lower_keys) with trees still growing
+        vid_to_first_level = {}     # vid -> size of bundles the first new bundles are built on (number of locked rids)
+        for vid in self.veh_objs.keys():
+            growing_rids = []
+            for rid, _ in self._getRidsToBuildForVid(vid):
+                do_not_remove_for_lower_keys = self._getBuildOnCurrentTreeInfos(vid, rid)
+                if do_not_remove_for_lower_keys is not None:
+                    growing_rids.append( (rid, do_not_remove_for_lower_keys) )
+            vid_to_growing_rids[vid] = growing_rids
+            vid_to_first_level[vid] = max(len(self.v2r_locked.get(vid, {}).keys()), 1)
+            self.vid_to_completed_tree_level[vid] = 0
+        deadline_reached = False
+        max_tour_heuristic = self.applied_heuristics.get("single_plan_per_v2rb", False)
+        # level 1: single request bundles (only for vehicles without locked requests)
+        for vid, growing_rids in vid_to_growing_rids.items():
+            if len(self.v2r_locked.get(vid, {}).keys()) == 0:
+                for rid, _ in growing_rids:
+                    if time.time() > t_deadline:
+                        deadline_reached = True
+                        break
+                    self._buildSingleRequestV2RB(vid, rid)
+            if deadline_reached:
+                break
+            self.vid_to_completed_tree_level[vid] = 1
+        # level i + 1: add rids to bundles of size i
+        for i in range(1, MAX_LENGTH_OF_TREES):
+            if deadline_reached:
+                break
+            for vid, growing_rids in vid_to_growing_rids.items():
+                if i < vid_to_first_level[vid]:
+                    self.vid_to_completed_tree_level[vid] = i + 1
+                    continue
+                if len(growing_rids) == 0:
+                    continue
+                still_growing_rids = []
+                for rid, do_not_remove_for_lower_keys in growing_rids:
+                    if time.time() > t_deadline:
+                        deadline_reached = True
+                        break
+                    if self._buildOnCurrentTreeLevel(vid, rid, i, do_not_remove_for_lower_keys, max_tour_heuristic):
+                        still_growing_rids.append( (rid, do_not_remove_for_lower_keys) )
+                if deadline_reached:
+                    break
+                vid_to_growing_rids[vid] = still_growing_rids
+                self.vid_to_completed_tree_level[vid] = i + 1
+            if not any(len(growing_rids) > 0 for growing_rids in vid_to_growing_rids.values()):
+                break
+        # requests with incomplete trees
+        nr_vehicles_cut = 0
+        for vid, growing_rids in vid_to_growing_rids.items():
+            if deadline_reached and len(growing_rids) > 0:
+                nr_vehicles_cut += 1
+                for rid, _ in growing_rids:
+                    self.requests_to_compute_in_next_step[rid] = 1
+            self._checkForNecessaryV2RBsAndComputeMissing(vid)
+        cut_levels = [self.vid_to_completed_tree_level[vid] for vid, growing_rids in vid_to_growing_rids.items() if deadline_reached and len(growing_rids) > 0]
+        self.tree_build_stats = {"tb_deadline_reached" : int(deadline_reached), "tb_vehicles_cut" : nr_vehicles_cut,
+                                 "tb_min_completed_level" : min(cut_levels, default=-1)}
+        if deadline_reached:
+            LOG.info("tree building stopped at batch deadline: {} vehicles with incomplete trees (min completed level {})".format(nr_vehicles_cut, self.tree_build_stats["tb_min_completed_level"]))
+
     def _buildOnCurrentTree(self, vid : int, rid : Any):
         """This method adds rid to all currently available rtv_keys for vehicle
         IF the rid is matching with all on-board requests.
@@ -1030,6 +1154,32 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
         """
 
         # LOG.verbose(f"build on current tree {rid} -> {vid}")
+        do_not_remove_for_lower_keys = self._getBuildOnCurrentTreeInfos(vid, rid)
+        if do_not_remove_for_lower_keys is None:
+            return
+        # check existing elements from lower to higher rid-number
+        number_locked_rids = len(self.v2r_locked.get(vid, {}).keys())
+        # check of activated heuristic
+        max_tour_heuristic = False
+        if self.applied_heuristics.get("single_plan_per_v2rb"):
+            max_tour_heuristic = True
+        #
+        for i in range(max(number_locked_rids,1), MAX_LENGTH_OF_TREES):
+            new_v2rb_found = self._buildOnCurrentTreeLevel(vid, rid, i, do_not_remove_for_lower_keys, max_tour_heuristic)
+            if not new_v2rb_found:
+                break
+
+        if number_locked_rids == 0:
+            self._buildSingleRequestV2RB(vid, rid)
+
+    def _getBuildOnCurrentTreeInfos(self, vid : int, rid : Any) -> List[Any]:
+        """This method checks if rid is rr-compatible with all on-board requests of vid and adds missing rr-connections
+        to assigned requests that are not part of the global optimisation.
+
+        :param vid: vehicle_id
+        :param rid: plan_request_id
+        :return: list of rids that must not be removed when lower keys are tested; None if rid can not be added to the tree of vid
+        """
         associated_locked_rids = []
         for ob_rid in self.v2r_locked.get(vid, {}).keys():
             other_sub_rids = self._get_all_other_subrids_associated_to_this_subrid(ob_rid)
@@ -1040,7 +1190,7 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
                     feasible_found = True
                     break
             if not feasible_found:
-                return
+                return None
         # check for assigned request not activated for global optimisation
         assigned_key = self.current_assignments.get(vid)
         if assigned_key is not None:
@@ -1052,76 +1202,83 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
                     if rr_comp:
                         # LOG.verbose(" -> 1")
                         self.rr[getRRKey(rid, o_rid)] = 1
-        # check existing elements from lower to higher rid-number
-        number_locked_rids = len(self.v2r_locked.get(vid, {}).keys())
         do_not_remove_for_lower_keys = [rid]
         do_not_remove_for_lower_keys.extend(associated_locked_rids)
-        lower_keys_available = True
+        return do_not_remove_for_lower_keys
+
+    def _buildOnCurrentTreeLevel(self, vid : int, rid : Any, i : int, do_not_remove_for_lower_keys : List[Any], max_tour_heuristic : bool) -> bool:
+        """This method adds rid to all currently available rtv_keys of vid with i requests (one level of _buildOnCurrentTree).
+
+        :param vid: vehicle_id
+        :param rid: plan_request_id
+        :param i: number of requests of the rtv_keys to build on
+        :param do_not_remove_for_lower_keys: return value of _getBuildOnCurrentTreeInfos
+        :param max_tour_heuristic: if True, only the best plan is kept ("single_plan_per_v2rb" heuristic)
+        :return: True if a new V2RB has been created
+        """
+        new_v2rb_found = False
         do_not_build_on_rv_key = createRTVKey(vid, [rid])
-        # check of activated heuristic
-        max_tour_heuristic = False
-        if self.applied_heuristics.get("single_plan_per_v2rb"):
-            max_tour_heuristic = True
-        #
-        for i in range(max(number_locked_rids,1), MAX_LENGTH_OF_TREES):
-            new_v2rb_found = False
-            # # LOG.debug(f"build rid {rid} size {i}")
-            for build_key in self.rtv_tree_N_v[vid].get(i, {}).keys():
-                # # LOG.debug(f"build key {build_key}")
-                lower_keys_available = True
-                if build_key == do_not_build_on_rv_key:
-                    continue
-                if self.rtv_r.get(rid, {}).get(build_key) is not None:
-                    # # LOG.debug(f"dont build on yourself {build_key}")
-                    continue
-                # check if lower key is available, otherwise match will not be possible
-                # # LOG.debug(f"build on {build_key}")
-                list_of_keys_to_test = createListLowerLevelKeys(build_key, rid, do_not_remove_for_lower_keys)
-                
-                for test_existence_rtv_key in list_of_keys_to_test:
-                    if not self.rtv_obj.get(test_existence_rtv_key):
-                        lower_keys_available = False
-                        break
-                if not lower_keys_available:
-                    continue
-                # test for feasibility by building on current V2RB object
-                unsorted_rid_list = list(getRidsFromRTVKey(build_key))
-                #check RR-compatibility! (?)
-                rr_test = True
-                for o_rid in unsorted_rid_list:
-                    rr_test = self.rr.get(getRRKey(o_rid, rid))
-                    # # LOG.debug(f"check rr {o_rid} {rid} -> {rr_test}")
-                    if rr_test != 1:
-                        rr_test = False
-                        break
-                if not rr_test:
-                    continue
-                
-                unsorted_rid_list.append(rid)
-                new_rtv_key = createRTVKey(vid, unsorted_rid_list)
+        # # LOG.debug(f"build rid {rid} size {i}")
+        for build_key in self.rtv_tree_N_v[vid].get(i, {}).keys():
+            # # LOG.debug(f"build key {build_key}")
+            lower_keys_available = True
+            if build_key == do_not_build_on_rv_key:
+                continue
+            if self.rtv_r.get(rid, {}).get(build_key) is not None:
+                # # LOG.debug(f"dont build on yourself {build_key}")
+                continue
+            # check if lower key is available, otherwise match will not be possible
+            # # LOG.debug(f"build on {build_key}")
+            list_of_keys_to_test = createListLowerLevelKeys(build_key, rid, do_not_remove_for_lower_keys)
+            
+            for test_existence_rtv_key in list_of_keys_to_test:
+                if not self.rtv_obj.get(test_existence_rtv_key):
+                    lower_keys_available = False
+                    break
+            if not lower_keys_available:
+                continue
+            # test for feasibility by building on current V2RB object
+            unsorted_rid_list = list(getRidsFromRTVKey(build_key))
+            #check RR-compatibility! (?)
+            rr_test = True
+            for o_rid in unsorted_rid_list:
+                rr_test = self.rr.get(getRRKey(o_rid, rid))
+                # # LOG.debug(f"check rr {o_rid} {rid} -> {rr_test}")
+                if rr_test != 1:
+                    rr_test = False
+                    break
+            if not rr_test:
+                continue
+            
+            unsorted_rid_list.append(rid)
+            new_rtv_key = createRTVKey(vid, unsorted_rid_list)
 
-                if self.rtv_obj.get(new_rtv_key, None) is not None:
-                    continue
+            if self.rtv_obj.get(new_rtv_key, None) is not None:
+                continue
 
-                # # LOG.debug(f"try building {build_key} | {rid} | ")
-                if max_tour_heuristic:
-                    test_new_V2RB = self._checkRTVFeasibilityAndReturnCreateV2RB_bestPlanHeuristic(vid, rid, build_key)
-                else:
-                    test_new_V2RB = self._checkRTVFeasibilityAndReturnCreateV2RB(vid, rid, build_key)
+            # # LOG.debug(f"try building {build_key} | {rid} | ")
+            if max_tour_heuristic:
+                test_new_V2RB = self._checkRTVFeasibilityAndReturnCreateV2RB_bestPlanHeuristic(vid, rid, build_key)
+            else:
+                test_new_V2RB = self._checkRTVFeasibilityAndReturnCreateV2RB(vid, rid, build_key)
 
-                if test_new_V2RB:
-                    self._addRtvKey(new_rtv_key, test_new_V2RB)
-                    new_v2rb_found = True
-            if not new_v2rb_found:
-                break
+            if test_new_V2RB:
+                self._addRtvKey(new_rtv_key, test_new_V2RB)
+                new_v2rb_found = True
+        return new_v2rb_found
 
-        if number_locked_rids == 0:
-            rtv_key = createRTVKey(vid, [rid])
-            if self.rtv_obj.get(rtv_key, None) is not None:
-                return
-            V2RB_obj = V2RB(self.routing_engine, self.active_requests, self.sim_time, rtv_key, self.veh_objs[vid], self.std_bt, self.add_bt, self.objective_function, new_prq_obj=self.active_requests[rid])
-            if V2RB_obj.isFeasible():
-                self._addRtvKey(rtv_key, V2RB_obj)
+    def _buildSingleRequestV2RB(self, vid : int, rid : Any):
+        """This method creates the V2RB of vid serving only rid if it is feasible and not available yet.
+
+        :param vid: vehicle_id
+        :param rid: plan_request_id
+        """
+        rtv_key = createRTVKey(vid, [rid])
+        if self.rtv_obj.get(rtv_key, None) is not None:
+            return
+        V2RB_obj = V2RB(self.routing_engine, self.active_requests, self.sim_time, rtv_key, self.veh_objs[vid], self.std_bt, self.add_bt, self.objective_function, new_prq_obj=self.active_requests[rid])
+        if V2RB_obj.isFeasible():
+            self._addRtvKey(rtv_key, V2RB_obj)
 
     def _checkRTVFeasibilityAndReturnCreateV2RB(self, vid : int, rid : Any, rtv_key : tuple) -> V2RB:
         """This method checks if the addition of rid to an existing V2RB object belonging to rtv_key.
@@ -1139,10 +1296,24 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
         #new_prq_obj, new_rtv_key, routing_engine, rq_dict, sim_time, veh_obj, std_bt, add_bt
         return low_level_V2RB.addRequestAndCheckFeasibility(self.active_requests[rid], new_rtv_key, self.routing_engine, self.objective_function, self.active_requests, self.sim_time, self.veh_objs[vid], self.std_bt, self.add_bt)
 
+    def _getVehicleStateSignature(self, vid : int) -> tuple:
+        """ returns the vehicle state that the v2rb plans of vid depend on (position, soc, on-board requests,
+        assigned route and assignment); only used for the "v2rb_shifted" statistics (V2RBs of vehicles whose state did
+        not change since the last update), the plans of these vehicles are updated like all others
+        :param vid: vehicle_id
+        :return: hashable signature tuple
+        """
+        veh_obj = self.veh_objs[vid]
+        return (veh_obj.pos, veh_obj.soc, veh_obj.cl_start_time, tuple(rq.get_rid_struct() for rq in veh_obj.pax),
+                tuple((leg.status, leg.destination_pos, leg.locked) for leg in veh_obj.assigned_route),
+                self.current_assignments.get(vid))
+
     def _updateVehicleDataBase(self, vid : int):
         """ this function updates the v2rb-database of a specific vehicl from the last optimisation time-step
         and deletes v2rbs that are no longer feasible or updates plans corresponding the
         vehicle movements and boarding processes since the last opt-step
+        with delta update, travel infos of unchanged legs are reused (not for vehicles with rebuild flag, i.e. after
+        travel time updates or unplanned boardings/alightings)
         :param vid: vehicle_id
         """
         veh_obj = self.veh_objs[vid]
@@ -1157,6 +1328,12 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
                     necessary_ob_rids.append(ass_rid)
 
         list_passed_VRLs = self.vid_to_list_passed_VRLs.get(vid, [])
+        reuse_leg_travel_infos = self.delta_v2rb_update and not self.rebuild_rtv.get(vid)
+        is_shifted = False  # only counted in v2rb_stats, does not change the update itself
+        if self.delta_v2rb_update:
+            state_signature = self._getVehicleStateSignature(vid)
+            is_shifted = reuse_leg_travel_infos and len(list_passed_VRLs) == 0 and self.vid_state_signatures.get(vid) == state_signature
+            self.vid_state_signatures[vid] = state_signature
         to_del_keys = {}
         # LOG.debug(f"updateVehicleDataBase {vid} assigned {assigned_key} ob {necessary_ob_rids}")
         for number_rtv_rids, rtv_key_dict in self.rtv_tree_N_v.get(vid, {}).items():
@@ -1182,13 +1359,18 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
                     continue
 
                 v2rb_obj = self.rtv_obj[rtv_key]
-                v2rb_obj.updateAndCheckFeasibility(self.routing_engine, self.objective_function, veh_obj, self.active_requests, self.sim_time, list_passed_VRLs = list_passed_VRLs, is_assigned = is_assigned)
+                v2rb_obj.updateAndCheckFeasibility(self.routing_engine, self.objective_function, veh_obj, self.active_requests, self.sim_time, list_passed_VRLs = list_passed_VRLs, is_assigned = is_assigned,
+                                                   reuse_leg_travel_infos = reuse_leg_travel_infos)
                 if not v2rb_obj.isFeasible():
                     to_del_keys[rtv_key] = 1
                 else:
                     self._updateV2RBcostInDataBase(rtv_key, v2rb_obj)
+                    self.v2rb_stats["v2rb_reused"] += 1
+                    if is_shifted:
+                        self.v2rb_stats["v2rb_shifted"] += 1
                     # # LOG.debug(" -> still feasible")
 
+        self.v2rb_stats["v2rb_deleted"] += len(to_del_keys)
         for rtv_key in to_del_keys.keys():
             self._delRtvKey(rtv_key)
         self._createNecessaryV2RBsBeforeBuildPhase(vid)
@@ -1347,6 +1529,8 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
             self._runOptimisation_Gurobi()
         elif self.solver == "CPLEX":
             self._runOptimisation_CPLEX()
+        elif self.solver == "HiGHS":
+            self._runOptimisation_HiGHS()
         else:
             raise EnvironmentError(f"False input for {G_RA_SOLVER}! Solver {self.solver} not found!")
 
@@ -1718,6 +1902,115 @@ class AlonsoMoraAssignment(BatchAssignmentAlgorithmBase):
         self.prob.end()
 
 
+    def _runOptimisation_HiGHS(self):
+        """This method creates and solves the assignment optimization problem of _runOptimisation_CPLEX with the
+        open-source solver HiGHS (scipy.optimize.milp, scipy >= 1.9). The constraints (C1) - (C3) are set up as one
+        sparse matrix.
+        HiGHS cannot be started with an initial solution by scipy. Instead, the current assignments are evaluated as
+        incumbent: they are kept if no better feasible solution is found within the optimisation timeout.
+        """
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        from scipy.sparse import csr_matrix
+        # init optimization variable l and dictionaries
+        l_counter = 0               # int | 1D optimization variable index counter
+        utility_function = []       # l -> c_l (cost/utility of of optimization variable)
+        l2rtv = []                  # l -> rtv_key
+        rtv2l = {}                  # rtv_key -> l
+        i2l = {}                    # vid -> list_of_l
+        j2l = {}                    # rid -> list_of_l
+        assigned_rids = {}
+        for rtv_key, rtv_cost in self.rtv_costs.items():
+            if rtv_cost == float('inf') or np.isnan(rtv_cost):
+                LOG.warning("v2rb with infinite cfv! no route found? {} {}".format(rtv_key, rtv_cost))
+                continue
+            utility_function.append(rtv_cost)
+            l2rtv.append(rtv_key)
+            rtv2l[rtv_key] = l_counter
+            vid = getVidFromRTVKey(rtv_key)
+            try:
+                i2l[vid].append(l_counter)
+            except KeyError:
+                i2l[vid] = [l_counter]
+            for rid in getRidsFromRTVKey(rtv_key):
+                v_rid = self._get_associated_baserid(rid) # requests with same mutually exclusive cluster ids are put into the same constraint later
+                try:
+                    j2l[v_rid].append(l_counter)
+                except KeyError:
+                    j2l[v_rid] = [l_counter]
+                if not self.unassigned_requests.get(rid):
+                    assigned_rids[v_rid] = 1
+            l_counter += 1
+        if l_counter == 0:
+            self.optimisation_solutions = {}
+            return
+        # constraints (C1) for each vid_i and (C2) / (C3) for each rid_j
+        rows = []
+        cols = []
+        c_lb = []
+        c_counter = 0
+        for list_l in i2l.values():
+            rows.extend([c_counter] * len(list_l))
+            cols.extend(list_l)
+            c_lb.append(0)
+            c_counter += 1
+        for rid_j, list_l in j2l.items():
+            rows.extend([c_counter] * len(list_l))
+            cols.extend(list_l)
+            if assigned_rids.get(rid_j):
+                c_lb.append(1)
+            else:
+                c_lb.append(0)
+            c_counter += 1
+        a_matrix = csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(c_counter, l_counter))
+        c_lb = np.array(c_lb)
+        c_ub = np.ones(c_counter)
+        costs = np.array(utility_function, dtype=float)
+        # current assignments as incumbent
+        x_init = np.zeros(l_counter)
+        for rtv_key in self.current_assignments.values():
+            if rtv_key is None:
+                continue
+            l = rtv2l.get(rtv_key)
+            if l is None:
+                LOG.warning("current assignment {} not found for setting initial solution".format(rtv_key))
+            else:
+                x_init[l] = 1
+        init_lhs = a_matrix.dot(x_init)
+        init_feasible = np.all(init_lhs >= c_lb) and np.all(init_lhs <= c_ub)
+        # solve problem
+        options = {"disp" : False}
+        if self.optimisation_timeout:
+            options["time_limit"] = self.optimisation_timeout
+        res = milp(costs, constraints=LinearConstraint(a_matrix, c_lb, c_ub), integrality=np.ones(l_counter),
+                   bounds=Bounds(0, 1), options=options)
+        LOG.info("=========")
+        LOG.info("OPT TIME {}:".format(self.sim_time))
+        LOG.info("solution status {} : {}".format(res.status, res.message))
+        LOG.info("number opt requests {} | number revealed requests {} | number active requests: {}".format(len(self.rid_to_consider_for_global_optimisation.keys()), len(j2l), len(self.active_requests.keys())))
+        LOG.info("number rtv_objs: {}".format(len(self.rtv_costs.keys())))
+        self.opt_stats = (res.status, int(res.x is not None))
+        if res.x is not None and (not init_feasible or res.fun <= costs.dot(x_init)):
+            x = res.x
+        elif init_feasible:
+            LOG.info("no better solution than the current assignments found!")
+            x = x_init
+        else:
+            if res.status == 2:
+                LOG.error("optimisation problem infeasible!")
+                raise EnvironmentError
+            LOG.error("no solution within timeout found!")
+            raise NotImplementedError
+        # re-transform l -> rtv_key
+        new_assignments = {}
+        sum_cfv = 0
+        for l in np.flatnonzero(x > 0.5):
+            rtv_key = l2rtv[l]
+            new_assignments[getVidFromRTVKey(rtv_key)] = rtv_key
+            sum_cfv += self.rtv_costs[rtv_key]
+        self.current_best_cfv = sum_cfv
+
+        self.optimisation_solutions = new_assignments
+
     def _setAdditionalInitForParallelization(self, current_assignments, v2r_locked, requests_to_compute, rr, v2r, active_requests, external_assignments, rid_to_mutually_exclusive_cluster_id, mutually_exclusive_cluster_id_to_rids,rid_to_consider_for_global_optimisation):
         """ this function sets additional inits in the database if this class member is created in a parallel process
         this function is only needed in the AlonsoMoraParallelization, therefore treated as private!
@@ -1,14 +1,22 @@
 import importlib
 import os
+import atexit
 from src.FleetSimulationBase import DEFAULT_LOG_LEVEL
 import traceback
 from multiprocessing import Process, Queue, Pipe
 import time
 import math
 import dill as pickle
+import numpy as np
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
 
 from src.misc.globals import *
 from src.misc.init_modules import load_routing_engine
+from src.routing.routing_imports.TravelInfoTables import share_loaded_travel_info_tables, \
+    attach_shared_travel_info_tables, release_shared_travel_info_tables
 import src.fleetctrl.pooling.GeneralPoolingFunctions as GeneralPoolingFunctions
 from src.fleetctrl.pooling.batch.AlonsoMora.AlonsoMoraAssignment import *
 from src.fleetctrl.pooling.immediate.insertion import single_insertion
@@ -21,11 +29,107 @@ LOG = logging.getLogger(__name__)
 from src.fleetctrl.pooling.batch.AlonsoMora.comcodes import *
 #=====================================================================
 
-def startProcess(q_in, q_out, process_id, scenario_parameters, dir_names):
-    PP = ParallelProcess(q_in, q_out, process_id, scenario_parameters, dir_names)
+def startProcess(q_in, q_out, process_id, scenario_parameters, dir_names, shared_table_handles=None):
+    PP = ParallelProcess(q_in, q_out, process_id, scenario_parameters, dir_names,
+                         shared_table_handles=shared_table_handles)
     LOG.info(f"time to run PP {process_id}")
     PP.run()
 
+
+def encode_positions(list_pos):
+    """ converts network positions into a float array (one row per position; None -> nan)
+    :param list_pos: list of network positions (start_node, end_node, relative_position)
+    :return: numpy array of shape (len(list_pos), 3)
+    """
+    return np.array([(p[0], np.nan if p[1] is None else p[1], np.nan if p[2] is None else p[2]) for p in list_pos],
+                    dtype=np.float64).reshape((len(list_pos), 3))
+
+
+def decode_positions(array):
+    """ inverse of encode_positions()
+    :param array: numpy array of shape (x, 3)
+    :return: list of network positions
+    """
+    on_edge = ~np.isnan(array[:, 1])
+    start_nodes = array[:, 0].astype(np.int64).tolist()
+    end_nodes = np.where(on_edge, array[:, 1], -1).astype(np.int64).tolist()
+    rel_positions = array[:, 2].tolist()
+    return [(start_node, end_node, rel_pos) if is_on_edge else (start_node, None, None)
+            for start_node, end_node, rel_pos, is_on_edge
+            in zip(start_nodes, end_nodes, rel_positions, on_edge.tolist())]
+
+
+def encode_travel_infos(travel_info_dict):
+    """ converts routing results into a float array (one row per entry: origin position, target position, cfv, tt, dis)
+    :param travel_info_dict: dictionary (origin_position, target_position) -> (cfv, tt, dis)
+    :return: numpy array of shape (len(travel_info_dict), 9)
+    """
+    rows = []
+    for (o_pos, d_pos), travel_info in travel_info_dict.items():
+        rows.append((o_pos[0], np.nan if o_pos[1] is None else o_pos[1], np.nan if o_pos[2] is None else o_pos[2],
+                     d_pos[0], np.nan if d_pos[1] is None else d_pos[1], np.nan if d_pos[2] is None else d_pos[2],
+                     *travel_info))
+    return np.array(rows, dtype=np.float64).reshape((len(rows), 9))
+
+
+def decode_travel_infos(array):
+    """ inverse of encode_travel_infos()
+    :param array: numpy array of shape (x, 9)
+    :return: dictionary (origin_position, target_position) -> (cfv, tt, dis)
+    """
+    o_positions = decode_positions(array[:, 0:3])
+    d_positions = decode_positions(array[:, 3:6])
+    return dict(zip(zip(o_positions, d_positions), zip(*array[:, 6:9].T.tolist())))
+
+
+class SharedArrayBuffer():
+    def __init__(self, nr_columns):
+        """ float array in a shared memory block that is written by the main process and read by the parallel processes
+        instead of sending the data to each parallel process via the queue, only a small handle is sent
+        (the block is reallocated if it is too small)
+        :param nr_columns: number of columns of the arrays to be written
+        """
+        self.nr_columns = nr_columns
+        self.capacity = 0   # number of rows that fit into the current block
+        self.shm = None
+
+    def write(self, array):
+        """ copies array into the shared memory block
+        :param array: numpy float array of shape (x, nr_columns)
+        :return: handle (shared memory name, number of rows, number of columns) to read the array with read_shared_array()
+        """
+        nr_rows = array.shape[0]
+        if self.shm is None or nr_rows > self.capacity:
+            new_capacity = max(nr_rows, 2 * self.capacity, 1024)
+            self.release()
+            self.capacity = new_capacity
+            self.shm = shared_memory.SharedMemory(create=True, size=self.capacity * self.nr_columns * 8)
+        np.ndarray((nr_rows, self.nr_columns), dtype=np.float64, buffer=self.shm.buf)[:] = array
+        return (self.shm.name, nr_rows, self.nr_columns)
+
+    def release(self):
+        """ frees the shared memory block """
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+            self.capacity = 0
+
+
+def read_shared_array(handle, attached_blocks):
+    """ returns a copy of an array written by SharedArrayBuffer.write()
+    :param handle: handle returned by SharedArrayBuffer.write()
+    :param attached_blocks: dict shared memory name -> SharedMemory of the calling process (blocks are attached once)
+    :return: numpy array
+    """
+    shm_name, nr_rows, nr_columns = handle
+    shm = attached_blocks.get(shm_name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        attached_blocks[shm_name] = shm
+    return np.ndarray((nr_rows, nr_columns), dtype=np.float64, buffer=shm.buf).copy()
+
+
 class ParallelizationManager():
     def __init__(self, number_cores, scenario_parameters, dir_names):   #TODO define data_staff (for loading all the data (nw e.g. cant be transmitted directly))
         """ this class is used to manage the parallelization of functions from the AlonsoMoraAssignment module
@@ -39,6 +143,10 @@ class ParallelizationManager():
                     a task is defined by the tuple (communication_code, (function_arguments)) the communication codes defined as globals above define the function to be called on the parallel cores
             q_out : here all the outputs from the parallel cores are collected
 
+        if available (python >= 3.8), shared memory is used to reduce the data sent via the Queues():
+            - preprocessed travel time tables loaded by the main process are attached read-only by the parallel processes
+            - vehicle locations and routing results that are broadcast to all processes are written into shared buffers
+
         :param number_cores: number of parallel processes
         :param scenario_parameters: dictionary initialized in the beginning of the simulation for all simulation parameters
         :param dir_names: dictionary of input/ouput directories initialzied in the beginning of the simulation
@@ -48,7 +156,12 @@ class ParallelizationManager():
         self.q_in = Queue() #communication queues
         self.q_out = Queue()
 
-        self.processes = [Process(target = startProcess, args = (self.q_in, self.q_out, i, scenario_parameters, dir_names)) for i in range(self.number_cores)]    # start processes
+        shared_table_handles = share_loaded_travel_info_tables()
+        if shared_memory is not None and os.name == "posix":
+            # parallel processes have to use the resource tracker of this process to not unlink shared blocks at exit
+            from multiprocessing import resource_tracker
+            resource_tracker.ensure_running()
+        self.processes = [Process(target = startProcess, args = (self.q_in, self.q_out, i, scenario_parameters, dir_names, shared_table_handles)) for i in range(self.number_cores)]    # start processes
         for p in self.processes:
             p.daemon = True    
             p.start()
@@ -64,11 +177,29 @@ class ParallelizationManager():
 
         self.last_update_network_call = -1
 
+        self._init_shared_buffers()
+
+    def _init_shared_buffers(self):
+        """ initializes the shared memory buffers for data that is broadcast to all parallel processes
+        (None if shared memory is not available -> data is sent via the queue) """
+        if shared_memory is not None:
+            self.Xto1_target_buffer = SharedArrayBuffer(3)     # vehicle positions
+            self.rv_results_buffer = SharedArrayBuffer(9)      # origin position, target position, cfv, tt, dis
+        else:
+            self.Xto1_target_buffer = None
+            self.rv_results_buffer = None
+        atexit.register(self.release_shared_memory)
 
+    def release_shared_memory(self):
+        """ frees the shared memory blocks of this manager and the shared travel time tables """
+        for shared_buffer in [self.Xto1_target_buffer, self.rv_results_buffer]:
+            if shared_buffer is not None:
+                shared_buffer.release()
+        release_shared_travel_info_tables()
 
     def killProcesses(self):
         """ this function is supposed to kill all parallel processes """
-        for i in range(self.N_cores):
+        for i in range(self.number_cores):
             self.q_in.put( (KILL,) )
             
         self.q_in.close()
@@ -80,6 +211,8 @@ class ParallelizationManager():
         for p in self.processes:
             p.join()
 
+        self.release_shared_memory()
+
     def _checkFunctionCall(self, function_id = -1):
         """ check if this function call is feasible respective to the last function call and if all results are fetched
         raises error if not
@@ -327,6 +460,8 @@ class ParallelizationManager():
         :param list_target_pos: list of all current vehicle network positions
         """
         self._checkFunctionCall()
+        if self.Xto1_target_buffer is not None:
+            list_target_pos = self.Xto1_target_buffer.write(encode_positions(list_target_pos))
         c = 0
         for i in range(self.number_cores):
             # LOG.debug(f"Queue put {SET_XTO1_TARGET_LOCATIONS}")
@@ -343,6 +478,8 @@ class ParallelizationManager():
         :param travel_info_dict : dictionary (o_node, d_node) -> (cfv, tt, dis)
         """
         self._checkFunctionCall()
+        if self.rv_results_buffer is not None:
+            travel_info_dict = self.rv_results_buffer.write(encode_travel_infos(travel_info_dict))
         c = 0
         for i in range(self.number_cores):
             # LOG.debug(f"Queue put {SET_RV_RESULTS}")
@@ -457,7 +594,7 @@ class ParallelizationManager():
 #===============================================================================================================#
 
 class ParallelProcess():
-    def __init__(self, q_in, q_out, process_id, scenario_parameters, dir_names):
+    def __init__(self, q_in, q_out, process_id, scenario_parameters, dir_names, *, shared_table_handles=None):
         """ this class carries out the computation tasks distributed from the parallelization manager
         communication is made via two multiprocessing.Queue() objects; the functions to be excuted are communcated via the global communication codes
         this process mimics AlonsoMoraAssignment-classes with only a subset of vehicles (mostly one); 
@@ -467,6 +604,7 @@ class ParallelProcess():
         :param process_id: id defined in the manager class of this process class
         :param scenario_parameters: scenario parameter entries to set up the process
         :param dir_names: dir_name paths from the simulation environment to set up the process
+        :param shared_table_handles: handles of travel time tables in shared memory (see TravelInfoTables.py)
         """
         # routing engine
         self.sleep_time = 0.1   # short waiting time in case another process is still busy
@@ -511,7 +649,10 @@ class ParallelProcess():
         LOG.info(f"Initialization of network and routing engine... on {self.process_id}")   # load the network TODO this should be communicated in a better fashion since this is allready defined
         network_type = self.scenario_parameters[G_NETWORK_TYPE]
         network_dynamics_file = self.scenario_parameters.get(G_NW_DYNAMIC_F, None)
-        self.routing_engine = load_routing_engine(network_type, self.dir_names[G_DIR_NETWORK], network_dynamics_file_name=network_dynamics_file)
+        attach_shared_travel_info_tables(shared_table_handles)
+        self.routing_engine = load_routing_engine(network_type, self.dir_names[G_DIR_NETWORK], network_dynamics_file_name=network_dynamics_file,
+                                                  table_mode=self.scenario_parameters.get(G_NW_TABLE_MODE),
+                                                  route_cache_size=self.scenario_parameters.get(G_NW_ROUTE_CACHE_SIZE))
 
         self.new_routing_data_loaded = False    # flag to tell if network changed
 
@@ -529,6 +670,7 @@ class ParallelProcess():
         self.fo_v2r = {}    #fo_id -> vid -> rid -> 1
 
         self.current_Xto1_targets = []  # sets targets to compute Xto1 routing queries in parallel
+        self.attached_shared_blocks = {}    # shared memory name -> SharedMemory of buffers written by the manager
 
         # LOG.debug("_____________________________________")
         # LOG.debug(f"PARALLEL PROCESS INITIALIZED! on {self.process_id}")
@@ -615,8 +757,11 @@ class ParallelProcess():
                         self.q_in.put(x)
                         time.sleep(self.sleep_time)
                     else:
+                        travel_info_dict = x[1][0]
+                        if type(travel_info_dict) == tuple:    # handle of shared buffer -> has to be read before confirming
+                            travel_info_dict = decode_travel_infos(read_shared_array(travel_info_dict, self.attached_shared_blocks))
                         self.q_out.put(SET_RV_RESULTS)
-                        self.routing_engine.add_travel_infos_to_database(*x[1])
+                        self.routing_engine.add_travel_infos_to_database(travel_info_dict)
                 elif x[0] == UPDATE_V2RBS_AND_COMPUTE_NEW:  # update und compute v2rb database for a set of vehicles
                     if type(x[1]) == tuple:
                         res = self._update_v2rbs_and_compute_new(*x[1])
@@ -763,9 +908,13 @@ class ParallelProcess():
         # raise NotImplementedError
         const_bt = fo_data["std_bt"]
         add_bt = fo_data["add_bt"]
+        rid2_list = list(rid_to_consider_for_global_optimisation.keys())
+        rr_filter = GeneralPoolingFunctions.RRCandidateFilter([active_requests[rid2] for rid2 in rid2_list], self.routing_engine,
+                                                              active=fo_data["operator_attributes"].get(G_RA_AM_RR_FILTER, False))
         for rid in rid_list:
             rq1 = active_requests[rid]
-            for rid2 in rid_to_consider_for_global_optimisation.keys():
+            for index in rr_filter.get_candidate_indices(rq1).tolist():
+                rid2 = rid2_list[index]
                 if rid != rid2:
                     if rid_to_mutually_exclusive_cluster_id.get(rid) is None or rid_to_mutually_exclusive_cluster_id.get(rid2) is None or rid_to_mutually_exclusive_cluster_id.get(rid) != rid_to_mutually_exclusive_cluster_id.get(rid2):
                         rq2 = active_requests[rid2]
@@ -786,8 +935,10 @@ class ParallelProcess():
 
     def _setXto1TargetLocations(self, target_locations):
         """ this function sets targets that have to be computed by a routing Xto1 query (mostly vehicle locations)
-        :param target_locations: target locations for the routing query (the 1)
+        :param target_locations: target locations for the routing query (the 1) or handle of the shared buffer
         """
+        if type(target_locations) == tuple:
+            target_locations = decode_positions(read_shared_array(target_locations, self.attached_shared_blocks))
         self.current_Xto1_targets = target_locations
 
     def _return_travel_costs_XtoTargets_in_time_range(self, list_origin_positions, list_target_positions, time_range):
@@ -61,6 +61,8 @@ class MoiaParallelizationManager(ParallelizationManager):
         self.last_update_network_call = -1
         self.update_offer_id = 0
 
+        self._init_shared_buffers()
+
     def _checkFunctionCall(self, function_id = -1):
         """ check if this function call is feasible respective to the last function call and if all results are fetched
         raises error if not
@@ -90,8 +90,10 @@ class V2RB():
 
     def updateAndCheckFeasibility(self, routing_engine : NetworkBase, obj_function : Callable, veh_obj : SimulationVehicleStruct,
                                   rq_dict : Dict[Any, PlanRequest], sim_time : int, list_passed_VRLs : List[VehicleRouteLeg]=None,
-                                  is_assigned : bool=False):
-        """ checks the feasibility of the v2rb after vehicle state updates from last simulation time step"""
+                                  is_assigned : bool=False, reuse_leg_travel_infos : bool=False):
+        """ checks the feasibility of the v2rb after vehicle state updates from last simulation time step
+        if reuse_leg_travel_infos, only legs that changed (e.g. the first leg after the vehicle moved) are routed again;
+        the plans are still fully re-evaluated at the new simulation time"""
         if list_passed_VRLs is None:
             list_passed_VRLs = []
         new_veh_plans = []
@@ -99,7 +101,8 @@ class V2RB():
         if not is_assigned:
             for i, veh_plan in enumerate(self.veh_plans):
                 veh_plan.update_plan(veh_obj, sim_time, routing_engine, list_passed_VRLs=list_passed_VRLs,
-                                     keep_time_infeasible=False)
+                                     keep_time_infeasible=False,
+                                     reuse_leg_travel_infos=reuse_leg_travel_infos)
                 if veh_plan.is_feasible():
                     new_veh_plans.append(veh_plan)
         else:
@@ -107,7 +110,8 @@ class V2RB():
             for i, veh_plan in enumerate(self.veh_plans):
                 if is_assigned and i == 0:
                     veh_plan.update_plan(veh_obj, sim_time, routing_engine, list_passed_VRLs=list_passed_VRLs,
-                                         keep_time_infeasible=True)
+                                         keep_time_infeasible=True,
+                                         reuse_leg_travel_infos=reuse_leg_travel_infos)
                     if veh_plan.is_feasible():
                         new_veh_plans.append(veh_plan)
                     elif veh_plan.is_structural_feasible():
@@ -116,7 +120,8 @@ class V2RB():
                         LOG.warning("(assigned) vehicle plan became structural infeasible! {}".format(veh_plan))
                 else:
                     veh_plan.update_plan(veh_obj, sim_time, routing_engine, list_passed_VRLs=list_passed_VRLs,
-                                         keep_time_infeasible=False)
+                                         keep_time_infeasible=False,
+                                         reuse_leg_travel_infos=reuse_leg_travel_infos)
                     if veh_plan.is_feasible():
                         new_veh_plans.append(veh_plan)
             if len(new_veh_plans) == 0:
@@ -13,12 +13,54 @@ from typing import Callable, List, Dict, Any, Tuple
 import logging
 LOG = logging.getLogger(__name__)
 
+SLACK_TOLERANCE = 0.001  # insertions are only rejected by slack if the delay exceeds the slack by more than this value
+USE_INSERTION_SLACK = True  # if False, all insertions of simple_insert() are checked completely
+
+
+def _check_insertion_delay(routing_engine : NetworkBase, prev_pos : tuple, prev_departure_time : float,
+                           new_plan_stop : PlanStop, pax_info : dict, next_pos : tuple, next_arrival_time : float,
+                           next_slack : float) -> Tuple[float, bool]:
+    """This function evaluates the insertion of new_plan_stop between two plan stops of a feasible vehicle plan with
+    the planned times and slack of VehiclePlan.get_insertion_slack(). The start time of the new plan stop is computed
+    like in VehiclePlan.update_tt_and_check_plan().
+
+    :param routing_engine: Network
+    :param prev_pos: position of the previous plan stop (or the vehicle)
+    :param prev_departure_time: planned departure time at the previous plan stop (or the current time)
+    :param new_plan_stop: inserted plan stop
+    :param pax_info: pax info of the vehicle plan (required for maximum trip time constraints of new_plan_stop)
+    :param next_pos: position of the next plan stop; None if new_plan_stop is inserted at the end of the plan
+    :param next_arrival_time: planned arrival time at the next plan stop
+    :param next_slack: slack of the next plan stop
+    :return: (planned start time of new_plan_stop, False if insertion is infeasible | True if it has to be checked)
+    """
+    c_time = prev_departure_time
+    new_pos = new_plan_stop.get_pos()
+    if prev_pos != new_pos:
+        c_time += routing_engine.return_travel_costs_1to1(prev_pos, new_pos)[1]
+    earliest_time = new_plan_stop.get_earliest_start_time()
+    if c_time < earliest_time:
+        c_time = earliest_time
+    start_time = c_time
+    if start_time > new_plan_stop.get_latest_start_time(pax_info):
+        return start_time, False
+    if next_pos is None:
+        return start_time, True
+    c_time = new_plan_stop.get_departure_time(start_time)
+    if new_pos != next_pos:
+        c_time += routing_engine.return_travel_costs_1to1(new_pos, next_pos)[1]
+    return start_time, c_time - next_arrival_time <= next_slack + SLACK_TOLERANCE
+
 
 def simple_insert(routing_engine : NetworkBase, sim_time : int, veh_obj : SimulationVehicle, orig_veh_plan : VehiclePlan, 
                   new_prq_obj : PlanRequest, std_bt : int, add_bt : int,
                   skip_first_position_insertion : bool=False) -> List[VehiclePlan]:
     """This method inserts the stops for the new request at all possible positions of orig_veh_plan and returns a
     generator that only yields the feasible solutions and None in the other case.
+    Insertions of new plan stops are first evaluated with the slack of the plan stops (VehiclePlan.get_insertion_slack)
+    and only copied and checked completely if the detour is not larger than the slack. The slack of orig_veh_plan is
+    taken from VehiclePlan.get_current_insertion_slack(), i.e. the plan is only copied and checked for it if its planned
+    times are not up to date for the current vehicle state.
 
     :param routing_engine: Network
     :param sim_time: current simulation time
@@ -43,6 +85,13 @@ def simple_insert(routing_engine : NetworkBase, sim_time : int, veh_obj : Simula
     prq_o_stop_pos, prq_t_pu_earliest, prq_t_pu_latest = new_prq_obj.get_o_stop_info()
     new_rid_struct = new_prq_obj.get_rid_struct()
 
+    # planned times and slack of the original plan for the current vehicle state
+    o_slack_times = None
+    if USE_INSERTION_SLACK:
+        current_insertion_slack = orig_veh_plan.get_current_insertion_slack(veh_obj, sim_time, routing_engine)
+        if current_insertion_slack is not None:
+            o_pax_info, (o_arrival_times, o_departure_times, o_slack_times) = current_insertion_slack
+
     skip_next = -1
     if skip_first_position_insertion:
         skip_next = 0
@@ -52,9 +101,9 @@ def simple_insert(routing_engine : NetworkBase, sim_time : int, veh_obj : Simula
             break
         if orig_veh_plan.list_plan_stops[i].is_locked() or orig_veh_plan.list_plan_stops[i].is_infeasible_locked():
             continue
-        next_o_plan = orig_veh_plan.copy()
         # only allow combination of boarding tasks if the existing one is not locked (has not started)
-        if not next_o_plan.list_plan_stops[i].is_locked() and not next_o_plan.list_plan_stops[i].is_locked_end() and prq_o_stop_pos == next_o_plan.list_plan_stops[i].get_pos():
+        if not orig_veh_plan.list_plan_stops[i].is_locked() and not orig_veh_plan.list_plan_stops[i].is_locked_end() and prq_o_stop_pos == orig_veh_plan.list_plan_stops[i].get_pos():
+            next_o_plan = orig_veh_plan.copy()
             old_pstop = next_o_plan.list_plan_stops[i]
             new_boarding_list = old_pstop.get_list_boarding_rids() + [new_rid_struct]
             new_boarding_dict = {-1:old_pstop.get_list_alighting_rids(), 1:new_boarding_list}
@@ -87,6 +136,20 @@ def simple_insert(routing_engine : NetworkBase, sim_time : int, veh_obj : Simula
             new_plan_stop = BoardingPlanStop(prq_o_stop_pos, boarding_dict={1:[new_rid_struct]}, earliest_pickup_time_dict={new_rid_struct : prq_t_pu_earliest},
                                              latest_pickup_time_dict={new_rid_struct : prq_t_pu_latest}, change_nr_pax=new_prq_obj.nr_pax,
                                              duration=std_bt)
+            if o_slack_times is not None:
+                if i == 0:
+                    prev_pos, prev_departure_time = veh_obj.pos, sim_time
+                else:
+                    prev_pos, prev_departure_time = orig_veh_plan.list_plan_stops[i-1].get_pos(), o_departure_times[i-1]
+                planned_pu, possibly_feasible = _check_insertion_delay(routing_engine, prev_pos, prev_departure_time,
+                                                                       new_plan_stop, o_pax_info,
+                                                                       orig_veh_plan.list_plan_stops[i].get_pos(),
+                                                                       o_arrival_times[i], o_slack_times[i])
+                if not possibly_feasible:
+                    if planned_pu > prq_t_pu_latest:
+                        o_prq_feasible = False
+                    continue
+            next_o_plan = orig_veh_plan.copy()
             next_o_plan.list_plan_stops[i:i] = [new_plan_stop]
             #LOG.debug(f"test else boarding: {next_o_plan}")
             is_feasible = next_o_plan.update_tt_and_check_plan(veh_obj, sim_time, routing_engine)
@@ -107,12 +170,21 @@ def simple_insert(routing_engine : NetworkBase, sim_time : int, veh_obj : Simula
         new_plan_stop = BoardingPlanStop(prq_o_stop_pos, boarding_dict={1:[new_rid_struct]}, earliest_pickup_time_dict={new_rid_struct : prq_t_pu_earliest},
                                             latest_pickup_time_dict={new_rid_struct : prq_t_pu_latest}, change_nr_pax=new_prq_obj.nr_pax,
                                             duration=std_bt)
-        next_o_plan = orig_veh_plan.copy()
-        next_o_plan.list_plan_stops[i:i] = [new_plan_stop]
-        #LOG.debug(f"test at end: {next_o_plan}")
-        is_feasible = next_o_plan.update_tt_and_check_plan(veh_obj, sim_time, routing_engine)
-        if is_feasible:
-            tmp_plans[i] = next_o_plan
+        possibly_feasible = True
+        if o_slack_times is not None:
+            if i == 0:
+                prev_pos, prev_departure_time = veh_obj.pos, sim_time
+            else:
+                prev_pos, prev_departure_time = orig_veh_plan.list_plan_stops[i-1].get_pos(), o_departure_times[i-1]
+            _, possibly_feasible = _check_insertion_delay(routing_engine, prev_pos, prev_departure_time, new_plan_stop,
+                                                          o_pax_info, None, None, None)
+        if possibly_feasible:
+            next_o_plan = orig_veh_plan.copy()
+            next_o_plan.list_plan_stops[i:i] = [new_plan_stop]
+            #LOG.debug(f"test at end: {next_o_plan}")
+            is_feasible = next_o_plan.update_tt_and_check_plan(veh_obj, sim_time, routing_engine)
+            if is_feasible:
+                tmp_plans[i] = next_o_plan
 
     # add d_stop for all tmp_plans
     d_stop_pos, prq_t_do_latest, prq_max_trip_time = new_prq_obj.get_d_stop_info()  # TODO # the checks with t_do_latest and max_trip_time can be confusing!
@@ -120,6 +192,9 @@ def simple_insert(routing_engine : NetworkBase, sim_time : int, veh_obj : Simula
     for o_index, tmp_next_plan in tmp_plans.items():
         d_feasible = True  # once latest arrival is reached, no insertion at later index is feasible for current pick-up
         number_stops = len(tmp_next_plan.list_plan_stops)
+        # tmp_next_plan was checked for the current vehicle state -> planned times are up to date
+        if USE_INSERTION_SLACK:
+            d_arrival_times, d_departure_times, d_slack_times = tmp_next_plan.get_insertion_slack()
         # always start checking plans after pick-up of new_prq_obj -> everything before is feasible and stay the same
         next_d_plan = tmp_next_plan.copy()
         init_plan_state = next_d_plan.return_intermediary_plan_state(veh_obj, sim_time, routing_engine, o_index)
@@ -127,9 +202,9 @@ def simple_insert(routing_engine : NetworkBase, sim_time : int, veh_obj : Simula
         for j in second_iterator:
             if not d_feasible:
                 break
-            # reload the plan without d-insertion
-            next_d_plan = tmp_next_plan.copy()
-            if d_stop_pos == next_d_plan.list_plan_stops[j].get_pos() and not next_d_plan.list_plan_stops[j].is_locked_end():
+            if d_stop_pos == tmp_next_plan.list_plan_stops[j].get_pos() and not tmp_next_plan.list_plan_stops[j].is_locked_end():
+                # reload the plan without d-insertion
+                next_d_plan = tmp_next_plan.copy()
                 old_pstop = next_d_plan.list_plan_stops[j]
                 # combine with last stop if it is at the same location (combine constraints)
                 new_alighting_list = old_pstop.get_list_alighting_rids() + [new_rid_struct]
@@ -165,6 +240,19 @@ def simple_insert(routing_engine : NetworkBase, sim_time : int, veh_obj : Simula
                 # add it after this stop else
                 new_plan_stop = BoardingPlanStop(d_stop_pos, boarding_dict={-1: [new_rid_struct]}, max_trip_time_dict={new_rid_struct : prq_max_trip_time},
                                                  change_nr_pax=-new_prq_obj.nr_pax, duration=std_bt)
+                if USE_INSERTION_SLACK:
+                    planned_do, possibly_feasible = _check_insertion_delay(routing_engine,
+                                                                           tmp_next_plan.list_plan_stops[j-1].get_pos(),
+                                                                           d_departure_times[j-1], new_plan_stop,
+                                                                           tmp_next_plan.pax_info,
+                                                                           tmp_next_plan.list_plan_stops[j].get_pos(),
+                                                                           d_arrival_times[j], d_slack_times[j])
+                    if not possibly_feasible:
+                        if planned_do > prq_t_do_latest:
+                            d_feasible = False
+                        continue
+                # reload the plan without d-insertion
+                next_d_plan = tmp_next_plan.copy()
                 next_d_plan.list_plan_stops[j:j] = [new_plan_stop]
                 # check constraints > yield plan if feasible
                 #LOG.debug(f"test with deboarding: {next_d_plan}")
@@ -178,10 +266,16 @@ def simple_insert(routing_engine : NetworkBase, sim_time : int, veh_obj : Simula
                         d_feasible = False
 
         if skip_next != number_stops and not tmp_next_plan.list_plan_stops[-1].is_locked_end():
-            next_d_plan = tmp_next_plan.copy()
             j = number_stops
             new_plan_stop = BoardingPlanStop(d_stop_pos, boarding_dict={-1: [new_rid_struct]}, max_trip_time_dict={new_rid_struct : prq_max_trip_time},
                                                 change_nr_pax=-new_prq_obj.nr_pax, duration=std_bt)
+            if USE_INSERTION_SLACK:
+                _, possibly_feasible = _check_insertion_delay(routing_engine, tmp_next_plan.list_plan_stops[j-1].get_pos(),
+                                                              d_departure_times[j-1], new_plan_stop, tmp_next_plan.pax_info,
+                                                              None, None, None)
+                if not possibly_feasible:
+                    continue
+            next_d_plan = tmp_next_plan.copy()
             next_d_plan.list_plan_stops[j:j] = [new_plan_stop]
             # check constraints > yield plan if feasible
             #LOG.debug(f"test with deboarding: {next_d_plan}")
@@ -39,6 +39,9 @@ class AlonsoMoraRepositioning(RepositioningBase):
     """
     def __init__(self, fleetctrl : FleetControlBase, operator_attributes: dict, dir_names: dict, solver: str = "Gurobi"):
         super().__init__(fleetctrl, operator_attributes, dir_names, solver=solver)
+        if self.solver_key not in ("Gurobi", "HiGHS"):
+            LOG.warning(f"{self.__class__.__name__} is only implemented for Gurobi and HiGHS! -> Gurobi is used instead of {self.solver_key}")
+            self.solver_key = "Gurobi"
         self._rejected_customer_origins_since_last_step = []
         self.min_reservation_buffer = operator_attributes.get(G_OP_REPO_RES_PUF, 3600)  # TODO  # minimum time for service before a vehicle has a reserved trip
         
@@ -88,6 +91,8 @@ class AlonsoMoraRepositioning(RepositioningBase):
                     
         if self.solver_key == "Gurobi":
             vid_to_repo_target = self._solve_gurobi(vid_to_origin_to_tt, origin_to_counts, sim_time)
+        elif self.solver_key == "HiGHS":
+            vid_to_repo_target = self._solve_highs(vid_to_origin_to_tt, origin_to_counts, sim_time)
         else:
             raise NotImplementedError(f"optimizer {self.solver_key} not implemented here!")
         
@@ -198,4 +203,66 @@ class AlonsoMoraRepositioning(RepositioningBase):
                             f" -> no repositioning")
                 new_assignments = {}
 
-            return new_assignments
\ No newline at end of file
+            return new_assignments
+
+    def _solve_highs(self, vid_to_origin_tt, origin_to_counts, sim_time):
+        """ solves the assignment problem vehicle -> repo target using HiGHS (scipy.optimize.milp)
+        :param vid_to_origin_to_tt: dict vehicle_id -> repo target position -> travel time of all possibilities
+        :param origin_to_counts: dict target position -> number of occurances
+        :return dict vid ->  repo target (assignment)"""
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        from scipy.sparse import csr_matrix
+
+        list_of_values = []
+        var2vid_o = []  # var -> (vid, repo target)
+        vid_constr_dict = {}    # vid -> list var
+        pos_constr_dict = {}    # pos_key -> list var
+        for vid, o_dict in vid_to_origin_tt.items():
+            for rej_o in o_dict.keys():
+                var = len(var2vid_o)
+                var2vid_o.append((vid, rej_o))
+                list_of_values.append(o_dict[rej_o])
+                try:
+                    vid_constr_dict[vid].append(var)
+                except KeyError:
+                    vid_constr_dict[vid] = [var]
+                try:
+                    pos_constr_dict[rej_o].append(var)
+                except KeyError:
+                    pos_constr_dict[rej_o] = [var]
+        number_vars = len(var2vid_o)
+        if number_vars == 0:
+            return {}
+
+        assign_all_vehicles = False
+        if len(vid_constr_dict.keys()) <= len(self._rejected_customer_origins_since_last_step):
+            assign_all_vehicles = True
+
+        rows = []
+        cols = []
+        c_lb = []
+        c_ub = []
+        for vid, varlist in vid_constr_dict.items():
+            rows.extend([len(c_lb)] * len(varlist))
+            cols.extend(varlist)
+            c_lb.append(1 if assign_all_vehicles else -np.inf)
+            c_ub.append(1)
+        for rej_o, varlist in pos_constr_dict.items():
+            rows.extend([len(c_lb)] * len(varlist))
+            cols.extend(varlist)
+            c_lb.append(-np.inf if assign_all_vehicles else origin_to_counts[rej_o])
+            c_ub.append(origin_to_counts[rej_o])
+        a_matrix = csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(c_lb), number_vars))
+        res = milp(np.array(list_of_values, dtype=float), constraints=LinearConstraint(a_matrix, c_lb, c_ub),
+                   integrality=np.ones(number_vars), bounds=Bounds(0, 1), options={"disp" : False, "time_limit" : TIME_OUT})
+
+        new_assignments = {}
+        if res.status == 0:
+            for x in range(number_vars):
+                if round(res.x[x]) == 1:
+                    vid, rej_o = var2vid_o[x]
+                    new_assignments[vid] = rej_o
+        else:
+            LOG.warning(f"Operator {self.fleetctrl.op_id}: No Optimal Solution! status {res.status} ({res.message})"
+                        f" -> no repositioning")
+        return new_assignments
@@ -40,7 +40,7 @@ INPUT_PARAMETERS_DensityRepositioning = {
 
 class DensityRepositioning(RepositioningBase):
     """This class implements Density Based Repositioning Algorithm from Frontiers paper of Arslan and Florian """
-    def __init__(self, fleetctrl, operator_attributes, dir_names):
+    def __init__(self, fleetctrl, operator_attributes, dir_names, solver="Gurobi"):
         """Initialization of repositioning class.
 
         :param fleetctrl: FleetControl class
@@ -48,7 +48,10 @@ class DensityRepositioning(RepositioningBase):
         :param dir_names: directory structure dict
         :param solver: solver for optimization problems
         """
-        super().__init__(fleetctrl, operator_attributes, dir_names)
+        super().__init__(fleetctrl, operator_attributes, dir_names, solver=solver)
+        if self.solver_key != "Gurobi":
+            LOG.warning(f"{self.__class__.__name__} is only implemented for Gurobi! -> Gurobi is used instead of {self.solver_key}")
+            self.solver_key = "Gurobi"
         self.distance_cost = np.mean([veh_obj.distance_cost for veh_obj in fleetctrl.sim_vehicles])/1000
         self.zone_corr_matrix = np.array(self._return_squared_zone_imbalance_np_array())
         self.gamma = operator_attributes.get(G_OP_REPO_GAMMA, 1.0)
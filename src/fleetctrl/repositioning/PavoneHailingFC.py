@@ -129,9 +129,12 @@ class PavoneHailingRepositioningFC(RepositioningBase):
         if self.solver_key == "Gurobi":
             alpha_od, od_reposition_trips = self._optimization_gurobi(sim_time, list_zones, v_i_e_dict, v_i_d_dict,
                                                                       number_idle_vehicles, zone_dict)
-        elif self.solver_key == "Cplex":
+        elif self.solver_key in ("CPLEX", "Cplex"):
             alpha_od, od_reposition_trips = self._optimization_cplex(sim_time, list_zones, v_i_e_dict, v_i_d_dict,
                                                                      number_idle_vehicles, zone_dict)
+        elif self.solver_key == "HiGHS":
+            alpha_od, od_reposition_trips = self._optimization_highs(sim_time, list_zones, v_i_e_dict, v_i_d_dict,
+                                                                     number_idle_vehicles, zone_dict)
         else:
             raise IOError(f"Solver {self.solver_key} not available!")
 
@@ -329,6 +332,83 @@ class PavoneHailingRepositioningFC(RepositioningBase):
                     od_reposition_trips.extend([(o_region, d_region)] * round_solution_integer)
         return alpha_od, od_reposition_trips
 
+    def _optimization_highs(self, sim_time, list_zones, v_i_e_dict, v_i_d_dict, number_idle_vehicles, zone_dict):
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        from scipy.sparse import csr_matrix
+        # decision variables
+        number_regions = len(list_zones)
+        number_vars = number_regions ** 2 - number_regions
+        list_of_values = []
+        var_counter = 0
+        o2var = {}  # o -> list of var with repositioning trips from o
+        d2var = {}  # d -> list of var with repositioning trips to d
+        var2od = {}  # var -> (o,d)
+        for o_region in list_zones:
+            for d_region in list_zones:
+                if o_region == d_region:
+                    continue
+                t_od, _ = self._get_od_zone_travel_info(sim_time, o_region, d_region)
+                list_of_values.append(t_od)
+                try:
+                    o2var[o_region].append(var_counter)
+                except KeyError:
+                    o2var[o_region] = [var_counter]
+                try:
+                    d2var[d_region].append(var_counter)
+                except KeyError:
+                    d2var[d_region] = [var_counter]
+                var2od[var_counter] = (o_region, d_region)
+                var_counter += 1
+        alpha_od = np.zeros((number_regions, number_regions))
+        od_reposition_trips = []
+        if number_vars == 0:
+            return alpha_od, od_reposition_trips
+        # constraints: balance (incoming - outgoing >= v_i_d - v_i_e) and outgoing <= idle vehicles for each region
+        rows = []
+        cols = []
+        vals = []
+        c_lb = []
+        c_ub = []
+        c_counter = 0
+        for region in list_zones:
+            list_o_vars = o2var.get(region, [])
+            list_d_vars = d2var.get(region, [])
+            rows.extend([c_counter] * (len(list_d_vars) + len(list_o_vars)))
+            cols.extend(list_d_vars + list_o_vars)
+            vals.extend([1] * len(list_d_vars) + [-1] * len(list_o_vars))
+            c_lb.append(v_i_d_dict.get(region, 0) - v_i_e_dict.get(region, 0))
+            c_ub.append(np.inf)
+            c_counter += 1
+            rows.extend([c_counter] * len(list_o_vars))
+            cols.extend(list_o_vars)
+            vals.extend([1] * len(list_o_vars))
+            c_lb.append(-np.inf)
+            c_ub.append(number_idle_vehicles.get(region, 0))
+            c_counter += 1
+        a_matrix = csr_matrix((vals, (rows, cols)), shape=(c_counter, number_vars))
+        options = {"disp" : False}
+        if self.optimisation_timeout:
+            options["time_limit"] = self.optimisation_timeout
+        res = milp(np.array(list_of_values, dtype=float), constraints=LinearConstraint(a_matrix, c_lb, c_ub),
+                   integrality=np.ones(number_vars), bounds=Bounds(0, np.inf), options=options)
+
+        # retrieve solution and create od-vehicle list
+        # --------------------------------------------
+        if res.status == 0:
+            for x in range(number_vars):
+                round_solution_integer = int(round(res.x[x], 0))
+                if round_solution_integer > 0:
+                    (o_region, d_region) = var2od[x]
+                    i = zone_dict[o_region]
+                    j = zone_dict[d_region]
+                    alpha_od[i, j] = round_solution_integer
+                    od_reposition_trips.extend([(o_region, d_region)] * round_solution_integer)
+        else:
+            LOG.warning(f"Operator {self.fleetctrl.op_id}: No Optimal Solution! status {res.status} ({res.message})"
+                        f" -> no repositioning")
+        return alpha_od, od_reposition_trips
+
+
 INPUT_PARAMETERS_PavoneHailingV2RepositioningFC = {
     "doc" : """This class implements an adaption of the real-time rebalancing policy formulated in section 4.3 of
     Zhang, R.; Pavone, M. (2016): Control of robotic mobility-on-demand systems. A queueing-theoretical perspective.
@@ -343,6 +423,7 @@ INPUT_PARAMETERS_PavoneHailingV2RepositioningFC = {
     "optional_modules": []
 }
 
+
 class PavoneHailingV2RepositioningFC(PavoneHailingRepositioningFC):
     """This class implements an adaption of the real-time rebalancing policy formulated in section 4.3 of
     Zhang, R.; Pavone, M. (2016): Control of robotic mobility-on-demand systems. A queueing-theoretical perspective.
@@ -434,9 +515,12 @@ class PavoneHailingV2RepositioningFC(PavoneHailingRepositioningFC):
         if self.solver_key == "Gurobi":
             alpha_od, od_reposition_trips = self._optimization_gurobi(sim_time, list_zones, v_i_e_dict, v_i_d_dict,
                                                                       number_idle_vehicles, zone_dict)
-        elif self.solver_key == "Cplex":
+        elif self.solver_key in ("CPLEX", "Cplex"):
             alpha_od, od_reposition_trips = self._optimization_cplex(sim_time, list_zones, v_i_e_dict, v_i_d_dict,
                                                                      number_idle_vehicles, zone_dict)
+        elif self.solver_key == "HiGHS":
+            alpha_od, od_reposition_trips = self._optimization_highs(sim_time, list_zones, v_i_e_dict, v_i_d_dict,
+                                                                     number_idle_vehicles, zone_dict)
         else:
             raise IOError(f"Solver {self.solver_key} not available!")
 
@@ -88,6 +88,15 @@ class ReservationBase(metaclass=ABCMeta):
         :return: offer for request """
         pass
 
+    def get_next_event_time(self, sim_time : int) -> float:
+        """ this function returns the next simulation time at which reservation requests have to be processed
+        (per default in every time step as long as reservation requests are active)
+        :param sim_time: current simulation time
+        :return: next event time (inf if none) """
+        if self.active_reservation_requests:
+            return sim_time
+        return float("inf")
+
     @abstractmethod
     def time_trigger(self, sim_time : int):
         """ this function is triggered during the simulation time and might trigger reoptimization processes for example 
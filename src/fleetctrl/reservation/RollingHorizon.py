@@ -110,6 +110,18 @@ class RollingHorizonReservation(ReservationBase):
             del self.rid_to_assigned_vid[rid]
             del self.active_reservation_requests[rid]
 
+    def get_next_event_time(self, sim_time):
+        """ this function returns the next simulation time at which reservation requests are revealed to the online
+        optimization
+        :param sim_time: current simulation time
+        :return: next event time (inf if none) """
+        if len(self.active_reservation_requests) > len(self.sorted_rids_with_epa):
+            # unconfirmed reservation requests
+            return sim_time
+        if self.sorted_rids_with_epa:
+            return self.sorted_rids_with_epa[0][1] - self.rolling_horizon
+        return float("inf")
+
     def time_trigger(self, sim_time):
         """ this function is triggered during the simulation time and might trigger reoptimization processes for example 
         :param sim_time: simulation time """
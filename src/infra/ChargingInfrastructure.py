@@ -25,6 +25,7 @@ from src.misc.globals import *
 from src.simulation.StationaryProcess import ChargingProcess
 from src.fleetctrl.planning.VehiclePlan import ChargingPlanStop, VehiclePlan, RoutingTargetPlanStop
 from src.misc.config import decode_config_str
+from src.misc.output_writer import submit_output_task
 if TYPE_CHECKING:
     from src.routing.NetworkBase import NetworkBase
     from src.simulation.Vehicles import SimulationVehicle
@@ -357,9 +358,13 @@ class ChargingStation:
         file = Path(ChargingStation.station_history_file_path)
         if len(ChargingStation.station_history) > 0:
             df = DataFrame(ChargingStation.station_history)
-            df.to_csv(file, index=False, mode="a", header=not file.exists())
+            submit_output_task(ChargingStation._append_history_to_file, df, file)
             ChargingStation.station_history = defaultdict(list)
 
+    @staticmethod
+    def _append_history_to_file(df, file):
+        df.to_csv(file, index=False, mode="a", header=not file.exists())
+
     @staticmethod
     def set_history_file_path(path):
         ChargingStation.station_history_file_path = Path(path)
@@ -623,6 +628,18 @@ class PublicChargingInfrastructureOperator:
                                 LOG.warning("couldnt cancel charging booking {}".format(booking_id))
                         
     
+    def get_next_event_time(self, sim_time):
+        """ returns the next simulation time at which unrealized bookings might have to be removed
+        (bookings are checked one time step before their end)
+        :param sim_time: simulation time
+        :return: next event time (inf if no bookings) """
+        next_event = float("inf")
+        for charging_station in self.station_by_id.values():
+            for schedule in charging_station.get_current_schedules(sim_time).values():
+                if len(schedule) > 0:
+                    next_event = min(next_event, min(x[1] for x in schedule) - self.sim_time_step)
+        return next_event
+
     def time_trigger(self, sim_time):
         """ this method is triggered in each simulation time step
         :param sim_time: simulation time"""
@@ -33,6 +33,11 @@ class PerfectForecastZoneSystem(ZoneSystem):
             del tmp_scenario_parameters[G_FC_FNAME] 
         super().__init__(zone_network_dir, tmp_scenario_parameters, dir_names)
 
+    def register_demand_ref(self, demand_ref):
+        super().register_demand_ref(demand_ref)
+        if getattr(demand_ref, "stream_lookahead", None) is not None:
+            LOG.warning(f"perfect forecasts only see streamed requests up to {G_RQ_STREAM_LOOKAHEAD} into the future!")
+
     def _get_trip_forecasts(self, trip_type, t0, t1, aggregation_level):
         """This method returns the number of expected trip arrivals or departures inside a zone in the
         time interval [t0, t1]. The return value is created by interpolation of the forecasts in the data frame
@@ -17,3 +17,50 @@ def draw_from_distribution_dict(distribution):
         probabilities.append(v/normalize)
     return np.random.choice(choices, p=probabilities)
 
+
+
+def draw_from_distribution_dicts(list_distributions, random_state=None):
+    """
+    This function draws a key for each distribution of a list of distributions. The drawn keys are identical to
+    calling draw_from_distribution_dict() for each entry in order, but all random numbers are drawn at once.
+    :param list_distributions: list of dictionaries: key > probability of key (same dictionary objects can be repeated)
+    :param random_state: numpy RandomState used for the draws (None: global numpy random state)
+    :return: list of randomly drawn keys
+    """
+    prepared = {}   # id(distribution) -> (choices, cdf) | (certain key, None)
+    draw_indices = []
+    draw_indices_by_distribution = {}   # id(distribution) -> list of positions in draw_indices
+    drawn_keys = [None] * len(list_distributions)
+    for i, distribution in enumerate(list_distributions):
+        prep = prepared.get(id(distribution))
+        if prep is None:
+            normalize = sum(distribution.values())
+            choices = []
+            probabilities = []
+            for k,v in distribution.items():
+                if v == np.inf:
+                    prep = (k, None)
+                    break
+                choices.append(k)
+                probabilities.append(v/normalize)
+            else:
+                # same computation as in np.random.choice
+                cdf = np.array(probabilities, dtype=np.float64).cumsum()
+                cdf /= cdf[-1]
+                prep = (choices, cdf)
+            prepared[id(distribution)] = prep
+        if prep[1] is None:
+            drawn_keys[i] = prep[0]
+        else:
+            draw_indices_by_distribution.setdefault(id(distribution), []).append(len(draw_indices))
+            draw_indices.append(i)
+    if draw_indices:
+        if random_state is None:
+            random_state = np.random
+        uniform_samples = random_state.random_sample(len(draw_indices))
+        for dist_id, positions in draw_indices_by_distribution.items():
+            choices, cdf = prepared[dist_id]
+            choice_indices = cdf.searchsorted(uniform_samples[positions], side="right")
+            for pos, choice_index in zip(positions, choice_indices.tolist()):
+                drawn_keys[draw_indices[pos]] = choices[choice_index]
+    return drawn_keys
@@ -29,6 +29,11 @@ G_SIM_REPLAY_FLAG = "replay_flag"
 G_SIM_REALTIME_PLOT_FLAG = "realtime_plot"
 G_SIM_REALTIME_PLOT_VEHICLE_STATUS = "realtime_plot_veh_states"
 G_SIM_REALTIME_PLOT_EXTENTS = "realtime_plot_extents"
+G_SIM_SKIP_IDLE_STEPS = "skip_idle_steps"
+G_SIM_OUTPUT_FORMAT = "output_format"
+G_SIM_OUTPUT_BUFFER = "output_buffer_size"
+G_SIM_OUTPUT_QUEUE_SIZE = "output_queue_size"
+G_SIM_CHECKPOINT_INTERVAL = "checkpoint_interval"
 G_NR_OPERATORS = "nr_mod_operators"
 G_NR_CH_OPERATORS = "nr_charging_operators"
 G_LOG_GUROBI = "log_gurobi" # optional; if True gurobi output file written -> default False
@@ -64,6 +69,10 @@ G_NW_DENSITY_T_BIN_SIZE = "nw_density_temporal_bin_size"
 G_NW_DENSITY_AVG_DURATION = "nw_density_avg_duration"
 # network dynamic file
 G_NW_DYNAMIC_F = "nw_dynamic_f"
+# loading mode of preprocessed travel time tables ("memory", "mmap", "mmap_float32", "mmap_uint16")
+G_NW_TABLE_MODE = "nw_table_mode"
+# maximum number of node-to-node routing results stored by routing engines with a route cache
+G_NW_ROUTE_CACHE_SIZE = "nw_route_cache_size"
 
 # zone specific attributes
 G_PARK_COST_SCALE = "park_cost_scale"
@@ -85,6 +94,7 @@ G_PT_FARE_B = "pt_base_fare"
 
 # traveler general attributes
 G_RQ_FILE = "rq_file"
+G_RQ_STREAM_LOOKAHEAD = "demand_stream_lookahead"
 G_RQ_TYP1 = "rq_type"
 G_RQ_TYP2 = "rq_type_distribution"
 G_RQ_TYP3 = "rq_type_od_distribution"
@@ -159,13 +169,16 @@ G_OP_PA_CONST_BT = "op_parcel_const_boarding_time"
 G_OP_PA_ADD_BT = "op_parcel_add_boarding_time"
 
 # operator specific attributes
-G_RA_SOLVER = "op_solver"   # currently "Gurobi" or "CPLEX"
+G_RA_SOLVER = "op_solver"   # currently "Gurobi", "CPLEX" or "HiGHS"
 G_RA_RP_BATCH_OPT = "op_rp_batch_optimizer"
 G_RA_LOCK_TIME = "op_lock_time"
 G_RA_REOPT_TS = "op_reoptimisation_timestep"
 G_RA_TB_TO_PER_VEH = "op_treebuild_timeout_per_veh"
+G_RA_TB_TO_PER_BATCH = "op_treebuild_timeout_per_batch"   # time budget [s] for updating and building all V2RBs of one batch (AlonsoMora)
 G_RA_OPT_TO = "op_optimisation_timeout"
 G_RA_HEU = "op_applied_heuristic"
+G_RA_AM_DELTA = "op_AM_delta_v2rb_update"    # if True, AlonsoMora V2RBs only re-route legs that changed since the last batch
+G_RA_AM_RR_FILTER = "op_AM_rr_candidate_filter"    # if True, AlonsoMora excludes rr-pairs by beeline bounds before the exact check
 G_RA_TW_HARD = "op_time_window_hardness"    # 1 -> soft | 2 -> hard # TODO # think about renaming to update_time_window_hardness
 G_RA_TW_LENGTH = "op_time_window_length"
 G_RA_LOCK_RID_VID = "op_lock_rid_vid_assignment" # no re-assignment if false
@@ -638,6 +651,10 @@ G_FCTRL_CT_RES = "reservation_time_trigger"
 # only evaluate data within specific interval
 G_EVAL_INT_START = "evaluation_int_start"
 G_EVAL_INT_END = "evaluation_int_end"
+# compute standard evaluation KPIs during the simulation (evaluation/online.py) -> default False
+G_EVAL_ONLINE = "online_evaluation"
+# write standard_eval.csv from the online evaluation and skip the standard evaluation of the output files -> default False
+G_EVAL_ONLINE_ONLY = "online_evaluation_only"
 
 # -------------------------------------------------------------------------------------------------------------------- #
 # load functions
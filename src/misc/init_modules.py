@@ -1,5 +1,7 @@
 import importlib
 
+from src.misc.globals import G_FC_TYPE, G_FC_FNAME, G_ZONE_CORR_M_F, G_DIR_FC
+
 # possibly load additional content from development content
 try:
     dev_content = importlib.import_module("dev.misc.init_modules")
@@ -20,6 +22,25 @@ def load_module(module_dict, module_str, module_type_str):
     else:
         raise IOError(f"{module_type_str} {module_str} is invalid!")
 
+# -------------------------------------------------------------------------------------------------------------------- #
+# preloaded module instances (e.g. provided by persistent scenario workers, see src.misc.scenario_runner)
+# > each preloaded instance is handed out only once, later loads with the same key read the input data again
+_PRELOADED_INSTANCES = {}    # key -> instance
+
+
+def set_preloaded_instance(key, instance):
+    """This function registers an already loaded module instance, which is returned by the next load call with the
+    same key instead of loading the data again.
+
+    :param key: key as returned by get_routing_engine_key() or get_zone_system_key()
+    :param instance: loaded routing engine or zone system
+    """
+    _PRELOADED_INSTANCES[key] = instance
+
+
+def _pop_preloaded_instance(key):
+    return _PRELOADED_INSTANCES.pop(key, None)
+
 # -------------------------------------------------------------------------------------------------------------------- #
 # function to get possibilties to load class from specific module
 def get_src_simulation_environments():
@@ -40,6 +61,7 @@ def get_src_routing_engines():
     # FleetPy routing engine options
     re_dict = {}  # str -> (module path, class name)
     re_dict["NetworkBasic"] = ("src.routing.NetworkBasic", "NetworkBasic")
+    re_dict["NetworkBasicCH"] = ("src.routing.NetworkBasicCH", "NetworkBasicCH")
     re_dict["NetworkImmediatePreproc"] = ("src.routing.NetworkImmediatePreproc", "NetworkImmediatePreproc")
     re_dict["NetworkBasicWithStore"] = ("src.routing.NetworkBasicWithStore", "NetworkBasicWithStore")
     re_dict["NetworkPartialPreprocessed"] = ("src.routing.NetworkPartialPreprocessed", "NetworkPartialPreprocessed")
@@ -174,19 +196,64 @@ def load_simulation_environment(scenario_parameters):
     return sim_env_class(scenario_parameters)
 
 
-def load_routing_engine(network_type, network_dir, network_dynamics_file_name=None):
+def load_routing_engine(network_type, network_dir, network_dynamics_file_name=None, table_mode=None,
+                        route_cache_size=None):
     """ This function loads the specific network defined in the config file
     routing_engine.add_init() is not called here! (TODO!?)
     :param network_type: str network_type defined by G_NETWORK_TYPE in config
     :param network_dir: path to corresponding network folder
     :param network_dynamics_file_name: name of network dynamic file to load
+    :param table_mode: loading mode of preprocessed travel time tables (only for networks using tables)
+    :param route_cache_size: maximum size of the route cache (only for networks with a route cache)
     :return: routing engine obj
     """
+    preloaded_instance = _pop_preloaded_instance(get_routing_engine_key(network_type, network_dir,
+                                                                        network_dynamics_file_name, table_mode,
+                                                                        route_cache_size))
+    if preloaded_instance is not None:
+        return preloaded_instance
     # FleetPy routing engine options
     re_dict = get_src_routing_engines()
     # load routing engine instance
     re_class = load_module(re_dict, network_type, "Network module")
-    return re_class(network_dir, network_dynamics_file_name=network_dynamics_file_name)
+    optional_kwargs = {}
+    if table_mode is not None:
+        optional_kwargs["table_mode"] = table_mode
+    if route_cache_size is not None:
+        optional_kwargs["route_cache_size"] = route_cache_size
+    return re_class(network_dir, network_dynamics_file_name=network_dynamics_file_name, **optional_kwargs)
+
+
+def get_routing_engine_key(network_type, network_dir, network_dynamics_file_name=None, table_mode=None,
+                           route_cache_size=None):
+    """This function returns the key identifying a routing engine instance loaded with the given arguments."""
+    return ("routing_engine", network_type, network_dir, network_dynamics_file_name, table_mode, route_cache_size)
+
+
+def load_zone_system(zone_network_dir, scenario_parameters, dir_names):
+    """This function loads the zone system; a perfect forecast zone system is used for forecast type 'perfect'.
+
+    :param zone_network_dir: path to corresponding zone system folder
+    :param scenario_parameters: scenario parameters
+    :param dir_names: directory dictionary
+    :return: zone system obj
+    """
+    preloaded_instance = _pop_preloaded_instance(get_zone_system_key(zone_network_dir, scenario_parameters,
+                                                                     dir_names))
+    if preloaded_instance is not None:
+        return preloaded_instance
+    if scenario_parameters.get(G_FC_TYPE) and scenario_parameters[G_FC_TYPE] == "perfect":
+        from src.infra.PerfectForecastZoning import PerfectForecastZoneSystem
+        return PerfectForecastZoneSystem(zone_network_dir, scenario_parameters, dir_names)
+    else:
+        from src.infra.Zoning import ZoneSystem
+        return ZoneSystem(zone_network_dir, scenario_parameters, dir_names)
+
+
+def get_zone_system_key(zone_network_dir, scenario_parameters, dir_names):
+    """This function returns the key identifying a zone system instance loaded with the given arguments."""
+    return ("zone_system", zone_network_dir, scenario_parameters.get(G_FC_TYPE), scenario_parameters.get(G_FC_FNAME),
+            scenario_parameters.get(G_ZONE_CORR_M_F), dir_names.get(G_DIR_FC))
 
 
 def load_request_module(rq_type_string):
@@ -0,0 +1,476 @@
+# -------------------------------------------------------------------------------------------------------------------- #
+# standard distribution imports
+# -----------------------------
+import os
+import logging
+import queue
+import threading
+import time
+from abc import abstractmethod, ABCMeta
+
+# additional module imports (> requirements)
+# ------------------------------------------
+import numpy as np
+import pandas as pd
+
+# optional: pyarrow is only required for the binary output formats
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+# src imports
+# -----------
+from src.misc.globals import *
+
+LOG = logging.getLogger(__name__)
+
+OUTPUT_FORMAT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+DEFAULT_OUTPUT_FORMAT = "csv"
+DEFAULT_BINARY_OUTPUT_BUFFER_SIZE = 10000
+
+# output service of the running simulation (see start_output_service); None -> output is written synchronously
+_OUTPUT_SERVICE = None
+
+
+# -------------------------------------------------------------------------------------------------------------------- #
+# help functions
+# --------------
+def get_output_format(scenario_parameters):
+    """This function returns the output format of the simulation output files (csv, parquet or feather).
+
+    :param scenario_parameters: scenario parameter dictionary
+    :return: output format string
+    """
+    output_format = scenario_parameters.get(G_SIM_OUTPUT_FORMAT, DEFAULT_OUTPUT_FORMAT)
+    if output_format is None or output_format != output_format:
+        return DEFAULT_OUTPUT_FORMAT
+    output_format = str(output_format).lower()
+    if output_format not in OUTPUT_FORMAT_EXTENSIONS:
+        raise IOError(f"Output format {output_format} is invalid! Possible: {list(OUTPUT_FORMAT_EXTENSIONS.keys())}")
+    if output_format != "csv" and pa is None:
+        raise ImportError(f"Output format {output_format} requires the package pyarrow!")
+    return output_format
+
+
+def get_output_buffer_size(scenario_parameters, default_csv_buffer_size):
+    """This function returns the number of records that are collected before they are written to an output file.
+    Without a scenario input, the module specific buffer size is used for csv output and
+    DEFAULT_BINARY_OUTPUT_BUFFER_SIZE (= row group size) for the binary formats.
+
+    :param scenario_parameters: scenario parameter dictionary
+    :param default_csv_buffer_size: buffer size of the calling module for csv output
+    :return: buffer size
+    """
+    buffer_size = scenario_parameters.get(G_SIM_OUTPUT_BUFFER)
+    if buffer_size is None or buffer_size != buffer_size:
+        if get_output_format(scenario_parameters) == "csv":
+            return default_csv_buffer_size
+        return DEFAULT_BINARY_OUTPUT_BUFFER_SIZE
+    return int(buffer_size)
+
+
+def get_output_file_path(output_dir, file_base_name, scenario_parameters):
+    """This function returns the path of an output file with the extension of the chosen output format.
+
+    :param output_dir: output directory of the scenario
+    :param file_base_name: file name without extension, e.g. 1_user-stats
+    :param scenario_parameters: scenario parameter dictionary
+    :return: file path
+    """
+    return os.path.join(output_dir, file_base_name + OUTPUT_FORMAT_EXTENSIONS[get_output_format(scenario_parameters)])
+
+
+def find_output_file(output_dir, file_base_name):
+    """This function searches an output file in any of the output formats.
+
+    :param output_dir: output directory of the scenario
+    :param file_base_name: file name without extension, e.g. 1_user-stats
+    :return: file path or None if no output file exists
+    """
+    for extension in OUTPUT_FORMAT_EXTENSIONS.values():
+        f = os.path.join(output_dir, file_base_name + extension)
+        if os.path.isfile(f):
+            return f
+    return None
+
+
+def read_output_file(output_dir, file_base_name, **kwargs):
+    """This function reads an output file written in any of the output formats.
+
+    :param output_dir: output directory of the scenario
+    :param file_base_name: file name without extension, e.g. 1_user-stats
+    :param kwargs: additional keyword arguments for pandas.read_csv (only used for csv files)
+    :return: DataFrame
+    """
+    f = find_output_file(output_dir, file_base_name)
+    if f is None:
+        raise FileNotFoundError(f"No output file {file_base_name} found in {output_dir}!")
+    if f.endswith(".parquet"):
+        return _convert_to_csv_dtypes(pd.read_parquet(f))
+    elif f.endswith(".feather"):
+        return _convert_to_csv_dtypes(pd.read_feather(f))
+    return pd.read_csv(f, **kwargs)
+
+
+def _convert_to_csv_dtypes(df):
+    """The binary formats keep empty strings and numbers in string columns (e.g. request ids). This function converts
+    them like pandas.read_csv would do to make the evaluation independent of the output format."""
+    for col in df.columns:
+        if df[col].dtype == object:
+            values = df[col].replace("", np.nan)
+            try:
+                values = pd.to_numeric(values)
+            except (ValueError, TypeError):
+                pass
+            df[col] = values
+    return df
+
+
+def create_output_writer(file_path, scenario_parameters):
+    """This function creates the output writer for the output format of the scenario.
+
+    :param file_path: output file path (see get_output_file_path)
+    :param scenario_parameters: scenario parameter dictionary
+    :return: OutputWriter instance
+    """
+    output_format = get_output_format(scenario_parameters)
+    if output_format == "parquet":
+        return ParquetOutputWriter(file_path)
+    elif output_format == "feather":
+        return FeatherOutputWriter(file_path)
+    return CsvOutputWriter(file_path)
+
+
+def start_output_service(scenario_parameters):
+    """This function starts the background output service if the scenario parameter output_queue_size is > 0.
+    Output that is written with submit_output_task() is then handled by the writer thread of the service.
+
+    :param scenario_parameters: scenario parameter dictionary
+    :return: OutputService instance or None
+    """
+    global _OUTPUT_SERVICE
+    stop_output_service()
+    queue_size = scenario_parameters.get(G_SIM_OUTPUT_QUEUE_SIZE, 0)
+    if queue_size is None or queue_size != queue_size or int(queue_size) <= 0:
+        return None
+    _OUTPUT_SERVICE = OutputService(int(queue_size))
+    return _OUTPUT_SERVICE
+
+
+def stop_output_service():
+    """This function writes all queued output and stops the writer thread of the output service."""
+    global _OUTPUT_SERVICE
+    if _OUTPUT_SERVICE is not None:
+        output_service = _OUTPUT_SERVICE
+        _OUTPUT_SERVICE = None
+        output_service.close()
+
+
+def flush_output_service():
+    """This function waits until the output service has written all queued output (if it is running)."""
+    if _OUTPUT_SERVICE is not None:
+        _OUTPUT_SERVICE.flush()
+
+
+def submit_output_task(func, *args, **kwargs):
+    """This function executes an output function in the writer thread of the output service if it is running or
+    directly otherwise.
+
+    :param func: function that writes the output
+    :param args: arguments of func
+    :param kwargs: keyword arguments of func
+    """
+    if _OUTPUT_SERVICE is not None:
+        _OUTPUT_SERVICE.submit(func, *args, **kwargs)
+    else:
+        func(*args, **kwargs)
+
+
+# -------------------------------------------------------------------------------------------------------------------- #
+# output writer classes
+# ---------------------
+class CsvOutputWriter:
+    def __init__(self, file_path):
+        """The csv writer appends every DataFrame to the output file; the header is only written for a new file.
+
+        :param file_path: output file path
+        """
+        self.file_path = file_path
+
+    def write(self, df, index=False):
+        """This method writes a DataFrame to the output file.
+
+        :param df: DataFrame
+        :param index: write index of DataFrame as (first) column
+        """
+        if os.path.isfile(self.file_path):
+            write_mode, write_header = "a", False
+        else:
+            write_mode, write_header = "w", True
+        df.to_csv(self.file_path, index=index, mode=write_mode, header=write_header)
+
+    def close(self):
+        pass
+
+
+class _ArrowOutputWriter(metaclass=ABCMeta):
+    def __init__(self, file_path):
+        """Base class of the binary writers. Every written DataFrame becomes one row group (record batch) of the
+        output file. Columns that appear later or change their type (e.g. int -> float in case of missing values)
+        close the current part file and continue with the combined schema in a new part file; columns with mixed
+        python types are stored as strings. In close(), the part files are merged into the output file (each
+        record is rewritten at most once). The file is only complete after close() was called.
+
+        :param file_path: output file path
+        """
+        if pa is None:
+            raise ImportError("Binary output formats require the package pyarrow!")
+        self.file_path = file_path
+        self.schema = None
+        self._writer = None
+        self._current_f = None
+        self._part_files = []   # closed part files (written with a subset of the current schema)
+
+    def write(self, df, index=False):
+        """This method writes a DataFrame as new row group to the output file.
+
+        :param df: DataFrame
+        :param index: write index of DataFrame as (first) column
+        """
+        if index:
+            df = df.reset_index()
+        table = self._df_to_table(df)
+        if self._writer is None:
+            self.schema = table.schema
+            self._current_f = self.file_path
+            self._writer = self._open_writer(self._current_f, self.schema)
+        elif not table.schema.equals(self.schema):
+            new_schema = _unify_schemas(self.schema, table.schema)
+            if not new_schema.equals(self.schema):
+                self._writer.close()
+                if self._current_f == self.file_path:
+                    part_f = self._get_part_file_name()
+                    os.replace(self.file_path, part_f)
+                    self._current_f = part_f
+                self._part_files.append(self._current_f)
+                self.schema = new_schema
+                self._current_f = self._get_part_file_name()
+                LOG.debug(f"schema change of output file {self.file_path} -> new part file {self._current_f} with "
+                          f"schema {new_schema}")
+                self._writer = self._open_writer(self._current_f, self.schema)
+            table = _cast_table(table, self.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        """This method finalizes the output file."""
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        if self._part_files:
+            part_files = self._part_files + [self._current_f]
+            self._writer = self._open_writer(self.file_path, self.schema)
+            for part_f in part_files:
+                for table in self._read_part_file(part_f):
+                    self._writer.write_table(_cast_table(table, self.schema))
+                os.remove(part_f)
+            self._writer.close()
+            self._writer = None
+            self._part_files = []
+        self._current_f = None
+
+    def _get_part_file_name(self):
+        return f"{self.file_path}.part{len(self._part_files)}"
+
+    @staticmethod
+    def _df_to_table(df):
+        columns = {}
+        for col in df.columns:
+            values = df[col]
+            try:
+                columns[str(col)] = pa.array(values, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                columns[str(col)] = pa.array(values.map(lambda x: x if x is None or x != x else str(x)),
+                                             type=pa.string(), from_pandas=True)
+        return pa.table(columns)
+
+    @abstractmethod
+    def _open_writer(self, file_path, schema):
+        """This method opens a writer for a new file.
+
+        :param file_path: file path
+        :param schema: pyarrow schema
+        :return: writer with write_table() and close() methods
+        """
+        pass
+
+    @abstractmethod
+    def _read_part_file(self, file_path):
+        """This method reads a closed part file row group by row group.
+
+        :param file_path: file path
+        :return: generator of pyarrow tables
+        """
+        pass
+
+
+class ParquetOutputWriter(_ArrowOutputWriter):
+    def _open_writer(self, file_path, schema):
+        return pq.ParquetWriter(file_path, schema)
+
+    def _read_part_file(self, file_path):
+        with open(file_path, "rb") as fh:
+            parquet_f = pq.ParquetFile(fh)
+            for i in range(parquet_f.num_row_groups):
+                yield parquet_f.read_row_group(i)
+
+
+class FeatherOutputWriter(_ArrowOutputWriter):
+    def _open_writer(self, file_path, schema):
+        return pa.ipc.new_file(file_path, schema)
+
+    def _read_part_file(self, file_path):
+        with pa.OSFile(file_path, "rb") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield pa.Table.from_batches([reader.get_batch(i)])
+
+
+def _unify_field_types(type_1, type_2):
+    if type_1.equals(type_2):
+        return type_1
+    if pa.types.is_null(type_1):
+        return type_2
+    if pa.types.is_null(type_2):
+        return type_1
+    if pa.types.is_integer(type_1) and pa.types.is_integer(type_2):
+        return pa.int64()
+    if (pa.types.is_integer(type_1) or pa.types.is_floating(type_1) or pa.types.is_boolean(type_1)) and \
+            (pa.types.is_integer(type_2) or pa.types.is_floating(type_2) or pa.types.is_boolean(type_2)):
+        return pa.float64()
+    return pa.string()
+
+
+def _unify_schemas(schema_1, schema_2):
+    fields = []
+    for field in schema_1:
+        if field.name in schema_2.names:
+            fields.append(pa.field(field.name, _unify_field_types(field.type, schema_2.field(field.name).type)))
+        else:
+            fields.append(field)
+    for field in schema_2:
+        if field.name not in schema_1.names:
+            fields.append(field)
+    return pa.schema(fields)
+
+
+def _cast_table(table, schema):
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            column = table.column(field.name)
+            if not column.type.equals(field.type):
+                if pa.types.is_string(field.type) and not pa.types.is_null(column.type):
+                    column = pa.chunked_array([pa.array([None if x is None else str(x) for x in column.to_pylist()],
+                                                        type=pa.string())])
+                else:
+                    column = column.cast(field.type)
+            columns.append(column)
+        else:
+            columns.append(pa.nulls(table.num_rows, type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+# -------------------------------------------------------------------------------------------------------------------- #
+# asynchronous output
+# -------------------
+class OutputService:
+    def __init__(self, queue_size):
+        """The output service executes all output tasks in one writer thread in the order of submission. The queue is
+        bounded: if the writer thread falls behind by queue_size tasks, the simulation waits for it (back-pressure).
+        Errors of the writer thread are raised in the simulation thread with the next submit or flush.
+
+        :param queue_size: maximum number of queued output tasks
+        """
+        self.queue_size = queue_size
+        self.max_queue_depth = 0
+        self.nr_tasks = 0
+        self.nr_blocked_submits = 0
+        self.blocked_time = 0.0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._work, name="OutputService", daemon=True)
+        self._thread.start()
+
+    def get_queue_depth(self):
+        """This method returns the current number of queued output tasks."""
+        return self._queue.qsize()
+
+    def get_statistics(self):
+        """This method returns the back-pressure statistics of the output service.
+
+        :return: dictionary with queue_depth, max_queue_depth, queue_size, nr_tasks, nr_blocked_submits, blocked_time
+        """
+        return {"queue_depth": self.get_queue_depth(), "max_queue_depth": self.max_queue_depth,
+                "queue_size": self.queue_size, "nr_tasks": self.nr_tasks,
+                "nr_blocked_submits": self.nr_blocked_submits, "blocked_time": self.blocked_time}
+
+    def submit(self, func, *args, **kwargs):
+        """This method queues an output task; it only blocks if the queue is full.
+
+        :param func: function that writes the output
+        :param args: arguments of func
+        :param kwargs: keyword arguments of func
+        """
+        self._raise_error()
+        task = (func, args, kwargs)
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            if self.nr_blocked_submits == 0:
+                LOG.warning(f"output queue is full ({self.queue_size} tasks) -> simulation waits for writer thread")
+            self.nr_blocked_submits += 1
+            t0 = time.perf_counter()
+            self._queue.put(task)
+            self.blocked_time += time.perf_counter() - t0
+        self.nr_tasks += 1
+        queue_depth = self._queue.qsize()
+        if queue_depth > self.max_queue_depth:
+            self.max_queue_depth = queue_depth
+
+    def flush(self):
+        """This method waits until all queued output tasks are written."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """This method writes all queued output tasks and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        LOG.info(f"output service closed: {self.get_statistics()}")
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise IOError(f"output service: writing of output failed: {error!r}") from error
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                func, args, kwargs = task
+                if self._error is None:
+                    func(*args, **kwargs)
+            except Exception as e:
+                LOG.error(f"output service: writing of output failed: {e!r}")
+                self._error = e
+            finally:
+                self._queue.task_done()
+
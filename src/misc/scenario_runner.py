@@ -0,0 +1,215 @@
+# -------------------------------------------------------------------------------------------------------------------- #
+# standard distribution imports
+# -----------------------------
+import os
+import sys
+import time
+import logging
+import traceback
+import multiprocessing as mp
+
+# additional module imports (> requirements)
+# ------------------------------------------
+import pandas as pd
+
+# src imports
+# -----------
+from src.misc.globals import *
+from src.misc.init_modules import load_simulation_environment, load_routing_engine, load_zone_system, \
+    get_routing_engine_key, get_zone_system_key, set_preloaded_instance
+
+# scenarios are simulated in forked child processes of the persistent workers (copy-on-write access to the cached
+# network and zone system, clean state for each scenario and per-scenario resource usage)
+FORK_AVAILABLE = sys.platform.startswith("linux") and hasattr(os, "fork") and hasattr(os, "wait4")
+SUMMARY_FILE_NAME = "00_scenario_runner_summary.csv"
+
+
+# -------------------------------------------------------------------------------------------------------------------- #
+# help functions
+# --------------
+def estimate_scenario_cost(scenario_parameters):
+    """This function estimates the computational cost of a scenario as fleet size times number of requests. Both
+    factors are set to 1 if they cannot be determined from the scenario input.
+
+    :param scenario_parameters: scenario parameters
+    :return: estimated cost
+    :rtype: int
+    """
+    fleet_size = 0
+    fleet_compositions = scenario_parameters.get(G_OP_FLEET)
+    if not isinstance(fleet_compositions, list):
+        fleet_compositions = [fleet_compositions]
+    for fleet_composition in fleet_compositions:
+        if isinstance(fleet_composition, dict):
+            for nr_veh in fleet_composition.values():
+                try:
+                    fleet_size += int(nr_veh)
+                except (TypeError, ValueError):
+                    pass
+    nr_requests = 0
+    rq_files = scenario_parameters.get(G_RQ_FILE)
+    if rq_files is not None and scenario_parameters.get(G_DEMAND_NAME) is not None:
+        if not isinstance(rq_files, list):
+            rq_files = [rq_files]
+        demand_dir = get_directory_dict(scenario_parameters)[G_DIR_DEMAND]
+        for rq_file in rq_files:
+            rq_f = os.path.join(demand_dir, str(rq_file))
+            if os.path.isfile(rq_f):
+                with open(rq_f) as fh:
+                    nr_requests += max(sum(1 for _ in fh) - 1, 0)
+    return max(fleet_size, 1) * max(nr_requests, 1)
+
+
+def _get_preload_infos(scenario_parameters):
+    """This function returns the keys and load functions of the routing engine and zone system of a scenario.
+
+    :param scenario_parameters: scenario parameters
+    :return: list of (key, load function) tuples
+    """
+    dir_names = get_directory_dict(scenario_parameters)
+    network_type = scenario_parameters[G_NETWORK_TYPE]
+    re_args = (network_type, dir_names[G_DIR_NETWORK], scenario_parameters.get(G_NW_DYNAMIC_F, None),
+               scenario_parameters.get(G_NW_TABLE_MODE), scenario_parameters.get(G_NW_ROUTE_CACHE_SIZE))
+    preload_infos = [(get_routing_engine_key(*re_args), lambda: load_routing_engine(*re_args))]
+    if dir_names.get(G_DIR_ZONES, None) is not None:
+        zone_args = (dir_names[G_DIR_ZONES], scenario_parameters, dir_names)
+        preload_infos.append((get_zone_system_key(*zone_args), lambda: load_zone_system(*zone_args)))
+    return preload_infos
+
+
+def _run_simulation(scenario_parameters):
+    SF = load_simulation_environment(scenario_parameters)
+    SF.run()
+
+
+def _run_in_forked_child(scenario_parameters, cached_instances):
+    """This function simulates a scenario in a forked child process, which can use the cached instances of its parent.
+
+    :param scenario_parameters: scenario parameters
+    :param cached_instances: key -> routing engine or zone system instance loaded by the worker
+    :return: (success flag, peak resident set size of the child in MB)
+    """
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            for key, instance in cached_instances.items():
+                set_preloaded_instance(key, instance)
+            _run_simulation(scenario_parameters)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            logging.shutdown()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
+    _, status, rusage = os.wait4(pid, 0)
+    # ru_maxrss is given in bytes on macOS and in kilobytes on linux
+    peak_rss = rusage.ru_maxrss / 1024**2 if sys.platform == "darwin" else rusage.ru_maxrss / 1024
+    return os.waitstatus_to_exitcode(status) == 0, peak_rss
+
+
+def _worker(worker_id, task_queue, result_queue, abort_event, continue_next_after_error):
+    """This function is executed by the persistent worker processes. It pulls scenarios from the shared queue until
+    it receives None. The routing engine and zone system of the last scenario are kept and reused by the next scenario
+    with the same network and zone system inputs.
+
+    :param worker_id: id of the worker
+    :param task_queue: queue of (scenario index, scenario parameters, estimated cost); None stops the worker
+    :param result_queue: queue for the summary entries of the scenarios; None signals the end of the worker
+    :param abort_event: set by a worker after an error if continue_next_after_error is False
+    :param continue_next_after_error: continue with the next scenario after an error
+    """
+    cached_instances = {}   # key -> instance
+    while True:
+        task = task_queue.get()
+        if task is None or abort_event.is_set():
+            break
+        sc_index, scenario_parameters, estimated_cost = task
+        t_start = time.perf_counter()
+        nr_cache_hits = 0
+        try:
+            if FORK_AVAILABLE:
+                preload_infos = _get_preload_infos(scenario_parameters)
+                new_cached_instances = {}
+                for key, load_function in preload_infos:
+                    if key in cached_instances:
+                        new_cached_instances[key] = cached_instances[key]
+                        nr_cache_hits += 1
+                    else:
+                        new_cached_instances[key] = load_function()
+                cached_instances = new_cached_instances
+                success, peak_rss = _run_in_forked_child(scenario_parameters, cached_instances)
+            else:
+                _run_simulation(scenario_parameters)
+                success, peak_rss = True, float("nan")
+        except Exception:
+            traceback.print_exc()
+            success, peak_rss = False, float("nan")
+        wall_time = time.perf_counter() - t_start
+        result_queue.put({"scenario_index": sc_index, G_SCENARIO_NAME: scenario_parameters.get(G_SCENARIO_NAME),
+                          "estimated_cost": estimated_cost, "worker": worker_id, "success": success,
+                          "cached_modules": nr_cache_hits, "wall_time [s]": wall_time, "peak_rss [MB]": peak_rss})
+        if not success and not continue_next_after_error:
+            abort_event.set()
+    result_queue.put(None)
+
+
+# -------------------------------------------------------------------------------------------------------------------- #
+# main function
+# -------------
+def run_scenarios_on_worker_pool(scenario_cfgs, n_parallel_sim, continue_next_after_error=False):
+    """This function simulates the scenarios on a pool of persistent worker processes. The scenarios are sorted by
+    their estimated cost (fleet size x number of requests) in descending order and pulled from a shared queue, i.e. an
+    idle worker directly starts with the next scenario. On linux, each worker caches the routing engine and zone system
+    for the following scenarios with the same inputs and simulates each scenario in a forked child process.
+    A summary with wall time and peak resident set size of each scenario is written to the results directory of
+    the study.
+
+    :param scenario_cfgs: list of complete scenario parameters
+    :param n_parallel_sim: number of worker processes
+    :param continue_next_after_error: continue with the next scenarios if a simulation threw an error
+    :return: summary data frame
+    """
+    tasks = [(sc_index, scenario_cfg, estimate_scenario_cost(scenario_cfg))
+             for sc_index, scenario_cfg in enumerate(scenario_cfgs)]
+    tasks.sort(key=lambda x: (-x[2], x[0]))
+    n_workers = max(min(n_parallel_sim, len(tasks)), 1)
+    task_queue = mp.Queue()
+    # the workers report with a SimpleQueue (no feeder thread) as they fork the simulation processes
+    result_queue = mp.SimpleQueue()
+    abort_event = mp.Event()
+    for task in tasks:
+        task_queue.put(task)
+    for _ in range(n_workers):
+        task_queue.put(None)
+    # workers must not be daemonic as simulations can start processes themselves
+    workers = [mp.Process(target=_worker, args=(worker_id, task_queue, result_queue, abort_event,
+                                                continue_next_after_error))
+               for worker_id in range(n_workers)]
+    for worker in workers:
+        worker.start()
+    summary_list = []
+    nr_finished_workers = 0
+    while nr_finished_workers < n_workers:
+        entry = result_queue.get()
+        if entry is None:
+            nr_finished_workers += 1
+        else:
+            summary_list.append(entry)
+    for worker in workers:
+        worker.join()
+    # remaining scenarios after an abort are not consumed
+    task_queue.cancel_join_thread()
+    summary_df = pd.DataFrame(summary_list, columns=["scenario_index", G_SCENARIO_NAME, "estimated_cost", "worker",
+                                                     "success", "cached_modules", "wall_time [s]", "peak_rss [MB]"])
+    summary_df.sort_values("scenario_index", inplace=True)
+    if len(scenario_cfgs) > 0:
+        results_dir = os.path.dirname(get_directory_dict(scenario_cfgs[0])[G_DIR_OUTPUT])
+        os.makedirs(results_dir, exist_ok=True)
+        summary_df.to_csv(os.path.join(results_dir, SUMMARY_FILE_NAME), index=False)
+    failed_scenarios = summary_df.loc[~summary_df["success"], G_SCENARIO_NAME].tolist()
+    if len(failed_scenarios) > 0 and not continue_next_after_error:
+        raise RuntimeError(f"Simulation of scenario(s) {failed_scenarios} failed!")
+    return summary_df
@@ -0,0 +1,216 @@
+import os
+import sys
+import time
+from heapq import heappush, heappop
+import pandas as pd
+fleet_sim_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+os.sys.path.append(fleet_sim_path)
+from src.misc.globals import *
+
+
+""" this script is used to preprocess contraction hierarchies for the routing_engine
+        NetworkBasicCH.py
+all nodes of the network are ordered by importance and contracted one after another. while contracting a node,
+shortcut edges are inserted between its remaining neighbors if the path via the contracted node is not dominated
+by a witness path. the result are two files, which are stored next to the corresponding edge files:
+    ch_node_order.csv: node_index, node_order (rank of the node in the hierarchy)
+    ch_shortcuts.csv: from_node, to_node, distance, travel_time, shortcut_def (node the shortcut bypasses)
+the contraction is only valid for the travel times it was computed with. in case the network has dynamic travel
+times, each travel time folder has to be preprocessed (see preprocess()).
+nodes with the "is_stop_only"-attribute cannot be passed by routes; they are contracted first and never bypassed
+by shortcuts.
+"""
+
+WITNESS_SETTLE_LIMIT = 500
+
+
+def load_graph(nw_dir, scenario_time=None):
+    """ loads nodes and edges of a network and returns adjacency dictionaries
+    :param nw_dir: full path to network directory
+    :param scenario_time: name of travel time folder (None -> base travel times)
+    :return: (number_nodes, set of stop only nodes, out_edges, in_edges) with
+                out_edges[o_node][d_node] = (travel_time, distance) and in_edges[d_node][o_node] = (travel_time, distance)
+    """
+    node_f = os.path.join(nw_dir, "base", "nodes.csv")
+    node_df = pd.read_csv(node_f)
+    number_nodes = len(node_df)
+    set_stop_nodes = set(node_df[node_df[G_NODE_STOP_ONLY] == True][G_NODE_ID])
+    edge_f = os.path.join(nw_dir, "base", "edges.csv")
+    edge_df = pd.read_csv(edge_f)
+    if scenario_time is not None:
+        edge_df.set_index([G_EDGE_FROM, G_EDGE_TO], inplace=True)
+        tmp_edge_f = os.path.join(nw_dir, scenario_time, "edges_td_att.csv")
+        tmp_edge_df = pd.read_csv(tmp_edge_f, index_col=[0, 1])
+        edge_df[G_EDGE_TT] = tmp_edge_df["edge_tt"]
+        edge_df = edge_df.reset_index()
+    out_edges = [{} for _ in range(number_nodes)]
+    in_edges = [{} for _ in range(number_nodes)]
+    for o_node, d_node, tt, dis in zip(edge_df[G_EDGE_FROM].values, edge_df[G_EDGE_TO].values,
+                                       edge_df[G_EDGE_TT].values, edge_df[G_EDGE_DIST].values):
+        o_node = int(o_node)
+        d_node = int(d_node)
+        if o_node == d_node:
+            continue
+        if out_edges[o_node].get(d_node) is not None and out_edges[o_node][d_node][0] <= tt:
+            continue
+        out_edges[o_node][d_node] = (float(tt), float(dis))
+        in_edges[d_node][o_node] = (float(tt), float(dis))
+    return number_nodes, set_stop_nodes, out_edges, in_edges
+
+
+def _witness_search(out_edges, source, excluded_node, max_cost, settle_limit):
+    """ local dijkstra from source within the remaining graph that does not pass excluded_node
+    :return: dict node -> cost of best found path (upper bound of shortest path)
+    """
+    costs = {source: 0.0}
+    frontier = [(0.0, source)]
+    settled = 0
+    while frontier:
+        c, node = heappop(frontier)
+        if c > costs[node]:
+            continue
+        if c > max_cost:
+            break
+        settled += 1
+        if settled > settle_limit:
+            break
+        for next_node, (tt, _) in out_edges[node].items():
+            if next_node == excluded_node:
+                continue
+            new_c = c + tt
+            if new_c < costs.get(next_node, float("inf")):
+                costs[next_node] = new_c
+                heappush(frontier, (new_c, next_node))
+    return costs
+
+
+def _necessary_shortcuts(node, out_edges, in_edges, settle_limit):
+    """ computes all shortcuts that have to be inserted if node is contracted
+    :return: list of (from_node, to_node, travel_time, distance)
+    """
+    shortcuts = []
+    if len(out_edges[node]) == 0:
+        return shortcuts
+    max_out_tt = max(tt for tt, _ in out_edges[node].values())
+    for in_node, (in_tt, in_dis) in in_edges[node].items():
+        witness_costs = _witness_search(out_edges, in_node, node, in_tt + max_out_tt, settle_limit)
+        for out_node, (out_tt, out_dis) in out_edges[node].items():
+            if out_node == in_node:
+                continue
+            via_tt = in_tt + out_tt
+            if witness_costs.get(out_node, float("inf")) > via_tt:
+                shortcuts.append((in_node, out_node, via_tt, in_dis + out_dis))
+    return shortcuts
+
+
+def _priority(node, out_edges, in_edges, deleted_neighbors, settle_limit):
+    """ edge difference + number of already contracted neighbors """
+    nr_shortcuts = len(_necessary_shortcuts(node, out_edges, in_edges, settle_limit))
+    return nr_shortcuts - len(out_edges[node]) - len(in_edges[node]) + deleted_neighbors[node]
+
+
+def _contract(node, out_edges, in_edges, deleted_neighbors, shortcuts, list_shortcut_entries):
+    """ removes node from the remaining graph and inserts the given shortcuts """
+    for in_node in in_edges[node].keys():
+        del out_edges[in_node][node]
+        deleted_neighbors[in_node] += 1
+    for out_node in out_edges[node].keys():
+        del in_edges[out_node][node]
+        deleted_neighbors[out_node] += 1
+    for o_node, d_node, tt, dis in shortcuts:
+        if out_edges[o_node].get(d_node) is not None and out_edges[o_node][d_node][0] <= tt:
+            continue
+        out_edges[o_node][d_node] = (tt, dis)
+        in_edges[d_node][o_node] = (tt, dis)
+        list_shortcut_entries.append((o_node, d_node, dis, tt, node))
+    out_edges[node] = {}
+    in_edges[node] = {}
+
+
+def create_contraction_hierarchy(nw_dir, scenario_time=None, settle_limit=WITNESS_SETTLE_LIMIT):
+    """ computes node order and shortcuts of a contraction hierarchy and stores them in the network folder
+    :param nw_dir: full path to network directory
+    :param scenario_time: name of travel time folder (None -> base travel times)
+    :param settle_limit: maximum number of settled nodes in a single witness search
+    :return: cpu time
+    """
+    print(f"Contracting network {nw_dir} for travel times {scenario_time} ...")
+    t0 = time.perf_counter()
+    number_nodes, set_stop_nodes, out_edges, in_edges = load_graph(nw_dir, scenario_time)
+    deleted_neighbors = [0 for _ in range(number_nodes)]
+    node_order = [-1 for _ in range(number_nodes)]
+    list_shortcut_entries = []
+    current_rank = 0
+    # no routing through stop nodes possible -> contracted first without shortcuts
+    for node in sorted(set_stop_nodes):
+        _contract(node, out_edges, in_edges, deleted_neighbors, [], list_shortcut_entries)
+        node_order[node] = current_rank
+        current_rank += 1
+    # lazy updated priority queue for all other nodes
+    pq = []
+    for node in range(number_nodes):
+        if node_order[node] < 0:
+            heappush(pq, (_priority(node, out_edges, in_edges, deleted_neighbors, settle_limit), node))
+    while pq:
+        _, node = heappop(pq)
+        if node_order[node] >= 0:
+            continue
+        new_prio = _priority(node, out_edges, in_edges, deleted_neighbors, settle_limit)
+        if pq and new_prio > pq[0][0]:
+            heappush(pq, (new_prio, node))
+            continue
+        shortcuts = _necessary_shortcuts(node, out_edges, in_edges, settle_limit)
+        _contract(node, out_edges, in_edges, deleted_neighbors, shortcuts, list_shortcut_entries)
+        node_order[node] = current_rank
+        current_rank += 1
+        if current_rank % 1000 == 0:
+            print(f"\t ... contracted {current_rank}/{number_nodes} nodes | {len(list_shortcut_entries)} shortcuts")
+    cpu_time = round(time.perf_counter() - t0, 3)
+    print(f"\t ... finished in {cpu_time} seconds with {len(list_shortcut_entries)} shortcuts")
+    #
+    if scenario_time is None:
+        output_dir = os.path.join(nw_dir, "base")
+    else:
+        output_dir = os.path.join(nw_dir, scenario_time)
+    print(f"\t ... saving files to {output_dir} ...")
+    order_df = pd.DataFrame({G_NODE_ID: list(range(number_nodes)), G_NODE_CH_ORDER: node_order})
+    order_df.to_csv(os.path.join(output_dir, "ch_node_order.csv"), index=False)
+    sc_df = pd.DataFrame(list_shortcut_entries, columns=[G_EDGE_FROM, G_EDGE_TO, G_EDGE_DIST, G_EDGE_TT, G_EDGE_SC])
+    sc_df.to_csv(os.path.join(output_dir, "ch_shortcuts.csv"), index=False)
+    return cpu_time
+
+
+def preprocess(nw_dir, network_dynamics_file=None):
+    """ computes contraction hierarchies for the base network and all travel time folders
+    :param nw_dir: full path to network directory
+    :param network_dynamics_file: name of network dynamics file (None -> all folders named by a simulation time)
+    """
+    tt_folders = {}
+    if network_dynamics_file is None:
+        for f in os.listdir(nw_dir):
+            try:
+                int(f)
+            except ValueError:
+                continue
+            tt_folders[f] = 1
+    else:
+        nw_dynamics_df = pd.read_csv(os.path.join(nw_dir, network_dynamics_file))
+        for tt_folder_name in nw_dynamics_df["travel_time_folder"].values:
+            tt_folders[str(tt_folder_name)] = 1
+    create_contraction_hierarchy(nw_dir)
+    for tt_folder in tt_folders.keys():
+        create_contraction_hierarchy(nw_dir, scenario_time=tt_folder)
+
+
+if __name__ == "__main__":
+    """ usage:
+    script arguments:
+    0: full path to network directory
+    1 (optional): name of network dynamics file; if not given, all travel time folders are preprocessed
+    """
+    network_name_dir = sys.argv[1]
+    try:
+        nw_dynamics_file = sys.argv[2]
+    except IndexError:
+        nw_dynamics_file = None
+    preprocess(network_name_dir, nw_dynamics_file)
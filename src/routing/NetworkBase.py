@@ -15,6 +15,8 @@ Definition of Route: [start_node_id, intermediary_node_id1, intermediary_node_id
 """
 from abc import abstractmethod, ABCMeta
 
+import numpy as np
+
 INPUT_PARAMETERS_NetworkBase = {
     "doc" : "this is the base abstract network class",
     "inherit" : None,
@@ -154,6 +156,15 @@ class NetworkBase(metaclass=ABCMeta):
         """
         raise NotImplementedError(f"return_positions_lon_lat method is not implemented for {type(self)}")
 
+    def return_beeline_speed_upper_bound(self):
+        """ Returns an upper bound of the speed along the straight line between two positions, i.e. the beeline
+        distance between the coordinates of two positions divided by this value is a lower bound of the travel time
+        between these positions. It can be used to exclude combinations that are infeasible without routing queries.
+
+        :return: speed [coordinate units / s] or None if no bound is available
+        """
+        return None
+
     def get_zones_external_route_costs(self, current_time, tmp_toll_route, park_origin=False, park_destination=False):
         # TODO #
         if self.zones is not None:
@@ -203,12 +214,39 @@ class NetworkBase(metaclass=ABCMeta):
         """
         pass
     
+    def get_next_update_time(self, simulation_time):
+        """This method returns the next simulation time at which update_network() changes the network state. It is
+        used to skip simulation time steps without events. Per default, the network is updated in every time step.
+
+        :param simulation_time: current simulation time
+        :type simulation_time: float
+        :return: next update time (simulation_time if the network has to be updated in the next time step)
+        :rtype: float
+        """
+        return simulation_time
+
     def reset_network(self, simulation_time : float):
         """ this method is used in case a module changed the travel times to future states for forecasts
         it resets the network to the travel times a stimulation_time
         :param simulation_time: current simulation time"""
         raise NotImplementedError(f"the method reset_network is not implemented for this network class")
 
+    def get_checkpoint_state(self):
+        """This method returns the dynamic state of the routing engine (e.g. current travel times, stored routing
+        results), which is saved in simulation checkpoints. The static network data is not part of the state: it is
+        loaded again from the network files when a checkpoint is restored.
+
+        :return: picklable state object
+        """
+        raise NotImplementedError(f"checkpoints are not implemented for this network class")
+
+    def set_checkpoint_state(self, checkpoint_state):
+        """This method sets the dynamic state of a newly loaded routing engine to the state of a checkpoint.
+
+        :param checkpoint_state: state object returned by get_checkpoint_state()
+        """
+        raise NotImplementedError(f"checkpoints are not implemented for this network class")
+
     @abstractmethod
     def get_number_network_nodes(self):
         """This method returns a list of all street network node indices.
@@ -334,6 +372,51 @@ class NetworkBase(metaclass=ABCMeta):
         """
         pass
 
+    def return_travel_costs_MtoN(self, list_origin_positions, list_destination_positions, max_cost_value=None,
+                                 customized_section_cost_function = None):
+        """This method will return the travel costs between all origin positions and all destination positions as
+        dense matrices. Combinations that do not fulfill all constraints get the value np.inf.
+        This default implementation calls return_travel_costs_1toX for each origin or return_travel_costs_Xto1 for
+        each destination (whatever requires fewer calls). Routing engines can overwrite it with batch computations.
+
+        :param list_origin_positions: list of origin positions (M)
+        :type list_origin_positions: list
+        :param list_destination_positions: list of destination positions (N)
+        :type list_destination_positions: list
+        :param max_cost_value: latest cost function value of a route at destination to be considered as solution
+                (max time if customized_section_cost_function == None)
+        :type max_cost_value: float/None
+        :param customized_section_cost_function: function to compute the travel cost of an section
+                which takes the args: (travel_time, travel_distance, current_dijkstra_node_index) -> cost_value
+                if None: travel_time is considered as the cost_function of a section
+        :type customized_section_cost_function: func
+        :return: tuple of numpy arrays (cost_function_values, travel_times, travel_distances) with shape (M, N)
+        :rtype: tuple
+        """
+        shape = (len(list_origin_positions), len(list_destination_positions))
+        cfv_matrix = np.full(shape, np.inf)
+        tt_matrix = np.full(shape, np.inf)
+        dis_matrix = np.full(shape, np.inf)
+        if shape[0] <= shape[1]:
+            destination_indices = {}
+            for j, d_pos in enumerate(list_destination_positions):
+                destination_indices.setdefault(d_pos, []).append(j)
+            for i, o_pos in enumerate(list_origin_positions):
+                for d_pos, cfv, tt, dis in self.return_travel_costs_1toX(o_pos, list_destination_positions,
+                        max_cost_value=max_cost_value, customized_section_cost_function=customized_section_cost_function):
+                    for j in destination_indices[d_pos]:
+                        cfv_matrix[i, j], tt_matrix[i, j], dis_matrix[i, j] = cfv, tt, dis
+        else:
+            origin_indices = {}
+            for i, o_pos in enumerate(list_origin_positions):
+                origin_indices.setdefault(o_pos, []).append(i)
+            for j, d_pos in enumerate(list_destination_positions):
+                for o_pos, cfv, tt, dis in self.return_travel_costs_Xto1(list_origin_positions, d_pos,
+                        max_cost_value=max_cost_value, customized_section_cost_function=customized_section_cost_function):
+                    for i in origin_indices[o_pos]:
+                        cfv_matrix[i, j], tt_matrix[i, j], dis_matrix[i, j] = cfv, tt, dis
+        return cfv_matrix, tt_matrix, dis_matrix
+
     @abstractmethod
     def return_best_route_1to1(self, origin_position, destination_position, customized_section_cost_function = None):
         """This method will return the best route [list of node indices] between two nodes, where origin_position[0] and
@@ -447,6 +530,33 @@ class NetworkBase(metaclass=ABCMeta):
         """
         pass
 
+    def move_fleet_along_routes(self, routes, positions, time_budget, sim_vid_ids=None, new_sim_time=None,
+                                record_node_times=False):
+        """This method moves several vehicles along their routes for the same time interval. It returns the same
+        results as calling move_along_route for every vehicle; routing engines can overwrite it with a method
+        treating all vehicles together.
+
+        :param routes: list of routes (list of node_indices) of the vehicles
+        :type routes: list
+        :param positions: list of position_tuples of the vehicles
+        :type positions: list
+        :param time_budget: time [s] the vehicles drive since they were observed at their positions
+        :type time_budget: float
+        :param sim_vid_ids: list of ids of simulation vehicles (see move_along_route)
+        :type sim_vid_ids: list
+        :param new_sim_time: new time to coordinate simulation times
+        :type new_sim_time: float
+        :param record_node_times: if this flag is set False, the lists of passed node times will always be empty
+        :type record_node_times: bool
+        :return: list of move_along_route result tuples in the order of the input routes
+        :rtype: list
+        """
+        if sim_vid_ids is None:
+            sim_vid_ids = [None for _ in range(len(routes))]
+        return [self.move_along_route(route, position, time_budget, sim_vid_id=sim_vid_id,
+                                      new_sim_time=new_sim_time, record_node_times=record_node_times)
+                for route, position, sim_vid_id in zip(routes, positions, sim_vid_ids)]
+
     def add_travel_infos_to_database(self, travel_info_dict):
         """ this function can be used to include externally computed (e.g. multiprocessing) route travel times
         into the database if present
@@ -454,6 +564,12 @@ class NetworkBase(metaclass=ABCMeta):
         """
         pass
 
+    def get_route_cache_statistics(self):
+        """ this function returns counters of the internal routing result database (if present)
+        :return: dictionary statistic name -> cumulative value; empty if the routing engine has no cache
+        """
+        return {}
+
     def return_network_bounding_box(self):
         """ Calculates the bounding box points for the whole network
 
@@ -31,6 +31,7 @@ from src.routing.routing_imports.Router import Router
 # ----------------
 from src.misc.globals import *
 LOG = logging.getLogger(__name__)
+MOVE_FLEET_CHUNK_SIZE = 16   # initial number of route edges per vehicle evaluated at once in move_fleet_along_routes
 
 # import os
 # import pandas as pd
@@ -62,6 +63,11 @@ class Node():
         self.travel_infos_from = {} #node_index -> (tt, dis)
         self.travel_infos_to = {}   #node_index -> (tt, dis)
         #
+        # attributes for contraction hierarchies (set by NetworkBasicCH)
+        self.ch_value = node_order
+        self.ch_edges_to = {}   #node_obj -> edge (only to nodes with higher ch_value)
+        self.ch_edges_from = {} #node_obj -> edge (only from nodes with higher ch_value)
+        #
         # attributes set during path calculations
         self.is_target_node = False     # is set and reset in computeFromNodes
         #attributes for forwards dijkstra
@@ -87,13 +93,19 @@ class Node():
     def get_next_node_edge_pairs(self, ch_flag = False):
         """
         :return: list of (node, edge) tuples [references to objects] in forward direction
+                    (only upward edges of the contraction hierarchy if ch_flag)
         """
+        if ch_flag:
+            return self.ch_edges_to.items()
         return self.edges_to.items()
 
     def get_prev_node_edge_pairs(self, ch_flag = False):
         """
         :return: list of (node, edge) tuples [references to objects] in backward direction
+                    (only upward edges of the contraction hierarchy if ch_flag)
         """
+        if ch_flag:
+            return self.ch_edges_from.items()
         return self.edges_from.items()
 
     def add_next_edge_to(self, other_node, edge):
@@ -164,8 +176,11 @@ class NetworkBasic(NetworkBase):
         :type network_dynamics_file_name: str
         """
         self.nodes = []     #list of all nodes in network (index == node.node_index)
+        self._edge_travel_info_arrays = None    # sorted edge arrays for move_fleet_along_routes (built on demand)
+        self._beeline_speed_upper_bound = None  # max over edges of beeline distance / travel time (built on demand)
         self.network_name_dir = network_name_dir
         self.travel_time_file_folders = self._load_tt_folder_path(network_dynamics_file_name=network_dynamics_file_name)
+        self._current_tt_time = None    # time of the currently loaded travel time file (None: base travel times)
         self.loadNetwork(network_name_dir, network_dynamics_file_name=network_dynamics_file_name, scenario_time=scenario_time)
         self.current_dijkstra_number = 1    #used in dijkstra-class
         self.sim_time = 0   # TODO #
@@ -237,6 +252,19 @@ class NetworkBasic(NetworkBase):
                 return True
         return False
     
+    def get_next_update_time(self, simulation_time):
+        """This method returns the next simulation time at which new travel times are loaded.
+
+        :param simulation_time: current simulation time
+        :type simulation_time: float
+        :return: next update time (inf if there is none)
+        :rtype: float
+        """
+        next_update_times = [t for t in self.travel_time_file_folders.keys() if t > simulation_time]
+        if next_update_times:
+            return min(next_update_times)
+        return float("inf")
+
     def reset_network(self, simulation_time: float):
         """ this method is used in case a module changed the travel times to future states for forecasts
         it resets the network to the travel times a stimulation_time
@@ -251,11 +279,32 @@ class NetworkBasic(NetworkBase):
                 self.update_network(sorted_tts[-1])
                 return
 
+    def get_checkpoint_state(self):
+        """This method returns the dynamic state of the routing engine, which is saved in simulation checkpoints:
+        the time of the loaded travel time file and the stored routing results of subclasses (travel_time_infos).
+
+        :return: picklable state object
+        """
+        return {"sim_time": self.sim_time, "tt_time": self._current_tt_time,
+                "travel_time_infos": getattr(self, "travel_time_infos", None)}
+
+    def set_checkpoint_state(self, checkpoint_state):
+        """This method sets the dynamic state of a newly loaded routing engine to the state of a checkpoint.
+
+        :param checkpoint_state: state object returned by get_checkpoint_state()
+        """
+        if checkpoint_state["tt_time"] != self._current_tt_time:
+            self.load_tt_file(checkpoint_state["tt_time"])
+        self.sim_time = checkpoint_state["sim_time"]
+        if checkpoint_state["travel_time_infos"] is not None:
+            self.travel_time_infos = checkpoint_state["travel_time_infos"]
+
     def load_tt_file(self, scenario_time):
         """
         loads new travel time files for scenario_time
         """
         self._reset_internal_attributes_after_travel_time_update()
+        self._current_tt_time = scenario_time
         f = self.travel_time_file_folders[scenario_time]
         tt_file = os.path.join(f, "edges_td_att.csv")
         tmp_df = pd.read_csv(tt_file)
@@ -271,6 +320,8 @@ class NetworkBasic(NetworkBase):
         new_tt, dis = edge_obj.get_tt_distance()
         o_node.travel_infos_to[d_node_index] = (new_tt, dis)
         d_node.travel_infos_from[o_node_index] = (new_tt, dis)
+        self._edge_travel_info_arrays = None
+        self._beeline_speed_upper_bound = None
 
     def get_node_list(self):
         """
@@ -309,6 +360,30 @@ class NetworkBasic(NetworkBase):
             c_rel = position_tuple[2] * c1 + (1 - position_tuple[2]) * c0
             return c_rel[0], c_rel[1]
 
+    def return_beeline_speed_upper_bound(self):
+        """ Returns an upper bound of the speed along the straight line between two positions, i.e. the beeline
+        distance between the coordinates of two positions divided by this value is a lower bound of the travel time
+        between these positions. It is the maximum of beeline distance / travel time over all edges (every route is
+        a sequence of edges and the beeline distance of a route is at most the sum of its edge beeline distances).
+
+        :return: speed [coordinate units / s]; inf if edges with travel time 0 exist
+        """
+        if self._beeline_speed_upper_bound is None:
+            edge_keys, edge_tts, _ = self._get_edge_travel_info_arrays()
+            nr_nodes = len(self.nodes)
+            node_x = np.array([node.pos_x for node in self.nodes], dtype=float)
+            node_y = np.array([node.pos_y for node in self.nodes], dtype=float)
+            o_nodes = edge_keys // nr_nodes
+            d_nodes = edge_keys % nr_nodes
+            beeline_distances = np.hypot(node_x[d_nodes] - node_x[o_nodes], node_y[d_nodes] - node_y[o_nodes])
+            positive_tt = edge_tts > 0
+            if np.any(beeline_distances[~positive_tt] > 0):
+                self._beeline_speed_upper_bound = np.inf
+            else:
+                self._beeline_speed_upper_bound = float(np.max(beeline_distances[positive_tt] / edge_tts[positive_tt],
+                                                               initial=0.0))
+        return self._beeline_speed_upper_bound
+
     def return_network_bounding_box(self):
         min_x = min([node.pos_x for node in self.nodes])
         max_x = max([node.pos_x for node in self.nodes])
@@ -533,6 +608,88 @@ class NetworkBasic(NetworkBase):
             return sorted(return_list, key = lambda x:x[1])[:max_routes]
         return return_list
 
+    def return_travel_costs_MtoN(self, list_origin_positions, list_destination_positions, max_cost_value=None, customized_section_cost_function = None):
+        """
+        This method will return the travel costs between all origin positions and all destination positions as dense
+        matrices. Combinations that dont fullfill all constraints get the value np.inf.
+        The routing is done once for all distinct origin and destination nodes (see _return_node_travel_costs_MtoN),
+        overheads of positions on edges and trivial routes are added afterwards.
+        :param list_origin_positions: list of origin_positions (current_edge_origin_node_index, current_edge_destination_node_index, relative_position)
+        :param list_destination_positions: list of destination positions : (destination_edge_origin_node_index, destination_edge_destination_node_index, relative_position)
+        :param max_cost_value: latest cost function value of a route at destination to be considered as solution (max time if customized_section_cost_function == None)
+        :param customized_section_cost_function: function to compute the travel cost of an section: args: (travel_time, travel_distance, current_dijkstra_node) -> cost_value
+                if None: travel_time is considered as the cost_function of a section
+        :return: tuple of numpy arrays (cost_function_values, travel_times, travel_distances) with shape (len(list_origin_positions), len(list_destination_positions))
+        """
+        if customized_section_cost_function is not None:
+            return super().return_travel_costs_MtoN(list_origin_positions, list_destination_positions, max_cost_value=max_cost_value, customized_section_cost_function=customized_section_cost_function)
+        if len(list_origin_positions) == 0 or len(list_destination_positions) == 0:
+            shape = (len(list_origin_positions), len(list_destination_positions))
+            return np.full(shape, np.inf), np.full(shape, np.inf), np.full(shape, np.inf)
+        origin_nodes = [pos[0] if pos[1] is None else pos[1] for pos in list_origin_positions]
+        destination_nodes = [pos[0] for pos in list_destination_positions]
+        unique_origin_nodes, origin_rows = np.unique(origin_nodes, return_inverse=True)
+        unique_destination_nodes, destination_cols = np.unique(destination_nodes, return_inverse=True)
+        node_tts, node_dis = self._return_node_travel_costs_MtoN(unique_origin_nodes, unique_destination_nodes, max_cost_value=max_cost_value)
+        origin_overheads = np.array([self.get_section_overhead(pos, from_start=False)[1:] for pos in list_origin_positions])
+        destination_overheads = np.array([self.get_section_overhead(pos, from_start=True)[1:] for pos in list_destination_positions])
+        node_pairs = np.ix_(origin_rows, destination_cols)
+        tt_matrix = node_tts[node_pairs] + origin_overheads[:, 0:1] + destination_overheads[:, 0]
+        dis_matrix = node_dis[node_pairs] + origin_overheads[:, 1:2] + destination_overheads[:, 1]
+        # trivial routes are only possible if the destination edge starts at the origin edge
+        destination_indices = {}
+        for j, d_pos in enumerate(list_destination_positions):
+            destination_indices.setdefault(d_pos[0], []).append(j)
+        for i, o_pos in enumerate(list_origin_positions):
+            for j in destination_indices.get(o_pos[0], []) + destination_indices.get(o_pos[1], []):
+                trivial_test = self.test_and_get_trivial_route_tt_and_dis(o_pos, list_destination_positions[j])
+                if trivial_test is not None:
+                    _, tt_matrix[i, j], dis_matrix[i, j] = trivial_test[1]
+        if max_cost_value is not None:
+            outside_range = tt_matrix > max_cost_value
+            tt_matrix[outside_range] = np.inf
+            dis_matrix[outside_range] = np.inf
+        return tt_matrix.copy(), tt_matrix, dis_matrix
+
+    def _return_node_travel_costs_MtoN(self, origin_nodes, destination_nodes, max_cost_value=None):
+        """ computes travel times and distances between all origin and all destination nodes
+        a dijkstra is computed for each origin node (forward) or for each destination node (backward),
+        whatever requires fewer searches
+        :param origin_nodes: array of distinct origin node indices (M)
+        :param destination_nodes: array of distinct destination node indices (N)
+        :param max_cost_value: maximum travel time of the searches
+        :return: tuple of numpy arrays (travel_times, travel_distances) with shape (M, N); np.inf if not reachable
+        """
+        origin_nodes = [int(x) for x in origin_nodes]
+        destination_nodes = [int(x) for x in destination_nodes]
+        tts = np.full((len(origin_nodes), len(destination_nodes)), np.inf)
+        dis = np.full((len(origin_nodes), len(destination_nodes)), np.inf)
+        if len(origin_nodes) <= len(destination_nodes):
+            destination_cols = {d_node : j for j, d_node in enumerate(destination_nodes)}
+            for i, origin_node in enumerate(origin_nodes):
+                R = Router(self, origin_node, destination_nodes=destination_nodes, time_radius = max_cost_value, forward_flag = True)
+                for entry in R.compute(return_route=False):
+                    cfv, tt, d = entry[1]
+                    if tt < 0 or cfv == float("inf"):
+                        continue
+                    dest_node = entry[0][-1]
+                    self._add_to_database(origin_node, dest_node, cfv, tt, d)
+                    tts[i, destination_cols[dest_node]] = tt
+                    dis[i, destination_cols[dest_node]] = d
+        else:
+            origin_rows = {o_node : i for i, o_node in enumerate(origin_nodes)}
+            for j, destination_node in enumerate(destination_nodes):
+                R = Router(self, destination_node, destination_nodes=origin_nodes, time_radius = max_cost_value, forward_flag = False)
+                for entry in R.compute(return_route=False):
+                    cfv, tt, d = entry[1]
+                    if cfv < 0 or cfv == float("inf"):
+                        continue
+                    org_node = entry[0][0]
+                    self._add_to_database(org_node, destination_node, cfv, tt, d)
+                    tts[origin_rows[org_node], j] = tt
+                    dis[origin_rows[org_node], j] = d
+        return tts, dis
+
     def return_best_route_1to1(self, origin_position, destination_position, customized_section_cost_function = None):
         """
         This method will return the best route [list of node_indices] between two nodes,
@@ -857,6 +1014,165 @@ class NetworkBasic(NetworkBase):
                 arrival_in_time_step = last_time
         return c_pos, driven_distance, arrival_in_time_step, list_passed_nodes, list_passed_node_times
 
+    def move_fleet_along_routes(self, routes, positions, time_budget, sim_vid_ids=None, new_sim_time=None,
+                                record_node_times=False):
+        """This method moves several vehicles along their routes for the same time interval and returns the same
+        results as move_along_route for each vehicle. Instead of iterating edge by edge for each vehicle, the next
+        edges of all vehicles (starting with MOVE_FLEET_CHUNK_SIZE edges per vehicle) are looked up at once in sorted
+        edge arrays; the node arrival times are the cumulative sums of the edge travel times along each route and
+        are compared with the end of the time interval. Vehicles passing all edges of a chunk are continued with a
+        chunk of twice the size.
+
+        :param routes: list of routes (list of node_indices) of the vehicles
+        :type routes: list
+        :param positions: list of position_tuples of the vehicles
+        :type positions: list
+        :param time_budget: time [s] the vehicles drive since they were observed at their positions
+        :type time_budget: float
+        :param sim_vid_ids: list of ids of simulation vehicles (only used for log messages)
+        :type sim_vid_ids: list
+        :param new_sim_time: new time to coordinate simulation times
+        :type new_sim_time: float
+        :param record_node_times: if this flag is set False, the lists of passed node times will always be empty
+        :type record_node_times: bool
+        :return: list of move_along_route result tuples in the order of the input routes
+        :rtype: list
+        """
+        if new_sim_time is not None:
+            start_time = new_sim_time
+        else:
+            start_time = self.sim_time
+        end_time = start_time + time_budget
+        results = [None for _ in range(len(routes))]
+        # moving vehicles: [index, route offset, first edge start, first edge end, first edge rel pos, time, distance]
+        moving = []
+        for j, (route, c_pos) in enumerate(zip(routes, positions)):
+            if c_pos[2] is None:
+                if len(route) == 0:
+                    results[j] = (c_pos, 0, start_time, [], [])
+                    continue
+                c_pos = (c_pos[0], route[0], 0.0)
+            elif len(route) == 0:
+                results[j] = (c_pos, 0, -1, [], [])
+                continue
+            moving.append([j, 0, c_pos[0], c_pos[1], c_pos[2], start_time, 0])
+        if not moving:
+            return results
+        edge_keys, edge_tts, edge_tds = self._get_edge_travel_info_arrays()
+        nr_nodes = len(self.nodes)
+        passed_nodes = {vehicle[0]: [] for vehicle in moving}
+        passed_node_times = {vehicle[0]: [] for vehicle in moving}
+        chunk = MOVE_FLEET_CHUNK_SIZE
+        while moving:
+            nr_moving = len(moving)
+            # collect edges of all vehicles in flat lists
+            from_nodes = []
+            to_nodes = []
+            nr_edges = []
+            for j, offset, o_node, d_node, _, _, _ in moving:
+                route = routes[j]
+                nr_row_edges = min(chunk, len(route) - offset)
+                nr_edges.append(nr_row_edges)
+                from_nodes.append(o_node)
+                from_nodes.extend(route[offset:offset + nr_row_edges - 1])
+                to_nodes.append(d_node)
+                to_nodes.extend(route[offset + 1:offset + nr_row_edges])
+            keys = np.array(from_nodes, dtype=np.int64) * nr_nodes + np.array(to_nodes, dtype=np.int64)
+            edge_indices = np.searchsorted(edge_keys, keys)
+            edge_indices[edge_indices == len(edge_keys)] = 0
+            missing = np.flatnonzero(edge_keys[edge_indices] != keys)
+            if len(missing) > 0:
+                raise KeyError(f"move_fleet_along_routes: no edge {from_nodes[missing[0]]} -> {to_nodes[missing[0]]}")
+            flat_tts = edge_tts[edge_indices]
+            flat_tds = edge_tds[edge_indices]
+            blocked = np.flatnonzero(flat_tts > 86400)
+            if len(blocked) > 0:
+                flat_tts[blocked] = 0
+            # arrays of increments; first column: current time and distance of vehicle; padding beyond route end
+            nr_edges = np.array(nr_edges)
+            rows = np.repeat(np.arange(nr_moving), nr_edges)
+            row_starts = np.cumsum(nr_edges) - nr_edges
+            cols = np.arange(len(keys)) - np.repeat(row_starts, nr_edges) + 1
+            tt_array = np.full((nr_moving, chunk + 1), np.inf)
+            td_array = np.zeros((nr_moving, chunk + 1))
+            tt_array[rows, cols] = flat_tts
+            td_array[rows, cols] = flat_tds
+            tt_array[:, 0] = [vehicle[5] for vehicle in moving]
+            td_array[:, 0] = [vehicle[6] for vehicle in moving]
+            rel_factors = np.array([1 - vehicle[4] for vehicle in moving])
+            tt_array[:, 1] = rel_factors * tt_array[:, 1]
+            td_array[:, 1] = rel_factors * td_array[:, 1]
+            node_times = np.cumsum(tt_array, axis=1)
+            node_distances = np.cumsum(td_array, axis=1)
+            # number of nodes reached before the end of the time interval (arrival times are sorted along each row)
+            nr_passed_list = (node_times[:, 1:] <= end_time).sum(axis=1).tolist()
+            node_times = node_times.tolist()
+            node_distances = node_distances.tolist()
+            nr_edges = nr_edges.tolist()
+            blocked_edges = {}  # row -> list of chunk edge indices with very large travel times
+            for flat_index in blocked.tolist():
+                blocked_edges.setdefault(rows[flat_index], []).append(cols[flat_index] - 1)
+            still_moving = []
+            for row, (j, offset, o_node, d_node, rel_pos, c_time, c_dist) in enumerate(moving):
+                route = routes[j]
+                nr_passed = nr_passed_list[row]
+                row_times = node_times[row]
+                row_distances = node_distances[row]
+                for k in blocked_edges.get(row, []):
+                    if k <= nr_passed:
+                        e_o, e_d = (o_node, d_node) if k == 0 else (route[offset + k - 1], route[offset + k])
+                        LOG.warning(f"move_fleet_along_routes: very large travel time on edge ({e_o} -> {e_d} for vid {sim_vid_ids[j] if sim_vid_ids is not None else None} at time {new_sim_time}) (blocked after tt update?) -> vehicle jumps this edge")
+                if nr_passed > 0:
+                    passed_nodes[j].extend(route[offset:offset + nr_passed])
+                    if record_node_times:
+                        passed_node_times[j].extend(row_times[1:nr_passed + 1])
+                if nr_passed < nr_edges[row]:
+                    # vehicle ends on edge with index nr_passed
+                    if nr_passed == 0:
+                        e_o, e_d, e_rel_pos = o_node, d_node, rel_pos
+                    else:
+                        e_o, e_d, e_rel_pos = route[offset + nr_passed - 1], route[offset + nr_passed], 0
+                    e_tt, e_td = self.nodes[e_o].get_travel_infos_to(e_d)
+                    last_time = row_times[nr_passed]
+                    end_rel_factor = (end_time - last_time) / e_tt + e_rel_pos
+                    driven_distance = row_distances[nr_passed] + (end_rel_factor - e_rel_pos) * e_td
+                    results[j] = ((e_o, e_d, end_rel_factor), driven_distance, -1, passed_nodes[j],
+                                  passed_node_times[j])
+                elif offset + nr_passed == len(route):
+                    # vehicle reaches end of route
+                    results[j] = ((route[-1], None, None), row_distances[nr_passed], row_times[nr_passed],
+                                  passed_nodes[j], passed_node_times[j])
+                else:
+                    # vehicle passed all edges of the chunk -> continue with next chunk
+                    new_offset = offset + nr_passed
+                    still_moving.append([j, new_offset, route[new_offset - 1], route[new_offset], 0,
+                                         row_times[nr_passed], row_distances[nr_passed]])
+            moving = still_moving
+            chunk *= 2
+        return results
+
+    def _get_edge_travel_info_arrays(self):
+        """ this function returns the travel infos of all edges as arrays sorted by the edge key
+        (o_node_index * number_nodes + d_node_index); the arrays are built after every travel time update
+
+        :return: tuple of (edge keys, edge travel times, edge distances)
+        """
+        if self._edge_travel_info_arrays is None:
+            nr_nodes = len(self.nodes)
+            keys = []
+            tts = []
+            tds = []
+            for o_node in self.nodes:
+                for d_node_index, (tt, td) in o_node.travel_infos_to.items():
+                    keys.append(o_node.node_index * nr_nodes + d_node_index)
+                    tts.append(tt)
+                    tds.append(td)
+            keys = np.array(keys, dtype=np.int64)
+            order = np.argsort(keys)
+            self._edge_travel_info_arrays = (keys[order], np.array(tts, dtype=float)[order],
+                                             np.array(tds, dtype=float)[order])
+        return self._edge_travel_info_arrays
+
     def add_travel_infos_to_database(self, travel_info_dict):
         """ this function can be used to include externally computed (e.g. multiprocessing) route travel times
         into the database if present
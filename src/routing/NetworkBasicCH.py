@@ -0,0 +1,208 @@
+"""
+Authors: Roman Engelhardt, Florian Dandl
+TUM, 2020
+In order to guarantee transferability of models, Network models should follow the following conventions.
+Classes should be called
+Node
+Edge
+Network
+in order to guarantee correct import in other modules.
+"""
+
+# -------------------------------------------------------------------------------------------------------------------- #
+# standard distribution imports
+# -----------------------------
+import os
+import logging
+
+# additional module imports (> requirements)
+# ------------------------------------------
+import pandas as pd
+
+# src imports
+# -----------
+from src.routing.NetworkBasic import NetworkBasic, Edge
+from src.routing.routing_imports.Router import Router
+
+# -------------------------------------------------------------------------------------------------------------------- #
+# global variables
+# ----------------
+from src.misc.globals import *
+LOG = logging.getLogger(__name__)
+
+CH_NODE_ORDER_F = "ch_node_order.csv"
+CH_SHORTCUTS_F = "ch_shortcuts.csv"
+
+INPUT_PARAMETERS_NetworkBasicCH = {
+    "doc" : """
+        This routing class computes 1-to-1 queries with a bidirectional upward search on a contraction hierarchy
+        and unpacks shortcuts to return full routes. All other queries are computed as in NetworkBasic.
+        The contraction hierarchy has to be preprocessed with src/preprocessing/networks/create_contraction_hierarchy.py
+        (files ch_node_order.csv and ch_shortcuts.csv next to the edge files). If no preprocessed files are found for
+        the current travel times, the class falls back to the bidirectional dijkstra of NetworkBasic.
+        """,
+    "inherit" : "NetworkBasic",
+    "input_parameters_mandatory": [],
+    "input_parameters_optional": [],
+    "mandatory_modules": [],
+    "optional_modules": []
+}
+
+
+class NetworkBasicCH(NetworkBasic):
+    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None):
+        """
+        The network will be initialized.
+        This network uses contraction hierarchies for time shortest 1-to-1 routing queries.
+
+        :param network_name_dir: name of the network_directory to be loaded
+        :param type: determining whether the base or a pre-processed network will be used
+        :param scenario_time: applying travel times for a certain scenario at a given time in the scenario
+        :param network_dynamics_file_name: file-name of the network dynamics file
+        :type network_dynamics_file_name: str
+        """
+        self.ch_flag = False
+        self.ch_loaded_folder = None
+        self.shortcut_via_nodes = {}    # (o_node_index, d_node_index) -> bypassed node index
+        super().__init__(network_name_dir, network_dynamics_file_name=network_dynamics_file_name, scenario_time=scenario_time)
+
+    def loadNetwork(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None):
+        super().loadNetwork(network_name_dir, network_dynamics_file_name=network_dynamics_file_name, scenario_time=scenario_time)
+        if self.ch_loaded_folder is None:
+            self._load_contraction_hierarchy(os.path.join(network_name_dir, "base"))
+
+    def load_tt_file(self, scenario_time):
+        """
+        loads new travel time files for scenario_time and the corresponding contraction hierarchy
+        """
+        super().load_tt_file(scenario_time)
+        self._load_contraction_hierarchy(self.travel_time_file_folders[scenario_time])
+
+    def _load_contraction_hierarchy(self, folder):
+        """ loads node order and shortcuts from folder and sets the upward edges of all nodes
+        if files are not available, contraction hierarchies are disabled until the next travel time update
+
+        :param folder: base folder or travel time folder of the network
+        """
+        self.ch_loaded_folder = folder
+        self.shortcut_via_nodes = {}
+        for node in self.nodes:
+            node.ch_value = None
+            node.ch_edges_to = {}
+            node.ch_edges_from = {}
+        order_f = os.path.join(folder, CH_NODE_ORDER_F)
+        shortcut_f = os.path.join(folder, CH_SHORTCUTS_F)
+        if not os.path.isfile(order_f) or not os.path.isfile(shortcut_f):
+            LOG.warning(f"no contraction hierarchy found in {folder} -> bidirectional dijkstra is used for 1to1 queries")
+            self.ch_flag = False
+            return
+        LOG.info(f"loading contraction hierarchy from {folder}")
+        order_df = pd.read_csv(order_f)
+        for node_index, node_order in zip(order_df[G_NODE_ID].values, order_df[G_NODE_CH_ORDER].values):
+            self.nodes[node_index].ch_value = int(node_order)
+        for o_node in self.nodes:
+            for d_node, edge in o_node.edges_to.items():
+                self._add_ch_edge(o_node, d_node, edge)
+        shortcut_df = pd.read_csv(shortcut_f)
+        for o_index, d_index, dis, tt, via_index in zip(shortcut_df[G_EDGE_FROM].values, shortcut_df[G_EDGE_TO].values,
+                                                        shortcut_df[G_EDGE_DIST].values, shortcut_df[G_EDGE_TT].values,
+                                                        shortcut_df[G_EDGE_SC].values):
+            o_node = self.nodes[o_index]
+            d_node = self.nodes[d_index]
+            if self._add_ch_edge(o_node, d_node, Edge((o_node, d_node), dis, tt)):
+                self.shortcut_via_nodes[(o_node.node_index, d_node.node_index)] = int(via_index)
+        self.ch_flag = True
+
+    def _add_ch_edge(self, o_node, d_node, edge):
+        """ adds an edge to the upward graph of the lower ranked node in case it improves an existing edge
+
+        :return: True, if edge has been added
+        """
+        if o_node.ch_value < d_node.ch_value:
+            edge_dict = o_node.ch_edges_to
+            other_node = d_node
+        else:
+            edge_dict = d_node.ch_edges_from
+            other_node = o_node
+        existing_edge = edge_dict.get(other_node)
+        if existing_edge is not None and existing_edge.get_tt() <= edge.get_tt():
+            return False
+        edge_dict[other_node] = edge
+        self.shortcut_via_nodes.pop((o_node.node_index, d_node.node_index), None)
+        return True
+
+    def _unpack_ch_route(self, ch_route):
+        """ replaces all shortcuts of a route in the contraction hierarchy by the original node sequence
+
+        :param ch_route: list of node indices connected by upward edges
+        :return: list of node indices connected by network edges
+        """
+        route = ch_route[:1]
+        stack = [(ch_route[i], ch_route[i+1]) for i in range(len(ch_route) - 2, -1, -1)]
+        while stack:
+            o_index, d_index = stack.pop()
+            via_index = self.shortcut_via_nodes.get((o_index, d_index))
+            if via_index is None:
+                route.append(d_index)
+            else:
+                stack.append((via_index, d_index))
+                stack.append((o_index, via_index))
+        return route
+
+    def return_travel_costs_1to1(self, origin_position, destination_position, customized_section_cost_function = None):
+        """
+        This method will return the travel costs of the fastest route between two nodes.
+        :param origin_position: (current_edge_origin_node_index, current_edge_destination_node_index, relative_position)
+        :param destination_position: (destination_edge_origin_node_index, destination_edge_destination_node_index, relative_position)
+        :param customized_section_cost_function: function to compute the travel cost of an section: args: (travel_time, travel_distance, current_dijkstra_node) -> cost_value
+                if None: travel_time is considered as the cost_function of a section
+        :return: (cost_function_value, travel time, travel_distance) between the two nodes
+        """
+        if not self.ch_flag or customized_section_cost_function is not None:
+            return super().return_travel_costs_1to1(origin_position, destination_position,
+                                                    customized_section_cost_function=customized_section_cost_function)
+        trivial_test = self.test_and_get_trivial_route_tt_and_dis(origin_position, destination_position)
+        if trivial_test is not None:
+            return trivial_test[1]
+        origin_node = origin_position[0]
+        origin_overhead = (0.0, 0.0, 0.0)
+        if origin_position[1] is not None:
+            origin_node = origin_position[1]
+            origin_overhead = self.get_section_overhead(origin_position, from_start=False)
+        destination_node = destination_position[0]
+        destination_overhead = (0.0, 0.0, 0.0)
+        if destination_position[1] is not None:
+            destination_overhead = self.get_section_overhead(destination_position, from_start=True)
+        R = Router(self, origin_node, destination_nodes=[destination_node], mode='bidirectional', ch_flag=True)
+        s = R.compute(return_route=False)[0][1]
+        res = (s[0] + origin_overhead[0] + destination_overhead[0], s[1] + origin_overhead[1] + destination_overhead[1], s[2] + origin_overhead[2] + destination_overhead[2])
+        self._add_to_database(origin_node, destination_node, s[0], s[1], s[2])
+        return res
+
+    def return_best_route_1to1(self, origin_position, destination_position, customized_section_cost_function = None):
+        """
+        This method will return the best route [list of node_indices] between two nodes,
+        while origin_position[0] and destination_postion[1](or destination_position[0] if destination_postion[1]==None) is included.
+        :param origin_position: (current_edge_origin_node_index, current_edge_destination_node_index, relative_position)
+        :param destination_position: (destination_edge_origin_node_index, destination_edge_destination_node_index, relative_position)
+        :param customized_section_cost_function: function to compute the travel cost of an section: args: (travel_time, travel_distance, current_dijkstra_node) -> cost_value
+                if None: travel_time is considered as the cost_function of a section
+        :return : route (list of node_indices) of best route
+        """
+        if not self.ch_flag or customized_section_cost_function is not None:
+            return super().return_best_route_1to1(origin_position, destination_position,
+                                                  customized_section_cost_function=customized_section_cost_function)
+        trivial_test = self.test_and_get_trivial_route_tt_and_dis(origin_position, destination_position)
+        if trivial_test is not None:
+            return trivial_test[0]
+        origin_node = origin_position[0]
+        destination_node = destination_position[0]
+        if origin_position[1] is not None:
+            origin_node = origin_position[1]
+        R = Router(self, origin_node, destination_nodes=[destination_node], mode='bidirectional', ch_flag=True)
+        node_list = self._unpack_ch_route(R.compute(return_route=True)[0][0])
+        if origin_node != origin_position[0]:
+            node_list = [origin_position[0]] + node_list
+        if destination_position[1] is not None:
+            node_list.append(destination_position[1])
+        return node_list
@@ -94,6 +94,15 @@ class NetworkBasicCpp(NetworkBasic):
             self._add_to_database(origin_node, destination_node, s[0], s[0], s[1])
         return res
 
+    def _return_node_travel_costs_MtoN(self, origin_nodes, destination_nodes, max_cost_value=None):
+        """ computes travel times and distances between all origin and all destination nodes within one c++ call
+        :param origin_nodes: array of distinct origin node indices (M)
+        :param destination_nodes: array of distinct destination node indices (N)
+        :param max_cost_value: maximum travel time of the searches
+        :return: tuple of numpy arrays (travel_times, travel_distances) with shape (M, N); np.inf if not reachable
+        """
+        return self.cpp_router.computeTravelCostsMtoN(origin_nodes, destination_nodes, max_time_range=max_cost_value)
+
     def return_travel_costs_Xto1(self, list_origin_positions, destination_position, max_routes=None, max_cost_value=None, customized_section_cost_function = None):
         """
         This method will return a list of tuples of origin node and travel time of the X fastest routes between
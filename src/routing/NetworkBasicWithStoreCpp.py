@@ -24,6 +24,7 @@ import numpy as np
 # -----------
 from src.routing.NetworkBasicCpp import NetworkBasicCpp
 from src.routing.cpp_router.PyNetwork import PyNetwork
+from src.routing.routing_imports.TravelInfoCache import TravelInfoCache
 
 # -------------------------------------------------------------------------------------------------------------------- #
 # global variables
@@ -36,17 +37,20 @@ INPUT_PARAMETERS_NetworkBasicWithStoreCpp = {
         This routing class does all routing computations based on dijkstras algorithm.
         Compared to NetworkBasicWithStore, this module has the same methods but is implemented in C++ and included via Cython.
         Compared to NetworkBasicCpp.py, this class stores already computed travel infos in a dictionary and returns the values from this dictionary if queried again.
+        The store is a size-bounded LRU cache; entries computed with outdated travel times are invalidated lazily.
         To install the coupling to C++, you need to run `src\routing\cpp_router\setup.py`
         """,
     "inherit" : "NetworkBasicCpp",
     "input_parameters_mandatory": [],
-    "input_parameters_optional": [],
+    "input_parameters_optional": [
+        G_NW_ROUTE_CACHE_SIZE
+    ],
     "mandatory_modules": [],
     "optional_modules": []
 }
 
 class NetworkBasicWithStoreCpp(NetworkBasicCpp):
-    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None):
+    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None, route_cache_size=None):
         """
         The network will be initialized.
         This network stores routing results from return_travel_costs_1to1 in a database to retrieve them in case they are queried again
@@ -58,11 +62,11 @@ class NetworkBasicWithStoreCpp(NetworkBasicCpp):
         :param scenario_time: applying travel times for a certain scenario at a given time in the scenario
         :param network_dynamics_file_name: file-name of the network dynamics file
         :type network_dynamics_file_name: str
+        :param route_cache_size: maximum number of stored node-to-node results (None -> default size)
         """
+        self.travel_time_infos = TravelInfoCache(max_size=route_cache_size) #(o,d) -> (cfv, tt, dis)
         super().__init__(network_name_dir, network_dynamics_file_name=network_dynamics_file_name, scenario_time=scenario_time)
 
-        self.travel_time_infos = {} #(o,d) -> (tt, dis)
-
     def update_network(self, simulation_time, update_state = True):
         """This method can be called during simulations to update travel times (dynamic networks).
 
@@ -96,8 +100,8 @@ class NetworkBasicWithStoreCpp(NetworkBasicCpp):
         destination_overhead = (0.0, 0.0, 0.0)
         if destination_position[1] is not None:
             destination_overhead = self.get_section_overhead(destination_position, from_start=True)
-        if self.travel_time_infos.get( (origin_node, destination_node) ) is not None:
-            s = self.travel_time_infos[(origin_node, destination_node)]
+        s = self.travel_time_infos.get( (origin_node, destination_node) )
+        if s is not None:
             return (s[0] + origin_overhead[0] + destination_overhead[0], s[1] + origin_overhead[1] + destination_overhead[1], s[2] + origin_overhead[2] + destination_overhead[2])
         else:
             s = self.cpp_router.computeTravelCosts1To1(origin_node, destination_node)
@@ -109,7 +113,13 @@ class NetworkBasicWithStoreCpp(NetworkBasicCpp):
             return res
 
     def _reset_internal_attributes_after_travel_time_update(self):
-        self.travel_time_infos = {}
+        self.travel_time_infos.new_epoch()
+
+    def get_route_cache_statistics(self):
+        """ this function returns counters of the internal routing result database
+        :return: dictionary statistic name -> cumulative value
+        """
+        return self.travel_time_infos.get_statistics()
 
     def add_travel_infos_to_database(self, travel_info_dict):
         """ this function can be used to include externally computed (e.g. multiprocessing) route travel times
@@ -129,17 +139,17 @@ class NetworkBasicWithStoreCpp(NetworkBasicCpp):
                 origin_node = origin_position[1]
                 origin_overhead = self.get_section_overhead(origin_position, from_start=False)
             destination_node = destination_position[0]
-            if self.travel_time_infos.get( (origin_node, destination_node) ) is not None:
+            if (origin_node, destination_node) in self.travel_time_infos:
                 continue
             destination_overhead = (0.0, 0.0, 0.0)
             if destination_position[1] is not None:
                 destination_overhead = self.get_section_overhead(destination_position, from_start=True)
             s_adopted = (s[0] - origin_overhead[0] - destination_overhead[0], s[1] - origin_overhead[1] - destination_overhead[1], s[2] - origin_overhead[2] - destination_overhead[2])
-            self.travel_time_infos[(origin_node, destination_node)] = s_adopted
+            self.travel_time_infos.set((origin_node, destination_node), s_adopted)
 
     def _add_to_database(self, o_node, d_node, cfv, tt, dis):
         """ this function is call when new routing results have been computed
         depending on the class the function can be overwritten to store certain results in the database
         """
-        if self.travel_time_infos.get( (o_node, d_node) ) is None:
-            self.travel_time_infos[ (o_node, d_node) ] = (cfv, tt, dis)
\ No newline at end of file
+        if (o_node, d_node) not in self.travel_time_infos:
+            self.travel_time_infos.set( (o_node, d_node), (cfv, tt, dis) )
\ No newline at end of file
@@ -24,7 +24,7 @@ from src.misc.globals import *
 LOG = logging.getLogger(__name__)
 
 class NetworkImmediatePreproc(NetworkBasicWithStore):
-    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None):
+    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None, route_cache_size=None):
         """
         The network will be initialized.
         This network immdiatly computes the travel times between all nodes
@@ -34,8 +34,11 @@ class NetworkImmediatePreproc(NetworkBasicWithStore):
         :param scenario_time: applying travel times for a certain scenario at a given time in the scenario
         :param network_dynamics_file_name: file-name of the network dynamics file
         :type network_dynamics_file_name: str
+        :param route_cache_size: maximum number of stored node-to-node results; as all node pairs are preprocessed,
+                the cache is enlarged to the number of node pairs if it is smaller
         """
-        super().__init__(network_name_dir, network_dynamics_file_name=network_dynamics_file_name, scenario_time=scenario_time)
+        super().__init__(network_name_dir, network_dynamics_file_name=network_dynamics_file_name, scenario_time=scenario_time,
+                         route_cache_size=route_cache_size)
         self._preprocess_globally()
 
     def update_network(self, simulation_time, update_state = True):
@@ -53,10 +56,15 @@ class NetworkImmediatePreproc(NetworkBasicWithStore):
             return False
 
     def _preprocess_globally(self):
-        self.travel_time_infos = {}
+        # all node pairs are stored -> the cache has to hold all of them; entries of older travel times are already
+        # invalidated by update_network() and overwritten here
+        number_node_pairs = max(1, len(self.nodes)**2)
+        if self.travel_time_infos.max_size < number_node_pairs:
+            LOG.info(f"route cache size {self.travel_time_infos.max_size} increased to {number_node_pairs} for preprocessing of all node pairs")
+            self.travel_time_infos.max_size = number_node_pairs
         targets = [self.return_node_position(node.node_index) for node in self.nodes]
         for o_pos in targets:
             res = self.return_travel_costs_1toX(o_pos, targets)
-            for d_pos, _, tt, dis in res:
-                self.travel_time_infos[(o_pos[0], d_pos[0])] = (tt, dis)
+            for d_pos, cfv, tt, dis in res:
+                self.travel_time_infos.set((o_pos[0], d_pos[0]), (cfv, tt, dis))
     
\ No newline at end of file
@@ -24,6 +24,7 @@ import numpy as np
 # -----------
 from src.routing.NetworkBasic import NetworkBasic, Node, Edge
 from src.routing.routing_imports.Router import Router
+from src.routing.routing_imports.TravelInfoTables import load_travel_info_table
 
 # -------------------------------------------------------------------------------------------------------------------- #
 # global variables
@@ -45,13 +46,13 @@ INPUT_PARAMETERS_NetworkPartialPreprocessed = {
         """,
     "inherit" : "NetworkBasic",
     "input_parameters_mandatory": [],
-    "input_parameters_optional": [],
+    "input_parameters_optional": [G_NW_TABLE_MODE],
     "mandatory_modules": [],
     "optional_modules": []
 }
 
 class NetworkPartialPreprocessed(NetworkBasic):
-    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None):
+    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None, table_mode=None):
         """
         The network will be initialized.
 
@@ -68,7 +69,10 @@ class NetworkPartialPreprocessed(NetworkBasic):
         :param scenario_time: applying travel times for a certain scenario at a given time in the scenario
         :param network_dynamics_file_name: file-name of the network dynamics file
         :type network_dynamics_file_name: str
+        :param table_mode: loading mode of the travel time tables (see routing_imports/TravelInfoTables.py)
+        :type table_mode: str
         """
+        self.table_mode = table_mode
         self.tt_table = None
         self.dis_table = None
         self.max_preprocessed_index = -1
@@ -84,8 +88,8 @@ class NetworkPartialPreprocessed(NetworkBasic):
             f = "base"
         else:
             f = str(self.travel_time_file_folders[scenario_time])
-        self.tt_table = np.load(os.path.join(network_name_dir, f, "tt_matrix.npy"))
-        self.dis_table = np.load(os.path.join(network_name_dir, f, "dis_matrix.npy"))
+        self.tt_table = load_travel_info_table(os.path.join(network_name_dir, f, "tt_matrix.npy"), self.table_mode)
+        self.dis_table = load_travel_info_table(os.path.join(network_name_dir, f, "dis_matrix.npy"), self.table_mode)
         self.max_preprocessed_index = self.tt_table.shape[0]
         LOG.info(" ... travel time tables loaded until index {}".format(self.max_preprocessed_index))
 
@@ -139,7 +143,8 @@ class NetworkPartialPreprocessed(NetworkBasic):
         #LOG.warning("get1to1: {} -> {} table: {} dict {}".format(origin_node, destination_node, self.max_preprocessed_index, self.travel_time_infos.get( (origin_node, destination_node) , None)))
         if customized_section_cost_function is None:
             if origin_node < self.max_preprocessed_index and destination_node < self.max_preprocessed_index:
-                s = (self.tt_table[origin_node][destination_node], self.tt_table[origin_node][destination_node], self.dis_table[origin_node][destination_node])
+                tt = self.tt_table.get(origin_node, destination_node)
+                s = (tt, tt, self.dis_table.get(origin_node, destination_node))
             else:
                 s = self.travel_time_infos.get( (origin_node, destination_node) , None)
         if s is None:
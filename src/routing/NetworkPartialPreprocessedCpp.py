@@ -24,6 +24,7 @@ import numpy as np
 # -----------
 from src.routing.NetworkBasicCpp import NetworkBasicCpp
 from src.routing.cpp_router.PyNetwork import PyNetwork
+from src.routing.routing_imports.TravelInfoTables import load_travel_info_table
 
 # -------------------------------------------------------------------------------------------------------------------- #
 # global variables
@@ -48,13 +49,13 @@ INPUT_PARAMETERS_NetworkPartialPreprocessedCpp = {
         """,
     "inherit" : "NetworkBasicCpp",
     "input_parameters_mandatory": [],
-    "input_parameters_optional": [],
+    "input_parameters_optional": [G_NW_TABLE_MODE],
     "mandatory_modules": [],
     "optional_modules": []
 }
 
 class NetworkPartialPreprocessedCpp(NetworkBasicCpp):
-    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None):
+    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None, table_mode=None):
         """
         The network will be initialized.
 
@@ -71,7 +72,10 @@ class NetworkPartialPreprocessedCpp(NetworkBasicCpp):
         :param scenario_time: applying travel times for a certain scenario at a given time in the scenario
         :param network_dynamics_file_name: file-name of the network dynamics file
         :type network_dynamics_file_name: str
+        :param table_mode: loading mode of the travel time tables (see routing_imports/TravelInfoTables.py)
+        :type table_mode: str
         """
+        self.table_mode = table_mode
         self.tt_table = None
         self.dis_table = None
         self.max_preprocessed_index = -1
@@ -88,8 +92,8 @@ class NetworkPartialPreprocessedCpp(NetworkBasicCpp):
         else:
             f = str(self.travel_time_file_folders[scenario_time])
         try:
-            self.tt_table = np.load(os.path.join(network_name_dir, f, "tt_matrix.npy"))
-            self.dis_table = np.load(os.path.join(network_name_dir, f, "dis_matrix.npy"))
+            self.tt_table = load_travel_info_table(os.path.join(network_name_dir, f, "tt_matrix.npy"), self.table_mode)
+            self.dis_table = load_travel_info_table(os.path.join(network_name_dir, f, "dis_matrix.npy"), self.table_mode)
             self.max_preprocessed_index = self.tt_table.shape[0]
             LOG.info(" ... travel time tables loaded until index {}".format(self.max_preprocessed_index))
         except FileNotFoundError:
@@ -147,7 +151,8 @@ class NetworkPartialPreprocessedCpp(NetworkBasicCpp):
         #LOG.warning("get1to1: {} -> {} table: {} dict {}".format(origin_node, destination_node, self.max_preprocessed_index, self.travel_time_infos.get( (origin_node, destination_node) , None)))
         if customized_section_cost_function is None:
             if origin_node < self.max_preprocessed_index and destination_node < self.max_preprocessed_index:
-                s = (self.tt_table[origin_node][destination_node], self.tt_table[origin_node][destination_node], self.dis_table[origin_node][destination_node])
+                tt = self.tt_table.get(origin_node, destination_node)
+                s = (tt, tt, self.dis_table.get(origin_node, destination_node))
             else:
                 s = self.travel_time_infos.get( (origin_node, destination_node) , None)
         if s is not None:
@@ -162,6 +167,37 @@ class NetworkPartialPreprocessedCpp(NetworkBasicCpp):
                 self._add_to_database(origin_node, destination_node, s[0], s[0], s[1])
             return res
 
+    def _return_node_travel_costs_MtoN(self, origin_nodes, destination_nodes, max_cost_value=None):
+        """ computes travel times and distances between all origin and all destination nodes
+        pairs of preprocessed nodes are read from the tables, all other pairs are computed within one c++ call
+        :param origin_nodes: array of distinct origin node indices (M)
+        :param destination_nodes: array of distinct destination node indices (N)
+        :param max_cost_value: maximum travel time of the searches
+        :return: tuple of numpy arrays (travel_times, travel_distances) with shape (M, N); np.inf if not reachable
+        """
+        origin_nodes = np.asarray(origin_nodes)
+        destination_nodes = np.asarray(destination_nodes)
+        pre_o = origin_nodes < self.max_preprocessed_index
+        pre_d = destination_nodes < self.max_preprocessed_index
+        if not pre_o.any() or not pre_d.any():
+            return super()._return_node_travel_costs_MtoN(origin_nodes, destination_nodes, max_cost_value=max_cost_value)
+        tts = np.full((len(origin_nodes), len(destination_nodes)), np.inf)
+        dis = np.full((len(origin_nodes), len(destination_nodes)), np.inf)
+        table_pairs = np.ix_(pre_o, pre_d)
+        tts[table_pairs] = self.tt_table.submatrix(origin_nodes[pre_o], destination_nodes[pre_d])
+        dis[table_pairs] = self.dis_table.submatrix(origin_nodes[pre_o], destination_nodes[pre_d])
+        if max_cost_value is not None:
+            outside_range = tts > max_cost_value
+            tts[outside_range] = np.inf
+            dis[outside_range] = np.inf
+        if not pre_o.all():
+            other_rows = np.ix_(~pre_o, np.ones(len(destination_nodes), dtype=bool))
+            tts[other_rows], dis[other_rows] = self.cpp_router.computeTravelCostsMtoN(origin_nodes[~pre_o], destination_nodes, max_time_range=max_cost_value)
+        if not pre_d.all():
+            other_cols = np.ix_(pre_o, ~pre_d)
+            tts[other_cols], dis[other_cols] = self.cpp_router.computeTravelCostsMtoN(origin_nodes[pre_o], destination_nodes[~pre_d], max_time_range=max_cost_value)
+        return tts, dis
+
     def add_travel_infos_to_database(self, travel_info_dict):
         """ this function can be used to include externally computed (e.g. multiprocessing) route travel times
         into the database if present
@@ -14,6 +14,7 @@ from pyproj import Transformer
 # src imports
 # -----------
 from src.routing.NetworkBase import NetworkBase
+from src.routing.routing_imports.TravelInfoTables import load_travel_info_table
 
 # -------------------------------------------------------------------------------------------------------------------- #
 # global variables
@@ -89,14 +90,14 @@ INPUT_PARAMETERS_NetworkTTMatrix = {
         """,
     "inherit" : "NetworkBase",
     "input_parameters_mandatory": [G_NETWORK_NAME],
-    "input_parameters_optional": [G_NW_DYNAMIC_F],
+    "input_parameters_optional": [G_NW_DYNAMIC_F, G_NW_TABLE_MODE],
     "mandatory_modules": [],
     "optional_modules": []
 }
 
 class NetworkTTMatrix(NetworkBase):
     """Routing based on TT Matrix, tt-scaling factor is read from file."""
-    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None):
+    def __init__(self, network_name_dir, network_dynamics_file_name=None, scenario_time=None, table_mode=None):
         """The network will be initialized.
 
         :param network_name_dir: name of the network_directory to be loaded
@@ -107,8 +108,11 @@ class NetworkTTMatrix(NetworkBase):
         :type scenario_time: str
         :param network_dynamics_file_name: file-name of the network dynamics file
         :type network_dynamics_file_name: str
+        :param table_mode: loading mode of the travel time tables (see routing_imports/TravelInfoTables.py)
+        :type table_mode: str
         """
         super().__init__(network_name_dir, network_dynamics_file_name=network_dynamics_file_name, scenario_time=scenario_time)
+        self.table_mode = table_mode
         self.zones = None
         self.tt_factor = 1.0
         self.network_name_dir = network_name_dir
@@ -135,10 +139,9 @@ class NetworkTTMatrix(NetworkBase):
         # load TT and TD matrices
         print(f"\t ... loading network travel time/distance tables ...")
         tt_table_f = os.path.join(self.network_name_dir, "ff", "tables", "nn_fastest_tt.npy")
-        self.tt_numpy = np.load(tt_table_f)
-        self.tt = self.tt_numpy.tolist()
+        self.tt = load_travel_info_table(tt_table_f, self.table_mode, as_list=True)
         distance_table_f = os.path.join(self.network_name_dir, "ff", "tables", "nn_fastest_distance.npy")
-        self.td = np.load(distance_table_f).tolist()
+        self.td = load_travel_info_table(distance_table_f, self.table_mode, as_list=True)
         # load travel times
         self.current_tt_factor_index = 0
         self.sorted_tt_factor_times = []
@@ -221,8 +224,8 @@ class NetworkTTMatrix(NetworkBase):
                     elif self._precalculated_tt_paths:
                         path = self._precalculated_tt_paths[next_time]
                         if self._current_tt_path != path:
-                            self.tt_numpy = np.load(path.joinpath("tt_matrix.npy"))
-                            self.tt = self.tt_numpy.tolist()
+                            self.tt = load_travel_info_table(str(path.joinpath("tt_matrix.npy")), self.table_mode,
+                                                             as_list=True)
                             self._current_tt_path = path
                             tt_updated = True
                     if tt_updated is True:
@@ -230,6 +233,41 @@ class NetworkTTMatrix(NetworkBase):
                         break
         return tt_updated
     
+    def get_checkpoint_state(self):
+        """This method returns the dynamic state of the routing engine, which is saved in simulation checkpoints:
+        the current travel time factor and the path of the current precalculated travel time matrix.
+
+        :return: picklable state object
+        """
+        return {"sim_time": self.sim_time, "tt_factor": self.tt_factor,
+                "current_tt_factor_index": self.current_tt_factor_index, "tt_path": self._current_tt_path}
+
+    def set_checkpoint_state(self, checkpoint_state):
+        """This method sets the dynamic state of a newly loaded routing engine to the state of a checkpoint.
+
+        :param checkpoint_state: state object returned by get_checkpoint_state()
+        """
+        self.sim_time = checkpoint_state["sim_time"]
+        self.tt_factor = checkpoint_state["tt_factor"]
+        self.current_tt_factor_index = checkpoint_state["current_tt_factor_index"]
+        path = checkpoint_state["tt_path"]
+        if path is not None and path != self._current_tt_path:
+            self.tt = load_travel_info_table(str(path.joinpath("tt_matrix.npy")), self.table_mode, as_list=True)
+            self._current_tt_path = path
+
+    def get_next_update_time(self, simulation_time):
+        """This method returns the next simulation time at which travel time factors or matrices change.
+
+        :param simulation_time: current simulation time
+        :type simulation_time: float
+        :return: next update time (inf if there is none)
+        :rtype: float
+        """
+        for next_time in self.sorted_tt_factor_times:
+            if next_time > simulation_time:
+                return next_time
+        return float("inf")
+
     def reset_network(self, simulation_time: float):
         """ this method is used in case a module changed the travel times to future states for forecasts
         it resets the network to the travel times a stimulation_time
@@ -291,10 +329,10 @@ class NetworkTTMatrix(NetworkBase):
         :return: (travel time, distance); if no section between nodes (None, None)
         :rtype: list
         """
-        tt = self.tt[start_node_index][end_node_index]
+        tt = self.tt.get(start_node_index, end_node_index)
         scaled_tt = tt * self.tt_factor
         if tt not in [None, np.nan, np.inf]:
-            return scaled_tt, self.td[start_node_index][end_node_index]
+            return scaled_tt, self.td.get(start_node_index, end_node_index)
         else:
             return None, None
 
@@ -362,9 +400,9 @@ class NetworkTTMatrix(NetworkBase):
             if c_pos[2] is None:
                 c_pos = (c_pos[0], route[i], 0)
             rel_factor = (1 - c_pos[2])
-            # c_edge_tt = rel_factor * self.tt_factor * self.tt[c_pos[0]][c_pos[1]]
+            # c_edge_tt = rel_factor * self.tt_factor * self.tt.get(c_pos[0], c_pos[1])
             # next_node_time = last_time + c_edge_tt
-            c_edge_tt = self.tt_factor * self.tt[c_pos[0]][c_pos[1]]
+            c_edge_tt = self.tt_factor * self.tt.get(c_pos[0], c_pos[1])
             next_node_time = last_time + rel_factor * c_edge_tt
             end_time = np.round(end_time, 2)
             next_node_time = np.round(next_node_time, 2)  # TODO # raw value leads to 1.00000002 being recognized as > 1
@@ -372,13 +410,13 @@ class NetworkTTMatrix(NetworkBase):
             if next_node_time > end_time:
                 # move vehicle to final position of current edge
                 end_rel_factor = c_pos[2] + (end_time - last_time) / c_edge_tt
-                driven_distance += (end_rel_factor - c_pos[2]) * self.td[c_pos[0]][c_pos[1]]
+                driven_distance += (end_rel_factor - c_pos[2]) * self.td.get(c_pos[0], c_pos[1])
                 c_pos = (c_pos[0], c_pos[1], end_rel_factor)
                 arrival_in_time_step = -1
                 break
             else:
                 # move vehicle to next node/edge and record data
-                driven_distance += rel_factor * self.td[c_pos[0]][c_pos[1]]
+                driven_distance += rel_factor * self.td.get(c_pos[0], c_pos[1])
                 next_node = route[i]
                 list_passed_nodes.append(next_node)
                 if record_node_times:
@@ -405,8 +443,8 @@ class NetworkTTMatrix(NetworkBase):
         origin_node, destination_node, add_tt, add_dist = self._get_od_nodes_and_section_overheads(origin_position,
                                                                                                    destination_position)
         # matrix lookup
-        tt = self.tt[origin_node.node_index][destination_node.node_index]
-        dist = self.td[origin_node.node_index][destination_node.node_index]
+        tt = self.tt.get(origin_node.node_index, destination_node.node_index)
+        dist = self.td.get(origin_node.node_index, destination_node.node_index)
         # scaling
         scaled_tt = (add_tt + tt) * self.tt_factor
         return scaled_tt, scaled_tt, dist + add_dist
@@ -650,8 +688,8 @@ class NetworkTTMatrix(NetworkBase):
             return (0.0, 0.0)
         o_node_index = position[0]
         d_node_index = position[1]
-        all_travel_time = self.tt[o_node_index][d_node_index]
-        all_travel_distance = self.td[o_node_index][d_node_index]
+        all_travel_time = self.tt.get(o_node_index, d_node_index)
+        all_travel_distance = self.td.get(o_node_index, d_node_index)
         overhead_fraction = position[2]
         if not traveled_from_start:
             overhead_fraction = 1.0 - overhead_fraction
@@ -700,7 +738,7 @@ class NetworkTTMatrix(NetworkBase):
         node_list = [current_node.node_index]
         route_tt = 0.0
         scaled_route_tt = 0.0
-        total_tt = self.tt[origin_node.node_index][destination_node.node_index]
+        total_tt = self.tt.get(origin_node.node_index, destination_node.node_index)
         if total_tt in [None, np.nan, np.inf]:
             prt_str = f"There is no route from {origin_node} to {destination_node}"
             raise AssertionError(prt_str)
@@ -711,8 +749,8 @@ class NetworkTTMatrix(NetworkBase):
                 # A->B + B->C = A->C
                 if next_node_obj.is_stop_only and next_node_obj != destination_node:
                     continue
-                next_tt = self.tt[current_node.node_index][next_node_id]
-                from_next_tt = self.tt[next_node_id][destination_node.node_index]
+                next_tt = self.tt.get(current_node.node_index, next_node_id)
+                from_next_tt = self.tt.get(next_node_id, destination_node.node_index)
                 if route_tt + next_tt + from_next_tt - total_tt < EPS:
                     found_next_node = True
                     node_list.append(next_node_id)
@@ -735,7 +773,7 @@ class NetworkTTMatrix(NetworkBase):
         :return: set of origin_node_indices that are close enough to reach destination node within max_time_value
         """
         d_node_index = destination_node.node_index
-        d_surround = set(np.argwhere(self.tt_numpy[:, d_node_index] <= max_time_value).flatten())
+        d_surround = set(np.argwhere(self.tt.column(d_node_index) <= max_time_value).flatten())
         destination_node.surround_prev[max_time_value] = d_surround
         return d_surround
 
@@ -749,7 +787,7 @@ class NetworkTTMatrix(NetworkBase):
         :return: set of destination_node_indices that are close enough to be reached from origin within max_time_value
         """
         o_node_index = origin_node.node_index
-        o_surround = set(np.argwhere(self.tt_numpy[o_node_index, :] <= max_time_value).flatten())
+        o_surround = set(np.argwhere(self.tt.row(o_node_index) <= max_time_value).flatten())
         if save:
             origin_node.surround_next[max_time_value] = o_surround
         return o_surround
@@ -436,6 +436,51 @@ int Network::computeTravelCostsXTo1py(int start_node_index, int number_targets,
     return return_vector.size();
 }
 
+int Network::computeTravelCostsMToNpy(int number_origins, int* origins, int number_targets, int* targets, double* tts, double* dis, double time_range) {
+    // results are written row-wise: tts[i * number_targets + j] is the travel time from origins[i] to targets[j]
+    // pairs that are not reached are set to -1
+    // one dijkstra is computed for each origin (forward) or for each target (backward); the smaller number is chosen
+    // origins and targets should not contain duplicates (otherwise the searches do not terminate early)
+    for (int k = 0; k < number_origins * number_targets; ++k) {
+        tts[k] = -1.0;
+        dis[k] = -1.0;
+    }
+    int reached_pairs = 0;
+    if (number_origins <= number_targets) {
+        vector<int> vec_targets(targets, targets + number_targets);
+        setTargets(vec_targets);
+        for (int i = 0; i < number_origins; ++i) {
+            dijkstraForward(origins[i], time_range);
+            for (int j = 0; j < number_targets; ++j) {
+                Node& target_node = nodes[targets[j]];
+                if (target_node.isSettledFw(dijkstra_number)) {
+                    pair<double, double> costs = target_node.getCostFw();
+                    tts[i * number_targets + j] = costs.first;
+                    dis[i * number_targets + j] = costs.second;
+                    reached_pairs++;
+                }
+            }
+        }
+    }
+    else {
+        vector<int> vec_origins(origins, origins + number_origins);
+        setTargets(vec_origins);
+        for (int j = 0; j < number_targets; ++j) {
+            dijkstraBackward(targets[j], time_range);
+            for (int i = 0; i < number_origins; ++i) {
+                Node& origin_node = nodes[origins[i]];
+                if (origin_node.isSettledBw(dijkstra_number)) {
+                    pair<double, double> costs = origin_node.getCostBw();
+                    tts[i * number_targets + j] = costs.first;
+                    dis[i * number_targets + j] = costs.second;
+                    reached_pairs++;
+                }
+            }
+        }
+    }
+    return reached_pairs;
+}
+
 int Network::dijkstraBackward(int start_node_index, double time_range, int max_targets) {
     dijkstra_number++;
     priority_queue<pair<double, int>> pq = {};
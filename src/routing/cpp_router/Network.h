@@ -37,6 +37,7 @@ public:
 	std::vector<Resultstruct> computeTravelCostsXto1(int start_node_index, const std::vector<int>& targets, double time_range = -1, int max_targets = -1);
 	int computeTravelCosts1ToXpy(int start_node_index, int number_targets, int* targets, int* reached_targets, double* reached_target_tts, double* reached_target_dis, double time_range = -1, int max_targets = -1);
 	int computeTravelCostsXTo1py(int start_node_index, int number_targets, int* targets, int* reached_targets, double* reached_target_tts, double* reached_target_dis, double time_range = -1, int max_targets = -1);
+	int computeTravelCostsMToNpy(int number_origins, int* origins, int number_targets, int* targets, double* tts, double* dis, double time_range = -1);
 	void computeTravelCosts1To1py(int start_node_index, int end_node_index, double* tt, double* dis);
 	int computeRouteSize1to1(int start_node_index, int end_node_index);
 	void writeRoute(int* output_array);
@@ -18,6 +18,7 @@ cdef extern from "Network.h":
         void updateEdgeTravelTimes(string) except +
         int computeTravelCosts1ToXpy(int start_node_index, int number_targets, int* targets, int* reached_targets, double* reached_target_tts, double* reached_target_dis, double time_range, int max_targets) except +
         int computeTravelCostsXTo1py(int start_node_index, int number_targets, int* targets, int* reached_targets, double* reached_target_tts, double* reached_target_dis, double time_range, int max_targets) except +
+        int computeTravelCostsMToNpy(int number_origins, int* origins, int number_targets, int* targets, double* tts, double* dis, double time_range) except +
         void computeTravelCosts1To1py(int start_node_index, int end_node_index, double* tt, double* dis) except +
         int computeRouteSize1to1(int start_node_index, int end_node_index) except +
         void writeRoute(int* output_array) except +
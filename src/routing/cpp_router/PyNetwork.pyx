@@ -53,9 +53,9 @@ cdef class PyNetwork:
             targets[i] = x
         #tts and dis will be overwritten with c++ function
         cdef np.ndarray[double, ndim=1, mode='c'] tts
-        tts = np.zeros((N_targets,), dtype=np.float)
+        tts = np.zeros((N_targets,), dtype=np.float64)
         cdef np.ndarray[double, ndim=1, mode='c'] dis
-        dis = np.zeros((N_targets,), dtype=np.float)
+        dis = np.zeros((N_targets,), dtype=np.float64)
         #calling c++: results will be stored in tts/dis; returns number of reached targets
         cdef int reached_targets = self.c_net.computeTravelCostsXTo1py(start_node_index, N_targets, &targets[0], &targets[0], &tts[0], &dis[0], mr, mt)
         return [(targets[i], tts[i], dis[i]) for i in range(reached_targets)]
@@ -83,13 +83,46 @@ cdef class PyNetwork:
             targets[i] = x
         #tts and dis will be overwritten with c++ function
         cdef np.ndarray[double, ndim=1, mode='c'] tts
-        tts = np.zeros((N_targets,), dtype=np.float)
+        tts = np.zeros((N_targets,), dtype=np.float64)
         cdef np.ndarray[double, ndim=1, mode='c'] dis
-        dis = np.zeros((N_targets,), dtype=np.float)
+        dis = np.zeros((N_targets,), dtype=np.float64)
         #calling c++: results will be stored in tts/dis; returns number of reached targets
         cdef int reached_targets = self.c_net.computeTravelCosts1ToXpy(start_node_index, N_targets, &targets[0], &targets[0], &tts[0], &dis[0], mr, mt)
         return [(targets[i], tts[i], dis[i]) for i in range(reached_targets)]
 
+    def computeTravelCostsMtoN(self, list_origin_node_indices, list_target_node_indices, max_time_range = None):
+        """
+        computes the travel costs between all origins and all targets within a single call
+        :param list_origin_node_indices: list int origins (M); should not contain duplicates
+        :param list_target_node_indices: list int targets (N); should not contain duplicates
+        :param max_time_range: float; targets outside of this range will not be reached
+        :return: tuple of numpy arrays (tts, dis) with shape (M, N); np.inf if target is not reached
+        """
+        #defining ctypes
+        cdef int N_origins = len(list_origin_node_indices)
+        cdef int N_targets = len(list_target_node_indices)
+        cdef double mr = -1.0
+        if max_time_range is not None:
+            mr = max_time_range
+        #defining arrays to pass as reference
+        cdef np.ndarray[int, ndim=1, mode='c'] origins
+        origins = np.ascontiguousarray(list_origin_node_indices, dtype=np.int32)
+        cdef np.ndarray[int, ndim=1, mode='c'] targets
+        targets = np.ascontiguousarray(list_target_node_indices, dtype=np.int32)
+        #tts and dis will be overwritten with c++ function
+        cdef np.ndarray[double, ndim=2, mode='c'] tts
+        tts = np.zeros((N_origins, N_targets), dtype=np.float64)
+        cdef np.ndarray[double, ndim=2, mode='c'] dis
+        dis = np.zeros((N_origins, N_targets), dtype=np.float64)
+        if N_origins == 0 or N_targets == 0:
+            return tts, dis
+        #calling c++: results will be stored in tts/dis
+        self.c_net.computeTravelCostsMToNpy(N_origins, &origins[0], N_targets, &targets[0], &tts[0, 0], &dis[0, 0], mr)
+        not_reached = tts < -0.001
+        tts[not_reached] = np.inf
+        dis[not_reached] = np.inf
+        return tts, dis
+
     def computeTravelCosts1To1(self, start_node_index, end_node_index):
         """
         :param start_node_index: int start_node
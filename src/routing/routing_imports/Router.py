@@ -53,10 +53,10 @@ class Router():
             self.end_hc_val = 999999999999999
 
         self.customized_section_cost_function = customized_section_cost_function
+        if self.customized_section_cost_function is not None and self.ch_flag:
+            print("WARNING IN ROUTER: Contraction Hierachies disabled! Only time shortest computations feasible!")
+            self.ch_flag = False
         if self.customized_section_cost_function == None:
-            if self.ch_flag:
-                print("WARNING IN ROUTER: Contraction Hierachies disabled! Only time shortest computations feasible!")
-                self.ch_flag = False
             self.customized_section_cost_function = shortest_travel_time_cost_function
 
         self.dijkstra_number = self.nw.current_dijkstra_number + 1
@@ -538,7 +538,7 @@ class Router():
             if current_forward_cost < current_backward_cost:
                 self.dijkstraStepForwards(frontierForward, current_forward_node_obj, current_forward_cost)
                 if current_forward_node_obj.settled_back == self.dijkstra_number:
-                    if not current_forward_node_obj.isFs() or current_forward_node_obj.node_index == self.start or current_forward_node_obj.node_index == end:
+                    if not current_forward_node_obj.must_stop() or current_forward_node_obj.node_index == self.start or current_forward_node_obj.node_index == end:
                         c = current_forward_node_obj.cost[0] + current_forward_node_obj.cost_back[0]
                         if c < current_solution[1]:
                             current_solution = (current_forward_node_obj, c)
@@ -547,7 +547,7 @@ class Router():
             else:
                 self.dijkstraStepBackwards(frontierBackward, current_backward_node_obj, current_backward_cost)
                 if current_backward_node_obj.settled == self.dijkstra_number:
-                    if not current_backward_node_obj.isFs() or current_backward_node_obj.node_index == end or current_backward_node_obj.node_index == self.start:
+                    if not current_backward_node_obj.must_stop() or current_backward_node_obj.node_index == end or current_backward_node_obj.node_index == self.start:
                         c = current_backward_node_obj.cost[0] + current_backward_node_obj.cost_back[0]
                         if c < current_solution[1]:
                             current_solution = (current_backward_node_obj, c)
@@ -0,0 +1,85 @@
+"""
+Size-bounded least-recently-used store for node-to-node routing results.
+
+Each entry is tagged with the travel time epoch it was computed in. The epoch is increased with every travel time
+update of the network; entries of older epochs are not flushed at once, but treated as misses and removed lazily when
+they are accessed again or reach the end of the LRU order.
+"""
+from collections import OrderedDict
+
+DEFAULT_ROUTE_CACHE_SIZE = 1000000
+
+# keys of cache statistics (also used as columns of the dynamic fleet control output)
+CACHE_HITS = "route_cache_hits"
+CACHE_MISSES = "route_cache_misses"
+CACHE_EVICTIONS = "route_cache_evictions"
+CACHE_STALE_EVICTIONS = "route_cache_stale_evictions"
+CACHE_SIZE = "route_cache_size"
+
+
+class TravelInfoCache:
+    def __init__(self, max_size=None):
+        """
+        :param max_size: maximum number of stored (o_node, d_node) entries (None -> DEFAULT_ROUTE_CACHE_SIZE)
+        """
+        if max_size is None:
+            max_size = DEFAULT_ROUTE_CACHE_SIZE
+        max_size = int(max_size)
+        if max_size <= 0:
+            raise IOError(f"route cache size has to be positive! given: {max_size}")
+        self.max_size = max_size
+        self.epoch = 0
+        self._entries = OrderedDict()     # (o_node, d_node) -> (epoch, travel_info)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] == self.epoch
+
+    def get(self, key):
+        """ returns the travel info stored for key and marks it as recently used
+        :param key: (o_node, d_node)
+        :return: stored travel info or None if not available for the current epoch
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != self.epoch:
+            del self._entries[key]
+            self.stale_evictions += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, travel_info):
+        """ stores travel info for key in the current epoch; removes the least recently used entry if necessary
+        :param key: (o_node, d_node)
+        :param travel_info: (cfv, tt, dis)
+        """
+        entries = self._entries
+        entries[key] = (self.epoch, travel_info)
+        entries.move_to_end(key)
+        if len(entries) > self.max_size:
+            _, (old_epoch, _) = entries.popitem(last=False)
+            if old_epoch != self.epoch:
+                self.stale_evictions += 1
+            else:
+                self.evictions += 1
+
+    def new_epoch(self):
+        """ has to be called after travel times changed; all stored entries become invalid """
+        self.epoch += 1
+
+    def get_statistics(self):
+        """ :return: dictionary of cumulative cache counters and current number of entries """
+        return {CACHE_HITS: self.hits, CACHE_MISSES: self.misses, CACHE_EVICTIONS: self.evictions,
+                CACHE_STALE_EVICTIONS: self.stale_evictions, CACHE_SIZE: len(self._entries)}
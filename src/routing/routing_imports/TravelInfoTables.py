@@ -0,0 +1,244 @@
+"""
+Loading of preprocessed node-to-node travel time and distance tables (numpy .npy files).
+
+Table modes:
+    "memory": table is loaded completely into private memory (default)
+    "mmap": table is opened read-only memory mapped -> parallel simulations on one host share the OS page cache
+    "mmap_float32": compact float32 copy of the table is memory mapped
+    "mmap_uint16": table is stored as scaled uint16 values and memory mapped; UINT16_INF encodes unreachable entries
+
+Compact copies are created next to the original table on first use and reused afterwards
+(uint16 tables store their scale factor in an additional '.scale' file).
+
+Tables loaded in "memory" mode can be copied into shared memory blocks (share_loaded_travel_info_tables()).
+Child processes that received the handles (attach_shared_travel_info_tables()) then attach to these blocks
+read-only instead of loading the files again (requires python >= 3.8).
+"""
+import os
+import logging
+import weakref
+
+import numpy as np
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
+
+LOG = logging.getLogger(__name__)
+
+TABLE_MODES = ("memory", "mmap", "mmap_float32", "mmap_uint16")
+UINT16_INF = np.iinfo(np.uint16).max
+
+_loaded_tables = weakref.WeakValueDictionary()  # table file -> TravelInfoTable loaded in "memory" mode
+_shared_blocks = {}  # table file -> (SharedMemory, handle) created by this process
+_attached_handles = {}  # table file -> handle of a table shared by the parent process
+_attached_blocks = {}  # shared memory name -> SharedMemory attached by this process
+
+
+class TravelInfoTable:
+    """Read-only access to a node-to-node table. Lookups return python floats (inf if unreachable)."""
+    def __init__(self, array, scale=None, as_list=False):
+        """
+        :param array: 2d numpy array (possibly memory mapped)
+        :param scale: None for float tables; for uint16 tables: stored value = round(value * scale)
+        :param as_list: keeps the table as nested list instead of the array for fastest scalar lookups
+            (only for "memory" mode; row/column access is slower then)
+        """
+        self.array = array
+        self.scale = scale
+        self.shape = array.shape
+        self._rows = None
+        if as_list:
+            self._rows = array.tolist()
+            self.array = None
+            self.get = self._get_from_list
+        elif scale is None:
+            self.get = self._get_from_array
+        else:
+            self.get = self._get_scaled
+
+    def _get_from_list(self, o_index, d_index):
+        return self._rows[o_index][d_index]
+
+    def _get_from_array(self, o_index, d_index):
+        return self.array.item(o_index, d_index)
+
+    def _get_scaled(self, o_index, d_index):
+        value = self.array.item(o_index, d_index)
+        if value == UINT16_INF:
+            return np.inf
+        return value / self.scale
+
+    def _decode(self, values):
+        if self.scale is None:
+            return np.asarray(values, dtype=np.float64)
+        decoded = values / self.scale
+        decoded[values == UINT16_INF] = np.inf
+        return decoded
+
+    def to_array(self):
+        """:return: numpy array of the table (new array for tables kept as nested list)"""
+        if self._rows is not None:
+            return np.array(self._rows, dtype=np.float64)
+        return self.array
+
+    def row(self, o_index):
+        """:return: float array of all values from o_index"""
+        if self._rows is not None:
+            return np.array(self._rows[o_index], dtype=np.float64)
+        return self._decode(self.array[o_index, :])
+
+    def column(self, d_index):
+        """:return: float array of all values to d_index"""
+        if self._rows is not None:
+            return np.array([row[d_index] for row in self._rows], dtype=np.float64)
+        return self._decode(self.array[:, d_index])
+
+    def submatrix(self, o_indices, d_indices):
+        """:return: float array of shape (len(o_indices), len(d_indices))"""
+        if self._rows is not None:
+            return np.array([[self._rows[o_index][d_index] for d_index in d_indices] for o_index in o_indices],
+                            dtype=np.float64).reshape(len(o_indices), len(d_indices))
+        return self._decode(self.array[np.ix_(o_indices, d_indices)])
+
+
+def _compact_file_name(table_f, dtype_str):
+    base, ext = os.path.splitext(table_f)
+    return f"{base}_{dtype_str}{ext}"
+
+
+def _replace_atomic(tmp_f, out_f):
+    """ files are written to a temporary file first to prevent parallel simulations from reading incomplete files """
+    os.replace(tmp_f, out_f)
+
+
+def _read_scale(compact_f):
+    scale_f = f"{compact_f}.scale"
+    if os.path.isfile(scale_f):
+        with open(scale_f) as fh:
+            return float(fh.read())
+    return None
+
+
+def create_compact_table(table_f, dtype_str, chunk_rows=1000):
+    """ creates a compact copy of the table in table_f next to the original file
+    the table is converted in chunks of rows to keep the memory footprint small
+
+    :param table_f: path to .npy table with float values
+    :param dtype_str: "float32" or "uint16"
+    :param chunk_rows: number of rows converted at once
+    :return: path to compact table
+    """
+    if dtype_str not in ("float32", "uint16"):
+        raise IOError(f"dtype {dtype_str} not available for compact travel info tables")
+    out_f = _compact_file_name(table_f, dtype_str)
+    LOG.info(f"creating {dtype_str} copy of {table_f}")
+    array = np.load(table_f, mmap_mode="r")
+    tmp_f = f"{out_f}.{os.getpid()}.tmp"
+    compact = np.lib.format.open_memmap(tmp_f, mode="w+", dtype=dtype_str, shape=array.shape)
+    if dtype_str == "float32":
+        for i in range(0, array.shape[0], chunk_rows):
+            compact[i:i+chunk_rows] = array[i:i+chunk_rows]
+    else:
+        max_value = 0.0
+        for i in range(0, array.shape[0], chunk_rows):
+            chunk = array[i:i+chunk_rows]
+            finite_chunk = chunk[np.isfinite(chunk)]
+            if finite_chunk.size > 0:
+                max_value = max(max_value, float(finite_chunk.max()))
+        scale = (UINT16_INF - 1) / max_value if max_value > 0 else 1.0
+        for i in range(0, array.shape[0], chunk_rows):
+            chunk = array[i:i+chunk_rows]
+            finite = np.isfinite(chunk)
+            compact_chunk = np.full(chunk.shape, UINT16_INF, dtype=np.uint16)
+            compact_chunk[finite] = np.round(chunk[finite] * scale)
+            compact[i:i+chunk_rows] = compact_chunk
+        scale_tmp_f = f"{out_f}.scale.{os.getpid()}.tmp"
+        with open(scale_tmp_f, "w") as fh:
+            fh.write(repr(scale))
+        _replace_atomic(scale_tmp_f, f"{out_f}.scale")
+    compact.flush()
+    del compact
+    _replace_atomic(tmp_f, out_f)
+    return out_f
+
+
+def load_travel_info_table(table_f, table_mode=None, as_list=False):
+    """ loads a node-to-node table
+
+    :param table_f: path to .npy table with float values
+    :param table_mode: one of TABLE_MODES (None -> "memory")
+    :param as_list: "memory" mode only: keep table as nested list for scalar lookups
+    :return: TravelInfoTable
+    """
+    if table_mode is None or table_mode == "memory":
+        table_key = os.path.abspath(table_f)
+        handle = _attached_handles.get(table_key)
+        if handle is not None:
+            return TravelInfoTable(_attach_shared_array(handle))
+        table = TravelInfoTable(np.load(table_f), as_list=as_list)
+        _loaded_tables[table_key] = table
+        return table
+    if table_mode not in TABLE_MODES:
+        raise IOError(f"travel info table mode {table_mode} invalid! Possible modes: {TABLE_MODES}")
+    if table_mode == "mmap":
+        return TravelInfoTable(np.load(table_f, mmap_mode="r"))
+    dtype_str = table_mode.split("_")[1]
+    compact_f = _compact_file_name(table_f, dtype_str)
+    if not os.path.isfile(compact_f) or os.path.getmtime(compact_f) < os.path.getmtime(table_f):
+        create_compact_table(table_f, dtype_str)
+    scale = None
+    if dtype_str == "uint16":
+        scale = _read_scale(compact_f)
+    return TravelInfoTable(np.load(compact_f, mmap_mode="r"), scale=scale)
+
+
+def _attach_shared_array(handle):
+    """ :param handle: (shared memory name, shape, dtype str)
+    :return: read-only numpy array on the shared memory block"""
+    shm_name, shape, dtype_str = handle
+    shm = _attached_blocks.get(shm_name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _attached_blocks[shm_name] = shm
+    array = np.ndarray(shape, dtype=dtype_str, buffer=shm.buf)
+    array.flags.writeable = False
+    return array
+
+
+def share_loaded_travel_info_tables():
+    """ copies all tables that are currently loaded in "memory" mode by this process into shared memory blocks
+    (tables that have already been shared are not copied again)
+
+    :return: dict table file -> handle; empty if shared memory is not available
+    """
+    if shared_memory is None:
+        return {}
+    handles = {}
+    for table_key, table in list(_loaded_tables.items()):
+        if table_key not in _shared_blocks:
+            array = np.ascontiguousarray(table.to_array())
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+            _shared_blocks[table_key] = (shm, (shm.name, array.shape, array.dtype.str))
+            LOG.info(f"travel info table {table_key} copied to shared memory {shm.name}")
+        handles[table_key] = _shared_blocks[table_key][1]
+    return handles
+
+
+def attach_shared_travel_info_tables(handles):
+    """ registers handles created by share_loaded_travel_info_tables() in a parent process;
+    afterwards load_travel_info_table() attaches to the shared blocks of these files in "memory" mode
+
+    :param handles: dict table file -> handle
+    """
+    if handles and shared_memory is not None:
+        _attached_handles.update(handles)
+
+
+def release_shared_travel_info_tables():
+    """ frees all shared memory blocks created by this process; attached processes have to be terminated before """
+    for shm, _ in _shared_blocks.values():
+        shm.close()
+        shm.unlink()
+    _shared_blocks.clear()
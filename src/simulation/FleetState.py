@@ -0,0 +1,105 @@
+# -------------------------------------------------------------------------------------------------------------------- #
+# standard distribution imports
+# -----------------------------
+from __future__ import annotations
+import logging
+import typing as tp
+
+# additional module imports (> requirements)
+# ------------------------------------------
+import numpy as np
+
+# src imports
+# -----------
+from src.misc.globals import *
+
+if tp.TYPE_CHECKING:
+    from src.simulation.Vehicles import SimulationVehicle
+
+LOG = logging.getLogger(__name__)
+
+INIT_CAPACITY = 64
+
+
+# Fleet State class
+# -----------------
+# > columnar copy of the vehicle states; vehicles write their state changes through to this store
+class FleetState:
+    def __init__(self):
+        """
+        Initialization of the columnar fleet state. Every registered vehicle gets a fleet index (row in the arrays);
+        the status array is updated whenever the status of a vehicle changes. Only states that are queried in bulk
+        are stored, as every column costs an update per state change.
+        """
+        self.nr_vehicles = 0
+        self.op_vid_to_index: tp.Dict[tp.Tuple[int, int], int] = {}
+        self.vehicles: tp.List[SimulationVehicle] = []
+        self.op_id = np.zeros(INIT_CAPACITY, dtype=np.int64)
+        self.vid = np.zeros(INIT_CAPACITY, dtype=np.int64)
+        self.status = np.zeros(INIT_CAPACITY, dtype=np.int64)
+
+    def register_vehicle(self, veh_obj : SimulationVehicle) -> int:
+        """This method adds a vehicle to the store, writes its current state and connects the vehicle to the store.
+
+        :param veh_obj: simulation vehicle
+        :return: fleet index of the vehicle
+        """
+        if self.nr_vehicles == len(self.op_id):
+            self._increase_capacity()
+        fleet_index = self.nr_vehicles
+        self.nr_vehicles += 1
+        self.op_vid_to_index[(veh_obj.op_id, veh_obj.vid)] = fleet_index
+        self.vehicles.append(veh_obj)
+        self.op_id[fleet_index] = veh_obj.op_id
+        self.vid[fleet_index] = veh_obj.vid
+        veh_obj.set_fleet_state(self, fleet_index)
+        return fleet_index
+
+    def _increase_capacity(self):
+        new_capacity = 2 * len(self.op_id)
+        for att, fill_value in [("op_id", 0), ("vid", 0), ("status", 0)]:
+            old_array = getattr(self, att)
+            new_array = np.full(new_capacity, fill_value, dtype=old_array.dtype)
+            new_array[:len(old_array)] = old_array
+            setattr(self, att, new_array)
+
+    # write methods (called by vehicles)
+    # ----------------------------------
+    def set_status(self, fleet_index : int, status : VRL_STATES):
+        self.status[fleet_index] = status.value if isinstance(status, VRL_STATES) else status
+
+    # bulk queries
+    # ------------
+    def get_vehicles(self, status_list : tp.Optional[tp.List[VRL_STATES]] = None,
+                     op_id : tp.Optional[int] = None) -> tp.List[SimulationVehicle]:
+        """This method returns all vehicle objects with the given status and operator in the order of registration.
+
+        :param status_list: list of VRL_STATES; all vehicles if None
+        :param op_id: operator id; all operators if None
+        :return: list of simulation vehicles
+        """
+        return [self.vehicles[fleet_index] for fleet_index in np.flatnonzero(self._get_mask(status_list, op_id))]
+
+    def count_status(self, op_id : tp.Optional[int] = None) -> tp.Dict[VRL_STATES, int]:
+        """This method counts the vehicles of an operator in each of the vehicle statuses.
+
+        :param op_id: operator id; all operators if None
+        :return: dictionary VRL_STATES -> number of vehicles (all states)
+        """
+        count = {state: 0 for state in VRL_STATES}
+        status_values, counts = np.unique(self.status[:self.nr_vehicles][self._get_mask(None, op_id)],
+                                          return_counts=True)
+        value_to_state = {state.value: state for state in VRL_STATES}
+        for status_value, nr_vehicles in zip(status_values.tolist(), counts.tolist()):
+            count[value_to_state[status_value]] = nr_vehicles
+        return count
+
+    def _get_mask(self, status_list, op_id):
+        n = self.nr_vehicles
+        if status_list is None:
+            mask = np.ones(n, dtype=bool)
+        else:
+            mask = np.isin(self.status[:n], [status.value for status in status_list])
+        if op_id is not None:
+            mask &= self.op_id[:n] == op_id
+        return mask
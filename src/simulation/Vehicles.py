@@ -14,11 +14,60 @@ from src.simulation.StationaryProcess import ChargingProcess
 
 if tp.TYPE_CHECKING:
     from src.demand.TravelerModels import RequestBase
+    from src.simulation.FleetState import FleetState
     from src.routing.NetworkBase import NetworkBase
     from src.fleetctrl.FleetControlBase import FleetControlBase
 
 LOG = logging.getLogger(__name__)
 
+# Vehicle type registry
+# ---------------------
+class VehicleType(tp.NamedTuple):
+    """Immutable record of the attributes of a vehicle type; shared by all vehicles of this type."""
+    name: str
+    max_pax: int
+    max_parcels: int
+    daily_fix_cost: float
+    distance_cost: float  # per meter
+    battery_size: float
+    range: float
+    soc_per_m: float
+
+
+_VEHICLE_TYPE_REGISTRY: tp.Dict[tp.Tuple[str, str], VehicleType] = {}
+
+
+def load_vehicle_type(vehicle_data_dir : str, vehicle_type : str) -> VehicleType:
+    """This function returns the vehicle type record of a vehicle type. The type file is only parsed for the first
+    request; later calls return the same record from the registry.
+
+    :param vehicle_data_dir: vehicle data directory
+    :param vehicle_type: name of vehicle type file (without .csv)
+    :return: VehicleType record
+    """
+    key = (vehicle_data_dir, vehicle_type)
+    veh_type_record = _VEHICLE_TYPE_REGISTRY.get(key)
+    if veh_type_record is None:
+        veh_data_f = os.path.join(vehicle_data_dir, f"{vehicle_type}.csv")
+        veh_data = pd.read_csv(veh_data_f, header=None, index_col=0, squeeze=True)
+        veh_range = float(veh_data[G_VTYPE_RANGE])
+        veh_type_record = VehicleType(name=veh_data[G_VTYPE_NAME],
+                                      max_pax=int(veh_data[G_VTYPE_MAX_PAX]),
+                                      max_parcels=int(veh_data.get(G_VTYPE_MAX_PARCELS, 0)),
+                                      daily_fix_cost=float(veh_data[G_VTYPE_FIX_COST]),
+                                      distance_cost=float(veh_data[G_VTYPE_DIST_COST])/1000.0,
+                                      battery_size=float(veh_data[G_VTYPE_BATTERY_SIZE]),
+                                      range=veh_range,
+                                      soc_per_m=1/(veh_range*1000))
+        _VEHICLE_TYPE_REGISTRY[key] = veh_type_record
+    return veh_type_record
+
+
+def clear_vehicle_type_registry():
+    """This function removes all loaded vehicle types from the registry (e.g. if type files changed between runs)."""
+    _VEHICLE_TYPE_REGISTRY.clear()
+
+
 # Simulation Vehicle class
 # ------------------------
 # > guarantee consistent movements in simulation and output
@@ -45,16 +94,19 @@ class SimulationVehicle:
         self.record_route_flag = record_route_flag
         self.replay_flag = replay_flag
         #
-        veh_data_f = os.path.join(vehicle_data_dir, f"{vehicle_type}.csv")
-        veh_data = pd.read_csv(veh_data_f, header=None, index_col=0, squeeze=True)
-        self.veh_type = veh_data[G_VTYPE_NAME]
-        self.max_pax = int(veh_data[G_VTYPE_MAX_PAX])
-        self.max_parcels = int(veh_data.get(G_VTYPE_MAX_PARCELS, 0))
-        self.daily_fix_cost = float(veh_data[G_VTYPE_FIX_COST])
-        self.distance_cost = float(veh_data[G_VTYPE_DIST_COST])/1000.0
-        self.battery_size = float(veh_data[G_VTYPE_BATTERY_SIZE])
-        self.range = float(veh_data[G_VTYPE_RANGE])
-        self.soc_per_m = 1/(self.range*1000)
+        # type attributes are parsed once per vehicle type and shared by reference
+        self.veh_type_record = load_vehicle_type(vehicle_data_dir, vehicle_type)
+        self.veh_type = self.veh_type_record.name
+        self.max_pax = self.veh_type_record.max_pax
+        self.max_parcels = self.veh_type_record.max_parcels
+        self.daily_fix_cost = self.veh_type_record.daily_fix_cost
+        self.distance_cost = self.veh_type_record.distance_cost
+        self.battery_size = self.veh_type_record.battery_size
+        self.range = self.veh_type_record.range
+        self.soc_per_m = self.veh_type_record.soc_per_m
+        # columnar fleet state (set by FleetState.register_vehicle); the status is written through
+        self.fleet_state: tp.Optional[FleetState] = None
+        self.fleet_index: tp.Optional[int] = None
         # current info
         self.status = VRL_STATES.IDLE
         self.pos = None
@@ -75,6 +127,25 @@ class SimulationVehicle:
         self.cl_locked = False
         # TODO # check and think about consistent way for large time steps -> will vehicles wait until next update?
         self.start_next_leg_first = False   # flag, if True, a new assignment has been made, which has to be activated first in the next call of update_veh_state
+        self._precomputed_move = None   # result of a fleet-wide move for the next call of _move (see set_precomputed_move)
+
+    @property
+    def status(self) -> VRL_STATES:
+        return self._status
+
+    @status.setter
+    def status(self, status : VRL_STATES):
+        self._status = status
+        if self.fleet_state is not None:
+            self.fleet_state.set_status(self.fleet_index, status)
+
+    def set_fleet_state(self, fleet_state : FleetState, fleet_index : int):
+        """ this method connects the vehicle to a columnar fleet state and writes its current state
+        :param fleet_state: FleetState object
+        :param fleet_index: index of the vehicle in fleet_state"""
+        self.fleet_state = fleet_state
+        self.fleet_index = fleet_index
+        fleet_state.set_status(fleet_index, self.status)
 
     def __str__(self):
         return f"veh {self.vid} at pos {self.pos} with soc {self.soc} leg status {self.status} remaining time {self.cl_remaining_time} number remaining legs: {len(self.assigned_route)} ob : {[rq.get_rid_struct() for rq in self.pax]}"
@@ -459,6 +530,30 @@ class SimulationVehicle:
                 remaining_step_time = 0
         return dict_boarding_requests, dict_alighting_requests, list_passed_VRL, dict_start_alighting
 
+    def get_next_event_time(self, simulation_time:float)->float:
+        """This method returns the time at which the current VehicleRouteLeg ends based on the current travel times.
+        It is used to skip simulation time steps in which no vehicle state changes have to be processed.
+
+        :param simulation_time: current simulation time (time of the current vehicle state)
+        :return: end time of current task (simulation_time if the vehicle has to be updated in the next time step,
+            inf for idle vehicles or tasks without stop criterion)
+        """
+        if self.start_next_leg_first:
+            return simulation_time
+        if self.status in G_DRIVING_STATUS:
+            if not self.cl_remaining_route:
+                return simulation_time
+            if self.pos[1] is None:
+                rel_start_edge_position = 0.0
+            else:
+                rel_start_edge_position = self.pos[2]
+            arrival_time, _ = self.routing_engine.return_route_infos([self.pos[0]] + self.cl_remaining_route,
+                                                                     rel_start_edge_position, simulation_time)
+            return arrival_time
+        elif self.status != VRL_STATES.IDLE and self.cl_remaining_time is not None:
+            return simulation_time + self.cl_remaining_time
+        return float("inf")
+
     def update_route(self):
         if self.assigned_route:
             ca = self.assigned_route[0]
@@ -540,31 +635,60 @@ class SimulationVehicle:
         :param remaining_step_time: remaining time of the current update step
         :param update_start_time: time when update step started
         :return: arrival in time step (-1 if still moving at end of update step, time of arrival at end of route otherwise"""        
-        (new_pos, driven_distance, arrival_in_time_step, passed_nodes, passed_node_times) = \
-            self.routing_engine.move_along_route(self.cl_remaining_route, self.pos, remaining_step_time,
-                                                    sim_vid_id=(self.op_id, self.vid),
-                                                    new_sim_time=c_time,
-                                                    record_node_times=self.replay_flag)
+        move_result = None
+        if self._precomputed_move is not None:
+            move_input, route, move_result = self._precomputed_move
+            self._precomputed_move = None
+            if route is not self.cl_remaining_route or \
+                    move_input != (c_time, remaining_step_time, self.pos, len(self.cl_remaining_route)):
+                move_result = None
+        if move_result is None:
+            move_result = self.routing_engine.move_along_route(self.cl_remaining_route, self.pos, remaining_step_time,
+                                                               sim_vid_id=(self.op_id, self.vid),
+                                                               new_sim_time=c_time,
+                                                               record_node_times=self.replay_flag)
+        (new_pos, driven_distance, arrival_in_time_step, passed_nodes, passed_node_times) = move_result
         last_node = self.pos[0]
         self.pos = new_pos
         self.cl_driven_distance += driven_distance
         self.soc -= self.compute_soc_consumption(driven_distance)
         if passed_nodes:
             self.cl_driven_route.extend(passed_nodes)
-        for node in passed_nodes:
-            self.cl_remaining_route.remove(node)
-            tmp_toll_route = [last_node, node]
-            # TODO #
+            # passed nodes are the leading nodes of the remaining route -> remove them with one slice operation
+            nr_passed = len(passed_nodes)
+            if self.cl_remaining_route[:nr_passed] == passed_nodes:
+                del self.cl_remaining_route[:nr_passed]
+            else:
+                for node in passed_nodes:
+                    self.cl_remaining_route.remove(node)
+            # toll costs are summed up edge by edge -> evaluate the driven part of the route at once
+            tmp_toll_route = [last_node] + passed_nodes
             _, toll_costs, _ = \
                 self.routing_engine.get_zones_external_route_costs(update_start_time,
                                                                     tmp_toll_route,
                                                                     park_origin=False, park_destination=False)
             self.cl_toll_costs += toll_costs
-            last_node = node
         if passed_node_times:
             self.cl_driven_route_times.extend(passed_node_times)
         return arrival_in_time_step
     
+    def get_batch_move_input(self)->tp.Optional[tp.Tuple[tp.List[int], tuple]]:
+        """ this function returns the input for a fleet-wide move of all driving vehicles at the start of an update
+        step (routing_engine.move_fleet_along_routes)
+        :return: (remaining route, position) if the vehicle starts the update step on a driving leg; None otherwise"""
+        if self.status in G_DRIVING_STATUS and not self.start_next_leg_first:
+            return self.cl_remaining_route, self.pos
+        return None
+
+    def set_precomputed_move(self, c_time:float, remaining_step_time:float, move_result:tuple):
+        """ this function stores the result of a fleet-wide move. it replaces the call of move_along_route in the next
+        call of _move, if this is called with the same time interval, position and remaining route
+        :param c_time: start_time of the moving process
+        :param remaining_step_time: time of the moving process
+        :param move_result: result tuple of move_along_route"""
+        move_input = (c_time, remaining_step_time, self.pos, len(self.cl_remaining_route))
+        self._precomputed_move = (move_input, self.cl_remaining_route, move_result)
+
     def _compute_new_route(self, target_pos:tuple)->tp.List[int]:
         """ this function is used internally when the route has to be updated
         this is usefull in case it has to be overwritten to trigger additional processes
@@ -615,6 +739,10 @@ class ExternallyMovingSimulationVehicle(SimulationVehicle):
         elif veh_pos is not None and not self.start_next_leg_first:
             raise EnvironmentError(f"moving without having a driving task? {self}")
 
+    def get_next_event_time(self, simulation_time):
+        """ vehicle movements are controlled externally -> vehicles have to be updated in every time step """
+        return simulation_time
+
     def start_next_leg(self, simulation_time):
         """
         This function resets the current task attributes of a vehicle. Furthermore, it returns a list of currently
@@ -635,6 +763,10 @@ class ExternallyMovingSimulationVehicle(SimulationVehicle):
         LOG.debug(" -> compute new route for {}".format(self))
         return super()._compute_new_route(target_pos)
 
+    def get_batch_move_input(self):
+        """ vehicles are moved externally -> not part of fleet-wide moves """
+        return None
+
     def _move(self, c_time, remaining_step_time, update_start_time):
         """ overwrite the function called in update_veh_state
         -> return -1 indicating that vehicle is still moving; (controlled externally
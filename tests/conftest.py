@@ -0,0 +1,73 @@
+# -------------------------------------------------------------------------------------------------------------------- #
+# standard distribution imports
+# -----------------------------
+import os
+import sys
+import shutil
+
+# additional module imports (> requirements)
+# ------------------------------------------
+import pandas as pd
+import pytest
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if MAIN_DIR not in sys.path:
+    sys.path.insert(0, MAIN_DIR)
+
+# src imports
+# -----------
+import src.misc.config as config
+from src.misc.globals import *
+
+STUDY_NAME = "example_study"
+SCENARIO_DIR = os.path.join(MAIN_DIR, "studies", STUDY_NAME, "scenarios")
+RESULTS_DIR = os.path.join(MAIN_DIR, "studies", STUDY_NAME, "results")
+
+
+def get_example_scenario(constant_config_f, scenario_f, scenario_index=0, **parameters):
+    """This function combines constant and scenario parameters of an example scenario like run_scenarios() in
+    run_examples.py.
+
+    :param constant_config_f: file name of the constant config in studies/example_study/scenarios
+    :param scenario_f: file name of the scenario config in studies/example_study/scenarios
+    :param scenario_index: row of the scenario config
+    :param parameters: parameters replacing the ones from the config files
+    :return: scenario parameter dictionary
+    """
+    constant_cfg = config.ConstantConfig(os.path.join(SCENARIO_DIR, constant_config_f))
+    constant_cfg[G_STUDY_NAME] = STUDY_NAME
+    constant_cfg["n_cpu_per_sim"] = 1
+    constant_cfg["evaluate"] = 1
+    constant_cfg["log_level"] = "warning"
+    constant_cfg["keep_old"] = False
+    scenario_cfg = config.ScenarioConfig(os.path.join(SCENARIO_DIR, scenario_f))[scenario_index]
+    scenario_parameters = constant_cfg + scenario_cfg
+    scenario_parameters.update(parameters)
+    return scenario_parameters
+
+
+@pytest.fixture
+def run_example(monkeypatch):
+    """Runs example scenarios (with the open-source solver HiGHS) and removes their output afterwards. The fixture
+    returns a function with the arguments of get_example_scenario(); its scenario_name has to be given and is the
+    name of the output directory that is returned."""
+    from run_examples import run_single_simulation
+    monkeypatch.chdir(MAIN_DIR)
+    output_dirs = []
+
+    def _run_example(constant_config_f, scenario_f, scenario_index=0, **parameters):
+        parameters.setdefault(G_RA_SOLVER, "HiGHS")
+        scenario_parameters = get_example_scenario(constant_config_f, scenario_f, scenario_index, **parameters)
+        output_dir = os.path.join(RESULTS_DIR, scenario_parameters[G_SCENARIO_NAME])
+        output_dirs.append(output_dir)
+        run_single_simulation(scenario_parameters)
+        return output_dir
+
+    yield _run_example
+    for output_dir in output_dirs:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def read_eval_df(output_dir, file_name="standard_eval.csv"):
+    """ reads an evaluation output file with KPIs as rows and operators as columns """
+    return pd.read_csv(os.path.join(output_dir, file_name), index_col=0)
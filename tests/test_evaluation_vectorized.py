@@ -0,0 +1,61 @@
+import os
+import glob
+import subprocess
+import types
+
+import pandas as pd
+import pytest
+
+from conftest import MAIN_DIR, read_eval_df
+from src.misc.globals import *
+import src.evaluation.standard as standard
+import src.evaluation.temporal as temporal
+
+# last commit with the row-wise (groupby/iterrows/apply) processing of the vehicle records in the evaluation
+ROWWISE_EVALUATION_COMMIT = "df90eb25e0aaed548118ceacd12402e73f9fbbb2"
+
+
+def load_rowwise_module(module_name):
+    """ loads src/evaluation/<module_name>.py of ROWWISE_EVALUATION_COMMIT from the git history """
+    try:
+        source = subprocess.run(["git", "show", f"{ROWWISE_EVALUATION_COMMIT}:src/evaluation/{module_name}.py"],
+                                cwd=MAIN_DIR, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip(f"row-wise evaluation (commit {ROWWISE_EVALUATION_COMMIT}) not available in git history")
+    module_f = os.path.join(MAIN_DIR, "src", "evaluation", f"{module_name}.py")
+    module = types.ModuleType(f"rowwise_{module_name}")
+    module.__file__ = module_f
+    exec(compile(source, module_f, "exec"), module.__dict__)
+    return module
+
+
+def read_eval_dfs(output_dir):
+    return {os.path.basename(f): read_eval_df(output_dir, os.path.basename(f))
+            for f in glob.glob(os.path.join(output_dir, "standard*eval.csv"))}
+
+
+@pytest.mark.parametrize("constant_config_f, scenario_f", [("constant_config_pool.csv", "example_pool.csv"),
+                                                            ("constant_config_depot.csv", "example_depot.csv")])
+def test_vectorized_evaluation_equals_rowwise_evaluation(run_example, constant_config_f, scenario_f):
+    rowwise_standard = load_rowwise_module("standard")
+    rowwise_temporal = load_rowwise_module("temporal")
+    output_dir = run_example(constant_config_f, scenario_f, scenario_name="test_evaluation_vectorized")
+
+    rowwise_standard.standard_evaluation(output_dir)
+    rowwise_eval_dfs = read_eval_dfs(output_dir)
+    standard.standard_evaluation(output_dir)
+    eval_dfs = read_eval_dfs(output_dir)
+    assert sorted(eval_dfs.keys()) == sorted(rowwise_eval_dfs.keys())
+    for eval_f, eval_df in eval_dfs.items():
+        pd.testing.assert_frame_equal(eval_df, rowwise_eval_dfs[eval_f], check_exact=False, rtol=1e-9, obj=eval_f)
+
+    scenario_parameters, list_operator_attributes, _ = standard.load_scenario_inputs(output_dir)
+    for op_id in range(scenario_parameters[G_NR_OPERATORS]):
+        for evaluation_start_time, evaluation_end_time in [(None, None), (1800, 5400)]:
+            # only the records are compared (not their index labels)
+            rowwise_op_df = rowwise_temporal._load_op_stats_and_infer_idle_states(
+                output_dir, scenario_parameters, op_id, evaluation_start_time, evaluation_end_time)
+            op_df = temporal._load_op_stats_and_infer_idle_states(
+                output_dir, scenario_parameters, op_id, evaluation_start_time, evaluation_end_time)
+            pd.testing.assert_frame_equal(op_df.reset_index(drop=True), rowwise_op_df.reset_index(drop=True),
+                                          check_exact=False, rtol=1e-9)
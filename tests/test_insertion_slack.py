@@ -0,0 +1,32 @@
+import os
+
+import pandas as pd
+import pytest
+
+import src.fleetctrl.pooling.immediate.insertion as insertion
+from src.misc.globals import *
+
+EXAMPLE_SCENARIOS = [("constant_config_ir.csv", "example_ir_only.csv"),
+                     ("constant_config_pool.csv", "example_pool.csv"),
+                     ("constant_config_ir.csv", "example_ir_batch.csv")]
+
+
+def read_stats(output_dir):
+    """ reads user and operator records of a scenario (sorted, as the order within a time step is not relevant) """
+    user_stats = pd.read_csv(os.path.join(output_dir, "1_user-stats.csv"))
+    user_stats = user_stats.sort_values(list(user_stats.columns)).reset_index(drop=True)
+    op_stats = pd.read_csv(os.path.join(output_dir, "2-0_op-stats.csv"))
+    op_stats = op_stats.sort_values([G_V_VID, G_VR_LEG_START_TIME]).reset_index(drop=True)
+    return user_stats, op_stats
+
+
+@pytest.mark.parametrize("constant_config_f, scenario_f", EXAMPLE_SCENARIOS)
+def test_insertion_slack_keeps_accepted_plans(run_example, monkeypatch, constant_config_f, scenario_f):
+    """ accepted requests and vehicle routes have to be the same with and without rejecting insertions by slack """
+    output_dir = run_example(constant_config_f, scenario_f, scenario_name="test_insertion_slack")
+    with_slack_user_stats, with_slack_op_stats = read_stats(output_dir)
+    monkeypatch.setattr(insertion, "USE_INSERTION_SLACK", False)
+    output_dir = run_example(constant_config_f, scenario_f, scenario_name="test_insertion_no_slack")
+    no_slack_user_stats, no_slack_op_stats = read_stats(output_dir)
+    pd.testing.assert_frame_equal(with_slack_user_stats, no_slack_user_stats)
+    pd.testing.assert_frame_equal(with_slack_op_stats, no_slack_op_stats)
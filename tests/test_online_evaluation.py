@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import read_eval_df
+from src.misc.globals import *
+from src.evaluation.online import ONLINE_EVAL_F, WAIT_TIME_RESOLUTION
+
+HIST_QUANTILE_KPIS = ["waiting time (median)", "waiting time (90% quantile)"]
+
+
+@pytest.mark.parametrize("constant_config_f, scenario_f", [("constant_config_ir.csv", "example_ir_only.csv"),
+                                                            ("constant_config_pool.csv", "example_pool.csv")])
+def test_online_kpis_equal_standard_evaluation(run_example, constant_config_f, scenario_f):
+    output_dir = run_example(constant_config_f, scenario_f, scenario_name="test_online_evaluation",
+                             **{G_EVAL_ONLINE: True})
+    standard_df = read_eval_df(output_dir)
+    online_df = read_eval_df(output_dir, ONLINE_EVAL_F)
+    assert list(online_df.columns) == list(standard_df.columns)
+    for kpi in online_df.index:
+        for op_name in online_df.columns:
+            online_value = float(online_df.loc[kpi, op_name])
+            standard_value = float(standard_df.loc[kpi, op_name])
+            # quantiles of the online evaluation are computed from a waiting time histogram
+            atol = WAIT_TIME_RESOLUTION if kpi in HIST_QUANTILE_KPIS else 1e-6
+            assert np.isclose(online_value, standard_value, rtol=1e-9, atol=atol, equal_nan=True), \
+                f"{kpi} of {op_name}: online {online_value} != standard {standard_value}"
+
+
+def test_online_evaluation_only_writes_standard_eval(run_example):
+    output_dir = run_example("constant_config_ir.csv", "example_ir_only.csv", scenario_name="test_online_evaluation",
+                             **{G_EVAL_ONLINE: True, G_EVAL_ONLINE_ONLY: True})
+    assert read_eval_df(output_dir).equals(read_eval_df(output_dir, ONLINE_EVAL_F))
+    assert not os.path.isfile(os.path.join(output_dir, "standard_mod-0_veh_eval.csv"))
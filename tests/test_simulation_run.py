@@ -0,0 +1,25 @@
+import pytest
+
+from src.FleetSimulationBase import FleetSimulationBase
+
+
+class StepError(Exception):
+    pass
+
+
+def test_exception_while_closing_output_keeps_original_exception(run_example, monkeypatch):
+    """ if the simulation is stopped by an exception, a failing close_output_files() must not replace it """
+    close_output_files = FleetSimulationBase.close_output_files
+
+    def _iterate_sim_times(self):
+        yield self.start_time
+        raise StepError("simulation stopped")
+
+    def _close_output_files(self):
+        close_output_files(self)
+        raise OSError("closing the output files failed")
+
+    monkeypatch.setattr(FleetSimulationBase, "_iterate_sim_times", _iterate_sim_times)
+    monkeypatch.setattr(FleetSimulationBase, "close_output_files", _close_output_files)
+    with pytest.raises(StepError):
+        run_example("constant_config_ir.csv", "example_ir_only.csv", scenario_name="test_simulation_run")